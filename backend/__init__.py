@@ -1,7 +1,7 @@
 from flask import Flask
 
 from backend.routes import register_api_routes, register_mobile_api_routes, register_web_routes
-from backend.services import build_path_config, configure_app, init_db
+from backend.services import build_path_config, configure_app, init_db, start_question_pools
 
 
 def create_app(config_overrides=None):
@@ -23,4 +23,5 @@ def create_app(config_overrides=None):
     register_web_routes(app)
     register_api_routes(app)
     register_mobile_api_routes(app)
+    start_question_pools(app)
     return app
@@ -21,106 +21,28 @@ def register_api_routes(app):
         return v
 
 
-    def _cleanup_tts_cache_dir(cache_dir: str, keep_paths=None) -> dict:
-        """Best-effort cleanup for gTTS MP3 cache (size cap + TTL)."""
-        keep = {os.path.abspath(p) for p in (keep_paths or []) if p}
-
+    def _cleanup_tts_cache_dir(cache_dir: str, keep_keys=None) -> dict:
+        """Best-effort cleanup for gTTS MP3 cache (size cap + TTL), driven by the cache manifest."""
         ttl_days = _env_int('TTS_CACHE_TTL_DAYS', 45, min_val=0, max_val=3650)
         max_mb = _env_int('TTS_CACHE_MAX_MB', 80, min_val=0, max_val=4096)
         max_files = _env_int('TTS_CACHE_MAX_FILES', 5000, min_val=0, max_val=500000)
         min_age_sec = _env_int('TTS_CACHE_MIN_AGE_SEC', 120, min_val=0, max_val=86400)
 
-        ttl_sec = ttl_days * 86400
-        max_bytes = max_mb * 1024 * 1024
-
-        now = time.time()
-        removed = 0
-        removed_bytes = 0
-        scanned = 0
-
         if not cache_dir:
             return {'ok': False, 'error': 'missing_cache_dir'}
         if not os.path.isdir(cache_dir):
-            return {'ok': True, 'scanned': 0, 'removed': 0, 'removed_bytes': 0}
-
-        entries = []  # [(last_used, size, path)]
-        try:
-            for ent in os.scandir(cache_dir):
-                if not ent.is_file():
-                    continue
-                scanned += 1
-                name = ent.name or ''
-                try:
-                    st = ent.stat()
-                except OSError:
-                    continue
-
-                path = ent.path
-                if not path:
-                    continue
-                apath = os.path.abspath(path)
-                age = now - float(st.st_mtime or 0.0)
-
-                # Clean up stale temp files if any remain after crashes.
-                if name.endswith('.tmp.mp3') or name.endswith('.tmp'):
-                    if age >= max(3600, min_age_sec):
-                        try:
-                            os.remove(apath)
-                            removed += 1
-                            removed_bytes += int(st.st_size or 0)
-                        except OSError:
-                            pass
-                    continue
-
-                if not name.endswith('.mp3'):
-                    continue
-
-                if apath in keep:
-                    continue
-
-                last_used = max(float(getattr(st, 'st_atime', 0.0) or 0.0), float(st.st_mtime or 0.0))
-                # Avoid deleting files that may be in-flight / very recent.
-                if (now - last_used) < min_age_sec:
-                    continue
-
-                # TTL delete pass (based on last access when available).
-                if ttl_sec and (now - last_used) > ttl_sec:
-                    try:
-                        os.remove(apath)
-                        removed += 1
-                        removed_bytes += int(st.st_size or 0)
-                    except OSError:
-                        pass
-                    continue
-
-                entries.append((last_used, int(st.st_size or 0), apath))
-        except OSError:
-            # Directory vanished or permission issue; just skip.
-            return {'ok': False, 'error': 'scan_failed'}
-
-        # Enforce max file count and/or size (delete least-recently-used by last_used).
-        if (max_files and len(entries) > max_files) or (max_bytes and sum(s for _, s, __ in entries) > max_bytes):
-            entries.sort(key=lambda x: x[0])  # oldest first
-
-            total_bytes = sum(s for _, s, __ in entries)
-            i = 0
-            while i < len(entries):
-                if (max_files and (len(entries) - i) <= max_files) and (not max_bytes or total_bytes <= max_bytes):
-                    break
-                _, size, path = entries[i]
-                try:
-                    os.remove(path)
-                    removed += 1
-                    removed_bytes += int(size or 0)
-                    total_bytes -= int(size or 0)
-                except OSError:
-                    pass
-                i += 1
-
-        return {'ok': True, 'scanned': scanned, 'removed': removed, 'removed_bytes': removed_bytes}
+            return {'ok': True, 'removed': 0, 'removed_bytes': 0}
+
+        return get_tts_store(cache_dir).evict(
+            ttl_sec=ttl_days * 86400,
+            max_files=max_files,
+            max_bytes=max_mb * 1024 * 1024,
+            min_age_sec=min_age_sec,
+            keep=keep_keys or (),
+        )
 
 
-    def _trigger_tts_cache_cleanup(cache_dir: str, keep_paths=None) -> None:
+    def _trigger_tts_cache_cleanup(cache_dir: str, keep_keys=None) -> None:
         """Rate-limited background cleanup for the TTS cache dir."""
         nonlocal _TTS_CLEAN_RUNNING, _TTS_CLEAN_LAST_TS
 
@@ -137,7 +59,7 @@ def register_api_routes(app):
         def _run():
             nonlocal _TTS_CLEAN_RUNNING, _TTS_CLEAN_LAST_TS
             try:
-                _cleanup_tts_cache_dir(cache_dir, keep_paths=keep_paths)
+                _cleanup_tts_cache_dir(cache_dir, keep_keys=keep_keys)
             except Exception as exc:
                 print(f"WARNING: TTS cache cleanup failed: {exc}")
             finally:
@@ -263,6 +185,41 @@ def register_api_routes(app):
         t.start()
 
 
+    _STUDY_CLEAN_LOCK = threading.Lock()
+    _STUDY_CLEAN_RUNNING = False
+    _STUDY_CLEAN_LAST_TS = 0.0
+
+
+    def _trigger_study_session_cleanup() -> None:
+        """Rate-limited purge of study sessions that were opened but never submitted.
+
+        Runs inline: it is one indexed DELETE, at most once per interval per process.
+        """
+        nonlocal _STUDY_CLEAN_RUNNING, _STUDY_CLEAN_LAST_TS
+
+        ttl_hours = _env_int('STUDY_SESSION_TTL_HOURS', 48, min_val=0, max_val=8760)
+        interval = _env_int('STUDY_SESSION_CLEANUP_INTERVAL_SEC', 3600, min_val=60, max_val=86400)
+        if ttl_hours <= 0:
+            return
+
+        now = time.time()
+        with _STUDY_CLEAN_LOCK:
+            if _STUDY_CLEAN_RUNNING:
+                return
+            if (now - _STUDY_CLEAN_LAST_TS) < float(interval):
+                return
+            _STUDY_CLEAN_RUNNING = True
+
+        try:
+            purge_study_sessions(ttl_hours * 3600)
+        except Exception as exc:
+            print(f"WARNING: Study session cleanup failed: {exc}")
+        finally:
+            with _STUDY_CLEAN_LOCK:
+                _STUDY_CLEAN_LAST_TS = time.time()
+                _STUDY_CLEAN_RUNNING = False
+
+
     @app.before_request
     def _maybe_run_housekeeping():  # pragma: no cover
         """Run lightweight housekeeping even when Scheduled Tasks are unavailable (free tiers)."""
@@ -270,6 +227,7 @@ def register_api_routes(app):
             cache_dir = app.config.get('TTS_CACHE_DIR') or TTS_CACHE_DIR
             _trigger_tts_cache_cleanup(cache_dir)
             _trigger_project_debug_cleanup(app.config.get('BASE_DIR') or _config_path('BASE_DIR'))
+            _trigger_study_session_cleanup()
         except Exception:
             # Never block user requests because of housekeeping.
             return None
@@ -278,72 +236,112 @@ def register_api_routes(app):
 
     @app.route('/api/tts')
     def api_tts():
-        provider = (app.config.get('TTS_PROVIDER') or 'auto').strip().lower()
-        if provider not in {'gtts', 'auto'}:
-            return ('TTS disabled (set TTS_PROVIDER=gtts or auto on the server)', 501)
+        chain = tts_provider_chain(app.config.get('TTS_PROVIDER') or 'auto')
+        if not chain:
+            return ('TTS disabled (set TTS_PROVIDER=gtts, espeak or auto on the server)', 501)
 
         text = (request.args.get('text') or '').strip()
-        lang_tag = (request.args.get('lang') or '').strip().lower().replace('_', '-')
+        tts_lang = tts_lang_code(request.args.get('lang') or '')
 
         if not text:
             return ('Missing "text"', 400)
         if len(text) > 400:
             return ('Text too long (max 400 chars)', 400)
-
-        if lang_tag.startswith('fr'):
-            tts_lang = 'fr'
-        elif lang_tag.startswith('es'):
-            tts_lang = 'es'
-        elif lang_tag.startswith('en'):
-            tts_lang = 'en'
-        elif lang_tag.startswith('bn'):
-            tts_lang = 'bn'
-        else:
+        if not tts_lang:
             return ('Unsupported language (use en-US, fr-FR, es-ES, bn-BD)', 400)
 
-        # Normalize whitespace to improve cache hit rate and avoid odd linebreak reads.
-        norm_text = ' '.join(text.split())
-        # Both `gtts` and `auto` generate audio via gTTS; use a stable cache prefix so the same
-        # text+language hits the same cached MP3 regardless of the configured provider.
-        cache_provider = 'gtts'
-        cache_key = hashlib.sha256(f'{cache_provider}|{tts_lang}|{norm_text}'.encode('utf-8')).hexdigest()
+        norm_text = normalize_tts_text(text)
+        store = get_tts_store(app.config.get('TTS_CACHE_DIR') or TTS_CACHE_DIR)
+        cache_key = chain[0].cache_key(tts_lang, norm_text)
 
-        cache_dir = app.config.get('TTS_CACHE_DIR') or TTS_CACHE_DIR
-        os.makedirs(cache_dir, exist_ok=True)
-        final_path = os.path.join(cache_dir, f'{cache_key}.mp3')
+        if request.if_none_match.contains(cache_key):
+            # A key always maps to the same audio, so a client holding it is up to date.
+            store.served(cache_key)
+            resp = app.response_class(status=304)
+            resp.set_etag(cache_key)
+            resp.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+            return resp
 
-        if not os.path.exists(final_path):
-            try:
-                from gtts import gTTS
-            except Exception as exc:  # pragma: no cover
-                return (f'TTS server dependency missing: {exc}', 500)
-
-            # gTTS can vary slightly by top-level domain (accent/voice). Allow override per language.
-            tld_default = (os.environ.get('GTTS_TLD') or 'com').strip() or 'com'
-            tld = tld_default
-            if tts_lang == 'es':
-                tld = (os.environ.get('GTTS_TLD_ES') or tld_default).strip() or tld_default
-            elif tts_lang == 'fr':
-                tld = (os.environ.get('GTTS_TLD_FR') or tld_default).strip() or tld_default
-            elif tts_lang == 'bn':
-                tld = (os.environ.get('GTTS_TLD_BN') or tld_default).strip() or tld_default
-            elif tts_lang == 'en':
-                tld = (os.environ.get('GTTS_TLD_EN') or tld_default).strip() or tld_default
-
-            tmp_path = os.path.join(cache_dir, f'.{cache_key}.{uuid.uuid4().hex}.tmp.mp3')
-            try:
-                gTTS(text=norm_text, lang=tts_lang, slow=False, tld=tld).save(tmp_path)
-                os.replace(tmp_path, final_path)
-            finally:
-                try:
-                    if os.path.exists(tmp_path):
-                        os.remove(tmp_path)
-                except OSError:
-                    pass
+        if store.exists(cache_key):
+            provider_name, served_key = chain[0].name, cache_key
+        else:
+            # Misses are generated by the background queue (one job per key, shared by
+            # concurrent requests); the request only waits briefly for it, then answers
+            # 202 and the client speaks with the browser voice or polls the status URL.
+            job = tts_generation_queue.job(cache_key)
+            if not (job and job['status'] == 'done' and store.exists(job['result_key'])):
+                job = tts_generation_queue.submit(
+                    store, chain, tts_lang, norm_text, cache_key,
+                    hedge_after=_env_int('TTS_HEDGE_AFTER_MS', 3000, min_val=0, max_val=60000) / 1000.0,
+                    wait=_env_int('TTS_GENERATE_WAIT_SEC', 20, min_val=1, max_val=120),
+                )
+                if job is None:
+                    return ('TTS queue is full; retry shortly', 503, {'Retry-After': '5'})
+                job['event'].wait(_env_int('TTS_QUEUE_INLINE_WAIT_MS', 1500, min_val=0, max_val=30000) / 1000.0)
+            if job['status'] == 'failed':
+                return (f"TTS generation failed: {job['error']}", 502)
+            if job['status'] != 'done':
+                return _tts_pending_response(job)
+            provider_name, served_key = job['provider'], job['result_key']
+
+        store.served(served_key)
+        _trigger_tts_cache_cleanup(store.cache_dir, keep_keys={served_key})
+        # The cache key hashes provider, voice, language and text, and a clip is never
+        # rewritten under its key: it is a strong ETag for the audio bytes.
+        resp = send_cache_file(store, store.path_for(served_key), etag=served_key)
+        if served_key == cache_key:
+            resp.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+        else:
+            # Fallback audio: let clients come back for the preferred provider's clip.
+            resp.headers['Cache-Control'] = 'public, max-age=3600'
+        resp.headers['X-TTS-Provider'] = provider_name
+        return resp
+
+    def _tts_pending_response(job):
+        status_url = url_for('api_tts_job', key=job['key'])
+        resp = jsonify({
+            'ok': False,
+            'status': job['status'],
+            'position': tts_generation_queue.position(job),
+            'status_url': status_url,
+            'retry_after': 1,
+        })
+        resp.status_code = 202
+        resp.headers['Retry-After'] = '1'
+        resp.headers['Location'] = status_url
+        resp.headers['Cache-Control'] = 'no-store'
+        return resp
 
-        _trigger_tts_cache_cleanup(cache_dir, keep_paths={final_path})
-        resp = send_file(final_path, mimetype='audio/mpeg', conditional=True)
-        resp.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    @app.route('/api/tts/jobs/<key>')
+    def api_tts_job(key):
+        """Status of a queued TTS clip: queued, running, done or failed."""
+        job = tts_generation_queue.job(key)
+        if job is None:
+            # Jobs live in the process that queued them; another worker only sees the cache
+            # and the cross-process single-flight lock.
+            store = get_tts_store(app.config.get('TTS_CACHE_DIR') or TTS_CACHE_DIR)
+            if re.fullmatch(r'[0-9a-f]{64}', key or ''):
+                if store.exists(key):
+                    return jsonify({'ok': True, 'status': 'done'})
+                if store.generating(key):
+                    resp = jsonify({'ok': True, 'status': 'running', 'position': 0})
+                    resp.headers['Retry-After'] = '1'
+                    resp.headers['Cache-Control'] = 'no-store'
+                    return resp
+            resp = jsonify({'ok': False, 'status': 'unknown'})
+            resp.status_code = 404
+            resp.headers['Cache-Control'] = 'no-store'
+            return resp
+        resp = jsonify({
+            'ok': job['status'] != 'failed',
+            'status': job['status'],
+            'position': tts_generation_queue.position(job),
+            'provider': job['provider'],
+            'error': job['error'],
+        })
+        if job['status'] in ('queued', 'running'):
+            resp.headers['Retry-After'] = '1'
+        resp.headers['Cache-Control'] = 'no-store'
         return resp
 
     @app.route('/api/translate', methods=['POST'])
@@ -423,37 +421,53 @@ def register_api_routes(app):
             return jsonify({'ok': False}), 400
 
         uid = current_user_id()
-        now_iso = _now_iso()
-        conn = get_db()
-        if uid is None:
-            conn.execute('''
-                INSERT INTO lesson_progress (language, lesson_id, completed, best_score, attempts, last_seen)
-                VALUES (?, ?, 1, ?, 1, ?)
-                ON CONFLICT(language, lesson_id) DO UPDATE SET
-                    completed  = 1,
-                    best_score = MAX(best_score, excluded.best_score),
-                    attempts   = attempts + 1,
-                    last_seen  = excluded.last_seen
-            ''', (lang, lesson_id, score, now_iso))
-        else:
-            conn.execute('''
-                INSERT INTO user_lesson_progress (user_id, language, lesson_id, completed, best_score, attempts, last_seen)
-                VALUES (?, ?, ?, 1, ?, 1, ?)
-                ON CONFLICT(user_id, language, lesson_id) DO UPDATE SET
-                    completed  = 1,
-                    best_score = MAX(best_score, excluded.best_score),
-                    attempts   = attempts + 1,
-                    last_seen  = excluded.last_seen
-            ''', (uid, lang, lesson_id, score, now_iso))
-        conn.commit()
-        conn.close()
-        if uid is not None:
-            user = get_user_by_id(uid)
-            quiz_url = url_for('quiz', lang=lang, lesson_id=lesson_id)
-            _emit_event_to_sheets('lesson_complete', user=user, language=lang, lesson_id=lesson_id, score=score, page=quiz_url)
-            _emit_user_snapshot_to_sheets(user, last_event='lesson_complete', language=lang, lesson_id=lesson_id, score=score, page=quiz_url)
+        complete_lesson(lang, lesson_id, score, user_id=uid)
+        _emit_lesson_complete(uid, lang, lesson_id, score)
         return jsonify({'ok': True})
 
+    @app.route('/api/study_sessions/<session_id>/submit', methods=['POST'])
+    def api_study_session_submit(session_id):
+        """Grade a quiz/practice/placement page in one request (replaces per-answer writes)."""
+        data = request.json or {}
+        uid = current_user_id()
+        study = get_study_session(session_id)
+        if not study or study['kind'] not in {'quiz', 'practice', 'placement'} or not study_session_belongs_to(study, uid):
+            return jsonify({'ok': False, 'error': 'Unknown session.'}), 404
+        if study['result'] is not None:
+            return jsonify(study['result'])
+        if study['content_version'] != get_content_version():
+            return jsonify({'ok': False, 'error': 'Course content changed. Please reload the page.'}), 409
+
+        questions = study_session_questions(study)
+        answers = parse_session_answers(data.get('answers'), len(questions))
+        if answers is None:
+            return jsonify({'ok': False, 'error': 'Invalid answers.'}), 400
+
+        if study['kind'] == 'placement':
+            result, _ = submit_placement_session(study, answers, questions)
+            return jsonify(result)
+
+        result, applied = submit_study_session(study, answers, questions)
+        if applied and study['kind'] == 'quiz':
+            _emit_lesson_complete(uid, study['language'], result['lesson_id'], result['score_pct'])
+        return jsonify(result)
+
+    @app.route('/api/metrics')
+    def api_metrics():
+        """Background worker metrics; 404 unless METRICS_TOKEN is set and passed as `?token=`."""
+        token = str(app.config.get('METRICS_TOKEN') or os.environ.get('METRICS_TOKEN') or '').strip()
+        if not token or not secrets.compare_digest(request.args.get('token') or '', token):
+            return jsonify({'ok': False, 'error': 'Not found.'}), 404
+        return jsonify({
+            'ok': True,
+            'question_pools': question_pools.metrics(),
+            'tts_single_flight': tts_single_flight.metrics(),
+            'pdf_single_flight': pdf_single_flight.metrics(),
+            'tts_queue': tts_generation_queue.metrics(),
+            'pdf_browser_pool': chromium_pdf_pool.metrics(),
+            'pdf_render_queue': pdf_render_queue.metrics(),
+        })
+
 
     @app.route('/api/feedback', methods=['POST'])
     def api_feedback():
@@ -534,114 +548,11 @@ def register_api_routes(app):
         xp = max(0, min(50, xp))
         if lang not in LANG_META or not word:
             return jsonify({'ok': False}), 400
-        now = _app_now()
-        now_iso = now.isoformat(timespec='seconds')
-
-        # Simple spaced repetition (Leitner boxes)
-        box_intervals_days = {1: 1, 2: 2, 3: 4, 4: 7, 5: 14}
-        fail_retry_hours = 6
-
         uid = current_user_id()
         conn = get_db()
-        if uid is None:
-            row = conn.execute(
-                'SELECT id, box FROM word_progress WHERE language=? AND word=?', (lang, word)
-            ).fetchone()
-        else:
-            row = conn.execute(
-                'SELECT id, box FROM user_word_progress WHERE user_id=? AND language=? AND word=?', (uid, lang, word)
-            ).fetchone()
-        old_box = int(row['box'] or 1) if row else 1
-
-        if correct:
-            new_box = min(old_box + 1, 5)
-            next_due = (now + timedelta(days=box_intervals_days[new_box])).isoformat(timespec='seconds')
-            if row:
-                if uid is None:
-                    conn.execute('''
-                        UPDATE word_progress
-                        SET correct = correct + 1,
-                            box = ?,
-                            next_due = ?,
-                            last_review = ?
-                        WHERE language=? AND word=?
-                    ''', (new_box, next_due, now_iso, lang, word))
-                else:
-                    conn.execute('''
-                        UPDATE user_word_progress
-                        SET correct = correct + 1,
-                            box = ?,
-                            next_due = ?,
-                            last_review = ?
-                        WHERE user_id=? AND language=? AND word=?
-                    ''', (new_box, next_due, now_iso, uid, lang, word))
-            else:
-                if uid is None:
-                    conn.execute('''
-                        INSERT INTO word_progress (language, word, correct, incorrect, box, next_due, last_review)
-                        VALUES (?,?,?,?,?,?,?)
-                    ''', (lang, word, 1, 0, new_box, next_due, now_iso))
-                else:
-                    conn.execute('''
-                        INSERT INTO user_word_progress (user_id, language, word, correct, incorrect, box, next_due, last_review)
-                        VALUES (?,?,?,?,?,?,?,?)
-                    ''', (uid, lang, word, 1, 0, new_box, next_due, now_iso))
-        else:
-            new_box = 1
-            next_due = (now + timedelta(hours=fail_retry_hours)).isoformat(timespec='seconds')
-            if row:
-                if uid is None:
-                    conn.execute('''
-                        UPDATE word_progress
-                        SET incorrect = incorrect + 1,
-                            box = ?,
-                            next_due = ?,
-                            last_review = ?
-                        WHERE language=? AND word=?
-                    ''', (new_box, next_due, now_iso, lang, word))
-                else:
-                    conn.execute('''
-                        UPDATE user_word_progress
-                        SET incorrect = incorrect + 1,
-                            box = ?,
-                            next_due = ?,
-                            last_review = ?
-                        WHERE user_id=? AND language=? AND word=?
-                    ''', (new_box, next_due, now_iso, uid, lang, word))
-            else:
-                if uid is None:
-                    conn.execute('''
-                        INSERT INTO word_progress (language, word, correct, incorrect, box, next_due, last_review)
-                        VALUES (?,?,?,?,?,?,?)
-                    ''', (lang, word, 0, 1, new_box, next_due, now_iso))
-                else:
-                    conn.execute('''
-                        INSERT INTO user_word_progress (user_id, language, word, correct, incorrect, box, next_due, last_review)
-                        VALUES (?,?,?,?,?,?,?,?)
-                    ''', (uid, lang, word, 0, 1, new_box, next_due, now_iso))
-
+        record_word_review(lang, word, correct, user_id=uid, conn=conn)
         # Log daily activity for streak/XP (client can pass xp per action)
-        today = _today_iso()
-        if uid is None:
-            conn.execute('''
-                INSERT INTO daily_activity (date, xp, reviews, correct, wrong)
-                VALUES (?, ?, 1, ?, ?)
-                ON CONFLICT(date) DO UPDATE SET
-                    xp = xp + excluded.xp,
-                    reviews = reviews + excluded.reviews,
-                    correct = correct + excluded.correct,
-                    wrong = wrong + excluded.wrong
-            ''', (today, xp, 1 if correct else 0, 0 if correct else 1))
-        else:
-            conn.execute('''
-                INSERT INTO user_daily_activity (user_id, date, xp, reviews, correct, wrong)
-                VALUES (?, ?, ?, 1, ?, ?)
-                ON CONFLICT(user_id, date) DO UPDATE SET
-                    xp = xp + excluded.xp,
-                    reviews = reviews + excluded.reviews,
-                    correct = correct + excluded.correct,
-                    wrong = wrong + excluded.wrong
-            ''', (uid, today, xp, 1 if correct else 0, 0 if correct else 1))
+        add_activity(xp=xp, reviews=1, correct=1 if correct else 0, wrong=0 if correct else 1, user_id=uid, conn=conn)
         conn.commit()
         conn.close()
         return jsonify({'ok': True})
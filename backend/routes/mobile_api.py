@@ -72,6 +72,20 @@ def register_mobile_api_routes(app):
             return None, None, None
         return None, None, _error('unauthorized', 'Missing or invalid bearer token.', 401)
 
+    def _not_modified(etag, private=False, vary=None):
+        """304 when If-None-Match already has `etag`; checked before the payload is built."""
+        if not request.if_none_match.contains_weak(etag):
+            return None
+        return _with_etag(app.response_class(status=304), etag, private=private, vary=vary)
+
+    def _with_etag(resp, etag, private=False, vary=None):
+        # Content only changes on deploy/reload: clients keep the body and revalidate.
+        resp.set_etag(etag)
+        resp.headers['Cache-Control'] = 'private, no-cache' if private else 'no-cache'
+        if vary:
+            resp.vary.add(vary)
+        return resp
+
     def _user_payload(user):
         return {
             'id': int(user['id']),
@@ -172,6 +186,55 @@ def register_mobile_api_routes(app):
             parsed = min(parsed, maximum)
         return parsed, None
 
+    def _question_payload(question, index, category):
+        kind = question.get('kind')
+        return {
+            'question_id': f'q_{index + 1:03d}',
+            'kind': kind,
+            'mode': question.get('mode'),
+            'mode_label': question.get('mode_label'),
+            'category': category,
+            'cefr': question.get('cefr'),
+            'prompt': {
+                'en': question.get('prompt_en'),
+                'bn': question.get('prompt_bn'),
+            },
+            'choices': list(question.get('choices') or []) if kind == 'mcq' else None,
+            'tokens': list(question.get('tokens') or []) if kind == 'order' else None,
+            'hint_bn': question.get('hint_bn') or None,
+            'tts': {
+                'text': question.get('tts_text'),
+                'lang_tag': question.get('tts_lang'),
+            },
+            'track_word': question.get('word'),
+        }
+
+    def _parse_answers(data, question_count):
+        answers = parse_session_answers(data.get('answers'), question_count)
+        if answers is None:
+            return None, _error(
+                'validation_error', 'answers must be a list of known question_ids.', 400, fields={'answers': 'invalid'},
+            )
+        return answers, None
+
+    def _word_update_payload(update):
+        return {**update, 'next_due': to_rfc3339(update.get('next_due'))}
+
+    def _session_result_payload(result, user_id):
+        payload = {**result, 'word_updates': [_word_update_payload(u) for u in result.get('word_updates') or []]}
+        if result.get('completion'):
+            payload['completion'] = {**result['completion'], 'last_seen': to_rfc3339(result['completion'].get('last_seen'))}
+        payload['activity_today'] = get_activity_summary(user_id=user_id)
+        return payload
+
+    def _study_session_or_404(language, session_id, kind, user):
+        study = get_study_session(session_id)
+        if not study or study['kind'] != kind or study['language'] != language or study['user_id'] != user['id']:
+            return None, _error('not_found', 'Unknown session.', 404)
+        if study['result'] is None and study['content_version'] != get_content_version():
+            return None, _error('session_expired', 'Course content changed. Please start a new session.', 409)
+        return study, None
+
     @app.route('/api/v1/auth/session', methods=['POST'])
     def api_v1_auth_session_create():
         data, body_error = _json_body()
@@ -232,12 +295,17 @@ def register_mobile_api_routes(app):
 
     @app.route('/api/v1/languages')
     def api_v1_languages():
-        return jsonify(
+        etag = api_content_etag('languages')
+        not_modified = _not_modified(etag)
+        if not_modified:
+            return not_modified
+        resp = jsonify(
             {
                 'ok': True,
                 'languages': [_language_payload(language) for language in LANGS],
             }
         )
+        return _with_etag(resp, etag)
 
     @app.route('/api/v1/languages/<language>/lessons')
     def api_v1_language_lessons(language):
@@ -249,6 +317,14 @@ def register_mobile_api_routes(app):
         if auth_error:
             return auth_error
 
+        if user:
+            etag = api_content_etag('lessons', language, 'user', progress_version(language, user['id']))
+        else:
+            etag = api_content_etag('lessons', language)
+        not_modified = _not_modified(etag, private=bool(user), vary='Authorization')
+        if not_modified:
+            return not_modified
+
         progress = load_progress(language, user_id=user['id']) if user else {}
         recommended = _recommended_lesson(lessons, progress)
         lesson_payloads = []
@@ -256,7 +332,7 @@ def register_mobile_api_routes(app):
             lesson_progress = progress.get(lesson['id'], {}) if user else None
             lesson_payloads.append(_lesson_summary_payload(lesson, lesson_progress))
 
-        return jsonify(
+        resp = jsonify(
             {
                 'ok': True,
                 'language': language,
@@ -264,6 +340,7 @@ def register_mobile_api_routes(app):
                 'lessons': lesson_payloads,
             }
         )
+        return _with_etag(resp, etag, private=bool(user), vary='Authorization')
 
     @app.route('/api/v1/languages/<language>/lessons/<int:lesson_id>/touch', methods=['POST'])
     def api_v1_lesson_touch(language, lesson_id):
@@ -278,12 +355,51 @@ def register_mobile_api_routes(app):
         last_seen = touch_lesson(language, int(lesson['id']), user_id=user['id'])
         return jsonify({'ok': True, 'last_seen': to_rfc3339(last_seen)})
 
+    @app.route('/api/v1/languages/<language>/lessons/<int:lesson_id>/audio_bundle')
+    def api_v1_lesson_audio_bundle(language, lesson_id):
+        """All cached audio of a lesson in one response (`format=zip|mp3|index`)."""
+        _, lesson, lookup_error = _find_lesson_or_404(language, lesson_id)
+        if lookup_error:
+            return lookup_error
+
+        fmt = (request.args.get('format') or 'zip').strip().lower()
+        if fmt not in {*_AUDIO_BUNDLE_FORMATS, 'index'}:
+            return _error('validation_error', 'format must be zip, mp3 or index.', 400, fields={'format': 'invalid'})
+
+        store = get_tts_store(app.config.get('TTS_CACHE_DIR') or TTS_CACHE_DIR)
+        try:
+            # The offset index describes the concatenated MP3, so both come from that bundle.
+            bundle = lesson_audio_bundle(
+                store, language, lesson, fmt='mp3' if fmt == 'index' else fmt,
+                chain=tts_provider_chain(app.config.get('TTS_PROVIDER') or 'auto'),
+            )
+        except TimeoutError:
+            payload, status = _error('busy', 'Audio bundle is being built. Retry shortly.', 503)
+            payload.headers['Retry-After'] = '2'
+            return payload, status
+
+        if fmt == 'index':
+            resp = jsonify({'ok': True, **bundle['index']})
+            resp.set_etag(bundle['bundle_id'])
+            resp = resp.make_conditional(request)
+        else:
+            resp = send_cache_file(
+                store,
+                bundle['path'],
+                etag=bundle['bundle_id'],
+                mimetype='application/zip' if fmt == 'zip' else 'audio/mpeg',
+                download_name=f'{language}-lesson-{int(lesson["id"])}-audio.{fmt}',
+            )
+        # Bundles change as more clips get cached: let clients revalidate with the ETag.
+        resp.headers['Cache-Control'] = 'no-cache'
+        resp.headers['X-Audio-Bundle-Missing'] = str(len(bundle['index']['missing']))
+        return resp
+
     @app.route('/api/v1/languages/<language>/vocabulary')
     def api_v1_vocabulary(language):
         if language not in LANG_META:
             return _error('not_found', 'Unknown language.', 404)
 
-        vocab_by_cat = get_vocab().get(language, {}) or {}
         category = (request.args.get('category') or 'all').strip()
         limit, limit_error = _parse_non_negative_int(request.args.get('limit'), 'limit', 60, minimum=1, maximum=200)
         if limit_error:
@@ -292,6 +408,13 @@ def register_mobile_api_routes(app):
         if offset_error:
             return offset_error
 
+        # Unknown categories never get an ETag, so a match is always a valid request.
+        etag = api_content_etag('vocabulary', language, category, limit, offset)
+        not_modified = _not_modified(etag)
+        if not_modified:
+            return not_modified
+
+        vocab_by_cat = get_vocab().get(language, {}) or {}
         if category != 'all' and category not in vocab_by_cat:
             return _error('not_found', 'Unknown vocabulary category.', 404)
 
@@ -318,7 +441,7 @@ def register_mobile_api_routes(app):
         total = len(items)
         paged_items = items[offset: offset + limit]
 
-        return jsonify(
+        resp = jsonify(
             {
                 'ok': True,
                 'language': language,
@@ -330,6 +453,7 @@ def register_mobile_api_routes(app):
                 'items': paged_items,
             }
         )
+        return _with_etag(resp, etag)
 
     @app.route('/api/v1/progress')
     def api_v1_progress():
@@ -377,3 +501,247 @@ def register_mobile_api_routes(app):
         if include_lessons:
             payload['lessons'] = lessons_payload
         return jsonify(payload)
+
+    def _placement_session_or_404(language, session_id, user):
+        study = get_study_session(session_id)
+        if study and study['kind'] == 'placement_adaptive':
+            return _study_session_or_404(language, session_id, 'placement_adaptive', user)
+        return _study_session_or_404(language, session_id, 'placement', user)
+
+    def _finish_adaptive_placement(study):
+        result = _placement_result(
+            study['language'], _adaptive_placement_result(study['language'], study['state'] or {}), adaptive=True,
+        )
+        if not finish_study_session(study['id'], result):
+            result = get_study_session(study['id'])['result']
+        return result
+
+    @app.route('/api/v1/languages/<language>/placement/sessions', methods=['POST'])
+    def api_v1_placement_session_create(language):
+        _, language_error = _language_lessons_or_404(language)
+        if language_error:
+            return language_error
+
+        user, _, auth_error = _api_user(optional=False)
+        if auth_error:
+            return auth_error
+
+        data, body_error = _json_body()
+        if body_error:
+            return body_error
+
+        if _parse_bool(data.get('adaptive')):
+            study = create_study_session(
+                user['id'], language, 'placement_adaptive',
+                {'max_questions': _ADAPTIVE_MAX_ITEMS},
+                state_builder=lambda seed: start_adaptive_placement(language, seed),
+            )
+            question = adaptive_question(language, study['seed'], study['state'], 0)
+            if not question:
+                return _error('not_found', 'No placement questions available.', 404)
+            return jsonify(
+                {
+                    'ok': True,
+                    'session_id': study['id'],
+                    'language': language,
+                    'adaptive': True,
+                    'max_questions': _ADAPTIVE_MAX_ITEMS,
+                    'answered': 0,
+                    'question': _question_payload(question, 0, 'placement'),
+                }
+            ), 201
+
+        per_level, per_level_error = _parse_non_negative_int(
+            data.get('questions_per_level'), 'questions_per_level', 10, minimum=6, maximum=16,
+        )
+        if per_level_error:
+            return per_level_error
+
+        study = create_study_session(user['id'], language, 'placement', {'questions_per_level': per_level})
+        questions = study_session_questions(study)
+        return jsonify(
+            {
+                'ok': True,
+                'session_id': study['id'],
+                'language': language,
+                'adaptive': False,
+                'questions_per_level': per_level,
+                'question_count': len(questions),
+                'questions': [_question_payload(q, i, 'placement') for i, q in enumerate(questions)],
+            }
+        ), 201
+
+    @app.route('/api/v1/languages/<language>/placement/sessions/<session_id>/answers', methods=['POST'])
+    def api_v1_placement_session_answer(language, session_id):
+        user, _, auth_error = _api_user(optional=False)
+        if auth_error:
+            return auth_error
+
+        study, session_error = _study_session_or_404(language, session_id, 'placement_adaptive', user)
+        if session_error:
+            return session_error
+        if study['result'] is not None:
+            return _error('conflict', 'Session already finished.', 409)
+
+        data, body_error = _json_body()
+        if body_error:
+            return body_error
+
+        state = study['state'] or {}
+        step = len(state.get('responses') or [])
+        if str(data.get('question_id') or '') != f'q_{step + 1:03d}':
+            return _error(
+                'validation_error', 'Answer the current question first.', 400, fields={'question_id': 'invalid'},
+            )
+
+        new_state, correct, finished, theta, se = answer_adaptive_placement(
+            language, study['seed'], state, data.get('answer'),
+        )
+        if not update_study_session_state(study['id'], step, new_state):
+            return _error('conflict', 'This question was already answered.', 409)
+        record_placement_responses(
+            study['id'], user['id'], language,
+            [(new_state['items'][step], correct, new_state['difficulties'][step])],
+        )
+
+        payload = {
+            'ok': True,
+            'session_id': study['id'],
+            'correct': bool(correct),
+            'answered': step + 1,
+            'finished': finished,
+        }
+        if finished:
+            study['state'] = new_state
+            payload['result'] = _finish_adaptive_placement(study)
+        else:
+            question = adaptive_question(language, study['seed'], new_state, step + 1)
+            payload['question'] = _question_payload(question, step + 1, 'placement')
+        return jsonify(payload)
+
+    @app.route('/api/v1/languages/<language>/placement/sessions/<session_id>/submit', methods=['POST'])
+    def api_v1_placement_session_submit(language, session_id):
+        user, _, auth_error = _api_user(optional=False)
+        if auth_error:
+            return auth_error
+
+        study, session_error = _placement_session_or_404(language, session_id, user)
+        if session_error:
+            return session_error
+        if study['result'] is not None:
+            return jsonify(study['result'])
+
+        if study['kind'] == 'placement_adaptive':
+            # Ends the adaptive test early with the current estimate.
+            return jsonify(_finish_adaptive_placement(study))
+
+        data, body_error = _json_body()
+        if body_error:
+            return body_error
+
+        questions = study_session_questions(study)
+        answers, answers_error = _parse_answers(data, len(questions))
+        if answers_error:
+            return answers_error
+
+        result, _ = submit_placement_session(study, answers, questions)
+        return jsonify(result)
+
+    def _submit_study_session(language, session_id, kind):
+        user, _, auth_error = _api_user(optional=False)
+        if auth_error:
+            return auth_error
+
+        study, session_error = _study_session_or_404(language, session_id, kind, user)
+        if session_error:
+            return session_error
+        if study['result'] is not None:
+            return jsonify(_session_result_payload(study['result'], user['id']))
+
+        data, body_error = _json_body()
+        if body_error:
+            return body_error
+
+        questions = study_session_questions(study)
+        answers, answers_error = _parse_answers(data, len(questions))
+        if answers_error:
+            return answers_error
+
+        result, applied = submit_study_session(study, answers, questions)
+        if applied and kind == 'quiz':
+            _emit_lesson_complete(user['id'], language, result['lesson_id'], result['score_pct'])
+        return jsonify(_session_result_payload(result, user['id']))
+
+    @app.route('/api/v1/languages/<language>/lessons/<int:lesson_id>/quiz_sessions', methods=['POST'])
+    def api_v1_quiz_session_create(language, lesson_id):
+        _, lesson, lesson_error = _find_lesson_or_404(language, lesson_id)
+        if lesson_error:
+            return lesson_error
+
+        user, _, auth_error = _api_user(optional=False)
+        if auth_error:
+            return auth_error
+
+        touch_lesson(language, lesson_id, user_id=user['id'])
+        study, questions = create_quiz_session(user['id'], language, lesson)
+        return jsonify(
+            {
+                'ok': True,
+                'session_id': study['id'],
+                'language': language,
+                'lesson_id': lesson_id,
+                'question_count': len(questions),
+                'questions': [
+                    _question_payload({**q, 'kind': 'mcq'}, i, q['kind']) for i, q in enumerate(questions)
+                ],
+            }
+        ), 201
+
+    @app.route('/api/v1/languages/<language>/quiz_sessions/<session_id>/submit', methods=['POST'])
+    def api_v1_quiz_session_submit(language, session_id):
+        return _submit_study_session(language, session_id, 'quiz')
+
+    @app.route('/api/v1/languages/<language>/practice_sessions', methods=['POST'])
+    def api_v1_practice_session_create(language):
+        _, language_error = _language_lessons_or_404(language)
+        if language_error:
+            return language_error
+
+        user, _, auth_error = _api_user(optional=False)
+        if auth_error:
+            return auth_error
+
+        data, body_error = _json_body()
+        if body_error:
+            return body_error
+
+        question_count, count_error = _parse_non_negative_int(
+            data.get('question_count'), 'question_count', 12, minimum=5, maximum=25,
+        )
+        if count_error:
+            return count_error
+
+        mode = str(data.get('mode') or 'default').strip().lower()
+        if mode not in _PRACTICE_MODES:
+            return _error('validation_error', 'Unknown practice mode.', 400, fields={'mode': 'invalid'})
+        resources_available = resource_mode_available(language)
+        if mode == 'resources' and not resources_available:
+            return _error('validation_error', 'Resource practice is not available.', 400, fields={'mode': 'unavailable'})
+        if not get_practice_engine(language).vocab_all:
+            return _error('not_found', 'No practice questions available.', 404)
+
+        study, questions = create_practice_session(user['id'], language, question_count, mode)
+        return jsonify(
+            {
+                'ok': True,
+                'session_id': study['id'],
+                'language': language,
+                'question_count': len(questions),
+                'resource_mode_available': resources_available,
+                'questions': [_question_payload(q, i, 'practice') for i, q in enumerate(questions)],
+            }
+        ), 201
+
+    @app.route('/api/v1/languages/<language>/practice_sessions/<session_id>/submit', methods=['POST'])
+    def api_v1_practice_session_submit(language, session_id):
+        return _submit_study_session(language, session_id, 'practice')
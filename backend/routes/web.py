@@ -21,8 +21,6 @@ def register_web_routes(app):
     def dashboard():
         uid = current_user_id()
         lessons_all = get_lessons()
-        vocab_all = get_vocab()
-        resource_all = get_resource_sentences()
         activity = get_activity_summary(user_id=uid)
 
         cefr_counts = Counter()
@@ -38,9 +36,7 @@ def register_web_routes(app):
             total = len(lesson_list)
             completed = sum(1 for v in prog.values() if v.get('completed'))
             rec = _recommended_lesson(lesson_list, prog)
-            vocab_by_cat = vocab_all.get(lang, {}) or {}
-            resources = resource_all.get(lang, []) or []
-            resource_info = _compute_resource_insights(lang, resources, vocab_by_cat, lesson_list, prog)
+            resource_info = _compute_resource_insights(lang, prog)
             stats[lang] = {'total': total, 'completed': completed,
                            'percent': int(completed / total * 100) if total else 0,
                            'next_lesson': rec,
@@ -168,7 +164,10 @@ def register_web_routes(app):
         except (TypeError, ValueError):
             per_level = 10
 
-        questions = _build_placement_questions(lang, per_level=per_level)
+        study = create_study_session(
+            current_user_id(), lang, 'placement', {'questions_per_level': max(6, min(16, per_level))},
+        )
+        questions = study_session_questions(study)
         if not questions:
             return redirect(url_for('language_home', lang=lang))
 
@@ -188,6 +187,7 @@ def register_web_routes(app):
             questions=questions,
             questions_json=json.dumps(questions, ensure_ascii=False),
             start_urls_json=json.dumps(start_urls, ensure_ascii=False),
+            session_id=study['id'],
         )
 
 
@@ -246,50 +246,78 @@ def register_web_routes(app):
         if not lesson:
             return redirect(url_for('language_home', lang=lang))
 
-        vocab = get_lesson_vocab(lang, lesson)
-        grammar = lesson.get('grammar')
-
         try:
             engine_param = (request.args.get('engine') or '').strip().lower()
             engine = (engine_param or (os.environ.get('PDF_ENGINE') or 'chromium')).strip().lower()
-            if engine == 'reportlab':
-                pdf_bytes = _build_lesson_pdf_bytes_reportlab(lang, LANG_META[lang], lesson, vocab, grammar)
-            else:
-                try:
-                    html = _render_lesson_pdf_html(lang, LANG_META[lang], lesson, vocab, grammar)
-                    header_html, footer_html = _lesson_pdf_header_footer(lang, LANG_META[lang], lesson)
-                    pdf_bytes = _build_lesson_pdf_bytes_chromium(html, header_html, footer_html)
-                except Exception as exc:
-                    # If Chromium/Playwright isn't available (common on some hosts), fall back to ReportLab
-                    # unless the user explicitly requested a specific engine in the URL.
-                    if engine_param:
-                        raise
-                    msg = str(exc) or type(exc).__name__
-                    lower = msg.lower()
-                    if ('playwright' in lower) or ('chromium' in lower) or ('browser is not installed' in lower):
-                        pdf_bytes = _build_lesson_pdf_bytes_reportlab(lang, LANG_META[lang], lesson, vocab, grammar)
-                    else:
-                        raise
+            # If Chromium/Playwright isn't available (common on some hosts), fall back to ReportLab
+            # unless the user explicitly requested a specific engine in the URL.
+            pdf = build_lesson_pdf(lang, lesson, engine=engine, strict=bool(engine_param))
+        except RenderQueueFull as exc:
+            return (str(exc), 503, {'Retry-After': str(exc.retry_after), 'Content-Type': 'text/plain; charset=utf-8'})
         except Exception as exc:
             msg = str(exc) or "Failed to generate PDF."
             return (msg, 500, {'Content-Type': 'text/plain; charset=utf-8'})
 
-        safe_lang = re.sub(r'[^a-z0-9]+', '-', (lang or '').lower()).strip('-') or 'lesson'
-        try:
-            safe_id = int(lesson.get('id') or lesson_id)
-        except (TypeError, ValueError):
-            safe_id = lesson_id
-        title_en = (lesson.get('title_en') or '').strip()
-        title_slug = re.sub(r'[^a-z0-9]+', '-', _strip_accents(title_en.lower())).strip('-')[:60]
-        filename = f"{safe_lang}-lesson-{safe_id}{('-' + title_slug) if title_slug else ''}.pdf"
+        filename = lesson_pdf_download_name(lang, lesson)
 
+        # The cache key covers every input of the PDF, so it doubles as a strong ETag.
         return send_file(
-            io.BytesIO(pdf_bytes),
+            pdf['path'],
             mimetype='application/pdf',
             as_attachment=True,
             download_name=filename,
+            conditional=True,
+            etag=pdf['key'],
+            max_age=0,
+        )
+
+    @app.route('/lesson/<lang>/pack/<level>.<fmt>')
+    @login_required
+    def lesson_pack_download(lang, level, fmt):
+        """Every lesson PDF of a CEFR level (or `all`): one merged PDF or a ZIP."""
+        level = 'all' if level.lower() == 'all' else level.upper()
+        if lang not in LANG_META or level not in LESSON_PACK_LEVELS or fmt not in _LESSON_PACK_FORMATS:
+            return ('Unknown lesson pack', 404)
+        lessons = lesson_pack_lessons(lang, level)
+        if not lessons:
+            return ('No lessons at this level', 404)
+
+        engine_param = (request.args.get('engine') or '').strip().lower()
+        engine = (engine_param or (os.environ.get('PDF_ENGINE') or 'chromium')).strip().lower()
+        workers = max(1, min(8, int(_env_float('PDF_PACK_WORKERS', 2))))
+        download_name = f"{lang}-{level.lower()}-lessons.{fmt}"
+
+        if fmt == 'zip':
+            if pdf_render_queue.saturated():
+                # Once streaming has started the status can no longer change: refuse up front.
+                retry_after = str(pdf_render_queue.retry_after())
+                return ('The PDF renderer is busy; try again shortly.', 503, {'Retry-After': retry_after})
+            # Streamed as it is built: lesson PDFs come from the cache (misses render in the
+            # background while earlier lessons are being sent).
+            body = stream_lesson_pack_zip(lang, lessons, engine=engine, strict=bool(engine_param), workers=workers)
+            resp = app.response_class(stream_with_context(body), mimetype='application/zip')
+            resp.headers.set('Content-Disposition', 'attachment', filename=download_name)
+            resp.headers['Cache-Control'] = 'no-cache'
+            return resp
+
+        try:
+            pack = build_lesson_pack_pdf(lang, level, lessons, engine=engine, strict=bool(engine_param), workers=workers)
+        except RenderQueueFull as exc:
+            return (str(exc), 503, {'Retry-After': str(exc.retry_after), 'Content-Type': 'text/plain; charset=utf-8'})
+        except Exception as exc:
+            msg = str(exc) or "Failed to generate PDF."
+            return (msg, 500, {'Content-Type': 'text/plain; charset=utf-8'})
+        resp = send_file(
+            pack['path'],
+            mimetype='application/pdf',
+            as_attachment=True,
+            download_name=download_name,
+            conditional=True,
+            etag=pack['key'],
             max_age=0,
         )
+        resp.headers['X-Pack-Missing'] = str(len(pack['missing']))
+        return resp
 
     @app.route('/flashcards/<lang>/<int:lesson_id>')
     @login_required
@@ -494,244 +522,24 @@ def register_web_routes(app):
 
         mode = (request.args.get('mode') or '').strip().lower()
 
-        vocab_by_cat = get_vocab().get(lang, {})
-        vocab_all = [w for words in vocab_by_cat.values() for w in words if w.get('word') and w.get('english')]
-        if not vocab_all:
+        engine = get_practice_engine(lang)
+        if not engine.vocab_all:
             return redirect(url_for('language_home', lang=lang))
 
-        lesson_list = get_lessons().get(lang, [])
-        progress = load_progress(lang, user_id=current_user_id())
-        lesson_list_sorted = _sorted_lessons(lesson_list)
-        rec = _recommended_lesson(lesson_list_sorted, progress)
-        current_rank = _cefr_rank(_lesson_cefr(rec)) if rec else 99
-
-        unlocked = []
-        unlocked_words = set()
-        for lesson in lesson_list_sorted:
-            if _cefr_rank(_lesson_cefr(lesson)) > current_rank:
-                continue
-            for w in get_lesson_vocab(lang, lesson):
-                ww = (w.get('word') or '').strip()
-                if not ww or ww in unlocked_words:
-                    continue
-                unlocked_words.add(ww)
-                unlocked.append(w)
-
-        tts_lang = 'fr-FR' if lang == 'french' else 'es-ES'
-        resource_sentences = get_resource_sentences().get(lang, []) or []
-
+        uid = current_user_id()
         if mode in {'resources', 'resource'}:
-            if not resource_sentences:
+            if not resource_mode_available(lang):
                 return redirect(url_for('practice', lang=lang))
-            questions = _build_resource_drill_questions(
-                lang, total_q, vocab_by_cat, vocab_all, resource_sentences, tts_lang, user_id=current_user_id()
-            )
-            if questions:
-                return render_template('practice.html',
-                                       lang=lang, meta=LANG_META[lang],
-                                       questions=questions,
-                                       questions_json=json.dumps(questions, ensure_ascii=False))
-            return redirect(url_for('practice', lang=lang))
-
-        # Prefer due words (spaced repetition); otherwise pick random vocabulary.
-        uid = current_user_id()
-        now_iso = _now_iso()
-        conn = get_db()
-        if uid is None:
-            due_rows = conn.execute('''
-                SELECT word
-                FROM word_progress
-                WHERE language=?
-                  AND (next_due IS NULL OR next_due <= ?)
-                ORDER BY COALESCE(next_due, '') ASC, box ASC, incorrect DESC
-                LIMIT ?
-            ''', (lang, now_iso, total_q)).fetchall()
+            study, questions = create_practice_session(uid, lang, total_q, 'resources')
         else:
-            due_rows = conn.execute('''
-                SELECT word
-                FROM user_word_progress
-                WHERE user_id=?
-                  AND language=?
-                  AND (next_due IS NULL OR next_due <= ?)
-                ORDER BY COALESCE(next_due, '') ASC, box ASC, incorrect DESC
-                LIMIT ?
-            ''', (uid, lang, now_iso, total_q)).fetchall()
-        conn.close()
-
-        vocab_lookup = {w['word']: w for w in vocab_all}
-        selected = []
-        for r in due_rows:
-            entry = vocab_lookup.get(r['word'])
-            if entry and (not unlocked_words or entry['word'] in unlocked_words):
-                selected.append(entry)
-
-        if len(selected) < total_q:
-            base_pool = unlocked or vocab_all
-            pool = [w for w in base_pool if w.get('word') and w['word'] not in {e['word'] for e in selected}]
-            random.shuffle(pool)
-            selected.extend(pool[: max(0, total_q - len(selected))])
-
-        # Build interactive exercises (Duolingo-like mix: listen, choice, type)
-        all_for_wrong = (unlocked[:] if len(unlocked) >= 40 else vocab_all[:])
-        random.shuffle(all_for_wrong)
-
-        questions = []
-        for idx, entry in enumerate(selected[:total_q]):
-            word = entry['word']
-            english = entry.get('english', '')
-            bengali = entry.get('bengali', '')
-
-            qtype_choices = ['listen_to_english', 'word_to_english', 'english_to_word', 'type_english_to_word']
-            example = (entry.get('example') or '').strip()
-            example_en = (entry.get('example_en') or '').strip()
-            example_bn = (entry.get('example_bn') or '').strip()
-            if example and example_en:
-                tokens = re.sub(r'[\\.,;:!?]', '', example).split()
-                if 3 <= len(tokens) <= 10:
-                    qtype_choices.append('order_sentence')
-
-            ctx = None
-            if resource_sentences and ' ' not in word and len(word) >= 2:
-                variants = _word_match_variants(word)
-                if variants:
-                    sample_n = min(80, len(resource_sentences))
-                    candidates = random.sample(resource_sentences, sample_n) if sample_n else []
-                    for s in candidates:
-                        sent = (s.get('text') or '').strip()
-                        if not sent:
-                            continue
-                        sent_norm = _norm_match(sent)
-                        if any(f' {v} ' in f' {sent_norm} ' for v in variants):
-                            blanked = _blank_first_token(sent, word)
-                            if blanked:
-                                ctx = {**s, 'blanked': blanked}
-                                break
-
-                    if not ctx:
-                        for s in resource_sentences:
-                            sent = (s.get('text') or '').strip()
-                            if not sent:
-                                continue
-                            sent_norm = _norm_match(sent)
-                            if any(f' {v} ' in f' {sent_norm} ' for v in variants):
-                                blanked = _blank_first_token(sent, word)
-                                if blanked:
-                                    ctx = {**s, 'blanked': blanked}
-                                    break
-
-            if ctx:
-                qtype_choices.extend(['context_cloze', 'context_cloze'])
-
-            qtype = random.choice(qtype_choices)
-
-            others = [w for w in all_for_wrong if w.get('word') != word]
-            wrong = random.sample(others, min(3, len(others)))
-
-            if qtype == 'listen_to_english':
-                q = {
-                    'kind': 'mcq',
-                    'mode': 'listen_to_english',
-                    'mode_label': '🔊 Listening',
-                    'prompt_en': 'Listen and choose the correct meaning (English)',
-                    'prompt_bn': 'শুনে সঠিক অর্থ নির্বাচন করুন (ইংরেজি)',
-                    'tts_text': word,
-                    'tts_lang': tts_lang,
-                    'choices': [english] + [w.get('english', '') for w in wrong],
-                    'answer': english,
-                    'word': word,
-                    'xp_correct': 10,
-                    'xp_wrong': 2,
-                }
-            elif qtype == 'context_cloze' and ctx:
-                hint = f"Hint: {english}"
-                if bengali:
-                    hint += f" \u2022 বাংলা: {bengali}"
-
-                q = {
-                    'kind': 'mcq',
-                    'mode': 'context_cloze',
-                    'mode_label': 'Context',
-                    'prompt_en': f"Fill in the blank: {ctx.get('blanked', '')}",
-                    'prompt_bn': hint,
-                    'tts_text': (ctx.get('text') or word),
-                    'tts_lang': tts_lang,
-                    'choices': [word] + [w.get('word', '') for w in wrong],
-                    'answer': word,
-                    'word': word,
-                    'xp_correct': 14,
-                    'xp_wrong': 3,
-                }
-            elif qtype == 'order_sentence':
-                tokens = re.sub(r'[\\.,;:!?]', '', example).split()
-                random.shuffle(tokens)
-                q = {
-                    'kind': 'order',
-                    'mode': 'order_sentence',
-                    'mode_label': '🧩 Order the sentence',
-                    'prompt_en': example_en,
-                    'prompt_bn': example_bn or 'শব্দগুলো সাজান',
-                    'tokens': tokens,
-                    'answer': ' '.join(re.sub(r'[\\.,;:!?]', '', example).split()),
-                    'word': word,
-                    'tts_text': example,
-                    'tts_lang': tts_lang,
-                    'xp_correct': 12,
-                    'xp_wrong': 3,
-                }
-            elif qtype == 'english_to_word':
-                q = {
-                    'kind': 'mcq',
-                    'mode': 'english_to_word',
-                    'mode_label': '✅ Choose',
-                    'prompt_en': f"How do you say “{english}” in {LANG_META[lang]['name_native'] or LANG_META[lang]['name']}?",
-                    'prompt_bn': f"“{english}” {LANG_META[lang]['name_bn']} ভাষায় কীভাবে বলে?",
-                    'choices': [word] + [w.get('word', '') for w in wrong],
-                    'answer': word,
-                    'word': word,
-                    'xp_correct': 10,
-                    'xp_wrong': 2,
-                }
-            elif qtype == 'type_english_to_word':
-                q = {
-                    'kind': 'type',
-                    'mode': 'type_english_to_word',
-                    'mode_label': '⌨️ Type',
-                    'prompt_en': f"Type the {LANG_META[lang]['name']} word for: {english}",
-                    'prompt_bn': f"{english} — লিখুন ({LANG_META[lang]['name_bn']} শব্দ)",
-                    'hint_bn': bengali,
-                    'answer': word,
-                    'word': word,
-                    'tts_text': word,
-                    'tts_lang': tts_lang,
-                    'xp_correct': 12,
-                    'xp_wrong': 3,
-                }
-            else:
-                q = {
-                    'kind': 'mcq',
-                    'mode': 'word_to_english',
-                    'mode_label': '✅ Choose',
-                    'prompt_en': f"What does “{word}” mean in English?",
-                    'prompt_bn': f"“{word}” ইংরেজিতে কী?",
-                    'choices': [english] + [w.get('english', '') for w in wrong],
-                    'answer': english,
-                    'word': word,
-                    'tts_text': word,
-                    'tts_lang': tts_lang,
-                    'xp_correct': 10,
-                    'xp_wrong': 2,
-                }
-
-            q['id'] = idx + 1
-            random.shuffle(q.get('choices', []))
-            questions.append(q)
-
-        random.shuffle(questions)
+            # Prefer due words (spaced repetition); otherwise pick random unlocked vocabulary.
+            study, questions = create_practice_session(uid, lang, total_q)
 
         return render_template('practice.html',
                                lang=lang, meta=LANG_META[lang],
                                questions=questions,
-                               questions_json=json.dumps(questions, ensure_ascii=False))
+                               questions_json=json.dumps(questions, ensure_ascii=False),
+                               session_id=study['id'])
 
     @app.route('/dictation/<lang>/<int:lesson_id>')
     @login_required
@@ -824,69 +632,7 @@ def register_web_routes(app):
         if not lesson:
             return redirect(url_for('language_home', lang=lang))
         touch_lesson(lang, lesson_id, user_id=current_user_id())
-
-        vocab = get_lesson_vocab(lang, lesson)
-        grammar = lesson.get('grammar')
-        questions = []
-        tts_lang = 'fr-FR' if lang == 'french' else 'es-ES'
-
-        # --- vocabulary questions ---
-        if len(vocab) >= 4:
-            q_count = min(10, len(vocab))
-            sampled = random.sample(vocab, q_count)
-            all_vocab = vocab[:]
-            for word in sampled:
-                qtype = random.choice(['word_to_english', 'english_to_word', 'word_to_bengali'])
-                others = [w for w in all_vocab if w['word'] != word['word']]
-                wrong  = random.sample(others, min(3, len(others)))
-
-                if qtype == 'word_to_english':
-                    q = {
-                        'kind': 'vocab',
-                        'mode': 'word_to_english',
-                        'word': word['word'],
-                        'tts_text': word['word'],
-                        'tts_lang': tts_lang,
-                        'question_en': f"What does <strong>{word['word']}</strong> mean in English?",
-                        'question_bn': f"<strong>{word['word']}</strong> ইংরেজিতে কী?",
-                        'correct': word['english'],
-                        'choices': [word['english']] + [w['english'] for w in wrong],
-                    }
-                elif qtype == 'english_to_word':
-                    lang_name_bn = LANG_META[lang]['name_bn']
-                    q = {
-                        'kind': 'vocab',
-                        'mode': 'english_to_word',
-                        'word': word['word'],
-                        'tts_text': word['word'],
-                        'tts_lang': tts_lang,
-                        'question_en': f"How do you say <strong>{word['english']}</strong> in {LANG_META[lang]['name']}?",
-                        'question_bn': f"<strong>{word['english']}</strong> {lang_name_bn} ভাষায় কীভাবে বলে?",
-                        'correct': word['word'],
-                        'choices': [word['word']] + [w['word'] for w in wrong],
-                    }
-                else:
-                    q = {
-                        'kind': 'vocab',
-                        'mode': 'word_to_bengali',
-                        'word': word['word'],
-                        'tts_text': word['word'],
-                        'tts_lang': tts_lang,
-                        'question_en': f"What does <strong>{word['word']}</strong> mean in Bengali?",
-                        'question_bn': f"<strong>{word['word']}</strong> বাংলায় কী?",
-                        'correct': word['bengali'],
-                        'choices': [word['bengali']] + [w['bengali'] for w in wrong],
-                    }
-                random.shuffle(q['choices'])
-                questions.append(q)
-
-        # --- grammar questions (embedded in lesson) ---
-        if grammar and grammar.get('quiz_questions'):
-            gq = [{**q, 'kind': 'grammar'} for q in grammar['quiz_questions'][:]]
-            random.shuffle(gq)
-            questions.extend(gq[:5])
-
-        random.shuffle(questions)
+        study, questions = create_quiz_session(current_user_id(), lang, lesson)
 
         idx = next((i for i, l in enumerate(lesson_list) if l.get('id') == lesson_id), None)
         next_lesson = lesson_list[idx + 1] if idx is not None and idx + 1 < len(lesson_list) else None
@@ -894,6 +640,7 @@ def register_web_routes(app):
         return render_template('quiz.html', lang=lang, meta=LANG_META[lang],
                                lesson=lesson, questions=questions,
                                questions_json=json.dumps(questions, ensure_ascii=False),
+                               session_id=study['id'],
                                next_lesson=next_lesson)
 
     @app.route('/progress')
@@ -1,20 +1,27 @@
 
 import base64
+import bisect
 import hashlib
 import io
 import os
 import json
+import math
 import random
 import re
 import secrets
 import shutil
 import sqlite3
+import tempfile
 import threading
 import time
 import unicodedata
 import uuid
+import zipfile
+import zlib
+from array import array
+from contextlib import contextmanager
 from datetime import datetime, date, timedelta, timezone
-from collections import Counter
+from collections import Counter, OrderedDict, deque
 from functools import lru_cache, wraps
 from typing import Optional
 from urllib.parse import urlencode, urlparse
@@ -22,14 +29,17 @@ from urllib.request import Request, urlopen
 
 from flask import (
     Flask,
+    copy_current_request_context,
     current_app,
     has_app_context,
+    has_request_context,
     jsonify,
     redirect,
     render_template,
     request,
     send_file,
     session,
+    stream_with_context,
     url_for,
 )
 
@@ -135,7 +145,11 @@ DATA_DIR = os.path.join(BASE_DIR, 'data')
 DB_PATH = os.path.join(DATA_DIR, 'progress.db')
 TTS_CACHE_DIR = (os.environ.get('TTS_CACHE_DIR') or os.path.join(DATA_DIR, 'tts_cache')).strip() or os.path.join(DATA_DIR, 'tts_cache')
 
-_TTS_PROVIDER = 'gtts'
+# 'gtts', 'espeak', a fallback chain like 'gtts,espeak', or 'auto' (same as 'gtts,espeak').
+_TTS_PROVIDER = (os.environ.get('TTS_PROVIDER') or 'gtts').strip().lower() or 'gtts'
+# Let a front proxy send cached audio: 'x-accel-redirect' (nginx) or 'x-sendfile' (Apache/lighttpd).
+_TTS_SENDFILE = (os.environ.get('TTS_SENDFILE') or '').strip().lower()
+_TTS_SENDFILE_PREFIX = (os.environ.get('TTS_SENDFILE_PREFIX') or '/_tts_cache/').strip() or '/_tts_cache/'
 
 _TRANSLATE_PROVIDER = (os.environ.get('TRANSLATE_PROVIDER') or 'hybrid').strip().lower()
 if _TRANSLATE_PROVIDER not in {'local', 'mymemory', 'hybrid'}:
@@ -168,9 +182,16 @@ def build_path_config(source=None):
         'LOGO_DIR': logo_dir,
         'DB_PATH': os.path.abspath(source.get('DB_PATH') or os.path.join(data_dir, 'progress.db')),
         'TTS_CACHE_DIR': os.path.abspath(source.get('TTS_CACHE_DIR') or os.path.join(data_dir, 'tts_cache')),
+        'PDF_CACHE_DIR': os.path.abspath(
+            source.get('PDF_CACHE_DIR') or os.environ.get('PDF_CACHE_DIR') or os.path.join(data_dir, 'pdf_cache')
+        ),
         'VOCAB_PATH': os.path.abspath(source.get('VOCAB_PATH') or os.path.join(data_dir, 'vocabulary.json')),
         'LESSONS_PATH': os.path.abspath(source.get('LESSONS_PATH') or os.path.join(data_dir, 'lessons.json')),
         'RESOURCE_SENTENCES_PATH': os.path.abspath(source.get('RESOURCE_SENTENCES_PATH') or os.path.join(data_dir, 'resource_sentences.json')),
+        'PLACEMENT_CALIBRATION_PATH': os.path.abspath(
+            source.get('PLACEMENT_CALIBRATION_PATH') or os.path.join(data_dir, 'placement_calibration.json')
+        ),
+        'DISTRACTORS_PATH': os.path.abspath(source.get('DISTRACTORS_PATH') or os.path.join(data_dir, 'distractors.json')),
         'PDF_FONT_PATH': os.path.abspath(
             source.get('PDF_FONT_PATH') or os.path.join(static_dir, 'fonts', 'NotoSerifBengali-Regular.ttf')
         ),
@@ -197,6 +218,13 @@ def _config_value(name: str, default=None):
     return default
 
 
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name) or default)
+    except (TypeError, ValueError):
+        return float(default)
+
+
 def _config_path(name: str) -> str:
     default = _DEFAULT_PATH_CONFIG[name]
     value = _config_value(name, default)
@@ -226,6 +254,8 @@ def configure_app(app: Flask) -> None:
     app.permanent_session_lifetime = timedelta(days=remember_days)
 
     app.config['TTS_PROVIDER'] = app.config.get('TTS_PROVIDER') or _TTS_PROVIDER
+    app.config['TTS_SENDFILE'] = app.config.get('TTS_SENDFILE') or _TTS_SENDFILE
+    app.config['TTS_SENDFILE_PREFIX'] = app.config.get('TTS_SENDFILE_PREFIX') or _TTS_SENDFILE_PREFIX
     app.config['TRANSLATE_PROVIDER'] = app.config.get('TRANSLATE_PROVIDER') or _TRANSLATE_PROVIDER
     app.config['SHEETS_WEBHOOK_URL'] = app.config.get('SHEETS_WEBHOOK_URL') or SHEETS_WEBHOOK_URL
     app.config['SHEETS_WEBHOOK_TOKEN'] = app.config.get('SHEETS_WEBHOOK_TOKEN') or SHEETS_WEBHOOK_TOKEN
@@ -243,12 +273,15 @@ RESOURCE_SENTENCES_PATH = os.path.join(DATA_DIR, 'resource_sentences.json')
 _DATA_LOCK = threading.Lock()
 _DATA_CACHE = {}
 _DATA_MTIME = {}
+_DATA_DIGEST = {}
 _DATA_ERROR_MTIME = {}
 
 
-def _read_json(path):
-    with open(path, encoding='utf-8') as f:
-        return json.load(f)
+def _read_json_with_digest(path):
+    """Parse a JSON file and return (data, sha1-of-raw-bytes)."""
+    with open(path, 'rb') as f:
+        raw = f.read()
+    return json.loads(raw.decode('utf-8')), hashlib.sha1(raw).hexdigest()
 
 
 def _cached_json(key, path, default):
@@ -268,14 +301,15 @@ def _cached_json(key, path, default):
             return _DATA_CACHE[cache_key]
 
         try:
-            data = _read_json(path)
-        except json.JSONDecodeError as exc:
+            data, digest = _read_json_with_digest(path)
+        except (json.JSONDecodeError, UnicodeDecodeError) as exc:
             _DATA_ERROR_MTIME[cache_key] = mtime
             print(f"WARNING: Could not parse {path}: {exc}")
             return _DATA_CACHE.get(cache_key, default)
 
         _DATA_CACHE[cache_key] = data
         _DATA_MTIME[cache_key] = mtime
+        _DATA_DIGEST[cache_key] = digest
         _DATA_ERROR_MTIME.pop(cache_key, None)
         return data
 
@@ -293,6 +327,59 @@ def get_resource_sentences():
     return _cached_json('resource_sentences', _config_path('RESOURCE_SENTENCES_PATH'), default={})
 
 
+_CONTENT_FILES = (
+    ('vocab', 'VOCAB_PATH'),
+    ('lessons', 'LESSONS_PATH'),
+    ('resource_sentences', 'RESOURCE_SENTENCES_PATH'),
+)
+
+
+def get_content_version() -> str:
+    """Short hash of the currently loaded content files (changes whenever any of them reloads).
+
+    Derived from the file bytes, so every worker serving the same files agrees on it.
+    """
+    parts = []
+    for key, path_name in _CONTENT_FILES:
+        path = _config_path(path_name)
+        _cached_json(key, path, default={})
+        parts.append(_DATA_DIGEST.get((key, os.path.abspath(path)), ''))
+    return hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()[:16]
+
+
+_DERIVED_LOCKS_GUARD = threading.Lock()
+_DERIVED_LOCKS = {}  # name -> RLock; builders may look up other derived values
+_DERIVED_CACHE = {}
+
+
+def _derived_lock(name):
+    with _DERIVED_LOCKS_GUARD:
+        lock = _DERIVED_LOCKS.get(name)
+        if lock is None:
+            lock = _DERIVED_LOCKS[name] = threading.RLock()
+        return lock
+
+
+def _content_derived(name, builder, extra_key=''):
+    """Memoize `builder()` for the current content version (rebuilt after a content reload).
+
+    `extra_key` adds another input (e.g. a calibration file digest) to the cache key.
+    Concurrent callers of the same `name` wait for a single build; other names do not.
+    """
+    version = f'{get_content_version()}:{extra_key}' if extra_key else get_content_version()
+    cached = _DERIVED_CACHE.get(name)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    with _derived_lock(name):
+        cached = _DERIVED_CACHE.get(name)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        value = builder()
+        _DERIVED_CACHE[name] = (version, value)
+        return value
+
+
 def _strip_accents(text: str) -> str:
     return ''.join(c for c in unicodedata.normalize('NFD', text) if unicodedata.category(c) != 'Mn')
 
@@ -631,157 +718,353 @@ def _build_vocab_variant_index(vocab_by_cat):
     return entries, variant_index
 
 
-def _compute_resource_insights(lang, resource_sentences, vocab_by_cat, lesson_list, progress):
-    if not resource_sentences:
+def _numpy():
+    try:
+        import numpy as np
+    except Exception as exc:
+        raise RuntimeError("Missing dependency: numpy. Run: pip install -r requirements.txt") from exc
+    return np
+
+
+class ResourceSentenceIndex:
+    """Inverted index over one language's resource sentences, compiled to NumPy arrays.
+
+    Every token is normalized with `_norm_match` and given an integer id. The corpus is
+    stored as a flat token-id array (`token_ids`, with each token's character span in
+    `starts`/`ends`) cut into sentences by `offsets`. Postings are kept the same way:
+    for each token id, the ids of the sentences containing it plus the flat position of
+    its first occurrence there. Finding a context sentence for a word is a postings
+    pick, and blanking the word out (same result as `_blank_first_token`) is a slice.
+    """
+
+    def __init__(self, sentences):
+        np = _numpy()
+        self.sentences = []
+        self.texts = []
+        self.token_index = {}  # norm -> token id
+        self.token_norms = []  # token id -> norm
+        norm_cache = {}
+
+        offsets = array('q', [0])
+        token_ids = array('i')
+        starts = array('i')
+        ends = array('i')
+        first = array('b')
+
+        for s in sentences or []:
+            text = ((s or {}).get('text') or '').strip()
+            if not text:
+                continue
+            self.sentences.append(s)
+            self.texts.append(text)
+
+            seen = set()
+            for m in _SENT_TOKEN_RE.finditer(text):
+                tok = m.group(0)
+                tid = norm_cache.get(tok)
+                if tid is None:
+                    norm = _norm_match(tok)
+                    tid = self.token_index.get(norm, -1) if norm else -1
+                    if norm and tid < 0:
+                        tid = self.token_index[norm] = len(self.token_norms)
+                        self.token_norms.append(norm)
+                    norm_cache[tok] = tid
+                if tid < 0:
+                    continue
+                token_ids.append(tid)
+                starts.append(m.start())
+                ends.append(m.end())
+                first.append(tid not in seen)
+                seen.add(tid)
+            offsets.append(len(token_ids))
+
+        vocab_size = len(self.token_norms)
+        self.offsets = np.frombuffer(offsets, dtype=np.int64).copy()
+        self.token_ids = np.frombuffer(token_ids, dtype=np.int32).copy()
+        self.starts = np.frombuffer(starts, dtype=np.int32).copy()
+        self.ends = np.frombuffer(ends, dtype=np.int32).copy()
+        # Sentence id of every flat token position.
+        self.token_sentence = np.repeat(
+            np.arange(len(self.sentences), dtype=np.int32), np.diff(self.offsets),
+        )
+        # Occurrences per token id, stopwords included.
+        self.token_counts = np.bincount(self.token_ids, minlength=vocab_size)
+
+        first_pos = np.flatnonzero(np.frombuffer(first, dtype=np.int8)).astype(np.int64)
+        order = np.argsort(self.token_ids[first_pos], kind='stable')
+        self.posting_pos = first_pos[order]
+        self.posting_sid = self.token_sentence[self.posting_pos]
+        self.posting_offsets = np.zeros(vocab_size + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.token_ids[first_pos], minlength=vocab_size), out=self.posting_offsets[1:])
+
+    def __len__(self):
+        return len(self.sentences)
+
+    def token_id(self, norm: str) -> int:
+        return self.token_index.get(norm, -1)
+
+    def postings(self, tid: int):
+        """Ascending ids of the sentences containing token `tid`."""
+        return self.posting_sid[self.posting_offsets[tid]:self.posting_offsets[tid + 1]]
+
+    def first_occurrences(self):
+        """`(token_ids, sentence_ids)` of every (token, sentence) posting, grouped by token id."""
+        return self.token_ids[self.posting_pos], self.posting_sid
+
+    def sentence_tokens(self, sid: int):
+        """Token ids of sentence `sid`, in order."""
+        return self.token_ids[self.offsets[sid]:self.offsets[sid + 1]]
+
+    def _first_pos(self, tid: int, sid: int):
+        lo, hi = self.posting_offsets[tid], self.posting_offsets[tid + 1]
+        sids = self.posting_sid[lo:hi]
+        i = int(sids.searchsorted(sid))
+        if i < len(sids) and sids[i] == sid:
+            return int(self.posting_pos[lo + i])
         return None
 
-    sample_limit = 900
-    sample = (
-        resource_sentences
-        if len(resource_sentences) <= sample_limit
-        else random.sample(resource_sentences, sample_limit)
+    def blank(self, sid: int, variants) -> Optional[str]:
+        """Sentence `sid` with the first token matching any of `variants` replaced by ____."""
+        positions = [
+            p for p in (self._first_pos(tid, sid) for tid in map(self.token_id, variants) if tid >= 0)
+            if p is not None
+        ]
+        if not positions:
+            return None
+        pos = min(positions)
+        start, end = int(self.starts[pos]), int(self.ends[pos])
+        text = self.texts[sid]
+        return text[:start] + '____' + text[end:]
+
+    def pick_context(self, word: str, rng=None):
+        """Random sentence containing `word` as `{**sentence, 'blanked': ...}`, or None."""
+        rng = rng or random
+        variants = _word_match_variants(word)
+        lists = [self.postings(tid) for tid in map(self.token_id, variants) if tid >= 0]
+        total = sum(len(sids) for sids in lists)
+        if not total:
+            return None
+
+        i = rng.randrange(total)
+        for sids in lists:
+            if i < len(sids):
+                sid = int(sids[i])
+                break
+            i -= len(sids)
+
+        blanked = self.blank(sid, variants)
+        if not blanked:
+            return None
+        return {**self.sentences[sid], 'blanked': blanked}
+
+
+def get_resource_index(lang: str) -> ResourceSentenceIndex:
+    """Resource sentence index for `lang`, built once per content version."""
+    return _content_derived(
+        ('resource_index', lang),
+        lambda: ResourceSentenceIndex(get_resource_sentences().get(lang, []) or []),
     )
 
-    entries, variant_index = _build_vocab_variant_index(vocab_by_cat)
-    category_counts = {}
-    total_tokens = 0
-    matched_tokens = 0
 
-    sources = set()
-    for s in resource_sentences:
-        src = (s.get('source') or '').strip()
-        if src:
-            sources.add(src)
+class ResourceCorpus:
+    """Resource sentences of one language, pre-matched against its vocabulary.
 
-    for s in sample:
-        text = (s.get('text') or '').strip()
-        if not text:
-            continue
-        for tok in _SENT_TOKEN_RE.findall(text):
-            norm = _norm_match(tok)
-            if not norm:
-                continue
-            total_tokens += 1
-            entry = variant_index.get(norm)
+    Token ids of the sentence index are mapped to vocab entries (`token_entry`, -1 when
+    unmatched) and on to categories (`token_category`). Drillable words (stopwords and
+    multi-word entries removed) get their own reverse map, stored like the postings:
+    `word_sentences(word)` lists every sentence a word can be drilled from.
+    """
+
+    def __init__(self, lang: str, vocab_by_cat: dict, index: ResourceSentenceIndex):
+        np = _numpy()
+        self.lang = lang
+        self.index = index
+        self.entries, self.variant_index = _build_vocab_variant_index(vocab_by_cat)
+        self.entry_by_word = {}
+        for entry in self.entries:
+            self.entry_by_word.setdefault(entry['word'], entry)
+
+        self.categories = list(dict.fromkeys(e['category'] for e in self.entries))
+        category_ids = {cat: i for i, cat in enumerate(self.categories)}
+        entry_ids = {id(e): i for i, e in enumerate(self.entries)}
+
+        stop = _STOPWORDS.get(lang, set())
+        vocab_size = len(index.token_norms)
+        self.token_entry = np.full(vocab_size, -1, dtype=np.int32)
+        self.entry_category = np.array([category_ids[e['category']] for e in self.entries], dtype=np.int32)
+        token_word = np.full(vocab_size, -1, dtype=np.int32)
+        drill_ids = {}
+        drill_words = []
+        for tid, norm in enumerate(index.token_norms):
+            entry = self.variant_index.get(norm)
             if not entry:
                 continue
-            matched_tokens += 1
-            cat = entry.get('category')
-            if cat:
-                category_counts[cat] = category_counts.get(cat, 0) + 1
+            self.token_entry[tid] = entry_ids[id(entry)]
+            word = entry['word']
+            if norm in stop or ' ' in word:
+                continue
+            if word not in drill_ids:
+                drill_ids[word] = len(drill_words)
+                drill_words.append(word)
+            token_word[tid] = drill_ids[word]
+        if len(self.entry_category):
+            self.token_category = np.where(
+                self.token_entry >= 0, self.entry_category[np.maximum(self.token_entry, 0)], -1,
+            ).astype(np.int32)
+        else:
+            # No vocabulary for this language: nothing matches.
+            self.token_category = np.full(vocab_size, -1, dtype=np.int32)
+        self._token_word = token_word
+
+        # (word, sentence) pairs from first occurrences, de-duplicated and grouped by word.
+        posting_tids, posting_sids = index.first_occurrences()
+        pair_word = token_word[posting_tids]
+        keep = pair_word >= 0
+        n = max(1, len(index))
+        keys = np.sort(pair_word[keep].astype(np.int64) * n + posting_sids[keep])
+        if len(keys):
+            keys = keys[np.concatenate(([True], keys[1:] != keys[:-1]))]
+        pair_word = (keys // n).astype(np.int32)
+        self._word_sid = (keys % n).astype(np.int32)
+        counts = np.bincount(pair_word, minlength=len(drill_words))
+        self._word_offsets = np.zeros(len(drill_words) + 1, dtype=np.int64)
+        np.cumsum(counts, out=self._word_offsets[1:])
+
+        self._drill_words = drill_words
+        self.word_ids = {w: i for i, w in enumerate(drill_words) if counts[i]}
+        self.words = sorted(self.word_ids)
+        self.drill_entries = [self.entry_by_word[w] for w in self.words]
+        self._variants = {w: _word_match_variants(w) for w in self.words}
+
+    def word_sentences(self, word: str):
+        """Ascending ids of the sentences `word` can be drilled from (empty if none)."""
+        wid = self.word_ids.get(word)
+        if wid is None:
+            return self._word_sid[:0]
+        return self._word_sid[self._word_offsets[wid]:self._word_offsets[wid + 1]]
+
+    def sentence_words(self, sid: int):
+        """Drillable vocab words found in sentence `sid`, in order of first appearance."""
+        wids = self._token_word[self.index.sentence_tokens(sid)]
+        return list(dict.fromkeys(self._drill_words[w] for w in wids.tolist() if w >= 0))
+
+    def blank(self, sid: int, word: str) -> Optional[str]:
+        return self.index.blank(sid, self._variants.get(word) or _word_match_variants(word))
+
+
+def get_resource_corpus(lang: str) -> ResourceCorpus:
+    """Vocab-matched resource corpus for `lang`, built once per content version."""
+    return _content_derived(
+        ('resource_corpus', lang),
+        lambda: ResourceCorpus(lang, get_vocab().get(lang, {}) or {}, get_resource_index(lang)),
+    )
+
+
+def _build_resource_stats(lang):
+    """Corpus-wide resource insights for `lang` (everything except the per-user focus lesson)."""
+    resource_sentences = get_resource_sentences().get(lang, []) or []
+    if not resource_sentences:
+        return None
+
+    np = _numpy()
+    corpus = get_resource_corpus(lang)
+    counts = corpus.index.token_counts
+    matched = corpus.token_entry >= 0
+    total_tokens = int(counts.sum())
+    matched_tokens = int(counts[matched].sum())
+
+    n_cats = len(corpus.categories)
+    by_category = np.bincount(
+        corpus.token_category[matched], weights=counts[matched], minlength=n_cats,
+    ).astype(np.int64)
+    category_counts = {corpus.categories[i]: int(c) for i, c in enumerate(by_category) if c}
+
+    sources = {(s.get('source') or '').strip() for s in resource_sentences}
+    sources.discard('')
 
     coverage_pct = int(round((matched_tokens / total_tokens) * 100)) if total_tokens else 0
     top_cats = sorted(category_counts.items(), key=lambda x: (-x[1], x[0]))[:3]
-    top_categories = [
-        {'id': cat, 'label': cat.replace('_', ' ').title(), 'count': cnt}
-        for cat, cnt in top_cats
-    ]
-
-    focus_lesson = None
-    best_score = 0
-    for lesson in _sorted_lessons(lesson_list):
-        lid = lesson.get('id')
-        if (progress or {}).get(lid, {}).get('completed'):
-            continue
-        score = sum(category_counts.get(c, 0) for c in (lesson.get('vocabulary_categories') or []))
-        if score > best_score:
-            best_score = score
-            focus_lesson = lesson
 
-    if best_score <= 0:
-        focus_lesson = None
+    # Lessons ranked by how much of the corpus their categories cover (ties: lesson order).
+    lessons = _sorted_lessons(get_lessons().get(lang, []) or [])
+    category_ids = {cat: i for i, cat in enumerate(corpus.categories)}
+    membership = np.zeros((len(lessons), n_cats), dtype=np.int64)
+    for row, lesson in enumerate(lessons):
+        for cat in lesson.get('vocabulary_categories') or []:
+            if cat in category_ids:
+                membership[row, category_ids[cat]] = 1
+    scores = membership @ by_category
+    ranked = np.lexsort((np.arange(len(lessons)), -scores))
 
     return {
         'sentence_count': len(resource_sentences),
         'source_count': len(sources),
         'coverage_pct': coverage_pct,
-        'top_categories': top_categories,
-        'focus_lesson': focus_lesson,
+        'category_counts': category_counts,
+        'top_categories': [
+            {'id': cat, 'label': cat.replace('_', ' ').title(), 'count': cnt}
+            for cat, cnt in top_cats
+        ],
+        'focus_candidates': [lessons[i] for i in ranked.tolist() if scores[i] > 0],
     }
 
 
-def _build_resource_drill_questions(lang, total_q, vocab_by_cat, vocab_all, resource_sentences, tts_lang, user_id=None):
-    if not resource_sentences:
-        return []
-
-    entries, variant_index = _build_vocab_variant_index(vocab_by_cat)
-    if not entries:
-        return []
-
-    stop = _STOPWORDS.get(lang, set())
+def get_resource_stats(lang):
+    return _content_derived(('resource_stats', lang), lambda: _build_resource_stats(lang))
 
-    # Prefer due words, but fall back to any vocab word if no SRS history exists.
-    now_iso = _now_iso()
-    conn = get_db()
-    if user_id is None:
-        due_rows = conn.execute('''
-            SELECT word
-            FROM word_progress
-            WHERE language=?
-              AND (next_due IS NULL OR next_due <= ?)
-            ORDER BY COALESCE(next_due, '') ASC, box ASC, incorrect DESC
-            LIMIT ?
-        ''', (lang, now_iso, max(200, total_q * 12))).fetchall()
-    else:
-        due_rows = conn.execute('''
-            SELECT word
-            FROM user_word_progress
-            WHERE user_id=?
-              AND language=?
-              AND (next_due IS NULL OR next_due <= ?)
-            ORDER BY COALESCE(next_due, '') ASC, box ASC, incorrect DESC
-            LIMIT ?
-        ''', (user_id, lang, now_iso, max(200, total_q * 12))).fetchall()
-    conn.close()
-    due_set = {r['word'] for r in due_rows if r.get('word')}
 
-    wrong_pool = [w.get('word') for w in vocab_all if w.get('word')]
-    wrong_pool = [w for w in dict.fromkeys(wrong_pool) if w]  # stable de-dupe
+def _compute_resource_insights(lang, progress):
+    stats = get_resource_stats(lang)
+    if not stats:
+        return None
 
-    used_words = set()
-    questions = []
-    attempts = 0
-    max_attempts = total_q * 80
+    focus_lesson = None
+    for lesson in stats['focus_candidates']:
+        if not (progress or {}).get(lesson.get('id'), {}).get('completed'):
+            focus_lesson = lesson
+            break
 
-    while len(questions) < total_q and attempts < max_attempts:
-        attempts += 1
-        s = random.choice(resource_sentences)
-        text = (s.get('text') or '').strip()
-        if not text:
-            continue
+    return {
+        'sentence_count': stats['sentence_count'],
+        'source_count': stats['source_count'],
+        'coverage_pct': stats['coverage_pct'],
+        'top_categories': stats['top_categories'],
+        'focus_lesson': focus_lesson,
+    }
 
-        candidates = []
-        seen = set()
-        for tok in _SENT_TOKEN_RE.findall(text):
-            norm = _norm_match(tok)
-            if not norm or norm in stop:
-                continue
-            entry = variant_index.get(norm)
-            if not entry:
-                continue
-            w = entry.get('word')
-            if not w or w in seen or ' ' in w:
-                continue
-            seen.add(w)
-            candidates.append(entry)
 
-        if due_set:
-            due_candidates = [e for e in candidates if e.get('word') in due_set]
-            if due_candidates:
-                candidates = due_candidates
+def _resource_due_words(lang, total_q, user_id=None):
+    """Due words (spaced repetition) that appear in the resource corpus."""
+    corpus = get_resource_corpus(lang)
+    return [w for w in load_due_words(lang, max(200, total_q * 12), user_id=user_id) if w in corpus.word_ids]
 
-        if not candidates:
-            continue
 
-        # Prefer not to repeat words in the same session if possible.
-        fresh = [e for e in candidates if e.get('word') and e.get('word') not in used_words]
-        pick_from = fresh or candidates
-        entry = random.choice(pick_from)
+def _build_resource_drill_questions(lang, total_q, vocab_all, tts_lang, user_id=None, rng=None, due_words=None):
+    corpus = get_resource_corpus(lang)
+    if not corpus.words:
+        return []
+    rng = rng or random
+    engine = get_practice_engine(lang)
+
+    # Due words come first; top up with random drillable words, repeating words only
+    # when the corpus has too few.
+    if due_words is None:
+        due_words = _resource_due_words(lang, total_q, user_id=user_id)
+    due = [w for w in due_words if w in corpus.word_ids]
+    words = due[:total_q]
+    rng.shuffle(words)
+    if len(words) < total_q:
+        words += [e['word'] for e in _sample_distinct(corpus.drill_entries, total_q - len(words), rng, taken_words=words)]
+    while words and len(words) < total_q:
+        words.append(rng.choice(corpus.words))
 
-        word = entry.get('word')
-        if not word:
-            continue
-        blanked = _blank_first_token(text, word)
+    questions = []
+    for word in words:
+        entry = corpus.entry_by_word.get(word) or {}
+        sids = corpus.word_sentences(word)
+        sid = int(sids[rng.randrange(len(sids))])
+        text = corpus.index.texts[sid]
+        blanked = corpus.blank(sid, word)
         if not blanked:
             continue
 
@@ -791,10 +1074,9 @@ def _build_resource_drill_questions(lang, total_q, vocab_by_cat, vocab_all, reso
         if bengali:
             hint += f" \u2022 বাংলা: {bengali}"
 
-        # Choices: correct + 3 wrong
-        wrong_choices = [w for w in wrong_pool if w != word]
-        random.shuffle(wrong_choices)
-        choices = [word] + wrong_choices[:3]
+        # Choices: correct + 3 wrong (similar words first)
+        wrong = engine.pick_distractors(word, 3, rng, fallback_pool=vocab_all)
+        choices = [word] + [w['word'] for w in wrong]
         if len(choices) < 2:
             continue
 
@@ -814,9 +1096,8 @@ def _build_resource_drill_questions(lang, total_q, vocab_by_cat, vocab_all, reso
         }
 
         q['id'] = len(questions) + 1
-        random.shuffle(q['choices'])
+        rng.shuffle(q['choices'])
         questions.append(q)
-        used_words.add(word)
 
     return questions
 
@@ -914,6 +1195,28 @@ def init_db():
             last_used_at TEXT,
             revoked_at   TEXT
         );
+        CREATE TABLE IF NOT EXISTS study_sessions (
+            id              TEXT PRIMARY KEY,
+            user_id         INTEGER,
+            language        TEXT NOT NULL,
+            kind            TEXT NOT NULL,
+            seed            INTEGER NOT NULL,
+            content_version TEXT NOT NULL,
+            params          TEXT,
+            created_at      TEXT NOT NULL,
+            submitted_at    TEXT,
+            result          TEXT
+        );
+        CREATE TABLE IF NOT EXISTS placement_responses (
+            id          INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id  TEXT,
+            user_id     INTEGER,
+            language    TEXT NOT NULL,
+            item_key    TEXT NOT NULL,
+            correct     INTEGER NOT NULL,
+            difficulty  REAL,
+            created_at  TEXT NOT NULL
+        );
     ''')
 
     # Lightweight migrations (for evolving DB schema over time)
@@ -934,6 +1237,10 @@ def init_db():
         'next_due': 'TEXT',
         'last_review': 'TEXT',
     })
+    _ensure_columns('study_sessions', {
+        'state': 'TEXT',
+        'owner_token': 'TEXT',
+    })
 
     # Performance indexes for SRS due-word queries (no-op if already present)
     conn.executescript('''
@@ -955,6 +1262,12 @@ def init_db():
             ON api_sessions(user_id);
         CREATE INDEX IF NOT EXISTS idx_api_sessions_expires_at
             ON api_sessions(expires_at);
+        CREATE INDEX IF NOT EXISTS idx_study_sessions_user_id
+            ON study_sessions(user_id, created_at);
+        CREATE INDEX IF NOT EXISTS idx_study_sessions_open
+            ON study_sessions(created_at) WHERE submitted_at IS NULL;
+        CREATE INDEX IF NOT EXISTS idx_placement_responses_lang_item
+            ON placement_responses(language, item_key);
     ''')
 
     conn.commit()
@@ -1476,6 +1789,151 @@ def revoke_api_session(token: str) -> bool:
     return bool(cur.rowcount)
 
 
+_STUDY_SESSION_PREFIX = {'placement': 'place', 'placement_adaptive': 'place'}
+# Flask session key holding the browser's token for its anonymous study sessions.
+_STUDY_OWNER_SESSION_KEY = 'study_owner'
+
+
+def _anonymous_study_owner(create: bool = False):
+    """Token tying anonymous study sessions to this browser's Flask session."""
+    if not has_request_context():
+        return None
+    token = session.get(_STUDY_OWNER_SESSION_KEY)
+    if not token and create:
+        token = secrets.token_hex(16)
+        session[_STUDY_OWNER_SESSION_KEY] = token
+    return token
+
+
+def study_session_belongs_to(study: dict, user_id) -> bool:
+    """True if `study` was created by this user, or (anonymous) by this browser session."""
+    if study.get('user_id') is not None or user_id is not None:
+        return study.get('user_id') == user_id
+    owner = study.get('owner_token')
+    current = _anonymous_study_owner()
+    return bool(owner and current and secrets.compare_digest(owner, current))
+
+
+def create_study_session(user_id, lang: str, kind: str, params=None, state_builder=None,
+                         seed=None, content_version=None) -> dict:
+    """Store a new study session as (seed, content version, params).
+
+    The question set is not stored: it is rebuilt from the seed against the same content
+    version when the session is submitted. `seed`/`content_version` are passed when the
+    questions were pre-generated (see QuestionPools). Anonymous sessions are bound to the
+    browser's Flask session (see `study_session_belongs_to`).
+    """
+    session_id = f"{_STUDY_SESSION_PREFIX.get(kind, kind)}_{secrets.token_hex(12)}"
+    seed = secrets.randbits(31) if seed is None else int(seed)
+    content_version = content_version or get_content_version()
+    params = dict(params or {})
+    state = state_builder(seed) if state_builder else None
+    owner_token = _anonymous_study_owner(create=True) if user_id is None else None
+    now_iso = utc_now_rfc3339()
+
+    conn = get_db()
+    conn.execute(
+        '''
+        INSERT INTO study_sessions (id, user_id, language, kind, seed, content_version, params, state, owner_token,
+                                    created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''',
+        (
+            session_id, user_id, lang, kind, seed, content_version, json.dumps(params),
+            json.dumps(state) if state is not None else None, owner_token, now_iso,
+        ),
+    )
+    conn.commit()
+    conn.close()
+
+    return {
+        'id': session_id,
+        'user_id': user_id,
+        'language': lang,
+        'kind': kind,
+        'seed': seed,
+        'content_version': content_version,
+        'params': params,
+        'state': state,
+        'owner_token': owner_token,
+        'created_at': now_iso,
+        'submitted_at': None,
+        'result': None,
+    }
+
+
+def get_study_session(session_id: str):
+    session_id = (session_id or '').strip()
+    if not session_id:
+        return None
+
+    conn = get_db()
+    row = conn.execute('SELECT * FROM study_sessions WHERE id=?', (session_id,)).fetchone()
+    conn.close()
+    if not row:
+        return None
+
+    data = dict(row)
+    data['params'] = json.loads(data.get('params') or '{}')
+    data['state'] = json.loads(data['state']) if data.get('state') else None
+    data['result'] = json.loads(data['result']) if data.get('result') else None
+    return data
+
+
+def update_study_session_state(session_id: str, expected_step: int, state: dict) -> bool:
+    """Store a new session state unless another request already advanced it past `expected_step`."""
+    conn = get_db()
+    cur = conn.execute(
+        '''
+        UPDATE study_sessions SET state=?
+        WHERE id=? AND submitted_at IS NULL
+          AND COALESCE(json_array_length(json_extract(state, '$.responses')), 0)=?
+        ''',
+        (json.dumps(state), session_id, expected_step),
+    )
+    conn.commit()
+    conn.close()
+    return bool(cur.rowcount)
+
+
+def purge_study_sessions(max_age_sec: float, conn=None, dry_run: bool = False) -> int:
+    """Delete study sessions never submitted within `max_age_sec` of being opened.
+
+    Every quiz, practice or placement page view opens one, including crawlers and visitors
+    who leave. Submitted sessions are kept. Returns the number of rows deleted (or that
+    would be, with `dry_run`).
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=max(0.0, float(max_age_sec)))
+    cutoff_iso = cutoff.isoformat(timespec='seconds').replace('+00:00', 'Z')
+    own_conn = conn is None
+    conn = conn or get_db()
+    try:
+        if dry_run:
+            return conn.execute(
+                'SELECT COUNT(*) FROM study_sessions WHERE submitted_at IS NULL AND created_at < ?', (cutoff_iso,),
+            ).fetchone()[0]
+        cur = conn.execute('DELETE FROM study_sessions WHERE submitted_at IS NULL AND created_at < ?', (cutoff_iso,))
+        conn.commit()
+        return cur.rowcount
+    finally:
+        if own_conn:
+            conn.close()
+
+
+def finish_study_session(session_id: str, result: dict, conn=None) -> bool:
+    """Record the graded result; returns False if the session was already submitted."""
+    own_conn = conn is None
+    conn = conn or get_db()
+    cur = conn.execute(
+        'UPDATE study_sessions SET submitted_at=?, result=? WHERE id=? AND submitted_at IS NULL',
+        (utc_now_rfc3339(), json.dumps(result, ensure_ascii=False), session_id),
+    )
+    if own_conn:
+        conn.commit()
+        conn.close()
+    return bool(cur.rowcount)
+
+
 def load_progress(lang, user_id=None):
     conn = get_db()
     if user_id is None:
@@ -1490,6 +1948,60 @@ def load_progress(lang, user_id=None):
     conn.close()
     return {r['lesson_id']: dict(r) for r in rows}
 
+
+def progress_version(lang, user_id) -> str:
+    """Short hash of a user's lesson progress rows for one language (changes on every write).
+
+    Hashes the rows themselves rather than a counter, so it needs no bookkeeping in the
+    writers and every worker agrees on it.
+    """
+    conn = get_db()
+    rows = conn.execute(
+        'SELECT lesson_id, completed, best_score, attempts, last_seen FROM user_lesson_progress '
+        'WHERE user_id=? AND language=? ORDER BY lesson_id',
+        (user_id, lang),
+    ).fetchall()
+    conn.close()
+    blob = json.dumps([list(r) for r in rows], separators=(',', ':'))
+    return hashlib.sha1(blob.encode('utf-8')).hexdigest()[:16]
+
+
+# Bump when a /api/v1 content payload changes shape, so cached ETags stop matching.
+_API_PAYLOAD_FORMAT = 1
+
+
+def api_content_etag(*parts) -> str:
+    """Strong ETag for a content payload: content version + payload format + `parts`."""
+    key = '|'.join([get_content_version(), str(_API_PAYLOAD_FORMAT)] + [str(p) for p in parts])
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:24]
+
+
+def load_due_words(lang, limit, user_id=None):
+    """Words due for spaced-repetition review, most overdue / weakest first."""
+    now_iso = _now_iso()
+    conn = get_db()
+    if user_id is None:
+        rows = conn.execute('''
+            SELECT word
+            FROM word_progress
+            WHERE language=?
+              AND (next_due IS NULL OR next_due <= ?)
+            ORDER BY COALESCE(next_due, '') ASC, box ASC, incorrect DESC
+            LIMIT ?
+        ''', (lang, now_iso, limit)).fetchall()
+    else:
+        rows = conn.execute('''
+            SELECT word
+            FROM user_word_progress
+            WHERE user_id=?
+              AND language=?
+              AND (next_due IS NULL OR next_due <= ?)
+            ORDER BY COALESCE(next_due, '') ASC, box ASC, incorrect DESC
+            LIMIT ?
+        ''', (user_id, lang, now_iso, limit)).fetchall()
+    conn.close()
+    return [r['word'] for r in rows if r['word']]
+
 def touch_lesson(lang, lesson_id, user_id=None):
     """Update last_seen for a lesson even if the user doesn't finish a quiz."""
     conn = get_db()
@@ -1512,7 +2024,7 @@ def touch_lesson(lang, lesson_id, user_id=None):
     conn.close()
     return now_iso
 
-def add_activity(xp=0, reviews=0, correct=0, wrong=0, user_id=None):
+def add_activity(xp=0, reviews=0, correct=0, wrong=0, user_id=None, conn=None):
     xp = int(xp or 0)
     reviews = int(reviews or 0)
     correct = int(correct or 0)
@@ -1521,7 +2033,8 @@ def add_activity(xp=0, reviews=0, correct=0, wrong=0, user_id=None):
         return
 
     today = _today_iso()
-    conn = get_db()
+    own_conn = conn is None
+    conn = conn or get_db()
     if user_id is None:
         conn.execute('''
             INSERT INTO daily_activity (date, xp, reviews, correct, wrong)
@@ -1542,8 +2055,121 @@ def add_activity(xp=0, reviews=0, correct=0, wrong=0, user_id=None):
                 correct = correct + excluded.correct,
                 wrong = wrong + excluded.wrong
         ''', (user_id, today, xp, reviews, correct, wrong))
-    conn.commit()
-    conn.close()
+    if own_conn:
+        conn.commit()
+        conn.close()
+
+
+# Simple spaced repetition (Leitner boxes): days until the next review per box.
+_SRS_BOX_DAYS = {1: 1, 2: 2, 3: 4, 4: 7, 5: 14}
+_SRS_RETRY_HOURS = 6
+
+
+def record_word_review(lang, word, correct, user_id=None, now=None, conn=None) -> dict:
+    """Move a word between Leitner boxes after one answer; returns its new SRS state."""
+    now = now or _app_now()
+    now_iso = now.isoformat(timespec='seconds')
+    own_conn = conn is None
+    conn = conn or get_db()
+    if user_id is None:
+        table, where, key = 'word_progress', 'language=? AND word=?', (lang, word)
+    else:
+        table, where, key = 'user_word_progress', 'user_id=? AND language=? AND word=?', (user_id, lang, word)
+
+    row = conn.execute(f'SELECT box, correct, incorrect FROM {table} WHERE {where}', key).fetchone()
+    if correct:
+        box = min((int(row['box'] or 1) if row else 1) + 1, 5)
+        next_due = (now + timedelta(days=_SRS_BOX_DAYS[box])).isoformat(timespec='seconds')
+    else:
+        box = 1
+        next_due = (now + timedelta(hours=_SRS_RETRY_HOURS)).isoformat(timespec='seconds')
+    hit, miss = (1, 0) if correct else (0, 1)
+
+    if row:
+        conn.execute(
+            f'''
+            UPDATE {table}
+            SET correct = correct + ?,
+                incorrect = incorrect + ?,
+                box = ?,
+                next_due = ?,
+                last_review = ?
+            WHERE {where}
+            ''',
+            (hit, miss, box, next_due, now_iso, *key),
+        )
+    elif user_id is None:
+        conn.execute('''
+            INSERT INTO word_progress (language, word, correct, incorrect, box, next_due, last_review)
+            VALUES (?,?,?,?,?,?,?)
+        ''', (lang, word, hit, miss, box, next_due, now_iso))
+    else:
+        conn.execute('''
+            INSERT INTO user_word_progress (user_id, language, word, correct, incorrect, box, next_due, last_review)
+            VALUES (?,?,?,?,?,?,?,?)
+        ''', (user_id, lang, word, hit, miss, box, next_due, now_iso))
+    if own_conn:
+        conn.commit()
+        conn.close()
+
+    return {
+        'word': word,
+        'box': box,
+        'next_due': next_due,
+        'correct': (int(row['correct'] or 0) if row else 0) + hit,
+        'incorrect': (int(row['incorrect'] or 0) if row else 0) + miss,
+    }
+
+
+def complete_lesson(lang, lesson_id, score, user_id=None, conn=None) -> dict:
+    """Mark a lesson completed: attempts + 1, best score kept (returns the updated row)."""
+    now_iso = _now_iso()
+    own_conn = conn is None
+    conn = conn or get_db()
+    if user_id is None:
+        conn.execute('''
+            INSERT INTO lesson_progress (language, lesson_id, completed, best_score, attempts, last_seen)
+            VALUES (?, ?, 1, ?, 1, ?)
+            ON CONFLICT(language, lesson_id) DO UPDATE SET
+                completed  = 1,
+                best_score = MAX(best_score, excluded.best_score),
+                attempts   = attempts + 1,
+                last_seen  = excluded.last_seen
+        ''', (lang, lesson_id, score, now_iso))
+        row = conn.execute(
+            'SELECT completed, best_score, attempts, last_seen FROM lesson_progress WHERE language=? AND lesson_id=?',
+            (lang, lesson_id),
+        ).fetchone()
+    else:
+        conn.execute('''
+            INSERT INTO user_lesson_progress (user_id, language, lesson_id, completed, best_score, attempts, last_seen)
+            VALUES (?, ?, ?, 1, ?, 1, ?)
+            ON CONFLICT(user_id, language, lesson_id) DO UPDATE SET
+                completed  = 1,
+                best_score = MAX(best_score, excluded.best_score),
+                attempts   = attempts + 1,
+                last_seen  = excluded.last_seen
+        ''', (user_id, lang, lesson_id, score, now_iso))
+        row = conn.execute(
+            '''
+            SELECT completed, best_score, attempts, last_seen FROM user_lesson_progress
+            WHERE user_id=? AND language=? AND lesson_id=?
+            ''',
+            (user_id, lang, lesson_id),
+        ).fetchone()
+    if own_conn:
+        conn.commit()
+        conn.close()
+    return dict(row)
+
+
+def _emit_lesson_complete(user_id, lang, lesson_id, score):
+    if user_id is None:
+        return
+    user = get_user_by_id(user_id)
+    quiz_url = url_for('quiz', lang=lang, lesson_id=lesson_id)
+    _emit_event_to_sheets('lesson_complete', user=user, language=lang, lesson_id=lesson_id, score=score, page=quiz_url)
+    _emit_user_snapshot_to_sheets(user, last_event='lesson_complete', language=lang, lesson_id=lesson_id, score=score, page=quiz_url)
 
 
 def get_activity_summary(user_id=None):
@@ -1589,8 +2215,11 @@ def get_activity_summary(user_id=None):
 
 # ---------- Helpers ----------
 def get_lesson_vocab(lang, lesson):
+    return _lesson_vocab_slice(get_vocab().get(lang) or {}, lesson)
+
+
+def _lesson_vocab_slice(vocab_by_cat, lesson):
     words = []
-    vocab_by_cat = (get_vocab().get(lang) or {})
     slices = lesson.get('vocabulary_slices') or {}
     try:
         default_limit = int(lesson.get('vocab_limit_per_category') or 60)
@@ -1684,85 +2313,305 @@ def _escape_paragraph_text(text: str) -> str:
     return s
 
 
-def _build_lesson_pdf_bytes_reportlab(lang: str, meta: dict, lesson: dict, vocabulary: list, grammar: Optional[dict]) -> bytes:
-    """Render a single lesson as a downloadable PDF."""
-    try:
-        from reportlab.lib import colors
-        from reportlab.lib.pagesizes import A4
-        from reportlab.lib.utils import ImageReader
-        from reportlab.pdfbase import pdfmetrics
-        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-        from reportlab.lib.styles import ParagraphStyle
-    except Exception as exc:
-        raise RuntimeError("Missing dependency: reportlab. Run: pip install -r requirements.txt") from exc
+_REPORTLAB_LOCK = threading.Lock()
+_REPORTLAB_STYLE_SHEETS = {}
+_REPORTLAB_PAGES = {}
+_REPORTLAB_LOGO_PX = 96
+_PDF_PAGE_MARGIN_X = 36
+# Leave space for a simple header+footer (logo/title + footer text)
+_PDF_PAGE_MARGIN_Y = 72
 
-    font_name, font_bold = _ensure_pdf_font_registered()
-    if not font_name:
-        raise RuntimeError(f"Missing PDF font file: {_config_path('PDF_FONT_PATH')}")
-    page_w, page_h = A4
-    left = right = 36
-    # Leave space for a simple header+footer (logo/title + footer text)
-    top = bottom = 72
-    content_width = page_w - left - right
 
-    def para(text: str, style: ParagraphStyle) -> Paragraph:
-        return Paragraph(_escape_paragraph_text(text), style)
+class ShapedTextCache:
+    """LRU of HarfBuzz shaping results keyed by (text, font, size).
 
-    styles = {
-        'title': ParagraphStyle(
-            name='LCTitle',
-            fontName=font_name,
-            shaping=1,
-            fontSize=18,
-            leading=22,
-            spaceAfter=10,
-        ),
-        'subtitle': ParagraphStyle(
-            name='LCSubtitle',
-            fontName=font_name,
-            shaping=1,
-            fontSize=11,
-            leading=14,
-            textColor=colors.HexColor('#444444'),
-            spaceAfter=14,
-        ),
-        'h2': ParagraphStyle(
-            name='LCH2',
-            fontName=font_name,
-            shaping=1,
-            fontSize=13,
-            leading=16,
-            spaceBefore=10,
-            spaceAfter=8,
-            textColor=colors.HexColor('#111111'),
-        ),
-        'normal': ParagraphStyle(
-            name='LCNormal',
-            fontName=font_name,
-            shaping=1,
-            fontSize=11,
-            leading=14,
-            textColor=colors.HexColor('#111111'),
-            spaceAfter=6,
-        ),
-        'muted': ParagraphStyle(
-            name='LCMuted',
-            fontName=font_name,
-            shaping=1,
-            fontSize=11,
-            leading=14,
-            textColor=colors.HexColor('#444444'),
-            spaceAfter=6,
-        ),
-        'cell': ParagraphStyle(
-            name='LCCell',
-            fontName=font_name,
-            shaping=1,
-            fontSize=9,
-            leading=11,
-            textColor=colors.HexColor('#111111'),
-        ),
+    ReportLab shapes every word of every Paragraph (`shaping=1`) again on each render,
+    although lesson PDFs repeat the same Bengali words and grammar strings across many
+    lessons. `wrap(shape)` returns a drop-in for ReportLab's `shapeFragWord`: single-run
+    words are looked up here and the cached glyph strings are re-attached to the caller's
+    own fragment (colour etc. stay per paragraph); anything else goes straight through.
+    """
+
+    _UNCHANGED = object()
+
+    def __init__(self, max_entries: int = 20000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def wrap(self, shape, word_class=None):
+        """`word_class(w)` gives the list class for a shaped copy of `w` (ReportLab's makeShapedFragWord)."""
+        word_class = word_class or (lambda w: w.__class__)
+
+        def shape_frag_word(w, *args, **kwargs):
+            if args or kwargs or self.max_entries <= 0 or len(w) != 2 or w.__class__ is not list:
+                return shape(w, *args, **kwargs)
+            frag, text = w[1]
+            if hasattr(frag, 'cbDefn'):
+                return shape(w)
+            key = (text, frag.fontName, frag.fontSize)
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+            if entry is None:
+                shaped = shape(w)
+                if shaped is w:
+                    entry = self._UNCHANGED
+                elif all(part[0] is frag for part in shaped[1:]):
+                    entry = (shaped[0], tuple(part[1] for part in shaped[1:]))
+                else:
+                    return shaped
+                with self._lock:
+                    self.misses += 1
+                    self._entries[key] = entry
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+                return shaped
+            if entry is self._UNCHANGED:
+                return w
+            width, parts = entry
+            return word_class(w)([width] + [(frag, part) for part in parts])
+
+        shape_frag_word.__wrapped__ = shape
+        return shape_frag_word
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+shaped_text_cache = ShapedTextCache(max(0, int(_env_float('PDF_SHAPE_CACHE_SIZE', 20000))))
+
+
+def _install_reportlab_shaping_cache():
+    """Route Paragraph shaping through `shaped_text_cache` (once per process)."""
+    if shaped_text_cache.max_entries <= 0:
+        return
+    from reportlab.platypus import paragraph
+
+    shape = paragraph.shapeFragWord
+    if getattr(shape, '__wrapped__', None) is not None:
+        return
+    try:
+        from reportlab.pdfbase.ttfonts import makeShapedFragWord
+    except ImportError:
+        return
+    paragraph.shapeFragWord = shaped_text_cache.wrap(shape, makeShapedFragWord)
+
+
+def _reportlab_style_sheet(font_name: str, font_bold: str) -> dict:
+    """Paragraph and table styles for lesson PDFs, built once per registered font pair."""
+    key = (font_name, font_bold)
+    sheet = _REPORTLAB_STYLE_SHEETS.get(key)
+    if sheet is not None:
+        return sheet
+
+    from reportlab.lib import colors
+    from reportlab.lib.styles import ParagraphStyle
+    from reportlab.platypus import TableStyle
+
+    def style(name, **kwargs):
+        return ParagraphStyle(name=name, fontName=font_name, shaping=1, **kwargs)
+
+    table_base = [
+        ('FONTNAME', (0, 0), (-1, -1), font_name),
+        ('FONTSIZE', (0, 0), (-1, -1), 9),
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#f1f3f5')),
+        ('LINEBELOW', (0, 0), (-1, 0), 0.5, colors.HexColor('#adb5bd')),
+        ('GRID', (0, 1), (-1, -1), 0.25, colors.HexColor('#ced4da')),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ('LEFTPADDING', (0, 0), (-1, -1), 6),
+        ('RIGHTPADDING', (0, 0), (-1, -1), 6),
+        ('TOPPADDING', (0, 0), (-1, -1), 4),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
+    ]
+    sheet = {
+        'title': style('LCTitle', fontSize=18, leading=22, spaceAfter=10),
+        'subtitle': style('LCSubtitle', fontSize=11, leading=14, textColor=colors.HexColor('#444444'), spaceAfter=14),
+        'h2': style('LCH2', fontSize=13, leading=16, spaceBefore=10, spaceAfter=8, textColor=colors.HexColor('#111111')),
+        'normal': style('LCNormal', fontSize=11, leading=14, textColor=colors.HexColor('#111111'), spaceAfter=6),
+        'muted': style('LCMuted', fontSize=11, leading=14, textColor=colors.HexColor('#444444'), spaceAfter=6),
+        'cell': style('LCCell', fontSize=9, leading=11, textColor=colors.HexColor('#111111')),
+        'vocab_table': TableStyle(table_base[:3] + [
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.HexColor('#111111')),
+        ] + table_base[3:6] + [
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#fbfcfd')]),
+        ] + table_base[6:]),
+        'grammar_table': TableStyle(table_base),
     }
+    with _REPORTLAB_LOCK:
+        return _REPORTLAB_STYLE_SHEETS.setdefault(key, sheet)
+
+
+def _reportlab_logo(path: str):
+    """(ImageReader, w, h) for the header logo, downscaled once: it is drawn 22pt wide."""
+    from PIL import Image
+    from reportlab.lib.utils import ImageReader
+
+    with Image.open(path) as img:
+        img.load()
+        thumb = img.convert('RGBA') if img.mode not in ('RGB', 'RGBA') else img.copy()
+    thumb.thumbnail((_REPORTLAB_LOGO_PX, _REPORTLAB_LOGO_PX), Image.LANCZOS)
+    reader = ImageReader(thumb)
+    logo_w, logo_h = reader.getSize()
+    return reader, logo_w, logo_h
+
+
+class _LessonPdfPage:
+    """ReportLab header/footer drawer shared by every lesson PDF with the same fonts and logo.
+
+    Per-document text comes from `doc.lesson_page` (lang_name, lesson_no, title, year).
+    """
+
+    def __init__(self, font_name: str, font_bold: str, logo=None):
+        from reportlab.lib import colors
+        from reportlab.lib.pagesizes import A4
+
+        self.font_name = font_name
+        self.font_bold = font_bold
+        self.logo = logo
+        self.page_w, self.page_h = A4
+        self.left = self.right = _PDF_PAGE_MARGIN_X
+        self.top = self.bottom = _PDF_PAGE_MARGIN_Y
+        self.rule = colors.HexColor('#e5e5e5')
+        self.ink = colors.HexColor('#111111')
+        self.muted = colors.HexColor('#666666')
+
+    def __call__(self, canvas, doc_):
+        info = doc_.lesson_page
+        page_w, page_h = self.page_w, self.page_h
+        left, right, top, bottom = self.left, self.right, self.top, self.bottom
+        font_name, font_bold = self.font_name, self.font_bold
+        canvas.saveState()
+        # ----- Header (logo + title) -----
+        header_line_y = page_h - top + 12
+        header_content_y = page_h - top + 34
+
+        canvas.setStrokeColor(self.rule)
+        canvas.setLineWidth(0.8)
+        canvas.line(left, header_line_y, page_w - right, header_line_y)
+
+        x = left
+        if self.logo:
+            logo_reader, logo_w, logo_h = self.logo
+            d = 22
+            r = d / 2
+            y = header_content_y - r
+            # Clip the logo to a circle (like the website avatar)
+            canvas.saveState()
+            path = canvas.beginPath()
+            path.circle(x + r, y + r, r)
+            canvas.clipPath(path, stroke=0, fill=0)
+
+            # "Cover" fit: scale to fill the square, then center-crop.
+            scale = max(d / float(logo_w), d / float(logo_h))
+            dw = logo_w * scale
+            dh = logo_h * scale
+            dx = x + r - dw / 2
+            dy = y + r - dh / 2
+            canvas.drawImage(logo_reader, dx, dy, width=dw, height=dh, mask='auto')
+            canvas.restoreState()
+
+            # Circle border
+            canvas.setStrokeColor(self.rule)
+            canvas.setLineWidth(1)
+            canvas.circle(x + r, y + r, r, stroke=1, fill=0)
+            x = x + d + 10
+
+        canvas.setFillColor(self.ink)
+        canvas.setFont(font_bold, 10)
+        canvas.drawString(x, header_content_y + 4, "Language Coach")
+
+        canvas.setFillColor(self.muted)
+        canvas.setFont(font_name, 9)
+        canvas.drawString(x, header_content_y - 8, f"{info['lang_name']} · Lesson {info['lesson_no']}")
+
+        # Right-side lesson title (truncated so it doesn't wrap)
+        canvas.drawRightString(page_w - right, header_content_y - 2, info['title'])
+
+        # ----- Footer (website footer text + page number) -----
+        footer_line_y = bottom - 18
+        canvas.setStrokeColor(self.rule)
+        canvas.setLineWidth(0.8)
+        canvas.line(left, footer_line_y, page_w - right, footer_line_y)
+
+        footer_center_x = (left + (page_w - right)) / 2
+        canvas.setFillColor(self.ink)
+        canvas.setFont(font_bold, 9)
+        canvas.drawCentredString(footer_center_x, footer_line_y - 12, "Language Coach")
+        canvas.setFillColor(self.muted)
+        canvas.setFont(font_name, 8.5)
+        canvas.drawCentredString(footer_center_x, footer_line_y - 24, "mentors.career.abroad26@gmail.com")
+        canvas.drawCentredString(footer_center_x, footer_line_y - 35, "An initiative from : Career Abroad Mentor")
+        canvas.drawCentredString(footer_center_x, footer_line_y - 46, f"© {info['year']} Ahsan Suny. All rights reserved")
+
+        canvas.setFont(font_name, 9)
+        canvas.drawRightString(page_w - right, 18, f"Page {doc_.page}")
+        canvas.restoreState()
+
+
+def _reportlab_page(font_name: str, font_bold: str) -> _LessonPdfPage:
+    """Shared page drawer; rebuilt when the logo file changes."""
+    logo_path = _logo_file_path()
+    try:
+        logo_stat = os.stat(logo_path)
+        logo_key = (logo_path, logo_stat.st_mtime_ns, logo_stat.st_size)
+    except (OSError, TypeError):
+        logo_key = None
+    key = (font_name, font_bold, logo_key)
+    page = _REPORTLAB_PAGES.get(key)
+    if page is not None:
+        return page
+    logo = None
+    if logo_key:
+        try:
+            logo = _reportlab_logo(logo_path)
+        except Exception as exc:
+            print(f"WARNING: Could not load PDF logo {logo_path}: {exc}")
+    page = _LessonPdfPage(font_name, font_bold, logo)
+    with _REPORTLAB_LOCK:
+        return _REPORTLAB_PAGES.setdefault(key, page)
+
+
+def reset_reportlab_caches():
+    """Drop the shared style sheets, page drawers and shaped text (benchmarks, tests)."""
+    with _REPORTLAB_LOCK:
+        _REPORTLAB_STYLE_SHEETS.clear()
+        _REPORTLAB_PAGES.clear()
+    shaped_text_cache.clear()
+
+
+def _build_lesson_pdf_bytes_reportlab(lang: str, meta: dict, lesson: dict, vocabulary: list, grammar: Optional[dict]) -> bytes:
+    """Render a single lesson as a downloadable PDF."""
+    try:
+        from reportlab.lib.pagesizes import A4
+        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table
+    except Exception as exc:
+        raise RuntimeError("Missing dependency: reportlab. Run: pip install -r requirements.txt") from exc
+
+    font_name, font_bold = _ensure_pdf_font_registered()
+    if not font_name:
+        raise RuntimeError(f"Missing PDF font file: {_config_path('PDF_FONT_PATH')}")
+    _install_reportlab_shaping_cache()
+    styles = _reportlab_style_sheet(font_name, font_bold)
+    page = _reportlab_page(font_name, font_bold)
+    content_width = page.page_w - page.left - page.right
+
+    def para(text: str, style) -> Paragraph:
+        return Paragraph(_escape_paragraph_text(text), style)
 
     story = []
 
@@ -1820,20 +2669,7 @@ def _build_lesson_pdf_bytes_reportlab(lang: str, meta: dict, lesson: dict, vocab
 
         col_widths = [0.22 * content_width, 0.16 * content_width, 0.30 * content_width, 0.32 * content_width]
         vocab_table = Table(rows, colWidths=col_widths, repeatRows=1, hAlign='LEFT')
-        vocab_table.setStyle(TableStyle([
-            ('FONTNAME', (0, 0), (-1, -1), font_name),
-            ('FONTSIZE', (0, 0), (-1, -1), 9),
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#f1f3f5')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.HexColor('#111111')),
-            ('LINEBELOW', (0, 0), (-1, 0), 0.5, colors.HexColor('#adb5bd')),
-            ('GRID', (0, 1), (-1, -1), 0.25, colors.HexColor('#ced4da')),
-            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#fbfcfd')]),
-            ('LEFTPADDING', (0, 0), (-1, -1), 6),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 6),
-            ('TOPPADDING', (0, 0), (-1, -1), 4),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
-        ]))
+        vocab_table.setStyle(styles['vocab_table'])
         story.append(vocab_table)
     else:
         story.append(para("No vocabulary for this lesson.", styles['muted']))
@@ -1871,18 +2707,7 @@ def _build_lesson_pdf_bytes_reportlab(lang: str, meta: dict, lesson: dict, vocab
 
                     col_w = content_width / ncols
                     g_table = Table(table_data, colWidths=[col_w] * ncols, repeatRows=1, hAlign='LEFT')
-                    g_table.setStyle(TableStyle([
-                        ('FONTNAME', (0, 0), (-1, -1), font_name),
-                        ('FONTSIZE', (0, 0), (-1, -1), 9),
-                        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#f1f3f5')),
-                        ('LINEBELOW', (0, 0), (-1, 0), 0.5, colors.HexColor('#adb5bd')),
-                        ('GRID', (0, 1), (-1, -1), 0.25, colors.HexColor('#ced4da')),
-                        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-                        ('LEFTPADDING', (0, 0), (-1, -1), 6),
-                        ('RIGHTPADDING', (0, 0), (-1, -1), 6),
-                        ('TOPPADDING', (0, 0), (-1, -1), 4),
-                        ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
-                    ]))
+                    g_table.setStyle(styles['grammar_table'])
                     story.append(g_table)
 
             note_en = (section.get('note_en') or '').strip()
@@ -1898,104 +2723,23 @@ def _build_lesson_pdf_bytes_reportlab(lang: str, meta: dict, lesson: dict, vocab
     doc = SimpleDocTemplate(
         buf,
         pagesize=A4,
-        leftMargin=left,
-        rightMargin=right,
-        topMargin=top,
-        bottomMargin=bottom,
+        leftMargin=page.left,
+        rightMargin=page.right,
+        topMargin=page.top,
+        bottomMargin=page.bottom,
         title=f"{meta.get('name', '').strip()} Lesson {lesson_no}",
         author="Language Coach",
     )
-
-    # Prepare logo (optional)
-    logo_reader = None
-    logo_w = logo_h = 0
-    try:
-        logo_path = _logo_file_path()
-        if logo_path and os.path.exists(logo_path):
-            logo_reader = ImageReader(logo_path)
-            logo_w, logo_h = logo_reader.getSize()
-    except Exception:
-        logo_reader = None
-        logo_w = logo_h = 0
-
-    def on_page(canvas, doc_):
-        canvas.saveState()
-        # ----- Header (logo + title) -----
-        header_line_y = page_h - top + 12
-        header_content_y = page_h - top + 34
-
-        canvas.setStrokeColor(colors.HexColor('#e5e5e5'))
-        canvas.setLineWidth(0.8)
-        canvas.line(left, header_line_y, page_w - right, header_line_y)
-
-        x = left
-        if logo_reader and logo_w and logo_h:
-            d = 22
-            r = d / 2
-            y = header_content_y - r
-            # Clip the logo to a circle (like the website avatar)
-            canvas.saveState()
-            path = canvas.beginPath()
-            path.circle(x + r, y + r, r)
-            canvas.clipPath(path, stroke=0, fill=0)
-
-            # "Cover" fit: scale to fill the square, then center-crop.
-            scale = max(d / float(logo_w), d / float(logo_h))
-            dw = logo_w * scale
-            dh = logo_h * scale
-            dx = x + r - dw / 2
-            dy = y + r - dh / 2
-            canvas.drawImage(logo_reader, dx, dy, width=dw, height=dh, mask='auto')
-            canvas.restoreState()
-
-            # Circle border
-            canvas.setStrokeColor(colors.HexColor('#e5e5e5'))
-            canvas.setLineWidth(1)
-            canvas.circle(x + r, y + r, r, stroke=1, fill=0)
-            x = x + d + 10
-
-        canvas.setFillColor(colors.HexColor('#111111'))
-        canvas.setFont(font_bold, 10)
-        canvas.drawString(x, header_content_y + 4, "Language Coach")
-
-        lang_name = (meta.get('name') or lang or '').strip()
-        subtitle = f"{lang_name} · Lesson {lesson_no}"
-        canvas.setFillColor(colors.HexColor('#666666'))
-        canvas.setFont(font_name, 9)
-        canvas.drawString(x, header_content_y - 8, subtitle)
-
-        # Right-side lesson title (truncate a bit so it doesn't wrap)
-        right_title = title_en or f"Lesson {lesson_no}"
-        right_title = re.sub(r'\s+', ' ', right_title).strip()
-        if len(right_title) > 46:
-            right_title = right_title[:45].rstrip() + "…"
-        canvas.setFillColor(colors.HexColor('#666666'))
-        canvas.setFont(font_name, 9)
-        canvas.drawRightString(page_w - right, header_content_y - 2, right_title)
-
-        # ----- Footer (website footer text + page number) -----
-        footer_line_y = bottom - 18
-        canvas.setStrokeColor(colors.HexColor('#e5e5e5'))
-        canvas.setLineWidth(0.8)
-        canvas.line(left, footer_line_y, page_w - right, footer_line_y)
-
-        year = _app_now().year
-        footer_center_x = (left + (page_w - right)) / 2
-        canvas.setFillColor(colors.HexColor('#111111'))
-        canvas.setFont(font_bold, 9)
-        canvas.drawCentredString(footer_center_x, footer_line_y - 12, "Language Coach")
-        canvas.setFillColor(colors.HexColor('#666666'))
-        canvas.setFont(font_name, 8.5)
-        canvas.drawCentredString(footer_center_x, footer_line_y - 24, "mentors.career.abroad26@gmail.com")
-        canvas.drawCentredString(footer_center_x, footer_line_y - 35, "An initiative from : Career Abroad Mentor")
-        canvas.drawCentredString(footer_center_x, footer_line_y - 46, f"© {year} Ahsan Suny. All rights reserved")
-
-        canvas.setFillColor(colors.HexColor('#666666'))
-        canvas.setFont(font_name, 9)
-        canvas.drawRightString(page_w - right, 18, f"Page {doc_.page}")
-        canvas.restoreState()
-
-    doc.build(story, onFirstPage=on_page, onLaterPages=on_page)
+    right_title = re.sub(r'\s+', ' ', title_en or f"Lesson {lesson_no}").strip()
+    if len(right_title) > 46:
+        right_title = right_title[:45].rstrip() + "…"
+    doc.lesson_page = {
+        'lang_name': (meta.get('name') or lang or '').strip(),
+        'lesson_no': lesson_no,
+        'title': right_title,
+        'year': _app_now().year,
+    }
+    doc.build(story, onFirstPage=page, onLaterPages=page)
     return buf.getvalue()
 
 
@@ -2023,9 +2767,50 @@ def _pdf_html_asset(key: str, path: str, mime: str) -> str:
         return data
 
 
+# Fonts are not inlined into the lesson HTML: it links them on this origin, which only
+# the browser pool answers (see _PlaywrightChromium), from files it reads once.
+_PDF_ASSET_ORIGIN = 'https://lesson-pdf.assets'
+_PDF_LOGO_PX = 64
+
+
+def _lesson_pdf_asset_files() -> dict:
+    """URL path -> (file path, mime) for the assets lesson_pdf.html links."""
+    return {
+        '/fonts/bn-regular.ttf': (_config_path('PDF_HTML_BN_FONT_REG_PATH'), 'font/ttf'),
+        '/fonts/bn-bold.ttf': (_config_path('PDF_HTML_BN_FONT_BOLD_PATH'), 'font/ttf'),
+    }
+
+
+def _pdf_logo_data_uri() -> str:
+    """Header logo as a small PNG data URI (header templates cannot load URLs).
+
+    The logo is shown 28px wide; it is downscaled once per logo file when Pillow is
+    installed (it comes with reportlab), otherwise the file is inlined as is.
+    """
+    path = _logo_file_path()
+    try:
+        stat = os.stat(path)
+    except OSError as exc:
+        raise RuntimeError(f"Missing PDF asset: {path}") from exc
+    cache_key = ('logo_thumb', os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    cached = _PDF_HTML_ASSET_CACHE.get(cache_key)
+    if cached:
+        return cached
+    try:
+        from PIL import Image
+    except ImportError:
+        return _pdf_html_asset('logo_png', path, 'image/png')
+    with Image.open(path) as img:
+        thumb = img.convert('RGBA')
+    thumb.thumbnail((_PDF_LOGO_PX, _PDF_LOGO_PX), Image.LANCZOS)
+    buf = io.BytesIO()
+    thumb.save(buf, format='PNG', optimize=True)
+    data = f"data:image/png;base64,{base64.b64encode(buf.getvalue()).decode('ascii')}"
+    with _PDF_HTML_ASSET_LOCK:
+        return _PDF_HTML_ASSET_CACHE.setdefault(cache_key, data)
+
+
 def _render_lesson_pdf_html(lang: str, meta: dict, lesson: dict, vocabulary: list, grammar: Optional[dict]) -> str:
-    bn_font_regular_data = _pdf_html_asset('bn_font_regular', _config_path('PDF_HTML_BN_FONT_REG_PATH'), 'font/ttf')
-    bn_font_bold_data = _pdf_html_asset('bn_font_bold', _config_path('PDF_HTML_BN_FONT_BOLD_PATH'), 'font/ttf')
     return render_template(
         'lesson_pdf.html',
         lang=lang,
@@ -2033,13 +2818,13 @@ def _render_lesson_pdf_html(lang: str, meta: dict, lesson: dict, vocabulary: lis
         lesson=lesson,
         vocabulary=vocabulary,
         grammar=grammar,
-        bn_font_regular_data=bn_font_regular_data,
-        bn_font_bold_data=bn_font_bold_data,
+        bn_font_regular_url=f'{_PDF_ASSET_ORIGIN}/fonts/bn-regular.ttf',
+        bn_font_bold_url=f'{_PDF_ASSET_ORIGIN}/fonts/bn-bold.ttf',
     )
 
 
 def _lesson_pdf_header_footer(lang: str, meta: dict, lesson: dict) -> tuple[str, str]:
-    logo_data = _pdf_html_asset('logo_png', _logo_file_path(), 'image/png')
+    logo_data = _pdf_logo_data_uri()
 
     lesson_no = lesson.get('id') or ''
     title = (lesson.get('title_en') or '').strip() or f"Lesson {lesson_no}"
@@ -2086,36 +2871,255 @@ def _lesson_pdf_header_footer(lang: str, meta: dict, lesson: dict) -> tuple[str,
     return header, footer
 
 
-def _build_lesson_pdf_bytes_chromium(html: str, header_html: str, footer_html: str) -> bytes:
+class _PlaywrightChromium:
+    """One headless Chromium with a single reusable page, owned by the thread that made it.
+
+    The sync Playwright API is bound to its thread, so only the pool worker that
+    launched an instance may use it. Requests to `_PDF_ASSET_ORIGIN` are answered from
+    the asset files passed to `render()`, each read once per browser.
+    """
+
+    def __init__(self):
+        try:
+            from playwright.sync_api import sync_playwright
+        except Exception as exc:
+            raise RuntimeError(
+                "Missing dependency: playwright. Run: pip install -r requirements.txt"
+            ) from exc
+        self.assets = {}
+        self._asset_bodies = {}
+        self._playwright = sync_playwright().start()
+        try:
+            self.browser = self._playwright.chromium.launch(args=['--no-sandbox'])
+            context = self.browser.new_context()
+            context.route(f'{_PDF_ASSET_ORIGIN}/**', self._serve_asset)
+            self.page = context.new_page()
+        except Exception as exc:
+            self._playwright.stop()
+            msg = str(exc) or ''
+            if 'Executable doesn' in msg or 'browserType.launch' in msg or 'chromium' in msg.lower():
+                raise RuntimeError("Playwright browser is not installed. Run: python -m playwright install chromium") from exc
+            raise
+
+    def healthy(self) -> bool:
+        return self.browser.is_connected() and not self.page.is_closed()
+
+    def _serve_asset(self, route):
+        entry = self.assets.get(urlparse(route.request.url).path)
+        if not entry:
+            route.abort()
+            return
+        path, mime = entry
+        try:
+            stat = os.stat(path)
+        except OSError:
+            route.abort()
+            return
+        key = (path, stat.st_mtime_ns, stat.st_size)
+        body = self._asset_bodies.get(key)
+        if body is None:
+            with open(path, 'rb') as f:
+                body = self._asset_bodies[key] = f.read()
+        # set_content() pages have an opaque origin: fonts need CORS to load.
+        route.fulfill(status=200, body=body, content_type=mime, headers={'Access-Control-Allow-Origin': '*'})
+
+    def render(self, html: str, header_html: str, footer_html: str, assets: Optional[dict] = None) -> bytes:
+        if assets is not None:
+            self.assets = assets
+        self.page.set_content(html, wait_until='load')
+        self.page.wait_for_load_state('networkidle')
+        return self.page.pdf(
+            format='A4',
+            print_background=True,
+            display_header_footer=True,
+            header_template=header_html,
+            footer_template=footer_html,
+            margin={'top': '96px', 'bottom': '110px', 'left': '36px', 'right': '36px'},
+        )
+
+    def close(self) -> None:
+        for close in (self.browser.close, self._playwright.stop):
+            try:
+                close()
+            except Exception:
+                pass
+
+
+_PDF_POOL_LATENCY_SAMPLES = 256
+
+
+class PdfRenderTimeout(TimeoutError):
+    """A Chromium render did not finish in time; `running` is its Future while a worker is
+    still busy on it (None when it never left the queue)."""
+
+    def __init__(self, message: str, running=None):
+        super().__init__(message)
+        self.running = running
+
+
+class ChromiumPdfPool:
+    """Long-lived headless Chromium instances for HTML-to-PDF, shared by all requests.
+
+    `size` worker threads each own one browser with one page (so at most `size` pages
+    are open). Requests queue for the next free worker instead of launching their own
+    browser. A worker relaunches its browser when the health check fails, after a
+    render error, and every `recycle_after` renders (bounding memory growth), and closes
+    it after `idle_sec` without work. Workers start lazily in each process.
+    """
+
+    def __init__(self, size: int = 1, recycle_after: int = 100, idle_sec: float = 300.0, launcher=None):
+        self.size = size
+        self.recycle_after = recycle_after
+        self.idle_sec = idle_sec
+        self.launcher = launcher or _PlaywrightChromium
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._pending = deque()
+        self._threads = []
+        self._pid = None
+        self.browsers = 0
+        self.launches = 0
+        self.recycles = 0
+        self.renders = 0
+        self.failures = 0
+        self.launch_ms = deque(maxlen=_PDF_POOL_LATENCY_SAMPLES)
+        self.render_ms = deque(maxlen=_PDF_POOL_LATENCY_SAMPLES)
+
+    def render(self, html: str, header_html: str, footer_html: str, timeout: float = 60.0,
+               assets: Optional[dict] = None) -> bytes:
+        """PDF bytes for `html`; raises PdfRenderTimeout when no worker finished it within `timeout`.
+
+        `assets` maps URL paths on `_PDF_ASSET_ORIGIN` to (file path, mime) for the browser.
+        """
+        from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+        future = Future()
+        job = (future, html, header_html, footer_html, assets)
+        with self._lock:
+            self._ensure_workers()
+            self._pending.append(job)
+            self._cond.notify()
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeout:
+            with self._lock:
+                queued = job in self._pending
+                if queued:
+                    self._pending.remove(job)
+            raise PdfRenderTimeout('Timed out waiting for the PDF renderer', None if queued else future) from None
+
+    def metrics(self) -> dict:
+        with self._lock:
+            renders = sorted(self.render_ms)
+            launches = sorted(self.launch_ms)
+            queued = len(self._pending)
+            workers = sum(1 for t in self._threads if t.is_alive()) if self._pid == os.getpid() else 0
+
+        def _pct(samples, q):
+            return round(samples[min(len(samples) - 1, int(q * len(samples)))], 3) if samples else None
+
+        return {
+            'workers': workers,
+            'browsers': self.browsers,
+            'queued': queued,
+            'launches': self.launches,
+            'recycles': self.recycles,
+            'renders': self.renders,
+            'failures': self.failures,
+            'launch_ms': {'p50': _pct(launches, 0.5), 'max': round(launches[-1], 3) if launches else None},
+            'render_ms': {'p50': _pct(renders, 0.5), 'p99': _pct(renders, 0.99)},
+        }
+
+    # ----- worker side -----
+    def _ensure_workers(self):
+        # Called with the lock held. Threads do not survive a fork: start them per process.
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._threads = []
+            self.browsers = 0
+        self._threads = [t for t in self._threads if t.is_alive()]
+        while len(self._threads) < max(1, self.size):
+            thread = threading.Thread(target=self._run, name=f'pdf-chromium-{len(self._threads)}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _next_job(self):
+        with self._cond:
+            if not self._pending:
+                self._cond.wait(self.idle_sec)
+            return self._pending.popleft() if self._pending else None
+
+    @staticmethod
+    def _healthy(browser) -> bool:
+        try:
+            return bool(browser.healthy())
+        except Exception:
+            return False
+
+    def _close(self, browser):
+        browser.close()
+        with self._lock:
+            self.browsers -= 1
+
+    def _run(self):
+        browser = None
+        used = 0
+        while True:
+            job = self._next_job()
+            if job is None:
+                if browser is not None:
+                    self._close(browser)
+                    browser = None
+                continue
+            future, html, header_html, footer_html, assets = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                if browser is not None and (used >= self.recycle_after or not self._healthy(browser)):
+                    self._close(browser)
+                    browser = None
+                    with self._lock:
+                        self.recycles += 1
+                if browser is None:
+                    started = time.monotonic()
+                    browser = self.launcher()
+                    used = 0
+                    with self._lock:
+                        self.browsers += 1
+                        self.launches += 1
+                        self.launch_ms.append((time.monotonic() - started) * 1000.0)
+                started = time.monotonic()
+                pdf = browser.render(html, header_html, footer_html, assets)
+                used += 1
+                with self._lock:
+                    self.renders += 1
+                    self.render_ms.append((time.monotonic() - started) * 1000.0)
+                future.set_result(pdf)
+            except Exception as exc:
+                with self._lock:
+                    self.failures += 1
+                if browser is not None:
+                    # The browser may be wedged: start the next render from a fresh one.
+                    self._close(browser)
+                    browser = None
+                future.set_exception(exc)
+
+
+chromium_pdf_pool = ChromiumPdfPool(
+    size=max(1, int(_env_float('PDF_BROWSER_POOL_SIZE', 1))),
+    recycle_after=max(1, int(_env_float('PDF_BROWSER_RECYCLE_AFTER', 100))),
+    idle_sec=max(5.0, _env_float('PDF_BROWSER_IDLE_SEC', 300)),
+)
+
+
+def _build_lesson_pdf_bytes_chromium(html: str, header_html: str, footer_html: str,
+                                     assets: Optional[dict] = None) -> bytes:
     """Render HTML to PDF using a headless Chromium engine (supports Bengali shaping)."""
-    try:
-        from playwright.sync_api import sync_playwright
-    except Exception as exc:
-        raise RuntimeError(
-            "Missing dependency: playwright. Run: pip install -r requirements.txt"
-        ) from exc
+    return chromium_pdf_pool.render(
+        html, header_html, footer_html, timeout=max(1.0, _env_float('PDF_RENDER_TIMEOUT_SEC', 60)),
+        assets=assets,
+    )
 
-    try:
-        with sync_playwright() as p:
-            browser = p.chromium.launch(args=['--no-sandbox'])
-            page = browser.new_page()
-            page.set_content(html, wait_until='load')
-            page.wait_for_load_state('networkidle')
-            pdf = page.pdf(
-                format='A4',
-                print_background=True,
-                display_header_footer=True,
-                header_template=header_html,
-                footer_template=footer_html,
-                margin={'top': '96px', 'bottom': '110px', 'left': '36px', 'right': '36px'},
-            )
-            browser.close()
-            return pdf
-    except Exception as exc:
-        msg = str(exc) or ''
-        if 'Executable doesn' in msg or 'browserType.launch' in msg or 'chromium' in msg.lower():
-            raise RuntimeError("Playwright browser is not installed. Run: python -m playwright install chromium") from exc
-        raise
 
 _CEFR_ORDER = {'A1': 1, 'A2': 2, 'B1': 3, 'B2': 4, 'C1': 5, 'C2': 6}
 
@@ -2136,326 +3140,1228 @@ def _find_lesson(lesson_list, lesson_id):
     return next((l for l in lesson_list if l.get('id') == lesson_id), None)
 
 
-def _build_placement_questions(lang: str, per_level: int = 10):
-    """Build a CEFR placement test question set for a language.
+_PLACEMENT_LEVELS = ('A1', 'A2', 'B1', 'B2')
+_PLACEMENT_PASS_PCT = 65
+_PLACEMENT_PUNCT_RE = re.compile(r'[\\.,;:!?¿¡"“”()\\[\\]]+')
+_PLACEMENT_DISTRACTORS = 12
 
-    Uses existing lesson grammar/vocabulary (resources) plus a few curated questions.
-    Output format matches the existing Practice engine (templates/practice.html + initPractice()).
+# Curated extras (small set so the test isn't only "in-app" content).
+_PLACEMENT_CURATED = {
+    'french': {
+        'A1': [
+            {
+                'question_en': "Choose the correct French for: Good evening.",
+                'question_bn': "সঠিক ফরাসি বাছাই করুন: Good evening।",
+                'correct': 'Bonsoir',
+                'choices': ['Bonjour', 'Bonsoir', 'Bonne nuit', 'Salut'],
+            },
+            {
+                'question_en': "Which pronoun means we?",
+                'question_bn': "we কোন সর্বনাম?",
+                'correct': 'nous',
+                'choices': ['nous', 'vous', 'ils', 'tu'],
+            },
+        ],
+        'A2': [
+            {
+                'question_en': "Choose the correct form: Je ___ manger. (I'm going to eat)",
+                'question_bn': "সঠিক রূপ: Je ___ manger. (আমি খেতে যাচ্ছি)",
+                'correct': 'vais',
+                'choices': ['vais', 'vas', 'va', 'allez'],
+            },
+        ],
+        'B1': [
+            {
+                'question_en': "Complete: J'___ vais. (I'm going there)",
+                'question_bn': "পূর্ণ করুন: J'___ vais. (আমি সেখানে যাচ্ছি)",
+                'correct': 'y',
+                'choices': ['y', 'en', 'le', 'la'],
+            },
+        ],
+        'B2': [
+            {
+                'question_en': "Choose the correct mood: Il faut que tu ___ (venir).",
+                'question_bn': "সঠিক রূপ: Il faut que tu ___ (venir)।",
+                'correct': 'viennes',
+                'choices': ['viens', 'viendras', 'viennes', 'venir'],
+            },
+        ],
+    },
+    'spanish': {
+        'A1': [
+            {
+                'question_en': "Choose the correct Spanish for: I am from Bangladesh.",
+                'question_bn': "সঠিক স্প্যানিশ বাছাই করুন: I am from Bangladesh।",
+                'correct': 'Soy de Bangladesh.',
+                'choices': ['Estoy de Bangladesh.', 'Soy de Bangladesh.', 'Soy en Bangladesh.', 'Estoy en Bangladesh.'],
+            },
+        ],
+        'A2': [
+            {
+                'question_en': "Choose the correct form: Ayer yo ___ (comer).",
+                'question_bn': "সঠিক রূপ: Ayer yo ___ (comer)।",
+                'correct': 'comí',
+                'choices': ['como', 'comía', 'comí', 'comer'],
+            },
+        ],
+        'B1': [
+            {
+                'question_en': "Choose the best option: Cuando era niño, yo ___ en Dhaka.",
+                'question_bn': "সঠিকটি বাছাই করুন: Cuando era niño, yo ___ en Dhaka।",
+                'correct': 'vivía',
+                'choices': ['viví', 'vivía', 'he vivido', 'vivir'],
+            },
+        ],
+        'B2': [
+            {
+                'question_en': "Complete: Espero que tú ___ (venir).",
+                'question_bn': "পূর্ণ করুন: Espero que tú ___ (venir)।",
+                'correct': 'vengas',
+                'choices': ['vienes', 'vendrás', 'vengas', 'venir'],
+            },
+        ],
+    },
+}
+
+
+def _placement_content_key(*parts) -> str:
+    """Short digest of an item's content, so its key survives reordered or inserted content."""
+    return hashlib.sha1('\x1f'.join(str(p or '') for p in parts).encode('utf-8')).hexdigest()[:10]
+
+
+def _placement_choice_others(choices, answer):
+    """Distinct non-empty choices other than `answer` (grammar items keep their authored set)."""
+    return [c for c in dict.fromkeys(str(c) for c in (choices or [])) if c.strip() and c != answer]
+
+
+class PlacementBank:
+    """Placement test items for one language and one content version.
+
+    Per CEFR level it holds curated and lesson grammar items, de-duplicated lesson vocab
+    (each with a fixed list of distractor candidates from the same level) and example
+    sentences for ordering tasks. Building a test only samples indices from these.
+    Every question carries an `item_key` ("<source>:<level>:<content digest>", plus the
+    question type for vocab) that identifies the bank item across requests and content
+    edits: it names the item's text, not its position.
     """
-    lang = (lang or '').strip().lower()
-    if lang not in LANG_META:
-        return []
 
-    levels = ['A1', 'A2', 'B1', 'B2']
-    per_level = max(6, min(16, int(per_level or 10)))
-    lessons_all = _sorted_lessons(get_lessons().get(lang, []) or [])
-    tts_lang = 'fr-FR' if lang == 'french' else 'es-ES'
-
-    # Curated extras (small set so the test isn't only "in-app" content).
-    curated = {
-        'french': {
-            'A1': [
-                {
-                    'question_en': "Choose the correct French for: Good evening.",
-                    'question_bn': "সঠিক ফরাসি বাছাই করুন: Good evening।",
-                    'correct': 'Bonsoir',
-                    'choices': ['Bonjour', 'Bonsoir', 'Bonne nuit', 'Salut'],
-                },
-                {
-                    'question_en': "Which pronoun means we?",
-                    'question_bn': "we কোন সর্বনাম?",
-                    'correct': 'nous',
-                    'choices': ['nous', 'vous', 'ils', 'tu'],
-                },
-            ],
-            'A2': [
-                {
-                    'question_en': "Choose the correct form: Je ___ manger. (I'm going to eat)",
-                    'question_bn': "সঠিক রূপ: Je ___ manger. (আমি খেতে যাচ্ছি)",
-                    'correct': 'vais',
-                    'choices': ['vais', 'vas', 'va', 'allez'],
-                },
-            ],
-            'B1': [
-                {
-                    'question_en': "Complete: J'___ vais. (I'm going there)",
-                    'question_bn': "পূর্ণ করুন: J'___ vais. (আমি সেখানে যাচ্ছি)",
-                    'correct': 'y',
-                    'choices': ['y', 'en', 'le', 'la'],
-                },
-            ],
-            'B2': [
-                {
-                    'question_en': "Choose the correct mood: Il faut que tu ___ (venir).",
-                    'question_bn': "সঠিক রূপ: Il faut que tu ___ (venir)।",
-                    'correct': 'viennes',
-                    'choices': ['viens', 'viendras', 'viennes', 'venir'],
-                },
-            ],
-        },
-        'spanish': {
-            'A1': [
-                {
-                    'question_en': "Choose the correct Spanish for: I am from Bangladesh.",
-                    'question_bn': "সঠিক স্প্যানিশ বাছাই করুন: I am from Bangladesh।",
-                    'correct': 'Soy de Bangladesh.',
-                    'choices': ['Estoy de Bangladesh.', 'Soy de Bangladesh.', 'Soy en Bangladesh.', 'Estoy en Bangladesh.'],
-                },
-            ],
-            'A2': [
-                {
-                    'question_en': "Choose the correct form: Ayer yo ___ (comer).",
-                    'question_bn': "সঠিক রূপ: Ayer yo ___ (comer)।",
-                    'correct': 'comí',
-                    'choices': ['como', 'comía', 'comí', 'comer'],
-                },
-            ],
-            'B1': [
-                {
-                    'question_en': "Choose the best option: Cuando era niño, yo ___ en Dhaka.",
-                    'question_bn': "সঠিকটি বাছাই করুন: Cuando era niño, yo ___ en Dhaka।",
-                    'correct': 'vivía',
-                    'choices': ['viví', 'vivía', 'he vivido', 'vivir'],
-                },
-            ],
-            'B2': [
-                {
-                    'question_en': "Complete: Espero que tú ___ (venir).",
-                    'question_bn': "পূর্ণ করুন: Espero que tú ___ (venir)।",
-                    'correct': 'vengas',
-                    'choices': ['vienes', 'vendrás', 'vengas', 'venir'],
-                },
-            ],
-        },
-    }
+    def __init__(self, lang: str, vocab_by_cat: dict, lesson_list: list):
+        self.lang = lang
+        self.meta = LANG_META[lang]
+        self.tts_lang = _tts_lang_tag(lang)
+        self.levels = {}
+        lessons = _sorted_lessons(lesson_list)
+
+        for lvl in _PLACEMENT_LEVELS:
+            grammar = []
+            vocab = []
+            examples = []
+            seen_words = set()
+            for lesson in (l for l in lessons if _lesson_cefr(l) == lvl):
+                gr = lesson.get('grammar') or {}
+                for gq in (gr.get('quiz_questions') or []):
+                    if not isinstance(gq, dict):
+                        continue
+                    if not gq.get('question_en') or not gq.get('correct') or not gq.get('choices'):
+                        continue
+                    grammar.append(gq)
+
+                for w in _lesson_vocab_slice(vocab_by_cat, lesson):
+                    if not isinstance(w, dict):
+                        continue
+                    word = (w.get('word') or '').strip()
+                    english = (w.get('english') or '').strip()
+                    if not word or not english:
+                        continue
+                    if w.get('example') and w.get('example_en'):
+                        sentence = _PLACEMENT_PUNCT_RE.sub('', w.get('example') or '').strip()
+                        if sentence:
+                            examples.append({
+                                'sentence': sentence,
+                                'example_en': w.get('example_en'),
+                                'example_bn': w.get('example_bn'),
+                            })
+                    if word in seen_words:
+                        continue
+                    seen_words.add(word)
+                    vocab.append({'word': word, 'english': english, 'bengali': (w.get('bengali') or '').strip()})
+
+            for item in vocab:
+                item['key'] = f"v:{lvl}:{_placement_content_key(item['word'])}"
+            curated = [self._grammar_item('c', lvl, x) for x in (_PLACEMENT_CURATED.get(lang, {}).get(lvl) or [])]
+            self.levels[lvl] = {
+                'curated': self._unique_keys(curated),
+                'grammar': self._unique_keys(self._grammar_item('g', lvl, gq) for gq in grammar),
+                'vocab': vocab,
+                'examples': self._unique_keys(
+                    dict(ex, key=f"x:{lvl}:{_placement_content_key(ex['sentence'])}") for ex in examples
+                ),
+                'distractors': self._distractor_candidates(lang, lvl, vocab),
+            }
+
+        # item key (without the vocab question type) -> (level, source, index)
+        self.key_index = {
+            item['key']: (lvl, source, idx)
+            for lvl, level_bank in self.levels.items()
+            for source in ('curated', 'grammar', 'vocab', 'examples')
+            for idx, item in enumerate(level_bank[source])
+        }
 
-    def _strip_punct(s: str) -> str:
-        return re.sub(r'[\\.,;:!?¿¡"“”()\\[\\]]+', '', (s or '')).strip()
-
-    def _mk_mcq(level: str, mode_label: str, prompt_en: str, prompt_bn: str, choices, answer: str, tts_text: str = None):
-        ch = [str(c) for c in (choices or []) if str(c).strip()]
-        # Ensure answer is included.
-        if answer and answer not in ch:
-            ch = [answer] + ch
-        # Limit to 4 choices for UI consistency.
-        if len(ch) > 4:
-            # Keep answer + 3 others
-            others = [c for c in ch if c != answer]
-            random.shuffle(others)
-            ch = [answer] + others[:3]
-        random.shuffle(ch)
+    @staticmethod
+    def _grammar_item(source, lvl, gq):
+        answer = str(gq.get('correct') or '')
         return {
-            'kind': 'mcq',
-            'mode': 'placement',
-            'mode_label': mode_label,
-            'prompt_en': prompt_en,
-            'prompt_bn': prompt_bn,
-            'choices': ch,
+            'key': f"{source}:{lvl}:{_placement_content_key(gq.get('question_en'), answer)}",
+            'question_en': gq.get('question_en', ''),
+            'question_bn': gq.get('question_bn', ''),
             'answer': answer,
-            'tts_text': tts_text,
-            'tts_lang': tts_lang,
-            'cefr': level,
-            # Keep XP tiny (hidden in UI for placement).
-            'xp_correct': 1,
-            'xp_wrong': 0,
+            'others': _placement_choice_others(gq.get('choices'), answer),
         }
 
-    def _mk_type(level: str, mode_label: str, prompt_en: str, prompt_bn: str, answer: str, hint_bn: str = ''):
+    @staticmethod
+    def _unique_keys(items):
+        """Drop repeated items (same content digest), keeping the first."""
+        seen = set()
+        out = []
+        for item in items:
+            if item['key'] not in seen:
+                seen.add(item['key'])
+                out.append(item)
+        return out
+
+    @staticmethod
+    def _distractor_candidates(lang, lvl, vocab):
+        """For each vocab item, up to N other items of the level with a different word and meaning."""
+        n = len(vocab)
+        rng = random.Random(f'placement:{lang}:{lvl}')
+        out = []
+        for i, item in enumerate(vocab):
+            picked = []
+            seen = {i}
+            for _ in range(_PLACEMENT_DISTRACTORS * 4):
+                if len(picked) >= _PLACEMENT_DISTRACTORS or len(seen) >= n:
+                    break
+                j = rng.randrange(n)
+                if j in seen:
+                    continue
+                seen.add(j)
+                other = vocab[j]
+                if other['word'] == item['word'] or other['english'] == item['english']:
+                    continue
+                picked.append(j)
+            out.append(tuple(picked))
+        return out
+
+    def item_count(self) -> int:
+        return sum(
+            len(b['curated']) + len(b['grammar']) + len(b['vocab']) + len(b['examples'])
+            for b in self.levels.values()
+        )
+
+    def _mcq(self, lvl, item_key, mode_label, prompt_en, prompt_bn, answer, others, rng, tts_text=None):
+        others = list(others)
+        if len(others) > 3:
+            others = rng.sample(others, 3)
+        choices = [answer] + others
+        rng.shuffle(choices)
         return {
-            'kind': 'type',
+            'kind': 'mcq',
             'mode': 'placement',
             'mode_label': mode_label,
             'prompt_en': prompt_en,
             'prompt_bn': prompt_bn,
+            'choices': choices,
             'answer': answer,
-            'hint_bn': hint_bn or '',
-            'tts_text': answer,
-            'tts_lang': tts_lang,
-            'cefr': level,
+            'tts_text': tts_text,
+            'tts_lang': self.tts_lang,
+            'cefr': lvl,
+            'item_key': item_key,
+            # Keep XP tiny (hidden in UI for placement).
             'xp_correct': 1,
             'xp_wrong': 0,
         }
 
-    def _mk_order(level: str, mode_label: str, prompt_en: str, prompt_bn: str, sentence: str, tokens):
-        tokens = [t for t in (tokens or []) if str(t).strip()]
+    def grammar_question(self, lvl, source, idx, rng):
+        item = self.levels[lvl][source][idx]
+        return self._mcq(
+            lvl, item['key'], f"Placement • {lvl} • Grammar",
+            item['question_en'], item['question_bn'], item['answer'], item['others'], rng,
+        )
+
+    def order_question(self, lvl, idx, rng):
+        ex = self.levels[lvl]['examples'][idx]
+        sentence = ex['sentence']
+        tokens = sentence.split()
+        rng.shuffle(tokens)
         return {
             'kind': 'order',
             'mode': 'placement',
-            'mode_label': mode_label,
-            'prompt_en': prompt_en,
-            'prompt_bn': prompt_bn,
+            'mode_label': f"Placement • {lvl} • Sentence",
+            'prompt_en': ex.get('example_en') or 'Order the sentence',
+            'prompt_bn': ex.get('example_bn') or 'শব্দগুলো সাজান',
             'tokens': tokens,
             'answer': sentence,
             'tts_text': sentence,
-            'tts_lang': tts_lang,
-            'cefr': level,
+            'tts_lang': self.tts_lang,
+            'cefr': lvl,
+            'item_key': ex['key'],
             'xp_correct': 1,
             'xp_wrong': 0,
         }
 
-    questions = []
+    def vocab_question(self, lvl, idx, qtype, rng):
+        bank = self.levels[lvl]
+        item = bank['vocab'][idx]
+        word, english, bengali = item['word'], item['english'], item['bengali']
+        item_key = f"{item['key']}:{qtype}"
+        meta = self.meta
+        wrong = [bank['vocab'][j] for j in bank['distractors'][idx]]
+
+        if qtype == 'type_english_to_word':
+            return {
+                'kind': 'type',
+                'mode': 'placement',
+                'mode_label': f"Placement • {lvl} • Type",
+                'prompt_en': f"Type the {meta['name']} word for: {english}",
+                'prompt_bn': f"{english} — লিখুন ({meta['name_bn']} শব্দ)",
+                'answer': word,
+                'hint_bn': bengali,
+                'tts_text': word,
+                'tts_lang': self.tts_lang,
+                'cefr': lvl,
+                'item_key': item_key,
+                'xp_correct': 1,
+                'xp_wrong': 0,
+            }
+        if qtype == 'english_to_word':
+            return self._mcq(
+                lvl, item_key, f"Placement • {lvl} • Vocabulary",
+                f"How do you say “{english}” in {meta['name_native'] or meta['name']}?",
+                f"“{english}” {meta['name_bn']} ভাষায় কীভাবে বলে?",
+                word, [w['word'] for w in wrong], rng, tts_text=word,
+            )
+        if qtype == 'listen_to_word':
+            # Listen (TTS) then choose the spelling.
+            return self._mcq(
+                lvl, item_key, f"Placement • {lvl} • Listening",
+                "Listen and choose what you hear.",
+                "শুনুন এবং যা শুনেছেন তা বাছাই করুন।",
+                word, [w['word'] for w in wrong], rng, tts_text=word,
+            )
+        return self._mcq(
+            lvl, item_key, f"Placement • {lvl} • Vocabulary",
+            f"What does “{word}” mean in English?",
+            f"“{word}” ইংরেজিতে কী?",
+            english, [w['english'] for w in wrong], rng, tts_text=word,
+        )
+
+    def question_for_key(self, item_key: str, rng):
+        """Rebuild the question for an `item_key` (choice order drawn from `rng`)."""
+        parts = (item_key or '').split(':')
+        found = self.key_index.get(':'.join(parts[:3]))
+        if found is None:
+            return None
+        lvl, source, idx = found
+        if source == 'examples':
+            return self.order_question(lvl, idx, rng)
+        if source == 'vocab':
+            if len(parts) != 4 or parts[3] not in _PLACEMENT_VOCAB_QTYPES:
+                return None
+            return self.vocab_question(lvl, idx, parts[3], rng)
+        return self.grammar_question(lvl, source, idx, rng)
+
+    def build_questions(self, per_level: int = 10, rng=None):
+        """Fixed-length placement test: `per_level` questions for each of A1–B2, in level order."""
+        rng = rng or random
+        per_level = max(6, min(16, int(per_level or 10)))
+        questions = []
+
+        for lvl in _PLACEMENT_LEVELS:
+            bank = self.levels[lvl]
+            lvl_q = []
+
+            # 1) Curated questions (optional)
+            n_cur = len(bank['curated'])
+            for idx in rng.sample(range(n_cur), min(2, n_cur)):
+                lvl_q.append(self.grammar_question(lvl, 'curated', idx, rng))
+
+            # 2) Grammar from lesson resources
+            n_gr = len(bank['grammar'])
+            grammar_idx = rng.sample(range(n_gr), min(max(2, per_level // 3), n_gr))
+            for idx in grammar_idx:
+                lvl_q.append(self.grammar_question(lvl, 'grammar', idx, rng))
+
+            # 3) Sentence task (order)
+            if bank['examples']:
+                lvl_q.append(self.order_question(lvl, rng.randrange(len(bank['examples'])), rng))
+
+            # 4) Vocab questions
+            need = per_level - len(lvl_q)
+            n_vocab = len(bank['vocab'])
+            if need > 0 and n_vocab:
+                for idx in rng.sample(range(n_vocab), min(need, n_vocab)):
+                    qtype = rng.choice(['word_to_english', 'english_to_word', 'type_english_to_word', 'listen_to_word'])
+                    lvl_q.append(self.vocab_question(lvl, idx, qtype, rng))
+
+            lvl_q = [q for q in lvl_q if q.get('answer') and (q.get('choices') if q.get('kind') == 'mcq' else True)]
+            lvl_q = lvl_q[:per_level]
 
-    for lvl in levels:
-        lvl_lessons = [l for l in lessons_all if _lesson_cefr(l) == lvl]
+            # Top up with unused grammar items when vocab is short.
+            if len(lvl_q) < per_level:
+                used = set(grammar_idx)
+                spare = [i for i in range(n_gr) if i not in used]
+                for idx in rng.sample(spare, min(per_level - len(lvl_q), len(spare))):
+                    lvl_q.append(self.grammar_question(lvl, 'grammar', idx, rng))
 
-        grammar_pool = []
-        vocab_pool = []
-        example_pool = []
-        for lesson in lvl_lessons:
-            gr = lesson.get('grammar') or {}
-            for gq in (gr.get('quiz_questions') or []):
-                if not isinstance(gq, dict):
-                    continue
-                if not gq.get('question_en') or not gq.get('correct') or not gq.get('choices'):
-                    continue
-                grammar_pool.append(gq)
+            for q in lvl_q:
+                q['id'] = len(questions) + 1
+                questions.append(q)
 
-            for w in get_lesson_vocab(lang, lesson) or []:
-                if not isinstance(w, dict):
-                    continue
-                if not w.get('word') or not w.get('english'):
-                    continue
-                vocab_pool.append(w)
-                if w.get('example') and w.get('example_en'):
-                    example_pool.append(w)
-
-        # Mix: grammar + vocab + one sentence task (when available)
-        lvl_q = []
-
-        # 1) Curated questions (optional)
-        extra = curated.get(lang, {}).get(lvl, []) or []
-        random.shuffle(extra)
-        for x in extra[:2]:
-            lvl_q.append(_mk_mcq(
-                lvl,
-                f"Placement • {lvl} • Grammar",
-                x.get('question_en', ''),
-                x.get('question_bn', ''),
-                x.get('choices', []),
-                x.get('correct', ''),
-            ))
-
-        # 2) Grammar from lesson resources
-        random.shuffle(grammar_pool)
-        for gq in grammar_pool[: max(2, per_level // 3)]:
-            lvl_q.append(_mk_mcq(
-                lvl,
-                f"Placement • {lvl} • Grammar",
-                gq.get('question_en', ''),
-                gq.get('question_bn', ''),
-                gq.get('choices', []),
-                gq.get('correct', ''),
-            ))
-
-        # 3) Sentence tasks (cloze or order)
-        if example_pool:
-            ex = random.choice(example_pool)
-            sent = _strip_punct(ex.get('example') or '')
-            if sent:
-                tokens = sent.split()
-                random.shuffle(tokens)
-                lvl_q.append(_mk_order(
-                    lvl,
-                    f"Placement • {lvl} • Sentence",
-                    ex.get('example_en') or 'Order the sentence',
-                    ex.get('example_bn') or 'শব্দগুলো সাজান',
-                    sent,
-                    tokens,
-                ))
-
-        # 4) Vocab questions
-        random.shuffle(vocab_pool)
-        vocab_words = [w for w in vocab_pool if w.get('word') and w.get('english')]
-        if vocab_words:
-            # Build a wrong-pool for distractors
-            wrong_pool = vocab_words[:]
-            random.shuffle(vocab_words)
-            used_words = set()
-            for w in vocab_words:
-                if len(lvl_q) >= per_level:
-                    break
-                word = (w.get('word') or '').strip()
-                english = (w.get('english') or '').strip()
-                bengali = (w.get('bengali') or '').strip()
+        return questions
 
-                if not word or not english:
-                    continue
-                if word in used_words:
-                    continue
-                used_words.add(word)
-
-                qtype = random.choice(['word_to_english', 'english_to_word', 'type_english_to_word', 'listen_to_word'])
-                others = [x for x in wrong_pool if (x.get('word') or '').strip() != word]
-                random.shuffle(others)
-
-                if qtype == 'english_to_word':
-                    choices = [word] + [(x.get('word') or '') for x in others[:3]]
-                    lvl_q.append(_mk_mcq(
-                        lvl,
-                        f"Placement • {lvl} • Vocabulary",
-                        f"How do you say “{english}” in {LANG_META[lang]['name_native'] or LANG_META[lang]['name']}?",
-                        f"“{english}” {LANG_META[lang]['name_bn']} ভাষায় কীভাবে বলে?",
-                        choices,
-                        word,
-                        tts_text=word,
-                    ))
-                elif qtype == 'type_english_to_word':
-                    lvl_q.append(_mk_type(
-                        lvl,
-                        f"Placement • {lvl} • Type",
-                        f"Type the {LANG_META[lang]['name']} word for: {english}",
-                        f"{english} — লিখুন ({LANG_META[lang]['name_bn']} শব্দ)",
-                        word,
-                        hint_bn=bengali,
-                    ))
-                elif qtype == 'listen_to_word':
-                    # Listen (TTS) then choose the spelling.
-                    choices = [word] + [(x.get('word') or '') for x in others[:3]]
-                    lvl_q.append(_mk_mcq(
-                        lvl,
-                        f"Placement • {lvl} • Listening",
-                        "Listen and choose what you hear.",
-                        "শুনুন এবং যা শুনেছেন তা বাছাই করুন।",
-                        choices,
-                        word,
-                        tts_text=word,
-                    ))
-                else:
-                    # word_to_english
-                    choices = [english] + [(x.get('english') or '') for x in others[:3]]
-                    lvl_q.append(_mk_mcq(
-                        lvl,
-                        f"Placement • {lvl} • Vocabulary",
-                        f"What does “{word}” mean in English?",
-                        f"“{word}” ইংরেজিতে কী?",
-                        choices,
-                        english,
-                        tts_text=word,
-                    ))
-
-        # Ensure we have exactly per_level
-        lvl_q = [q for q in lvl_q if q.get('answer') and (q.get('choices') if q.get('kind') == 'mcq' else True)]
-        if len(lvl_q) > per_level:
-            lvl_q = lvl_q[:per_level]
-        while len(lvl_q) < per_level and grammar_pool:
-            gq = grammar_pool.pop()
-            lvl_q.append(_mk_mcq(
-                lvl,
-                f"Placement • {lvl} • Grammar",
-                gq.get('question_en', ''),
-                gq.get('question_bn', ''),
-                gq.get('choices', []),
-                gq.get('correct', ''),
-            ))
-
-        # Tag IDs and append in level order.
-        for q in lvl_q:
-            q['id'] = len(questions) + 1
+
+def get_placement_bank(lang: str) -> PlacementBank:
+    """Placement item bank for `lang`, built once per content version."""
+    return _content_derived(
+        ('placement_bank', lang),
+        lambda: PlacementBank(lang, get_vocab().get(lang, {}) or {}, get_lessons().get(lang, []) or []),
+    )
+
+
+def _build_placement_questions(lang: str, per_level: int = 10, rng=None):
+    """Build a CEFR placement test question set for a language.
+
+    Uses existing lesson grammar/vocabulary (resources) plus a few curated questions.
+    Output format matches the existing Practice engine (templates/practice.html + initPractice()).
+    """
+    lang = (lang or '').strip().lower()
+    if lang not in LANG_META:
+        return []
+    return get_placement_bank(lang).build_questions(per_level, rng=rng)
+
+
+def _normalize_answer(text) -> str:
+    """Server-side twin of normalizeAnswer() in static/js/app.js."""
+    s = str(text or '').lower().strip().replace('œ', 'oe').replace('æ', 'ae')
+    s = ''.join(c for c in unicodedata.normalize('NFD', s) if not ('\u0300' <= c <= '\u036f'))
+    s = re.sub(r'[^a-z0-9\s]', ' ', s)
+    return re.sub(r'\s+', ' ', s).strip()
+
+
+def _answer_variants(answer):
+    a = str(answer or '').strip()
+    out = {a}
+    # Handle gender variants like "argentino/a" -> ["argentino", "argentina"]
+    m = re.match(r'^(.+?)([oa])\/([oa])$', a, flags=re.I)
+    if m:
+        out.add(m.group(1) + m.group(2))
+        out.add(m.group(1) + m.group(3))
+    return {v for v in (_normalize_answer(x) for x in out) if v}
+
+
+def _grade_answer(question, answer) -> bool:
+    """Grade one answer the way the browser does (exact choice, tolerant typing/ordering)."""
+    if answer is None:
+        return False
+    kind = question.get('kind')
+    if 'answer' not in question:
+        # Lesson quiz questions (vocab/grammar) keep the expected choice under `correct`.
+        return str(answer) == str(question.get('correct'))
+    if kind == 'order':
+        if isinstance(answer, (list, tuple)):
+            answer = ' '.join(str(t) for t in answer)
+        return _normalize_answer(answer) == _normalize_answer(question.get('answer'))
+    if kind == 'type':
+        return _normalize_answer(answer) in _answer_variants(question.get('answer'))
+    return str(answer) == str(question.get('answer'))
+
+
+def _score_placement(questions, answers):
+    """Score a placement test; `answers` maps question index -> submitted answer (missing = wrong)."""
+    breakdown = {lvl: {'correct': 0, 'total': 0, 'pct': 0} for lvl in _PLACEMENT_LEVELS}
+    correct = 0
+    for idx, q in enumerate(questions):
+        stats = breakdown.get(str(q.get('cefr') or '').upper())
+        if stats is None:
+            continue
+        ok = _grade_answer(q, answers.get(idx))
+        stats['total'] += 1
+        stats['correct'] += int(ok)
+        correct += int(ok)
+    for stats in breakdown.values():
+        stats['pct'] = int(round(stats['correct'] / stats['total'] * 100)) if stats['total'] else 0
+
+    recommended = _PLACEMENT_LEVELS[-1]
+    for lvl in _PLACEMENT_LEVELS:
+        if breakdown[lvl]['total'] == 0 or breakdown[lvl]['pct'] < _PLACEMENT_PASS_PCT:
+            recommended = lvl
+            break
+
+    total = sum(s['total'] for s in breakdown.values())
+    return {
+        'overall_pct': int(round(correct / total * 100)) if total else 0,
+        'recommended_level': recommended,
+        'breakdown': breakdown,
+    }
+
+
+def _first_lesson_for_level(lang: str, level: str):
+    lesson_list = _sorted_lessons(get_lessons().get(lang, []) or [])
+    return next((l for l in lesson_list if _lesson_cefr(l) == level), None)
+
+
+# ---------- Adaptive placement (Rasch / 1PL) ----------
+# Prior item difficulty (logits) per CEFR level, nudged by item type; replaced by
+# calibrated values from scripts/calibrate_placement.py once enough answers exist.
+_PLACEMENT_LEVEL_DIFFICULTY = {'A1': -1.5, 'A2': -0.5, 'B1': 0.5, 'B2': 1.5}
+_PLACEMENT_TYPE_OFFSET = {
+    'c': 0.0,
+    'g': 0.0,
+    'x': 0.4,
+    'word_to_english': -0.2,
+    'english_to_word': 0.0,
+    'listen_to_word': 0.1,
+    'type_english_to_word': 0.5,
+}
+_PLACEMENT_VOCAB_QTYPES = ('word_to_english', 'english_to_word', 'type_english_to_word', 'listen_to_word')
+# A level counts as passed when the model predicts >= _PLACEMENT_PASS_PCT on its typical item.
+_PLACEMENT_PASS_LOGIT = math.log(_PLACEMENT_PASS_PCT / (100 - _PLACEMENT_PASS_PCT))
+_ADAPTIVE_MIN_ITEMS = 8
+_ADAPTIVE_MAX_ITEMS = 16
+_ADAPTIVE_TARGET_SE = 0.5
+_ADAPTIVE_RANDOMESQUE = 5
+
+
+def get_placement_calibration():
+    """Calibrated item difficulties: {lang: {item_key: {'b': float, 'n': int}}} (optional file)."""
+    data = _cached_json('placement_calibration', _config_path('PLACEMENT_CALIBRATION_PATH'), default={})
+    return (data or {}).get('languages') or {}
+
+
+def placement_prior_difficulty(item_key: str):
+    """Uncalibrated difficulty of an item: its CEFR level prior plus the item-type offset.
+
+    None for keys that are not placement item keys.
+    """
+    parts = (item_key or '').split(':')
+    if len(parts) < 3 or parts[1] not in _PLACEMENT_LEVEL_DIFFICULTY or len(parts[2]) != 10:
+        return None
+    kind = parts[3] if parts[0] == 'v' and len(parts) > 3 else parts[0]
+    offset = _PLACEMENT_TYPE_OFFSET.get(kind)
+    if offset is None:
+        return None
+    return _PLACEMENT_LEVEL_DIFFICULTY[parts[1]] + offset
+
+
+def _placement_item_family(item_key: str) -> str:
+    """Items sharing a family test the same content (a vocab word under different question types)."""
+    return ':'.join(item_key.split(':')[:3])
+
+
+class AdaptivePlacementEngine:
+    """Computerized-adaptive placement over a PlacementBank.
+
+    Items follow a Rasch model, P(correct) = 1 / (1 + exp(b - theta)). After each answer the
+    ability theta is re-estimated (EAP on a grid, N(0, 1) prior) and the next item is one of
+    the few most informative unused ones (difficulty closest to theta). The test stops once
+    the estimate is precise enough or after `_ADAPTIVE_MAX_ITEMS` answers.
+    """
+
+    def __init__(self, bank: PlacementBank, calibration=None):
+        np = _numpy()
+        calibration = calibration or {}
+        self.bank = bank
+        keys = []
+        difficulty = []
+        for lvl in _PLACEMENT_LEVELS:
+            level_bank = bank.levels[lvl]
+            items = [item['key'] for source in ('curated', 'grammar', 'examples') for item in level_bank[source]]
+            items += [f"{item['key']}:{qtype}" for item in level_bank['vocab'] for qtype in _PLACEMENT_VOCAB_QTYPES]
+            for key in items:
+                calibrated = (calibration.get(key) or {}).get('b')
+                keys.append(key)
+                difficulty.append(float(calibrated) if calibrated is not None else placement_prior_difficulty(key))
+
+        self.keys = keys
+        self.key_index = {k: i for i, k in enumerate(keys)}
+        self.families = [_placement_item_family(k) for k in keys]
+        self.difficulty = np.asarray(difficulty, dtype=np.float64)
+        self.grid = np.linspace(-4.0, 4.0, 161)
+        self.log_prior = -0.5 * self.grid ** 2
+
+    def estimate(self, item_keys, responses):
+        """EAP ability estimate and its standard error for the answered items."""
+        np = _numpy()
+        log_post = self.log_prior.copy()
+        for key, ok in zip(item_keys, responses):
+            i = self.key_index.get(key)
+            if i is None:
+                continue
+            p = 1.0 / (1.0 + np.exp(self.difficulty[i] - self.grid))
+            log_post += np.log(p if ok else 1.0 - p)
+        post = np.exp(log_post - log_post.max())
+        post /= post.sum()
+        theta = float((self.grid * post).sum())
+        se = float(np.sqrt(((self.grid - theta) ** 2 * post).sum()))
+        return theta, se
+
+    def is_finished(self, answered: int, se: float) -> bool:
+        if answered >= _ADAPTIVE_MAX_ITEMS:
+            return True
+        return answered >= _ADAPTIVE_MIN_ITEMS and se <= _ADAPTIVE_TARGET_SE
+
+    def next_item(self, theta: float, used_keys, rng) -> Optional[str]:
+        """One of the most informative items not yet used (randomesque, for item exposure)."""
+        np = _numpy()
+        used_families = {_placement_item_family(k) for k in used_keys}
+        distance = np.abs(self.difficulty - theta)
+        k = _ADAPTIVE_RANDOMESQUE + 4 * len(used_families)
+        while True:
+            k = min(k, len(distance))
+            nearest = np.argpartition(distance, k - 1)[:k] if k else []
+            candidates = sorted(
+                (i for i in (int(j) for j in nearest) if self.families[i] not in used_families),
+                key=lambda i: (distance[i], i),
+            )
+            if candidates or k >= len(distance):
+                break
+            k *= 4
+        if not candidates:
+            return None
+        return self.keys[rng.choice(candidates[:_ADAPTIVE_RANDOMESQUE])]
+
+    @staticmethod
+    def level_for(theta: float) -> str:
+        for lvl in _PLACEMENT_LEVELS:
+            if theta < _PLACEMENT_LEVEL_DIFFICULTY[lvl] + _PLACEMENT_PASS_LOGIT:
+                return lvl
+        return _PLACEMENT_LEVELS[-1]
+
+    def difficulty_of(self, item_key: str):
+        i = self.key_index.get(item_key)
+        return float(self.difficulty[i]) if i is not None else None
+
+
+def get_adaptive_placement_engine(lang: str) -> AdaptivePlacementEngine:
+    """Adaptive placement engine for `lang` (rebuilt on content or calibration changes)."""
+    calibration_path = _config_path('PLACEMENT_CALIBRATION_PATH')
+    calibration = get_placement_calibration().get(lang) or {}
+    digest = _DATA_DIGEST.get(('placement_calibration', os.path.abspath(calibration_path)), '')
+    return _content_derived(
+        ('adaptive_placement', lang),
+        lambda: AdaptivePlacementEngine(get_placement_bank(lang), calibration),
+        extra_key=digest,
+    )
+
+
+def _adaptive_step_rng(seed: int, step: int):
+    return random.Random(f'{seed}:{step}')
+
+
+def start_adaptive_placement(lang: str, seed: int):
+    """Initial adaptive state: the first item, chosen at the prior mean ability."""
+    engine = get_adaptive_placement_engine(lang)
+    first = engine.next_item(0.0, [], _adaptive_step_rng(seed, 0))
+    return {'items': [first] if first else [], 'responses': [], 'difficulties': []}
+
+
+def adaptive_question(lang: str, seed: int, state: dict, step: int):
+    """Question dict for step `step` of an adaptive session (None past the end)."""
+    items = state.get('items') or []
+    if step >= len(items):
+        return None
+    return get_placement_bank(lang).question_for_key(items[step], _adaptive_step_rng(seed, step + 1000))
+
+
+def answer_adaptive_placement(lang: str, seed: int, state: dict, answer):
+    """Grade the pending item, update the ability estimate and queue the next item.
+
+    Returns (new_state, correct, finished, theta, se).
+    """
+    engine = get_adaptive_placement_engine(lang)
+    items = list(state.get('items') or [])
+    responses = list(state.get('responses') or [])
+    difficulties = list(state.get('difficulties') or [])
+    step = len(responses)
+    question = adaptive_question(lang, seed, state, step)
+    correct = _grade_answer(question, answer) if question else False
+
+    responses.append(bool(correct))
+    difficulties.append(engine.difficulty_of(items[step]) if step < len(items) else None)
+    theta, se = engine.estimate(items, responses)
+    finished = engine.is_finished(len(responses), se)
+    if not finished:
+        nxt = engine.next_item(theta, items, _adaptive_step_rng(seed, len(responses)))
+        if nxt:
+            items.append(nxt)
+        else:
+            finished = True
+    return {'items': items, 'responses': responses, 'difficulties': difficulties}, correct, finished, theta, se
+
+
+def _adaptive_placement_result(lang: str, state: dict):
+    engine = get_adaptive_placement_engine(lang)
+    items = state.get('items') or []
+    responses = state.get('responses') or []
+    theta, se = engine.estimate(items, responses)
+    breakdown = {lvl: {'correct': 0, 'total': 0, 'pct': 0} for lvl in _PLACEMENT_LEVELS}
+    for key, ok in zip(items, responses):
+        stats = breakdown.get(key.split(':')[1])
+        if stats is not None:
+            stats['total'] += 1
+            stats['correct'] += int(ok)
+    for stats in breakdown.values():
+        stats['pct'] = int(round(stats['correct'] / stats['total'] * 100)) if stats['total'] else 0
+    answered = len(responses)
+    return {
+        'overall_pct': int(round(sum(responses) / answered * 100)) if answered else 0,
+        'recommended_level': engine.level_for(theta),
+        'ability': {'theta': round(theta, 3), 'se': round(se, 3)},
+        'question_count': answered,
+        'breakdown': breakdown,
+    }
+
+
+def record_placement_responses(session_id, user_id, lang, rows, conn=None):
+    """Log graded placement answers for offline calibration.
+
+    `rows` is an iterable of (item_key, correct, difficulty_used).
+    """
+    now_iso = utc_now_rfc3339()
+    own_conn = conn is None
+    conn = conn or get_db()
+    conn.executemany(
+        '''
+        INSERT INTO placement_responses (session_id, user_id, language, item_key, correct, difficulty, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''',
+        [(session_id, user_id, lang, key, int(bool(ok)), b, now_iso) for key, ok, b in rows if key],
+    )
+    if own_conn:
+        conn.commit()
+        conn.close()
+
+
+def _placement_result(lang: str, score: dict, adaptive: bool = False) -> dict:
+    lesson = _first_lesson_for_level(lang, score['recommended_level'])
+    result = {
+        'ok': True,
+        'language': lang,
+        'adaptive': adaptive,
+        'overall_pct': score['overall_pct'],
+        'recommended_level': score['recommended_level'],
+        'recommended_lesson_id': int(lesson['id']) if lesson else None,
+        'breakdown': score['breakdown'],
+    }
+    if adaptive:
+        result['ability'] = score['ability']
+        result['question_count'] = score['question_count']
+    return result
+
+
+def submit_placement_session(study: dict, answers: dict, questions=None):
+    """Grade a fixed-length placement session and log its answers for calibration.
+
+    Returns (result, applied); an already-submitted session returns its stored result.
+    """
+    lang = study['language']
+    questions = study_session_questions(study) if questions is None else questions
+    result = _placement_result(lang, _score_placement(questions, answers))
+    engine = get_adaptive_placement_engine(lang)
+
+    conn = get_db()
+    try:
+        if not finish_study_session(study['id'], result, conn=conn):
+            conn.rollback()
+            return get_study_session(study['id'])['result'], False
+        record_placement_responses(
+            study['id'], study['user_id'], lang,
+            [
+                (q.get('item_key'), _grade_answer(q, answers.get(i)), engine.difficulty_of(q.get('item_key') or ''))
+                for i, q in enumerate(questions)
+                if i in answers
+            ],
+            conn=conn,
+        )
+        conn.commit()
+    finally:
+        conn.close()
+    return result, True
+
+
+# ---------- Study sessions (quiz / practice) ----------
+_QUIZ_VOCAB_QUESTIONS = 10
+_QUIZ_GRAMMAR_QUESTIONS = 5
+_QUIZ_XP_CORRECT = 8
+_QUIZ_XP_WRONG = 1
+_PRACTICE_MODES = ('default', 'resources')
+
+
+def build_quiz_questions(lang: str, lesson: dict, rng=None):
+    """Lesson quiz: vocabulary MCQs plus the lesson's own grammar questions, shuffled.
+
+    Output matches templates/quiz.html (`question_en`/`question_bn` may contain markup);
+    `prompt_en`/`prompt_bn` carry the same prompt as plain text for the mobile API.
+    """
+    rng = rng or random
+    meta = LANG_META[lang]
+    tts_lang = _tts_lang_tag(lang)
+    cefr = _lesson_cefr(lesson)
+    vocab = get_lesson_vocab(lang, lesson)
+    engine = get_practice_engine(lang)
+    questions = []
+
+    # --- vocabulary questions ---
+    if len(vocab) >= 4:
+        lesson_words = {w['word'] for w in vocab}
+        for word in rng.sample(vocab, min(_QUIZ_VOCAB_QUESTIONS, len(vocab))):
+            qtype = rng.choice(['word_to_english', 'english_to_word', 'word_to_bengali'])
+            # Wrong answers come from this lesson's words, most similar first.
+            wrong = engine.pick_distractors(
+                word['word'], 3, rng, fallback_pool=vocab, within=lesson_words,
+                distinct=('english', 'bengali') if qtype == 'word_to_bengali' else ('english',),
+            )
+
+            if qtype == 'word_to_english':
+                shown, field = word['word'], 'english'
+                question_en = "What does {} mean in English?"
+                question_bn = "{} ইংরেজিতে কী?"
+            elif qtype == 'english_to_word':
+                shown, field = word['english'], 'word'
+                question_en = "How do you say {} in " + meta['name'] + "?"
+                question_bn = "{} " + meta['name_bn'] + " ভাষায় কীভাবে বলে?"
+            else:
+                shown, field = word['word'], 'bengali'
+                question_en = "What does {} mean in Bengali?"
+                question_bn = "{} বাংলায় কী?"
+
+            q = {
+                'kind': 'vocab',
+                'mode': qtype,
+                'mode_label': 'Quiz',
+                'cefr': cefr,
+                'word': word['word'],
+                'tts_text': word['word'],
+                'tts_lang': tts_lang,
+                'question_en': question_en.format(f"<strong>{shown}</strong>"),
+                'question_bn': question_bn.format(f"<strong>{shown}</strong>"),
+                'prompt_en': question_en.format(f'"{shown}"'),
+                'prompt_bn': question_bn.format(f'"{shown}"'),
+                'correct': word[field],
+                'choices': [word[field]] + [w[field] for w in wrong],
+            }
+            rng.shuffle(q['choices'])
             questions.append(q)
 
+    # --- grammar questions (embedded in lesson) ---
+    grammar = lesson.get('grammar') or {}
+    if grammar.get('quiz_questions'):
+        gq = [
+            {
+                **q,
+                'kind': 'grammar',
+                'mode': 'grammar',
+                'mode_label': 'Quiz',
+                'cefr': cefr,
+                'prompt_en': q.get('question_en'),
+                'prompt_bn': q.get('question_bn'),
+            }
+            for q in grammar['quiz_questions']
+        ]
+        rng.shuffle(gq)
+        questions.extend(gq[:_QUIZ_GRAMMAR_QUESTIONS])
+
+    rng.shuffle(questions)
     return questions
 
 
+def create_quiz_session(user_id, lang: str, lesson: dict):
+    """Start a lesson quiz; returns (session, questions)."""
+    params = {'lesson_id': int(lesson['id'])}
+    ready = question_pools.take(('quiz', lang, params['lesson_id']))
+    if ready:
+        version, seed, questions = ready
+        return create_study_session(user_id, lang, 'quiz', params, seed=seed, content_version=version), questions
+    study = create_study_session(user_id, lang, 'quiz', params)
+    return study, study_session_questions(study)
+
+
+def resource_mode_available(lang: str) -> bool:
+    return bool(get_resource_corpus(lang).words)
+
+
+def create_practice_session(user_id, lang: str, question_count: int, mode: str = 'default'):
+    """Start a Daily Practice session; returns (session, questions).
+
+    Due words and the learner's CEFR rank are captured in the session params so the
+    same questions can be rebuilt from the seed at submit time.
+    """
+    engine = get_practice_engine(lang)
+    if mode == 'resources':
+        params = {
+            'question_count': question_count,
+            'mode': mode,
+            'due_words': _resource_due_words(lang, question_count, user_id=user_id),
+        }
+    else:
+        rec = _recommended_lesson(engine.lessons, load_progress(lang, user_id=user_id))
+        params = {
+            'question_count': question_count,
+            'mode': 'default',
+            'due_words': load_due_words(lang, question_count, user_id=user_id),
+            'rank': _cefr_rank(_lesson_cefr(rec)) if rec else 99,
+        }
+        # The session is a pre-generated set for (language, rank, size) with questions for
+        # the due words merged in (see PracticeEngine.merge_due_words): use a pooled set
+        # when available.
+        ready = question_pools.take(('practice', lang, params['rank'], question_count))
+        if ready:
+            version, seed, questions = ready
+            if params['due_words']:
+                questions = engine.merge_due_words(
+                    questions, question_count, params['due_words'], params['rank'],
+                    get_resource_index(lang), _due_merge_rng(seed),
+                )
+            study = create_study_session(user_id, lang, 'practice', params, seed=seed, content_version=version)
+            return study, questions
+    study = create_study_session(user_id, lang, 'practice', params)
+    return study, study_session_questions(study)
+
+
+def _due_merge_rng(seed: int):
+    return random.Random(f'{seed}:due')
+
+
+_QUESTION_POOL_PRACTICE_SIZE = 12
+_QUESTION_POOL_LATENCY_SAMPLES = 512
+
+
+class QuestionPools:
+    """Ring buffers of ready-made question sets, refilled by a background worker.
+
+    Keys are ('quiz', lang, lesson_id) and ('practice', lang, rank, question_count); each
+    buffer holds (seed, questions) pairs built exactly as `study_session_questions` would
+    rebuild them, so a pooled set can back a normal study session.
+
+    The worker warms every content-derived index and fills the default keys when it starts
+    and whenever the content version changes (pools from an older version are dropped).
+    Taking from a buffer wakes the worker to top it up; a miss registers the key so later
+    requests for it are served from the pool.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._pools = {}
+        self._pending = set()
+        self._version = None
+        self._app = None
+        self._pid = None
+        self._thread = None
+        self.depth = 3
+        self.poll_sec = 30.0
+        self.hits = 0
+        self.misses = 0
+        self.refills = 0
+        self.warmups = 0
+        self.last_warmup_ms = None
+        self.refill_ms = deque(maxlen=_QUESTION_POOL_LATENCY_SAMPLES)
+
+    # ----- request side -----
+    def take(self, key):
+        """(content_version, seed, questions) from the pool, or None on a miss."""
+        if self._version is None and self._thread is None:
+            return None
+        self._ensure_worker()
+        version = get_content_version()
+        with self._lock:
+            pool = self._pools.get(key) if version == self._version else None
+            entry = pool.popleft() if pool else None
+            if entry:
+                self.hits += 1
+            else:
+                self.misses += 1
+            self._pending.add(key)
+        self._wake.set()
+        return (version, *entry) if entry else None
+
+    def metrics(self) -> dict:
+        with self._lock:
+            depths = {'/'.join(str(p) for p in key): len(pool) for key, pool in self._pools.items()}
+            samples = sorted(self.refill_ms)
+            version = self._version
+
+        def _pct(q):
+            return round(samples[min(len(samples) - 1, int(q * len(samples)))], 3) if samples else None
+
+        return {
+            'running': bool(self._thread and self._thread.is_alive() and self._pid == os.getpid()),
+            'content_version': version,
+            'depth_target': self.depth,
+            'pools': len(depths),
+            'ready': sum(depths.values()),
+            'empty_pools': sorted(k for k, n in depths.items() if not n),
+            'hits': self.hits,
+            'misses': self.misses,
+            'refills': self.refills,
+            'warmups': self.warmups,
+            'last_warmup_ms': self.last_warmup_ms,
+            'refill_ms': {'p50': _pct(0.5), 'p99': _pct(0.99), 'max': round(samples[-1], 3) if samples else None},
+            'depths': depths,
+        }
+
+    # ----- worker side -----
+    def start(self, app, depth=None, poll_sec=None):
+        """Start the refill worker for `app` (once per process)."""
+        with self._lock:
+            self._app = app
+            if depth is not None:
+                self.depth = max(1, int(depth))
+            if poll_sec is not None:
+                self.poll_sec = max(1.0, float(poll_sec))
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name='question-pools', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 30.0):
+        """Stop the refill worker once its current step is done (pools are kept)."""
+        with self._lock:
+            thread = self._thread
+        self._stopping.set()
+        self._wake.set()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def _ensure_worker(self):
+        # Worker threads do not survive a fork (e.g. a pre-loading WSGI server).
+        if self._pid != os.getpid() and self._app is not None:
+            with self._lock:
+                self._pools = {}
+                self._version = None
+            self.start(self._app)
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                with self._app.app_context():
+                    if get_content_version() != self._version:
+                        self.warm()
+                    self.refill()
+            except Exception as exc:
+                print(f"WARNING: question pool refill failed: {exc}")
+            self._wake.wait(self.poll_sec)
+            self._wake.clear()
+
+    def _default_keys(self):
+        keys = []
+        for lang in LANG_META:
+            engine = get_practice_engine(lang)
+            for lesson in engine.lessons:
+                keys.append(('quiz', lang, int(lesson['id'])))
+            if engine.vocab_all:
+                for rank in [*engine.ranks, 99]:
+                    keys.append(('practice', lang, rank, _QUESTION_POOL_PRACTICE_SIZE))
+        return keys
+
+    def warm(self):
+        """Build every content-derived index for the current version, then fill the pools."""
+        start = time.perf_counter()
+        version = get_content_version()
+        for lang in LANG_META:
+            get_practice_engine(lang)
+            get_resource_corpus(lang)
+            get_resource_stats(lang)
+            get_adaptive_placement_engine(lang)
+        with self._lock:
+            self._version = version
+            self._pools = {}
+            self._pending = set(self._default_keys())
+        self.refill()
+        self.warmups += 1
+        self.last_warmup_ms = round((time.perf_counter() - start) * 1000, 1)
+
+    def refill(self):
+        """Top up every pending pool to `depth` (stops early if the content changes)."""
+        with self._lock:
+            pending, self._pending = self._pending, set()
+            version = self._version
+        for key in sorted(pending, key=str):
+            while True:
+                with self._lock:
+                    if self._version != version:
+                        return
+                    pool = self._pools.setdefault(key, deque(maxlen=self.depth))
+                    if len(pool) >= self.depth:
+                        break
+                start = time.perf_counter()
+                entry = self._build(key)
+                elapsed = (time.perf_counter() - start) * 1000
+                if get_content_version() != version:
+                    return
+                with self._lock:
+                    self.refill_ms.append(elapsed)
+                    if entry is None:
+                        self._pools.pop(key, None)
+                        break
+                    pool.append(entry)
+                    self.refills += 1
+
+    def _build(self, key):
+        seed = secrets.randbits(31)
+        if key[0] == 'quiz':
+            _, lang, lesson_id = key
+            study = {'kind': 'quiz', 'language': lang, 'seed': seed, 'params': {'lesson_id': lesson_id}}
+        else:
+            _, lang, rank, total_q = key
+            study = {
+                'kind': 'practice',
+                'language': lang,
+                'seed': seed,
+                'params': {'question_count': total_q, 'mode': 'default', 'due_words': [], 'rank': rank},
+            }
+        questions = study_session_questions(study)
+        return (seed, questions) if questions else None
+
+
+question_pools = QuestionPools()
+
+
+def start_question_pools(app) -> None:
+    """Warm content-derived indexes and question pools in the background (per worker)."""
+    enabled = app.config.get('QUESTION_POOL_WARMUP')
+    if enabled is None:
+        enabled = (os.environ.get('QUESTION_POOL_WARMUP') or '1').strip().lower() not in {'0', 'false', 'no', 'off'}
+        enabled = enabled and not app.config.get('TESTING')
+    if not enabled:
+        return
+    try:
+        depth = int(app.config.get('QUESTION_POOL_DEPTH') or os.environ.get('QUESTION_POOL_DEPTH') or 3)
+    except (TypeError, ValueError):
+        depth = 3
+    question_pools.start(app, depth=max(1, min(20, depth)))
+
+
+def study_session_questions(study: dict):
+    """Rebuild a session's questions from its seed (identical for the same content version)."""
+    lang = study['language']
+    params = study.get('params') or {}
+    rng = random.Random(study['seed'])
+    kind = study['kind']
+
+    if kind == 'quiz':
+        lesson = _find_lesson(_sorted_lessons(get_lessons().get(lang, []) or []), params.get('lesson_id'))
+        return build_quiz_questions(lang, lesson, rng) if lesson else []
+    if kind == 'practice':
+        engine = get_practice_engine(lang)
+        total_q = int(params.get('question_count') or 12)
+        if params.get('mode') == 'resources':
+            return _build_resource_drill_questions(
+                lang, total_q, engine.vocab_all, engine.tts_lang, rng=rng, due_words=params.get('due_words') or [],
+            )
+        rank = int(params.get('rank', 99))
+        resource_index = get_resource_index(lang)
+        due_words = params.get('due_words') or []
+        questions = engine.build_questions(total_q, [], rank, resource_index, rng=rng)
+        if due_words:
+            questions = engine.merge_due_words(
+                questions, total_q, due_words, rank, resource_index, _due_merge_rng(study['seed']),
+            )
+        return questions
+    if kind == 'placement':
+        return _build_placement_questions(lang, params.get('questions_per_level', 10), rng=rng)
+    return []
+
+
+def parse_session_answers(raw, question_count: int):
+    """`[{question_id: "q_001", answer: ...}, ...]` -> {index: answer}; None if malformed."""
+    if not isinstance(raw, list):
+        return None
+    answers = {}
+    for item in raw:
+        if not isinstance(item, dict):
+            return None
+        qid = str(item.get('question_id') or '')
+        try:
+            index = int(qid[2:]) - 1 if qid.startswith('q_') else -1
+        except ValueError:
+            index = -1
+        if not 0 <= index < question_count:
+            return None
+        answers[index] = item.get('answer')
+    return answers
+
+
+def submit_study_session(study: dict, answers: dict, questions=None):
+    """Grade a quiz or practice session and apply every progress write in one transaction.
+
+    `answers` maps question index -> submitted answer. Only answered questions that track
+    a word update SRS and daily activity (as the per-answer calls used to); a quiz also
+    completes its lesson with the score over all questions.
+    Returns (result, applied); an already-submitted session returns its stored result.
+    """
+    lang = study['language']
+    user_id = study['user_id']
+    is_quiz = study['kind'] == 'quiz'
+    questions = study_session_questions(study) if questions is None else questions
+
+    graded = [(q, _grade_answer(q, answers.get(i))) for i, q in enumerate(questions) if i in answers]
+    correct_count = sum(1 for _, ok in graded if ok)
+    result = {
+        'ok': True,
+        'language': lang,
+        'progress_applied': True,
+        'question_count': len(questions),
+        'correct_count': correct_count,
+        'wrong_count': (len(questions) if is_quiz else len(graded)) - correct_count,
+    }
+
+    now = _app_now()
+    conn = get_db()
+    try:
+        xp = reviews = hits = 0
+        word_updates = {}
+        for q, ok in graded:
+            word = (q.get('word') or '')[:300]
+            if not word or (is_quiz and q.get('kind') != 'vocab'):
+                continue
+            if is_quiz:
+                xp += _QUIZ_XP_CORRECT if ok else _QUIZ_XP_WRONG
+            else:
+                xp += int(q.get('xp_correct', 10) if ok else q.get('xp_wrong', 2))
+            reviews += 1
+            hits += int(ok)
+            word_updates[word] = record_word_review(lang, word, ok, user_id=user_id, now=now, conn=conn)
+        add_activity(xp=xp, reviews=reviews, correct=hits, wrong=reviews - hits, user_id=user_id, conn=conn)
+        result['xp_earned'] = xp
+        result['word_updates'] = list(word_updates.values())
+
+        if is_quiz:
+            lesson_id = int(study['params']['lesson_id'])
+            score_pct = int(round(correct_count / len(questions) * 100)) if questions else 0
+            lesson_list = _sorted_lessons(get_lessons().get(lang, []) or [])
+            idx = next((i for i, l in enumerate(lesson_list) if l.get('id') == lesson_id), None)
+            next_lesson = lesson_list[idx + 1] if idx is not None and idx + 1 < len(lesson_list) else None
+            completion = complete_lesson(lang, lesson_id, score_pct, user_id=user_id, conn=conn)
+            result.update({
+                'lesson_id': lesson_id,
+                'score_pct': score_pct,
+                'completion': {**completion, 'completed': bool(completion['completed'])},
+                'next_lesson_id': int(next_lesson['id']) if next_lesson else None,
+            })
+
+        if not finish_study_session(study['id'], result, conn=conn):
+            conn.rollback()
+            return get_study_session(study['id'])['result'], False
+        conn.commit()
+    finally:
+        conn.close()
+    return result, True
+
+
 def _next_incomplete_lesson(lesson_list, progress):
     for lesson in _sorted_lessons(lesson_list):
         p = (progress or {}).get(lesson['id'])
@@ -2488,46 +4394,602 @@ def _recommended_lesson(lesson_list, progress):
     return _next_incomplete_lesson(lesson_list, progress)
 
 
-def _logo_candidate_paths():
-    logo_dir = _config_path('LOGO_DIR')
+def _tts_lang_tag(lang: str) -> str:
+    return 'fr-FR' if lang == 'french' else 'es-ES'
+
+
+_ORDER_PUNCT_RE = re.compile(r'[\\.,;:!?]')
+
+
+def _sample_distinct(pool, k, rng, skip_word=None, taken_words=None, max_attempts=None):
+    """Pick up to `k` entries from `pool` by random index, without copying the pool.
+
+    Entries whose `word` equals `skip_word` (or is already in `taken_words`) are rejected.
+    Falls back to a filtered scan only when rejection sampling keeps missing (tiny pools).
+    """
+    n = len(pool)
+    if n == 0 or k <= 0:
+        return []
+
+    taken = set(taken_words or ())
+    if skip_word is not None:
+        taken.add(skip_word)
+
+    picked = []
+    seen_idx = set()
+    attempts = 0
+    max_attempts = max_attempts or (k * 8 + 8)
+    while len(picked) < k and attempts < max_attempts and len(seen_idx) < n:
+        attempts += 1
+        i = rng.randrange(n)
+        if i in seen_idx:
+            continue
+        seen_idx.add(i)
+        entry = pool[i]
+        word = entry.get('word')
+        if word in taken:
+            continue
+        taken.add(word)
+        picked.append(entry)
+
+    if len(picked) < k and len(seen_idx) < n:
+        rest = [pool[i] for i in range(n) if i not in seen_idx and pool[i].get('word') not in taken]
+        rng.shuffle(rest)
+        for entry in rest:
+            if len(picked) >= k:
+                break
+            word = entry.get('word')
+            if word in taken:
+                continue
+            taken.add(word)
+            picked.append(entry)
+
+    return picked
+
+
+_DISTRACTOR_K = 16
+_DISTRACTOR_HASH_DIM = 256
+_DISTRACTOR_BLOCK = 1024
+# Feature-group weights (squared norms of each block in the embedding).
+_DISTRACTOR_WEIGHTS = {'word': 1.0, 'gloss': 1.0, 'category': 1.5, 'pos': 1.0, 'length': 0.5, 'cefr': 0.5}
+_DISTRACTOR_POS = ('noun', 'verb', 'adj', 'adv', 'number', 'phrase', 'other')
+_DISTRACTOR_RANKS = (1, 2, 3, 4, 5, 6, 99)
+# Bump when the embedding or neighbour search changes: stored neighbour snapshots are then stale.
+_DISTRACTOR_FORMAT = 1
+
+
+def _distractor_value(entry: dict, field: str) -> str:
+    """Comparable form of a shown answer (`english` loosely, other fields by exact text)."""
+    if field == 'english':
+        return _norm_match(entry.get('english') or '')
+    return ' '.join(str(entry.get(field) or '').split()).casefold()
+
+
+def _guess_pos(entry: dict, category: str = '') -> str:
+    """Very rough part-of-speech guess from the category, article and English gloss."""
+    category = (category or entry.get('category') or '').lower()
+    word = (entry.get('word') or '').strip().lower()
+    english = (entry.get('english') or '').strip().lower()
+    if category == 'numbers':
+        return 'number'
+    if category == 'verbs' or english.startswith('to '):
+        return 'verb'
+    if category in {'adjectives', 'colors', 'nationalities'}:
+        return 'adj'
+    if category in {'phrases', 'greetings'} or len(word.split()) > 2:
+        return 'phrase'
+    if (entry.get('article') or '').strip():
+        return 'noun'
+    if word.endswith(('ment', 'mente')) or english.endswith('ly'):
+        return 'adv'
+    return 'other'
+
+
+def _char_ngram_buckets(text: str, n: int = 3):
+    """Hashed character n-grams (with word-boundary padding); stable across processes."""
+    text = f" {_norm_match(text)} "
     return [
-        os.path.join(logo_dir, 'Language_Coach_logo.png'),
-        os.path.join(logo_dir, 'languagecoach_logo.png'),
-        os.path.join(logo_dir, 'AhsanSuny_Logo.png'),
+        zlib.crc32(text[i:i + n].encode('utf-8')) % _DISTRACTOR_HASH_DIM
+        for i in range(max(1, len(text) - n + 1))
     ]
 
 
-def _logo_file_path():
-    for path in _logo_candidate_paths():
-        if os.path.exists(path):
-            return path
-    return _logo_candidate_paths()[0]
+class DistractorIndex:
+    """Precomputed nearest neighbours per vocab entry, used as plausible wrong answers.
 
+    Each entry is embedded with cheap features: category, a part-of-speech guess, word
+    length, hashed character trigrams of the word and of the English gloss, and the CEFR
+    rank at which it unlocks. Cosine similarities are computed block-wise with matrix
+    products and only the top-K neighbours (`neighbours`, int32, -1 padded) are kept, so
+    picking distractors at request time is a slice of that array.
 
-LANG_META = {
-    'french':  {'name': 'French',  'name_native': 'Français', 'name_bn': 'ফরাসি',    'flag': '🇫🇷', 'color': '#0055A4'},
-    'spanish': {'name': 'Spanish', 'name_native': 'Español',  'name_bn': 'স্প্যানিশ', 'flag': '🇪🇸', 'color': '#c60b1e'},
-}
+    Entries sharing the target's word or (normalized) English gloss are never neighbours:
+    they would be a second correct answer.
 
-LANGS = list(LANG_META.keys())
+    The neighbours are built offline by scripts/build_distractors.py and stored next to the
+    content (`data/distractors.json`); pass a stored `snapshot` whose `inputs` digest matches
+    and nothing is computed here. Without one they are computed in-process (`precomputed`
+    is then False).
+    """
 
-def _static_asset_version():
-    """Cache-bust static assets (CSS/JS) by appending a version query parameter.
+    def __init__(self, entries, ranks=None, categories=None, k: int = _DISTRACTOR_K, snapshot=None):
+        np = _numpy()
+        self.entries = list(entries)
+        n = len(self.entries)
+        self.categories = list(categories) if categories is not None else [e.get('category') or '' for e in self.entries]
+        self.row_by_word = {}
+        for i, e in enumerate(self.entries):
+            self.row_by_word.setdefault(e.get('word'), i)
+        self.ranks = np.asarray(list(ranks) if ranks is not None else [99] * n, dtype=np.int16)
+        self.k = max(0, min(int(k), n - 1))
+        self.inputs = self._inputs_digest()
+        self.precomputed = False
+        stored = (snapshot or {}).get('neighbours')
+        if (snapshot or {}).get('inputs') == self.inputs and stored is not None:
+            neighbours = np.asarray(stored, dtype=np.int32).reshape(n, -1)
+            if neighbours.shape == (n, self.k):
+                self.neighbours = neighbours
+                self.precomputed = True
+        if not self.precomputed:
+            self.neighbours = np.full((n, self.k), -1, dtype=np.int32)
+            if self.k:
+                self._compute_neighbours(self.embed())
+
+    def _inputs_digest(self) -> str:
+        """Digest of everything the neighbours depend on (entries in order, ranks, k, format)."""
+        h = hashlib.sha1(f'{_DISTRACTOR_FORMAT}|{self.k}'.encode('utf-8'))
+        for e, cat, rank in zip(self.entries, self.categories, self.ranks.tolist()):
+            fields = (e.get('word'), e.get('english'), e.get('article'), cat, rank)
+            h.update(('\x1f'.join(str(f or '') for f in fields) + '\x1e').encode('utf-8'))
+        return h.hexdigest()
+
+    def snapshot(self) -> dict:
+        """JSON-ready neighbour table, as stored in `data/distractors.json`."""
+        return {'inputs': self.inputs, 'k': self.k, 'neighbours': self.neighbours.tolist()}
+
+    def embed(self):
+        """(n, d) float32 matrix whose row dot products are weighted cosine similarities."""
+        np = _numpy()
+        n = len(self.entries)
+        categories = sorted(set(self.categories))
+        cat_index = {c: i for i, c in enumerate(categories)}
+        rank_index = {r: i for i, r in enumerate(_DISTRACTOR_RANKS)}
+
+        def _one_hot(cols, width, smooth=False):
+            block = np.zeros((n, width), dtype=np.float32)
+            rows = np.arange(n)
+            cols = np.asarray(cols, dtype=np.int64)
+            block[rows, cols] = 1.0
+            if smooth:
+                # Neighbouring buckets (length, CEFR rank) count as partially similar.
+                block[rows[cols > 0], cols[cols > 0] - 1] = 0.5
+                block[rows[cols < width - 1], cols[cols < width - 1] + 1] = 0.5
+            return block
+
+        def _hashed(texts):
+            block = np.zeros((n, _DISTRACTOR_HASH_DIM), dtype=np.float32)
+            rows, cols = [], []
+            for i, text in enumerate(texts):
+                buckets = _char_ngram_buckets(text)
+                rows.extend([i] * len(buckets))
+                cols.extend(buckets)
+            np.add.at(block, (np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64)), 1.0)
+            return block
+
+        blocks = {
+            'word': _hashed([e.get('word') or '' for e in self.entries]),
+            'gloss': _hashed([e.get('english') or '' for e in self.entries]),
+            'category': _one_hot([cat_index[c] for c in self.categories], len(categories)),
+            'pos': _one_hot(
+                [_DISTRACTOR_POS.index(_guess_pos(e, c)) for e, c in zip(self.entries, self.categories)],
+                len(_DISTRACTOR_POS),
+            ),
+            'length': _one_hot([min(len(e.get('word') or ''), 19) for e in self.entries], 20, smooth=True),
+            'cefr': _one_hot(
+                [rank_index.get(int(r), len(_DISTRACTOR_RANKS) - 1) for r in self.ranks],
+                len(_DISTRACTOR_RANKS), smooth=True,
+            ),
+        }
+        parts = []
+        for name, block in blocks.items():
+            norms = np.linalg.norm(block, axis=1, keepdims=True)
+            parts.append(block * (math.sqrt(_DISTRACTOR_WEIGHTS[name]) / np.maximum(norms, 1e-9)))
+        return np.hstack(parts) / math.sqrt(sum(_DISTRACTOR_WEIGHTS.values()))
+
+    def _compute_neighbours(self, emb):
+        np = _numpy()
+        n, k = len(self.entries), self.k
+        word_ids = np.asarray(_group_ids(e.get('word') or '' for e in self.entries))
+        gloss_ids = np.asarray(_group_ids(_norm_match(e.get('english') or '') for e in self.entries))
+        for start in range(0, n, _DISTRACTOR_BLOCK):
+            stop = min(n, start + _DISTRACTOR_BLOCK)
+            sim = emb[start:stop] @ emb.T
+            same = (word_ids[start:stop, None] == word_ids[None, :]) | (gloss_ids[start:stop, None] == gloss_ids[None, :])
+            sim[same] = -np.inf
+            top = np.argpartition(-sim, k - 1, axis=1)[:, :k]
+            top_sim = np.take_along_axis(sim, top, axis=1)
+            order = np.argsort(-top_sim, axis=1, kind='stable')
+            top = np.take_along_axis(top, order, axis=1)
+            top[np.take_along_axis(top_sim, order, axis=1) == -np.inf] = -1
+            self.neighbours[start:stop] = top
+
+    def __len__(self):
+        return len(self.entries)
+
+    def neighbours_of(self, word: str, max_rank=None):
+        """Neighbour rows for `word`, most similar first (optionally only ranks <= max_rank)."""
+        row = self.row_by_word.get(word)
+        if row is None:
+            return self.neighbours[:0, 0]
+        nb = self.neighbours[row]
+        nb = nb[nb >= 0]
+        if max_rank is not None:
+            nb = nb[self.ranks[nb] <= max_rank]
+        return nb
+
+    def pick(self, word: str, n: int, rng, max_rank=None, spread: int = 2, distinct=('english',), within=None):
+        """Up to `n` distractor entries for `word`, sampled from its `n * spread` nearest.
+
+        No two picks (and no pick and the target) share a value of a `distinct` field, so
+        the shown choices stay unambiguous; `within` limits picks to a set of words.
+        """
+        nb = self.neighbours_of(word, max_rank).tolist()
+        if within is not None:
+            nb = [row for row in nb if self.entries[row].get('word') in within]
+        candidates = [self.entries[row] for row in nb[: max(n, n * spread)]]
+        if not candidates:
+            return []
+        rng.shuffle(candidates)
+        return _pick_distinct(candidates, self.entries[self.row_by_word[word]], n, distinct)
+
+
+def _pick_distinct(entries, target, n, distinct, picked=()):
+    """Extend `picked` with entries whose `distinct` fields are non-empty and differ from the
+    target's and each other's, up to `n` entries in total."""
+    seen = {field: {_distractor_value(e, field) for e in (target, *picked)} for field in distinct}
+    picked = list(picked)
+    if len(picked) >= n:
+        return picked
+    for entry in entries:
+        values = {field: _distractor_value(entry, field) for field in distinct}
+        if any(not v or v in seen[f] for f, v in values.items()):
+            continue
+        for f, v in values.items():
+            seen[f].add(v)
+        picked.append(entry)
+        if len(picked) >= n:
+            break
+    return picked
 
-    Prefer `STATIC_VERSION` env var; otherwise derive from file mtimes.
+
+def _group_ids(values):
+    ids = {}
+    return [ids.setdefault(v, len(ids)) for v in values]
+
+
+class PracticeEngine:
+    """Daily Practice question generator for one language and one content version.
+
+    Everything that only depends on content (flat vocab list, word lookup, the unlocked
+    vocab pool for each CEFR rank, the distractor neighbours) is computed once in
+    `__init__`; building a session only samples from those pools. `distractor_snapshot`
+    is the language's stored neighbour table (see DistractorIndex).
     """
-    env = (_config_value('STATIC_VERSION', os.environ.get('STATIC_VERSION') or '') or '').strip()
-    if env:
-        return env
 
-    static_dir = _config_path('STATIC_DIR')
-    paths = [
-        os.path.join(static_dir, 'css', 'style.css'),
-        os.path.join(static_dir, 'js', 'app.js'),
-        *_logo_candidate_paths(),
-    ]
-    mtimes = []
-    for p in paths:
+    def __init__(self, lang: str, vocab_by_cat: dict, lesson_list: list, distractor_snapshot=None):
+        self.lang = lang
+        self.meta = LANG_META[lang]
+        self.tts_lang = _tts_lang_tag(lang)
+        self.vocab_all = []
+        categories = []
+        for cat, words in (vocab_by_cat or {}).items():
+            for w in (words or []):
+                if w.get('word') and w.get('english'):
+                    self.vocab_all.append(w)
+                    categories.append(cat)
+        self.vocab_lookup = {w['word']: w for w in self.vocab_all}
+        self.lessons = _sorted_lessons(lesson_list)
+
+        # Cumulative unlocked pools: rank -> (entries, words) for lessons with rank <= key.
+        self._ranks = []
+        self._unlocked = {}
+        self.word_rank = {}
+        pool = []
+        words = set()
+        for lesson in self.lessons:
+            rank = _cefr_rank(_lesson_cefr(lesson))
+            if self._ranks and self._ranks[-1] != rank:
+                self._unlocked[self._ranks[-1]] = (pool[:], frozenset(words))
+            if not self._ranks or self._ranks[-1] != rank:
+                self._ranks.append(rank)
+            for w in _lesson_vocab_slice(vocab_by_cat, lesson):
+                ww = (w.get('word') or '').strip()
+                if not ww or ww in words:
+                    continue
+                words.add(ww)
+                pool.append(w)
+                self.word_rank[ww] = rank
+        if self._ranks:
+            self._unlocked[self._ranks[-1]] = (pool, frozenset(words))
+
+        self.distractors = DistractorIndex(
+            self.vocab_all,
+            ranks=[self.word_rank.get(w['word'].strip(), 99) for w in self.vocab_all],
+            categories=categories,
+            snapshot=distractor_snapshot,
+        )
+
+    @property
+    def ranks(self):
+        """CEFR ranks at which lessons unlock new vocab, ascending (one unlocked pool each)."""
+        return tuple(self._ranks)
+
+    def unlocked_pool(self, current_rank: int):
+        """Return (entries, words) unlocked for a learner whose current lesson has `current_rank`."""
+        i = bisect.bisect_right(self._ranks, current_rank)
+        if i == 0:
+            return [], frozenset()
+        return self._unlocked[self._ranks[i - 1]]
+
+    def _context_for(self, word: str, resource_index, rng):
+        if not resource_index or ' ' in word or len(word) < 2:
+            return None
+        return resource_index.pick_context(word, rng)
+
+    def build_questions(self, total_q: int, due_words=(), current_rank: int = 99, resource_index=None, rng=None):
+        """Build a shuffled Daily Practice session (same question shapes as templates/practice.html)."""
+        rng = rng or random
+        unlocked, unlocked_words = self.unlocked_pool(current_rank)
+
+        selected = []
+        chosen = set()
+        for word in due_words or ():
+            entry = self.vocab_lookup.get(word)
+            if entry and (not unlocked_words or entry['word'] in unlocked_words) and entry['word'] not in chosen:
+                chosen.add(entry['word'])
+                selected.append(entry)
+
+        if len(selected) < total_q:
+            base_pool = unlocked or self.vocab_all
+            selected.extend(_sample_distinct(base_pool, total_q - len(selected), rng, taken_words=chosen))
+
+        wrong_pool = unlocked if len(unlocked) >= 40 else self.vocab_all
+        max_rank = current_rank if wrong_pool is unlocked else None
+
+        questions = []
+        for idx, entry in enumerate(selected[:total_q]):
+            q = self._build_question(entry, wrong_pool, resource_index, rng, max_rank)
+            q['id'] = idx + 1
+            rng.shuffle(q.get('choices', []))
+            questions.append(q)
+
+        rng.shuffle(questions)
+        return questions
+
+    def merge_due_words(self, questions, total_q: int, due_words, current_rank: int = 99, resource_index=None,
+                        rng=None):
+        """Put questions for `due_words` into a session built without due words.
+
+        Due words (unlocked ones, at most `total_q`) get fresh questions; they replace the
+        session's own questions for the same words first, then its last ones. The result is
+        reshuffled and renumbered.
+        """
+        rng = rng or random
+        _, unlocked_words = self.unlocked_pool(current_rank)
+        due = [
+            w for w in dict.fromkeys(due_words or ())
+            if w in self.vocab_lookup and (not unlocked_words or w in unlocked_words)
+        ][:total_q]
+        if not due:
+            return questions
+        fresh = self.build_questions(len(due), due, current_rank, resource_index, rng=rng)
+        due_set = set(due)
+        kept = [q for q in questions if q.get('word') not in due_set][: max(0, total_q - len(fresh))]
+        merged = fresh + kept
+        rng.shuffle(merged)
+        for idx, q in enumerate(merged):
+            q['id'] = idx + 1
+        return merged
+
+    def pick_distractors(self, word: str, n: int, rng, fallback_pool=None, max_rank=None,
+                         distinct=('english',), within=None):
+        """`n` wrong-answer entries: nearest neighbours first, random `fallback_pool` top-up.
+
+        `distinct` names the fields shown as choices (see DistractorIndex.pick).
+        """
+        wrong = self.distractors.pick(word, n, rng, max_rank=max_rank, distinct=distinct, within=within)
+        if len(wrong) < n:
+            extra = _sample_distinct(
+                self.vocab_all if fallback_pool is None else fallback_pool, (n - len(wrong)) * 3, rng,
+                skip_word=word, taken_words=[w['word'] for w in wrong],
+            )
+            target = self.vocab_lookup.get(word) or {'word': word}
+            wrong = _pick_distinct(extra, target, n, distinct, picked=wrong)
+        return wrong
+
+    def _build_question(self, entry, wrong_pool, resource_index, rng, max_rank=None):
+        meta = self.meta
+        tts_lang = self.tts_lang
+        word = entry['word']
+        english = entry.get('english', '')
+        bengali = entry.get('bengali', '')
+
+        qtype_choices = ['listen_to_english', 'word_to_english', 'english_to_word', 'type_english_to_word']
+        example = (entry.get('example') or '').strip()
+        example_en = (entry.get('example_en') or '').strip()
+        example_bn = (entry.get('example_bn') or '').strip()
+        if example and example_en:
+            tokens = _ORDER_PUNCT_RE.sub('', example).split()
+            if 3 <= len(tokens) <= 10:
+                qtype_choices.append('order_sentence')
+
+        ctx = self._context_for(word, resource_index, rng)
+        if ctx:
+            qtype_choices.extend(['context_cloze', 'context_cloze'])
+
+        qtype = rng.choice(qtype_choices)
+        wrong = self.pick_distractors(word, 3, rng, wrong_pool, max_rank)
+
+        if qtype == 'listen_to_english':
+            return {
+                'kind': 'mcq',
+                'mode': 'listen_to_english',
+                'mode_label': '🔊 Listening',
+                'prompt_en': 'Listen and choose the correct meaning (English)',
+                'prompt_bn': 'শুনে সঠিক অর্থ নির্বাচন করুন (ইংরেজি)',
+                'tts_text': word,
+                'tts_lang': tts_lang,
+                'choices': [english] + [w.get('english', '') for w in wrong],
+                'answer': english,
+                'word': word,
+                'xp_correct': 10,
+                'xp_wrong': 2,
+            }
+        if qtype == 'context_cloze' and ctx:
+            hint = f"Hint: {english}"
+            if bengali:
+                hint += f" • বাংলা: {bengali}"
+            return {
+                'kind': 'mcq',
+                'mode': 'context_cloze',
+                'mode_label': 'Context',
+                'prompt_en': f"Fill in the blank: {ctx.get('blanked', '')}",
+                'prompt_bn': hint,
+                'tts_text': (ctx.get('text') or word),
+                'tts_lang': tts_lang,
+                'choices': [word] + [w.get('word', '') for w in wrong],
+                'answer': word,
+                'word': word,
+                'xp_correct': 14,
+                'xp_wrong': 3,
+            }
+        if qtype == 'order_sentence':
+            answer_tokens = _ORDER_PUNCT_RE.sub('', example).split()
+            tokens = answer_tokens[:]
+            rng.shuffle(tokens)
+            return {
+                'kind': 'order',
+                'mode': 'order_sentence',
+                'mode_label': '🧩 Order the sentence',
+                'prompt_en': example_en,
+                'prompt_bn': example_bn or 'শব্দগুলো সাজান',
+                'tokens': tokens,
+                'answer': ' '.join(answer_tokens),
+                'word': word,
+                'tts_text': example,
+                'tts_lang': tts_lang,
+                'xp_correct': 12,
+                'xp_wrong': 3,
+            }
+        if qtype == 'english_to_word':
+            return {
+                'kind': 'mcq',
+                'mode': 'english_to_word',
+                'mode_label': '✅ Choose',
+                'prompt_en': f"How do you say “{english}” in {meta['name_native'] or meta['name']}?",
+                'prompt_bn': f"“{english}” {meta['name_bn']} ভাষায় কীভাবে বলে?",
+                'choices': [word] + [w.get('word', '') for w in wrong],
+                'answer': word,
+                'word': word,
+                'xp_correct': 10,
+                'xp_wrong': 2,
+            }
+        if qtype == 'type_english_to_word':
+            return {
+                'kind': 'type',
+                'mode': 'type_english_to_word',
+                'mode_label': '⌨️ Type',
+                'prompt_en': f"Type the {meta['name']} word for: {english}",
+                'prompt_bn': f"{english} — লিখুন ({meta['name_bn']} শব্দ)",
+                'hint_bn': bengali,
+                'answer': word,
+                'word': word,
+                'tts_text': word,
+                'tts_lang': tts_lang,
+                'xp_correct': 12,
+                'xp_wrong': 3,
+            }
+        return {
+            'kind': 'mcq',
+            'mode': 'word_to_english',
+            'mode_label': '✅ Choose',
+            'prompt_en': f"What does “{word}” mean in English?",
+            'prompt_bn': f"“{word}” ইংরেজিতে কী?",
+            'choices': [english] + [w.get('english', '') for w in wrong],
+            'answer': english,
+            'word': word,
+            'tts_text': word,
+            'tts_lang': tts_lang,
+            'xp_correct': 10,
+            'xp_wrong': 2,
+        }
+
+
+def get_distractor_snapshots():
+    """Stored distractor neighbours: {lang: {'inputs', 'k', 'neighbours'}} (optional file)."""
+    data = _cached_json('distractors', _config_path('DISTRACTORS_PATH'), default={})
+    return (data or {}).get('languages') or {}
+
+
+def get_practice_engine(lang: str) -> PracticeEngine:
+    """Shared PracticeEngine for `lang`, rebuilt only when the content version changes."""
+    snapshots = get_distractor_snapshots()
+    digest = _DATA_DIGEST.get(('distractors', _config_path('DISTRACTORS_PATH')), '')
+
+    def _build():
+        engine = PracticeEngine(
+            lang, get_vocab().get(lang, {}) or {}, get_lessons().get(lang, []) or [],
+            distractor_snapshot=snapshots.get(lang),
+        )
+        if not engine.distractors.precomputed:
+            print(
+                f"WARNING: {lang} distractors are missing or stale in {_config_path('DISTRACTORS_PATH')}; "
+                "computed in this process. Run: python scripts/build_distractors.py"
+            )
+        return engine
+    return _content_derived(('practice_engine', lang), _build, extra_key=digest)
+
+
+def _logo_candidate_paths():
+    logo_dir = _config_path('LOGO_DIR')
+    return [
+        os.path.join(logo_dir, 'Language_Coach_logo.png'),
+        os.path.join(logo_dir, 'languagecoach_logo.png'),
+        os.path.join(logo_dir, 'AhsanSuny_Logo.png'),
+    ]
+
+
+def _logo_file_path():
+    for path in _logo_candidate_paths():
+        if os.path.exists(path):
+            return path
+    return _logo_candidate_paths()[0]
+
+
+LANG_META = {
+    'french':  {'name': 'French',  'name_native': 'Français', 'name_bn': 'ফরাসি',    'flag': '🇫🇷', 'color': '#0055A4'},
+    'spanish': {'name': 'Spanish', 'name_native': 'Español',  'name_bn': 'স্প্যানিশ', 'flag': '🇪🇸', 'color': '#c60b1e'},
+}
+
+LANGS = list(LANG_META.keys())
+
+def _static_asset_version():
+    """Cache-bust static assets (CSS/JS) by appending a version query parameter.
+
+    Prefer `STATIC_VERSION` env var; otherwise derive from file mtimes.
+    """
+    env = (_config_value('STATIC_VERSION', os.environ.get('STATIC_VERSION') or '') or '').strip()
+    if env:
+        return env
+
+    static_dir = _config_path('STATIC_DIR')
+    paths = [
+        os.path.join(static_dir, 'css', 'style.css'),
+        os.path.join(static_dir, 'js', 'app.js'),
+        *_logo_candidate_paths(),
+    ]
+    mtimes = []
+    for p in paths:
         try:
             mtimes.append(int(os.path.getmtime(p)))
         except OSError:
@@ -2538,5 +5000,1755 @@ def _static_asset_version():
 
 
 
+# ---------- TTS cache ----------
+try:
+    import fcntl as _fcntl
+except ImportError:  # pragma: no cover - Windows dev machines run a single worker
+    _fcntl = None
+
+_TTS_FLIGHT_LOCK_STRIPES = 256
+_TTS_FLIGHT_POLL_SEC = 0.05
+
+
+class SingleFlight:
+    """Let one caller per key do expensive work while concurrent callers wait for it.
+
+    Within a process callers queue on a per-key lock; across workers they queue on an
+    `flock` held on one of a fixed set of lock files under `<lock_dir>/.locks/` (striped by
+    key, so no per-key lock files pile up). Waiters give up after `timeout` seconds.
+
+        with flight.hold(key, cache_dir, timeout=20) as acquired:
+            if acquired and not os.path.exists(path):
+                ...generate path...
+    """
+
+    def __init__(self, stripes: int = _TTS_FLIGHT_LOCK_STRIPES):
+        self.stripes = max(1, int(stripes))
+        self._lock = threading.Lock()
+        self._keys = {}  # (lock_dir, key) -> [threading.Lock, users]
+        self.leaders = 0
+        self.waited = 0
+        self.timeouts = 0
+
+    def _stripe_path(self, lock_dir: str, key: str) -> str:
+        stripe = zlib.crc32(key.encode('utf-8')) % self.stripes
+        path = os.path.join(lock_dir, '.locks')
+        os.makedirs(path, exist_ok=True)
+        return os.path.join(path, f'{stripe:03d}.lock')
+
+    @contextmanager
+    def hold(self, key: str, lock_dir: str, timeout: float):
+        """Context manager yielding True once this caller owns `key`, False on timeout."""
+        deadline = time.monotonic() + max(0.0, float(timeout))
+        slot_key = (os.path.abspath(lock_dir), key)
+        with self._lock:
+            slot = self._keys.setdefault(slot_key, [threading.Lock(), 0])
+            slot[1] += 1
+        lock = slot[0]
+        contended = lock.locked()
+        fd = None
+        thread_locked = lock.acquire(timeout=max(0.0, deadline - time.monotonic()))
+        acquired = thread_locked
+        try:
+            if acquired and _fcntl is not None:
+                fd = os.open(self._stripe_path(lock_dir, key), os.O_RDWR | os.O_CREAT, 0o644)
+                while True:
+                    try:
+                        _fcntl.flock(fd, _fcntl.LOCK_EX | _fcntl.LOCK_NB)
+                        break
+                    except OSError:
+                        contended = True
+                        if time.monotonic() >= deadline:
+                            acquired = False
+                            break
+                        time.sleep(_TTS_FLIGHT_POLL_SEC)
+            with self._lock:
+                if not acquired:
+                    self.timeouts += 1
+                elif contended:
+                    self.waited += 1
+                else:
+                    self.leaders += 1
+            yield acquired
+        finally:
+            if fd is not None:
+                try:
+                    _fcntl.flock(fd, _fcntl.LOCK_UN)
+                except OSError:
+                    pass
+                os.close(fd)
+            if thread_locked:
+                lock.release()
+            with self._lock:
+                slot[1] -= 1
+                if slot[1] <= 0:
+                    self._keys.pop(slot_key, None)
+
+    def is_held(self, key: str, lock_dir: str) -> bool:
+        """True if a caller in this or another process holds `key` right now.
+
+        Across processes only the key's lock stripe can be probed, so a different key on
+        the same stripe also reads as held.
+        """
+        with self._lock:
+            if (os.path.abspath(lock_dir), key) in self._keys:
+                return True
+        if _fcntl is None:
+            return False
+        try:
+            fd = os.open(self._stripe_path(lock_dir, key), os.O_RDWR | os.O_CREAT, 0o644)
+        except OSError:
+            return False
+        try:
+            _fcntl.flock(fd, _fcntl.LOCK_EX | _fcntl.LOCK_NB)
+        except OSError:
+            return True
+        else:
+            _fcntl.flock(fd, _fcntl.LOCK_UN)
+            return False
+        finally:
+            os.close(fd)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                'in_flight': len(self._keys),
+                'leaders': self.leaders,
+                'waited': self.waited,
+                'timeouts': self.timeouts,
+            }
+
+
+tts_single_flight = SingleFlight()
+
+
+_TTS_MANIFEST_NAME = '.manifest.sqlite3'
+_TTS_TOUCH_FLUSH_SEC = 30.0
+_TTS_TOUCH_FLUSH_MAX = 256
+_TTS_STALE_TMP_SEC = 3600
+
+
+class TTSCacheManifest:
+    """SQLite index of the TTS cache: one row per MP3 plus running totals.
+
+    Rows are written when a clip is generated (`record`) and touched when it is served
+    (`touch`, buffered in memory and flushed in batches), so eviction can walk the
+    `last_served_at` index from the oldest end and stop as soon as the caps are met.
+    Triggers keep the `totals` row in step with `entries`; nothing here scans or stats
+    the cache directory except `rebuild`, which indexes a cache that predates the manifest.
+    File locations come from the owning `TTSCacheStore`; `path` and `prune_tmp=False` give
+    a scratch manifest that leaves the cache directory alone (see `scratch_manifest`).
+    """
+
+    def __init__(self, store, path: str = None, prune_tmp: bool = True):
+        self.store = store
+        self.cache_dir = store.cache_dir
+        self.path = path or os.path.join(self.cache_dir, _TTS_MANIFEST_NAME)
+        self.prune_tmp = prune_tmp
+        self._lock = threading.Lock()
+        self._touched = {}
+        self._last_flush = time.monotonic()
+        self._ready = False
+
+    def connect(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        if not self._ready:
+            self._init(conn)
+        return conn
+
+    def _init(self, conn):
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.executescript('''
+            CREATE TABLE IF NOT EXISTS entries (
+                key             TEXT PRIMARY KEY,
+                size            INTEGER NOT NULL,
+                created_at      REAL NOT NULL,
+                last_served_at  REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_entries_last_served ON entries(last_served_at);
+            CREATE TABLE IF NOT EXISTS totals (
+                id     INTEGER PRIMARY KEY CHECK (id = 1),
+                files  INTEGER NOT NULL,
+                bytes  INTEGER NOT NULL
+            );
+            INSERT OR IGNORE INTO totals (id, files, bytes) VALUES (1, 0, 0);
+            CREATE TABLE IF NOT EXISTS meta (
+                key    TEXT PRIMARY KEY,
+                value  TEXT
+            );
+            CREATE TRIGGER IF NOT EXISTS entries_insert AFTER INSERT ON entries BEGIN
+                UPDATE totals SET files = files + 1, bytes = bytes + NEW.size WHERE id = 1;
+            END;
+            CREATE TRIGGER IF NOT EXISTS entries_delete AFTER DELETE ON entries BEGIN
+                UPDATE totals SET files = files - 1, bytes = bytes - OLD.size WHERE id = 1;
+            END;
+            CREATE TRIGGER IF NOT EXISTS entries_resize AFTER UPDATE OF size ON entries BEGIN
+                UPDATE totals SET bytes = bytes + NEW.size - OLD.size WHERE id = 1;
+            END;
+        ''')
+        conn.commit()
+        self._ready = True
+        if conn.execute("SELECT 1 FROM meta WHERE key='indexed_at'").fetchone() is None:
+            self.rebuild(conn=conn)
+
+    def record(self, key: str, size: int, now: float = None) -> None:
+        """Add (or refresh) a freshly generated clip."""
+        now = time.time() if now is None else float(now)
+        with self._lock:
+            self._touched.pop(key, None)
+        conn = self.connect()
+        conn.execute(
+            '''
+            INSERT INTO entries (key, size, created_at, last_served_at) VALUES (?, ?, ?, ?)
+            ON CONFLICT(key) DO UPDATE SET size=excluded.size, last_served_at=excluded.last_served_at
+            ''',
+            (key, int(size), now, now),
+        )
+        conn.commit()
+        conn.close()
+
+    def touch(self, key: str, now: float = None) -> None:
+        """Note that `key` was served; written to SQLite in batches."""
+        now = time.time() if now is None else float(now)
+        with self._lock:
+            self._touched[key] = now
+            due = (len(self._touched) >= _TTS_TOUCH_FLUSH_MAX
+                   or time.monotonic() - self._last_flush >= _TTS_TOUCH_FLUSH_SEC)
+        if due:
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            touched, self._touched = self._touched, {}
+            self._last_flush = time.monotonic()
+        if not touched:
+            return
+        conn = self.connect()
+        conn.executemany(
+            'UPDATE entries SET last_served_at=? WHERE key=? AND last_served_at < ?',
+            [(ts, key, ts) for key, ts in touched.items()],
+        )
+        conn.commit()
+        conn.close()
+
+    def totals(self) -> dict:
+        conn = self.connect()
+        row = conn.execute('SELECT files, bytes FROM totals WHERE id=1').fetchone()
+        conn.close()
+        return {'files': int(row['files']), 'bytes': int(row['bytes'])}
+
+    def rebuild(self, conn=None) -> dict:
+        """Re-index the cache directory (one full scan); keeps known last_served_at values."""
+        own_conn = conn is None
+        if own_conn:
+            conn = self.connect()
+        known = {r['key']: r['last_served_at'] for r in conn.execute('SELECT key, last_served_at FROM entries')}
+        rows = []
+        for key, _, st in self.store.iter_files(prune_tmp=self.prune_tmp):
+            mtime = float(st.st_mtime or 0.0)
+            last = max(known.get(key) or 0.0, mtime, float(getattr(st, 'st_atime', 0.0) or 0.0))
+            rows.append((key, int(st.st_size or 0), mtime, last))
+        conn.execute('DELETE FROM entries')
+        conn.executemany('INSERT INTO entries (key, size, created_at, last_served_at) VALUES (?, ?, ?, ?)', rows)
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('indexed_at', ?)", (str(time.time()),))
+        conn.commit()
+        if own_conn:
+            conn.close()
+        return {'files': len(rows), 'bytes': sum(r[1] for r in rows)}
+
+    def evict(self, ttl_sec: int = 0, max_files: int = 0, max_bytes: int = 0, min_age_sec: int = 0,
+              keep=(), dry_run: bool = False, now: float = None) -> dict:
+        """Delete least-recently-served clips until TTL and caps hold.
+
+        Walks the `last_served_at` index from the oldest entry and stops at the first
+        entry that is neither expired nor needed to get under `max_files` / `max_bytes`,
+        so the cost scales with the number of evicted clips. Entries served within
+        `min_age_sec` and keys in `keep` are never evicted.
+        """
+        now = time.time() if now is None else float(now)
+        self.flush()
+        keep = set(keep or ())
+        conn = self.connect()
+        totals = conn.execute('SELECT files, bytes FROM totals WHERE id=1').fetchone()
+        files, total_bytes = int(totals['files']), int(totals['bytes'])
+        expire_before = now - ttl_sec if ttl_sec else None
+        young_after = now - max(0, min_age_sec)
+
+        victims = []
+        cur = conn.execute('SELECT key, size, last_served_at FROM entries ORDER BY last_served_at')
+        for row in cur:
+            over = (max_files and files > max_files) or (max_bytes and total_bytes > max_bytes)
+            expired = expire_before is not None and row['last_served_at'] < expire_before
+            if not (over or expired) or row['last_served_at'] > young_after:
+                break
+            if row['key'] in keep:
+                continue
+            victims.append((row['key'], int(row['size'])))
+            files -= 1
+            total_bytes -= int(row['size'])
+        cur.close()
+
+        if not dry_run and victims:
+            removed = []
+            for key, size in victims:
+                try:
+                    os.remove(self.store.path_for(key))
+                except FileNotFoundError:
+                    pass
+                except OSError:
+                    files += 1
+                    total_bytes += size
+                    continue
+                removed.append((key, size))
+            conn.executemany('DELETE FROM entries WHERE key=?', [(key,) for key, _ in removed])
+            conn.commit()
+            victims = removed
+        conn.close()
+        return {
+            'ok': True,
+            'removed': len(victims),
+            'removed_bytes': sum(size for _, size in victims),
+            'files': files,
+            'bytes': total_bytes,
+        }
+
+
+class TTSCacheStore:
+    """Content-addressed MP3 cache laid out as `<cache_dir>/ab/cd/<key>.mp3`.
+
+    The single entry point for the TTS cache: `/api/tts`, the on-request cleanup,
+    `scripts/cleanup_storage.py` and the pre-warm job all resolve paths, write clips and
+    evict through it, so the layout and the manifest cannot drift apart. A cache still
+    in the old flat layout (`<cache_dir>/<key>.mp3`) is moved into place by `migrate`.
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.manifest = TTSCacheManifest(self)
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key[2:4], f'{key}.mp3')
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self.path_for(key))
+
+    def lock(self, key: str, timeout: float):
+        """Single-flight guard for generating `key` (see `SingleFlight.hold`)."""
+        return tts_single_flight.hold(key, self.cache_dir, timeout=timeout)
+
+    def generating(self, key: str) -> bool:
+        """True while some process holds the single-flight lock for `key`."""
+        return tts_single_flight.is_held(key, self.cache_dir)
+
+    @contextmanager
+    def writer(self, key: str):
+        """Yield a temp path to write the clip to; it is published (and recorded) on success."""
+        path = self.path_for(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = os.path.join(os.path.dirname(path), f'.{key}.{uuid.uuid4().hex}.tmp.mp3')
+        try:
+            yield tmp_path
+            os.replace(tmp_path, path)
+            self.manifest.record(key, os.path.getsize(path))
+        finally:
+            try:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def served(self, key: str) -> None:
+        self.manifest.touch(key)
+
+    def evict(self, **kwargs) -> dict:
+        return self.manifest.evict(**kwargs)
+
+    def totals(self) -> dict:
+        return self.manifest.totals()
+
+    @contextmanager
+    def scratch_manifest(self):
+        """Throwaway copy of the manifest for dry runs; nothing in the cache dir changes.
+
+        Starts from the live manifest when there is one (read-only), otherwise indexes
+        the directory without removing stale temp files.
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            scratch = TTSCacheManifest(self, path=os.path.join(tmp, _TTS_MANIFEST_NAME), prune_tmp=False)
+            if os.path.exists(self.manifest.path):
+                try:
+                    src = sqlite3.connect(f'file:{self.manifest.path}?mode=ro', uri=True, timeout=10)
+                    dst = sqlite3.connect(scratch.path)
+                    try:
+                        src.backup(dst)
+                    finally:
+                        dst.close()
+                        src.close()
+                except sqlite3.Error as e:
+                    print(f"WARNING: could not read TTS cache manifest; indexing the directory: {e}")
+                    os.remove(scratch.path)
+            yield scratch
+
+    def _scan_dir(self, path):
+        try:
+            return list(os.scandir(path))
+        except OSError:
+            return []
+
+    def iter_files(self, prune_tmp: bool = True):
+        """(key, path, stat) for every cached MP3 (either layout); stale temp files are removed
+        unless `prune_tmp` is False."""
+        now = time.time()
+        pending = [self.cache_dir]
+        while pending:
+            for ent in self._scan_dir(pending.pop()):
+                name = ent.name or ''
+                try:
+                    if ent.is_dir(follow_symlinks=False):
+                        if len(name) == 2 and not name.startswith('.'):
+                            pending.append(ent.path)
+                        continue
+                    if not ent.is_file():
+                        continue
+                    st = ent.stat()
+                except OSError:
+                    continue
+                if name.endswith('.tmp.mp3') or name.endswith('.tmp'):
+                    if prune_tmp and now - float(st.st_mtime or 0.0) >= _TTS_STALE_TMP_SEC:
+                        try:
+                            os.remove(ent.path)
+                        except OSError:
+                            pass
+                    continue
+                if name.endswith('.mp3') and not name.startswith('.'):
+                    yield name[:-4], ent.path, st
+
+    def migrate(self) -> dict:
+        """Move flat `<key>.mp3` files into the sharded layout (once; safe to re-run)."""
+        conn = self.manifest.connect()
+        done = conn.execute("SELECT 1 FROM meta WHERE key='layout' AND value='sharded'").fetchone()
+        conn.close()
+        if done:
+            return {'moved': 0}
+        moved = 0
+        for ent in self._scan_dir(self.cache_dir):
+            name = ent.name or ''
+            if not name.endswith('.mp3') or name.startswith('.') or name.endswith('.tmp.mp3'):
+                continue
+            key = name[:-4]
+            path = self.path_for(key)
+            try:
+                if not ent.is_file():
+                    continue
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(ent.path, path)
+                moved += 1
+            except OSError:
+                # Another worker may be migrating the same file.
+                continue
+        conn = self.manifest.connect()
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('layout', 'sharded')")
+        conn.commit()
+        conn.close()
+        return {'moved': moved}
+
+
+_TTS_STORES = {}
+_TTS_STORES_LOCK = threading.Lock()
+
+
+def get_tts_store(cache_dir: str) -> TTSCacheStore:
+    """Shared, migrated store per cache dir (so touches buffered by requests reach eviction)."""
+    key = os.path.abspath(cache_dir)
+    with _TTS_STORES_LOCK:
+        store = _TTS_STORES.get(key)
+        if store is None:
+            store = TTSCacheStore(key)
+            store.migrate()
+            _TTS_STORES[key] = store
+        return store
+
+
+_SENDFILE_MODES = {
+    'x-accel-redirect': 'x-accel-redirect',
+    'nginx': 'x-accel-redirect',
+    'x-sendfile': 'x-sendfile',
+    'apache': 'x-sendfile',
+}
+
+
+def send_cache_file(store, path: str, etag: str, mimetype: str = 'audio/mpeg', download_name: str = None):
+    """Response for a file under `store.cache_dir` with `etag` as its strong validator.
+
+    By default the worker sends the file itself (conditional GET and byte ranges come
+    from `send_file`). With `TTS_SENDFILE` set the response carries no body, only an
+    `X-Accel-Redirect` (nginx: `TTS_SENDFILE_PREFIX` must be an `internal` location
+    aliasing the cache dir) or `X-Sendfile` header, and the front proxy streams the
+    bytes and answers Range requests; revalidation (304) is still decided here.
+    """
+    mode = _SENDFILE_MODES.get(str(_config_value('TTS_SENDFILE', _TTS_SENDFILE) or '').strip().lower())
+    if not mode:
+        return send_file(path, mimetype=mimetype, conditional=True, etag=etag, download_name=download_name)
+
+    resp = current_app.response_class(mimetype=mimetype)
+    if mode == 'x-accel-redirect':
+        prefix = str(_config_value('TTS_SENDFILE_PREFIX', _TTS_SENDFILE_PREFIX)).rstrip('/')
+        rel = os.path.relpath(path, store.cache_dir).replace(os.sep, '/')
+        resp.headers['X-Accel-Redirect'] = f'{prefix}/{rel}'
+    else:
+        resp.headers['X-Sendfile'] = os.path.abspath(path)
+    if download_name:
+        resp.headers.set('Content-Disposition', 'inline', filename=download_name)
+    resp.set_etag(etag)
+    return resp.make_conditional(request)
+
+
+# ---------- TTS generation ----------
+_TTS_LANG_CODES = ('fr', 'es', 'en', 'bn')
+_FAKE_TTS_HEADER = b'ID3\x03\x00\x00\x00\x00\x00\x00'
+
+
+def tts_lang_code(lang_tag: str) -> Optional[str]:
+    """'fr-FR' / 'es_ES' / 'en' -> gTTS language code; None when unsupported."""
+    tag = (lang_tag or '').strip().lower().replace('_', '-')
+    return next((code for code in _TTS_LANG_CODES if tag.startswith(code)), None)
+
+
+def normalize_tts_text(text: str) -> str:
+    # Normalize whitespace to improve cache hit rate and avoid odd linebreak reads.
+    return ' '.join((text or '').split())
+
+
+def tts_cache_key(tts_lang: str, text: str, provider: str = 'gtts', voice: str = 'com') -> str:
+    """Cache key for a clip of `text` spoken by `provider` with `voice`.
+
+    gTTS with its default voice keeps the original key ('gtts|lang|text'), so caches
+    built before providers were pluggable stay valid; every other provider/voice gets
+    its own key and never serves audio generated by another engine.
+    """
+    norm_text = normalize_tts_text(text)
+    prefix = provider if (provider, voice) == ('gtts', 'com') else f'{provider}:{voice}'
+    return hashlib.sha256(f'{prefix}|{tts_lang}|{norm_text}'.encode('utf-8')).hexdigest()
+
+
+def tts_word_text(entry: dict) -> str:
+    """What the lesson page speaks for a vocab entry: the word with its article."""
+    word = entry.get('word') or ''
+    article = entry.get('article') or ''
+    if not article:
+        return word
+    return article + ('' if article.endswith("'") else ' ') + word
+
+
+class TTSError(RuntimeError):
+    """A TTS provider could not produce a clip."""
+
+
+class TTSProvider:
+    """One speech engine. Subclasses implement `_synthesize` (write an MP3 to a path).
+
+    `synthesize` adds the shared policy: at most `timeout` seconds per attempt (enforced
+    by the engine call itself) and `retries` extra attempts with a short backoff.
+    """
+
+    name = ''
+
+    def __init__(self, timeout: float = 10.0, retries: int = 1, backoff: float = 0.5):
+        self.timeout = float(timeout)
+        self.retries = max(0, int(retries))
+        self.backoff = float(backoff)
+
+    def available(self) -> bool:
+        return True
+
+    def voice(self, tts_lang: str) -> str:
+        return 'default'
+
+    def cache_key(self, tts_lang: str, text: str) -> str:
+        return tts_cache_key(tts_lang, text, provider=self.name, voice=self.voice(tts_lang))
+
+    def synthesize(self, text: str, tts_lang: str, out_path: str) -> None:
+        for attempt in range(self.retries + 1):
+            try:
+                return self._synthesize(text, tts_lang, out_path)
+            except Exception as exc:
+                if attempt >= self.retries:
+                    raise TTSError(f'{self.name}: {exc}') from exc
+                time.sleep(self.backoff * (2 ** attempt))
+
+    def _synthesize(self, text: str, tts_lang: str, out_path: str) -> None:
+        raise NotImplementedError
+
+
+class GTTSProvider(TTSProvider):
+    """Google Translate TTS via gTTS (needs outbound internet)."""
+
+    name = 'gtts'
+
+    def available(self) -> bool:
+        try:
+            import gtts  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def voice(self, tts_lang: str) -> str:
+        # gTTS can vary slightly by top-level domain (accent/voice). Allow override per language.
+        tld_default = (os.environ.get('GTTS_TLD') or 'com').strip() or 'com'
+        return (os.environ.get(f'GTTS_TLD_{tts_lang.upper()}') or tld_default).strip() or tld_default
+
+    def _synthesize(self, text, tts_lang, out_path):
+        try:
+            from gtts import gTTS
+        except ImportError as exc:
+            raise RuntimeError("Missing dependency: gTTS. Run: pip install -r requirements.txt") from exc
+        gTTS(text=text, lang=tts_lang, slow=False, tld=self.voice(tts_lang), timeout=self.timeout).save(out_path)
+
+
+class EspeakProvider(TTSProvider):
+    """Offline engine: espeak-ng renders WAV, ffmpeg encodes it to MP3.
+
+    Needs the `espeak-ng` (or `espeak`) and `ffmpeg` binaries on PATH; voices can be
+    overridden per language with `ESPEAK_VOICE_FR` etc.
+    """
+
+    name = 'espeak'
+
+    def _binaries(self):
+        return shutil.which('espeak-ng') or shutil.which('espeak'), shutil.which('ffmpeg')
+
+    def available(self) -> bool:
+        return all(self._binaries())
+
+    def voice(self, tts_lang: str) -> str:
+        return (os.environ.get(f'ESPEAK_VOICE_{tts_lang.upper()}') or tts_lang).strip() or tts_lang
+
+    def _synthesize(self, text, tts_lang, out_path):
+        import subprocess
+
+        espeak, ffmpeg = self._binaries()
+        if not (espeak and ffmpeg):
+            raise RuntimeError('espeak-ng and ffmpeg must be installed for the espeak provider')
+        wav = subprocess.run(
+            [espeak, '-v', self.voice(tts_lang), '--stdin', '--stdout'],
+            input=text.encode('utf-8'), capture_output=True, timeout=self.timeout, check=True,
+        ).stdout
+        subprocess.run(
+            [ffmpeg, '-nostdin', '-loglevel', 'error', '-y', '-f', 'wav', '-i', 'pipe:0',
+             '-codec:a', 'libmp3lame', '-q:a', '6', '-f', 'mp3', out_path],
+            input=wav, capture_output=True, timeout=self.timeout, check=True,
+        )
+
+
+class FakeTTSProvider(TTSProvider):
+    """Deterministic offline stand-in (tests, local pre-warm dry runs): a tiny tagged file.
+
+    `delay` simulates a slow engine and `fail` a broken one.
+    """
+
+    name = 'fake'
+
+    def __init__(self, *args, delay: float = 0.0, fail: bool = False, voice: str = 'fake', **kwargs):
+        super().__init__(*args, **kwargs)
+        self.delay = float(delay)
+        self.fail = fail
+        self._voice = voice
+        self.calls = 0
+
+    def voice(self, tts_lang: str) -> str:
+        return self._voice
+
+    def _synthesize(self, text, tts_lang, out_path):
+        self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError('fake provider failure')
+        with open(out_path, 'wb') as f:
+            f.write(_FAKE_TTS_HEADER + f'{self._voice}|{tts_lang}|{text}'.encode('utf-8'))
+
+
+TTS_PROVIDERS = {
+    'gtts': GTTSProvider,
+    'espeak': EspeakProvider,
+    'fake': FakeTTSProvider,
+}
+_TTS_PROVIDER_ALIASES = {'auto': 'gtts,espeak'}
+
+
+def tts_provider_chain(spec: str = None, timeout: float = None, retries: int = None) -> list:
+    """Providers for a `TTS_PROVIDER` value, in fallback order ('gtts', 'gtts,espeak', 'auto', ...).
+
+    Unknown names are ignored; providers that are not installed are dropped unless
+    nothing else is left (so the error still names the missing dependency).
+    """
+    spec = (spec or _config_value('TTS_PROVIDER', _TTS_PROVIDER) or '').strip().lower()
+    spec = _TTS_PROVIDER_ALIASES.get(spec, spec)
+    kwargs = {
+        'timeout': timeout if timeout is not None else _env_float('TTS_PROVIDER_TIMEOUT_SEC', 10.0),
+        'retries': retries if retries is not None else int(_env_float('TTS_PROVIDER_RETRIES', 1)),
+    }
+    chain = [TTS_PROVIDERS[name](**kwargs) for name in spec.replace(' ', '').split(',') if name in TTS_PROVIDERS]
+    return [p for p in chain if p.available()] or chain[:1]
+
+
+def _generate_tts_clip(store, provider, key, tts_lang, text, lock_timeout) -> bool:
+    """Make sure `key` is cached, generating it with `provider` under the single-flight lock."""
+    with store.lock(key, timeout=lock_timeout) as acquired:
+        if not acquired:
+            raise TimeoutError(f'{provider.name}: clip is being generated elsewhere')
+        if not store.exists(key):
+            with store.writer(key) as tmp_path:
+                provider.synthesize(text, tts_lang, tmp_path)
+    return True
+
+
+def synthesize_tts(store, chain, tts_lang: str, text: str, hedge_after: float = 3.0, wait: float = 20.0):
+    """Return (provider, key) of a cached clip for `text`, generating it if needed.
+
+    Tries the providers in order. When one fails, the next starts at once; when one is
+    merely slow (no result after `hedge_after` seconds) the next starts as a hedge and
+    whichever finishes first is served. A fallback clip that is already cached is used
+    without calling its engine. Requests that lose the race keep running in the
+    background, so the preferred provider's clip still lands in the cache for next time.
+
+    Raises TimeoutError when nothing finished within `wait` seconds and TTSError when
+    every provider failed.
+    """
+    from concurrent.futures import FIRST_COMPLETED, Future, wait as wait_futures
+
+    keyed = [(provider, provider.cache_key(tts_lang, text)) for provider in chain]
+    if not keyed:
+        raise TTSError('No TTS provider configured')
+    if store.exists(keyed[0][1]):
+        return keyed[0]
+
+    deadline = time.monotonic() + max(0.0, wait)
+    running = {}
+    errors = []
+
+    def _start(provider, key):
+        future = Future()
+
+        def _run():
+            try:
+                future.set_result(_generate_tts_clip(store, provider, key, tts_lang, text, wait))
+            except BaseException as exc:
+                future.set_exception(exc)
+
+        threading.Thread(target=_run, name=f'tts-{provider.name}', daemon=True).start()
+        running[future] = (provider, key)
+
+    def _winner(timeout):
+        end = time.monotonic() + max(0.0, timeout)
+        while True:
+            pending = [f for f in running if not f.done()]
+            for future in [f for f in running if f.done()]:
+                provider, key = running.pop(future)
+                if future.exception() is None:
+                    return provider, key
+                errors.append(str(future.exception()))
+            remaining = end - time.monotonic()
+            if not pending or remaining <= 0:
+                return None
+            wait_futures(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+
+    for n, (provider, key) in enumerate(keyed):
+        if n and store.exists(key):
+            return provider, key
+        _start(provider, key)
+        is_last = n == len(keyed) - 1
+        window = deadline - time.monotonic()
+        winner = _winner(window if is_last else min(hedge_after, window))
+        if winner:
+            return winner
+        if time.monotonic() >= deadline:
+            break
+    if running:
+        raise TimeoutError('TTS providers did not finish in time')
+    raise TTSError('; '.join(errors) or 'TTS generation failed')
+
+
+_TTS_QUEUE_LATENCY_SAMPLES = 512
+_TTS_QUEUE_RECENT_JOBS = 1024
+
+
+class TTSGenerationQueue:
+    """Bounded background queue for TTS cache misses, so requests do not wait on the engine.
+
+    `submit` enqueues a clip (or joins the job already queued for the same key) and
+    returns the job; when `max_depth` jobs are waiting it returns None and the caller
+    should answer 503. Worker threads run `synthesize_tts` and keep the outcome of recent
+    jobs, so a client polling the status URL (or retrying `/api/tts`) sees `done` and the
+    key that was cached (a fallback provider's key when the primary lost the race).
+    Workers start lazily in each process.
+    """
+
+    def __init__(self, workers: int = 2, max_depth: int = 64):
+        self.workers = workers
+        self.max_depth = max_depth
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._pending = deque()
+        self._jobs = OrderedDict()
+        self._threads = []
+        self._pid = None
+        self.running = 0
+        self.submitted = 0
+        self.joined = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+        self.wait_ms = deque(maxlen=_TTS_QUEUE_LATENCY_SAMPLES)
+        self.generate_ms = deque(maxlen=_TTS_QUEUE_LATENCY_SAMPLES)
+
+    def submit(self, store, chain, tts_lang: str, text: str, key: str, hedge_after: float = 3.0, wait: float = 20.0):
+        """The job for `key` ({'status', 'event', ...}), or None when the queue is full."""
+        with self._lock:
+            job = self._jobs.get(key)
+            if job and job['status'] in ('queued', 'running'):
+                self.joined += 1
+                return job
+            if len(self._pending) >= self.max_depth:
+                self.rejected += 1
+                return None
+            job = {
+                'key': key, 'status': 'queued', 'event': threading.Event(), 'queued_at': time.monotonic(),
+                'args': (store, list(chain), tts_lang, text, hedge_after, wait),
+                'provider': None, 'result_key': None, 'error': None,
+            }
+            self._jobs[key] = job
+            self._jobs.move_to_end(key)
+            while len(self._jobs) > _TTS_QUEUE_RECENT_JOBS:
+                oldest = next(iter(self._jobs))
+                if self._jobs[oldest]['status'] in ('queued', 'running'):
+                    break
+                self._jobs.popitem(last=False)
+            self._pending.append(job)
+            self.submitted += 1
+            self._ensure_workers()
+            self._cond.notify()
+        return job
+
+    def job(self, key: str):
+        with self._lock:
+            return self._jobs.get(key)
+
+    def position(self, job) -> int:
+        """1-based place of a queued job in the line (0 once it is running or finished)."""
+        with self._lock:
+            for n, pending in enumerate(self._pending, 1):
+                if pending is job:
+                    return n
+        return 0
+
+    def metrics(self) -> dict:
+        with self._lock:
+            waits = sorted(self.wait_ms)
+            gens = sorted(self.generate_ms)
+            depth = len(self._pending)
+            workers = sum(1 for t in self._threads if t.is_alive()) if self._pid == os.getpid() else 0
+
+        def _pct(samples, q):
+            return round(samples[min(len(samples) - 1, int(q * len(samples)))], 3) if samples else None
+
+        return {
+            'workers': workers,
+            'depth': depth,
+            'max_depth': self.max_depth,
+            'running': self.running,
+            'submitted': self.submitted,
+            'joined': self.joined,
+            'rejected': self.rejected,
+            'completed': self.completed,
+            'failed': self.failed,
+            'wait_ms': {'p50': _pct(waits, 0.5), 'p99': _pct(waits, 0.99)},
+            'generate_ms': {'p50': _pct(gens, 0.5), 'p99': _pct(gens, 0.99), 'max': round(gens[-1], 3) if gens else None},
+        }
+
+    # ----- worker side -----
+    def _ensure_workers(self):
+        # Called with the lock held. Threads do not survive a fork: start them per process.
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._threads = []
+        self._threads = [t for t in self._threads if t.is_alive()]
+        while len(self._threads) < max(1, self.workers):
+            thread = threading.Thread(target=self._run, name=f'tts-queue-{len(self._threads)}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                job = self._pending.popleft()
+                job['status'] = 'running'
+                self.running += 1
+            started = time.monotonic()
+            store, chain, tts_lang, text, hedge_after, wait = job['args']
+            try:
+                provider, key = synthesize_tts(store, chain, tts_lang, text, hedge_after=hedge_after, wait=wait)
+                outcome = {'status': 'done', 'provider': provider.name, 'result_key': key}
+            except TimeoutError as exc:
+                outcome = {'status': 'failed', 'error': f'timeout: {exc}'}
+            except Exception as exc:
+                outcome = {'status': 'failed', 'error': str(exc)}
+            finished = time.monotonic()
+            with self._lock:
+                job.update(outcome)
+                job['args'] = None
+                self.running -= 1
+                self.wait_ms.append((started - job['queued_at']) * 1000.0)
+                self.generate_ms.append((finished - started) * 1000.0)
+                if outcome['status'] == 'done':
+                    self.completed += 1
+                else:
+                    self.failed += 1
+            job['event'].set()
+
+
+tts_generation_queue = TTSGenerationQueue(
+    workers=max(1, int(_env_float('TTS_QUEUE_WORKERS', 2))),
+    max_depth=max(1, int(_env_float('TTS_QUEUE_MAX', 64))),
+)
+
+
+_TTS_CLIP_KINDS = ('word', 'article', 'example')
+
+
+def lesson_tts_clips(lang: str, lesson: dict, kinds=_TTS_CLIP_KINDS, provider=None) -> list:
+    """Clips the app speaks for a lesson's vocabulary, in lesson order (one per cache key).
+
+    Each clip is {key, lang, text, kind, word}: `word` is the bare word, `article` the word
+    with its article (lesson page), `example` the example sentence. Keys are `provider`'s
+    (default: gTTS with its default voice).
+    """
+    tts_lang = tts_lang_code(_tts_lang_tag(lang))
+    clips = []
+    seen = set()
+    for entry in get_lesson_vocab(lang, lesson):
+        texts = {
+            'word': entry.get('word'),
+            'article': tts_word_text(entry) if entry.get('article') else None,
+            'example': entry.get('example'),
+        }
+        for kind in kinds:
+            text = normalize_tts_text(texts.get(kind) or '')
+            if not text or len(text) > 400:
+                continue
+            key = provider.cache_key(tts_lang, text) if provider else tts_cache_key(tts_lang, text)
+            if key not in seen:
+                seen.add(key)
+                clips.append({'key': key, 'lang': tts_lang, 'text': text, 'kind': kind, 'word': entry.get('word')})
+    return clips
+
+
+def tts_prewarm_items(langs=None, kinds=_TTS_CLIP_KINDS, provider=None):
+    """[(cache_key, tts_lang, text)] for every lesson word, word with article and example.
+
+    Keys are de-duplicated across lessons; the order follows the lessons so an
+    interrupted run has already warmed the earliest lessons.
+    """
+    lessons_by_lang = get_lessons()
+    items = []
+    seen = set()
+    for lang in (langs or list(LANG_META)):
+        for lesson in _sorted_lessons(lessons_by_lang.get(lang, [])):
+            for clip in lesson_tts_clips(lang, lesson, kinds=kinds, provider=provider):
+                if clip['key'] not in seen:
+                    seen.add(clip['key'])
+                    items.append((clip['key'], clip['lang'], clip['text']))
+    return items
+
+
+_AUDIO_BUNDLE_FORMATS = ('zip', 'mp3')
+
+
+def lesson_audio_bundle(store, lang: str, lesson: dict, fmt: str = 'zip', chain=None) -> dict:
+    """Build (or reuse) one archive with every cached clip of a lesson.
+
+    `zip` stores `<key>.mp3` members plus `index.json`; `mp3` concatenates the clips and
+    the index gives each clip's byte offset and length. Bundles live under
+    `<cache_dir>/bundles/` and are named after a digest of the content version, the
+    lesson and the clips currently cached, so warming more clips (or a content change)
+    produces a new bundle while repeat requests reuse the file. Clips that are not cached
+    yet are listed under `missing` for the client to fetch from `/api/tts`.
+
+    With a provider `chain`, each clip comes from the first provider that has it cached
+    (the same preference `/api/tts` applies).
+
+    Returns {'path', 'bundle_id', 'index'}.
+    """
+    lesson_id = int(lesson['id'])
+    chain = list(chain or [None])
+    present, missing = [], []
+    for clip in lesson_tts_clips(lang, lesson, provider=chain[0]):
+        for provider in chain:
+            key = provider.cache_key(clip['lang'], clip['text']) if provider else clip['key']
+            if store.exists(key):
+                present.append({**clip, 'key': key})
+                break
+        else:
+            missing.append(clip)
+    version = get_content_version()
+    bundle_id = hashlib.sha1(
+        f"{version}|{lang}|{lesson_id}|{fmt}|{','.join(c['key'] for c in present)}".encode('utf-8')
+    ).hexdigest()[:24]
+
+    bundle_dir = os.path.join(store.cache_dir, 'bundles')
+    prefix = f'{lang}-{lesson_id}-{fmt}-'
+    path = os.path.join(bundle_dir, f'{prefix}{bundle_id}.{fmt}')
+    index_path = f'{path}.json'
+
+    if not (os.path.exists(path) and os.path.exists(index_path)):
+        os.makedirs(bundle_dir, exist_ok=True)
+        with store.lock(f'bundle-{bundle_id}', timeout=60) as acquired:
+            if not acquired:
+                raise TimeoutError('audio bundle is being built')
+            if not (os.path.exists(path) and os.path.exists(index_path)):
+                _write_audio_bundle(store, path, index_path, fmt, present, {
+                    'language': lang,
+                    'lesson_id': lesson_id,
+                    'content_version': version,
+                    'bundle_id': bundle_id,
+                    'format': fmt,
+                    'missing': missing,
+                })
+                for ent in os.scandir(bundle_dir):
+                    if ent.name.startswith(prefix) and bundle_id not in ent.name:
+                        try:
+                            os.remove(ent.path)
+                        except OSError:
+                            pass
+
+    for clip in present:
+        store.served(clip['key'])
+    with open(index_path, 'r', encoding='utf-8') as f:
+        index = json.load(f)
+    return {'path': path, 'bundle_id': bundle_id, 'index': index}
+
+
+def _write_audio_bundle(store, path, index_path, fmt, clips, header):
+    entries = []
+    tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+    try:
+        if fmt == 'zip':
+            with zipfile.ZipFile(tmp_path, 'w', compression=zipfile.ZIP_STORED) as zf:
+                for clip in clips:
+                    try:
+                        zf.write(store.path_for(clip['key']), f"{clip['key']}.mp3")
+                    except OSError:
+                        continue  # evicted since the availability check
+                    entries.append({**clip, 'file': f"{clip['key']}.mp3"})
+                index = {**header, 'clips': entries}
+                zf.writestr('index.json', json.dumps(index, ensure_ascii=False))
+        else:
+            offset = 0
+            with open(tmp_path, 'wb') as out:
+                for clip in clips:
+                    try:
+                        with open(store.path_for(clip['key']), 'rb') as f:
+                            data = f.read()
+                    except OSError:
+                        continue
+                    out.write(data)
+                    entries.append({**clip, 'offset': offset, 'length': len(data)})
+                    offset += len(data)
+            index = {**header, 'clips': entries}
+        with open(f'{index_path}.tmp', 'w', encoding='utf-8') as f:
+            json.dump(index, f, ensure_ascii=False)
+        os.replace(f'{index_path}.tmp', index_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+class _RateLimiter:
+    """Spaces calls at least 1/rate seconds apart across threads (rate <= 0: unlimited)."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next = time.monotonic()
+
+    def wait(self) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+# Typical gTTS clip size, used to size the cache before anything has been generated.
+_TTS_TYPICAL_CLIP_BYTES = 12 * 1024
+
+
+def tts_prewarm_capacity(store, items, max_files: int, max_bytes: int) -> dict:
+    """Would the cache hold `items` next to what it already holds, under these caps?
+
+    Clips are evicted least recently served first, so a warmed set that does not fit is
+    deleted by the next cleanup before anyone asks for it. Sizes of clips not generated
+    yet are estimated from the cache's current average. A cap of 0 means no cap.
+    """
+    totals = store.totals()
+    missing = sum(1 for key, _, __ in items if not store.exists(key))
+    avg = totals['bytes'] / totals['files'] if totals['files'] else _TTS_TYPICAL_CLIP_BYTES
+    files = totals['files'] + missing
+    size = int(totals['bytes'] + missing * avg)
+    return {
+        'missing': missing,
+        'files': files,
+        'bytes': size,
+        'fits': (not max_files or files <= max_files) and (not max_bytes or size <= max_bytes),
+    }
+
+
+def prewarm_tts_cache(store, items, synthesize, workers: int = 4, rate: float = 2.0, retries: int = 2,
+                      lock_timeout: float = 30.0, progress=None, stop=None) -> dict:
+    """Generate every missing clip in `items` into `store`.
+
+    Up to `workers` threads generate at once, never more than `rate` provider calls per
+    second in total. Clips already cached are skipped, so an interrupted run resumes where
+    it left off; each generation takes the same single-flight lock as `/api/tts`, so live
+    requests and the job never fetch the same clip twice. `progress(stats)` is called after
+    every item; setting the `stop` event ends the run after the clips in flight.
+    """
+    stats = {'total': len(items), 'done': 0, 'cached': 0, 'generated': 0, 'failed': 0, 'bytes': 0}
+    stats_lock = threading.Lock()
+    limiter = _RateLimiter(rate)
+    pending = deque(items)
+    stop = stop or threading.Event()
+    failures = []
+
+    def _finish(outcome, size=0, error=None, item=None):
+        with stats_lock:
+            stats['done'] += 1
+            stats[outcome] += 1
+            stats['bytes'] += size
+            if error is not None:
+                failures.append({'key': item[0], 'lang': item[1], 'text': item[2], 'error': error})
+            snapshot = dict(stats)
+        if progress:
+            progress(snapshot)
+
+    def _generate(item):
+        key, tts_lang, text = item
+        if store.exists(key):
+            return _finish('cached')
+        with store.lock(key, timeout=lock_timeout) as acquired:
+            if not acquired:
+                return _finish('failed', error='lock timeout', item=item)
+            if store.exists(key):
+                return _finish('cached')
+            error = None
+            for attempt in range(max(0, retries) + 1):
+                if stop.is_set():
+                    return _finish('failed', error='stopped', item=item)
+                limiter.wait()
+                try:
+                    with store.writer(key) as tmp_path:
+                        synthesize(text, tts_lang, tmp_path)
+                    return _finish('generated', size=os.path.getsize(store.path_for(key)))
+                except Exception as exc:
+                    error = str(exc) or exc.__class__.__name__
+                    if attempt < retries:
+                        time.sleep(min(30.0, 0.5 * (2 ** attempt)))
+            return _finish('failed', error=error, item=item)
+
+    def _worker():
+        while not stop.is_set():
+            try:
+                item = pending.popleft()
+            except IndexError:
+                return
+            _generate(item)
+
+    threads = [threading.Thread(target=_worker, name=f'tts-prewarm-{n}', daemon=True)
+               for n in range(max(1, int(workers)))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    stats['remaining'] = len(pending)
+    stats['failures'] = failures
+    return stats
+
+
+# ---------- Lesson PDF cache ----------
+# Bump when a renderer changes its output for the same inputs (layout, styles, templates in code).
+_PDF_CACHE_FORMAT = 2
+_PDF_FILE_DIGESTS = {}
+_PDF_FILE_DIGESTS_LOCK = threading.Lock()
+
+
+def _file_digest(path: str) -> str:
+    """sha256 of a file, remembered per (path, mtime, size) so fonts are hashed once."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return 'missing'
+    stamp = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+    with _PDF_FILE_DIGESTS_LOCK:
+        digest = _PDF_FILE_DIGESTS.get(stamp)
+    if digest is None:
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+        digest = h.hexdigest()
+        with _PDF_FILE_DIGESTS_LOCK:
+            _PDF_FILE_DIGESTS[stamp] = digest
+    return digest
+
+
+def _lesson_pdf_assets(engine: str) -> list:
+    if engine == 'reportlab':
+        return [_config_path('PDF_FONT_PATH'), _config_path('PDF_FONT_BOLD_PATH'), _logo_file_path()]
+    return [
+        _config_path('PDF_HTML_BN_FONT_REG_PATH'),
+        _config_path('PDF_HTML_BN_FONT_BOLD_PATH'),
+        _logo_file_path(),
+        os.path.join(_config_path('TEMPLATE_DIR'), 'lesson_pdf.html'),
+    ]
+
+
+def lesson_pdf_cache_key(engine: str, lang: str, lesson: dict, vocabulary: list, grammar: Optional[dict]) -> str:
+    """Hash of everything a lesson PDF depends on: the lesson, its vocabulary slice and
+    grammar, the engine, its fonts, logo and template, and the footer year."""
+    payload = {
+        'format': _PDF_CACHE_FORMAT,
+        'engine': engine,
+        'lang': lang,
+        'meta': LANG_META.get(lang),
+        'lesson': lesson,
+        'vocabulary': vocabulary,
+        'grammar': grammar,
+        'year': _app_now().year,
+        'assets': [_file_digest(path) for path in _lesson_pdf_assets(engine)],
+    }
+    blob = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(blob.encode('utf-8')).hexdigest()
+
+
+class LessonPdfCache:
+    """Rendered lesson PDFs on disk as `<cache_dir>/ab/<key>.pdf`, bounded by `max_bytes`.
+
+    Serving a file bumps its mtime, and eviction removes the least recently served
+    files first; with a few hundred PDFs a directory scan per write is cheap.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = 200 * 1024 * 1024):
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.max_bytes = max_bytes
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f'{key}.pdf')
+
+    def get(self, key: str) -> Optional[str]:
+        path = self.path_for(key)
+        try:
+            os.utime(path)
+        except OSError:
+            return None
+        return path
+
+    def put(self, key: str, data: bytes) -> str:
+        def _write(tmp_path):
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+
+        return self.put_file(key, _write)
+
+    def put_file(self, key: str, write) -> str:
+        """Store the file `write(tmp_path)` produces under `key` (atomically)."""
+        path = self.path_for(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        try:
+            write(tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self.evict(keep={key})
+        return path
+
+    def files(self) -> list:
+        """[(mtime, size, path)] of cached PDFs."""
+        out = []
+        if not os.path.isdir(self.cache_dir):
+            return out
+        for shard in os.scandir(self.cache_dir):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith('.pdf'):
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    out.append((st.st_mtime, st.st_size, entry.path))
+        return out
+
+    def evict(self, keep=()) -> int:
+        files = sorted(self.files())
+        total = sum(size for _, size, __ in files)
+        keep_paths = {self.path_for(key) for key in keep}
+        removed = 0
+        for _, size, path in files:
+            if total <= self.max_bytes:
+                break
+            if path in keep_paths:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
+
+
+def get_lesson_pdf_cache() -> LessonPdfCache:
+    max_mb = max(1.0, _env_float('PDF_CACHE_MAX_MB', 200))
+    return LessonPdfCache(_config_path('PDF_CACHE_DIR'), max_bytes=int(max_mb * 1024 * 1024))
+
+
+class RenderQueueFull(RuntimeError):
+    """No PDF render slot is free and the wait queue is full (or the wait timed out)."""
+
+    def __init__(self, message: str, retry_after: int = 5):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+_PDF_RENDER_LATENCY_SAMPLES = 256
+_PDF_RENDER_SLOT_POLL_SEC = 0.1
+_PDF_WORKER_APPS = {}
+
+
+def _reportlab_pdf_in_worker(config: dict, lang: str, meta: dict, lesson: dict, vocabulary: list, grammar):
+    """ReportLab render inside a pool process, with the parent's font and logo paths."""
+    key = tuple(sorted(config.items()))
+    app = _PDF_WORKER_APPS.get(key)
+    if app is None:
+        app = _PDF_WORKER_APPS[key] = Flask(__name__)
+        app.config.update(config)
+    with app.app_context():
+        return _build_lesson_pdf_bytes_reportlab(lang, meta, lesson, vocabulary, grammar)
+
+
+class PdfRenderQueue:
+    """Admission control for lesson PDF renders (cache misses only).
+
+    At most `concurrency` renders run at once; up to `max_waiting` more wait for a slot
+    (at most `wait_sec` each) and anything beyond that is refused with `RenderQueueFull`
+    so the route can answer 503 instead of piling work onto the CPUs. Given a `lock_dir`
+    (the PDF cache dir), the `concurrency` cap is shared by every web worker process
+    using that directory: a render also holds one of `concurrency` `flock`ed slot files
+    under `<lock_dir>/.render-slots/`. `max_waiting` stays per process.
+
+    Chromium renders go to the shared browser pool; ReportLab renders run in a process
+    pool of `processes` workers (0 = in the calling thread, at most `concurrency`) so they
+    do not hold the GIL of the web worker. Each web worker starts its own pool on its first
+    ReportLab render. A render that times out while the renderer is still working on it
+    (`PdfRenderTimeout.running`) keeps its slot until the renderer is done.
+    """
+
+    def __init__(self, concurrency: int = 2, max_waiting: int = 8, wait_sec: float = 20.0, processes: int = 2):
+        self.concurrency = concurrency
+        self.max_waiting = max_waiting
+        self.wait_sec = wait_sec
+        self.processes = min(processes, concurrency)
+        self._cond = threading.Condition()
+        self._executor = None
+        self._executor_pid = None
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.wait_ms = deque(maxlen=_PDF_RENDER_LATENCY_SAMPLES)
+        self.render_ms = deque(maxlen=_PDF_RENDER_LATENCY_SAMPLES)
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely free: the median render time per queued render."""
+        samples = sorted(self.render_ms)
+        median_sec = (samples[len(samples) // 2] / 1000.0) if samples else 2.0
+        return max(1, min(60, math.ceil(median_sec * (self.waiting + 1) / max(1, self.concurrency))))
+
+    def _host_slot(self, lock_dir: str, deadline: float):
+        """fd holding one of the host-wide render slots, or None if there is none to take."""
+        if _fcntl is None or not lock_dir:
+            return None
+        slot_dir = os.path.join(lock_dir, '.render-slots')
+        os.makedirs(slot_dir, exist_ok=True)
+        while True:
+            for i in range(self.concurrency):
+                fd = os.open(os.path.join(slot_dir, f'{i:02d}.lock'), os.O_RDWR | os.O_CREAT, 0o644)
+                try:
+                    _fcntl.flock(fd, _fcntl.LOCK_EX | _fcntl.LOCK_NB)
+                    return fd
+                except OSError:
+                    os.close(fd)
+            if time.monotonic() >= deadline:
+                raise RenderQueueFull('The PDF renderer is busy; try again shortly.', self.retry_after())
+            time.sleep(_PDF_RENDER_SLOT_POLL_SEC)
+
+    @contextmanager
+    def slot(self, lock_dir: str = None):
+        queued_at = time.monotonic()
+        with self._cond:
+            if self.active >= self.concurrency:
+                if self.waiting >= self.max_waiting:
+                    self.rejected += 1
+                    raise RenderQueueFull('The PDF renderer is busy; try again shortly.', self.retry_after())
+                self.waiting += 1
+                try:
+                    admitted = self._cond.wait_for(lambda: self.active < self.concurrency, timeout=self.wait_sec)
+                finally:
+                    self.waiting -= 1
+                if not admitted:
+                    self.timeouts += 1
+                    raise RenderQueueFull('The PDF renderer is busy; try again shortly.', self.retry_after())
+            self.active += 1
+        try:
+            fd = self._host_slot(lock_dir, queued_at + self.wait_sec)
+        except BaseException:
+            with self._cond:
+                self.active -= 1
+                self.timeouts += 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self.admitted += 1
+            self.wait_ms.append((time.monotonic() - queued_at) * 1000.0)
+        started = time.monotonic()
+
+        def _release(_=None):
+            if fd is not None:
+                _fcntl.flock(fd, _fcntl.LOCK_UN)
+                os.close(fd)
+            with self._cond:
+                self.active -= 1
+                self.render_ms.append((time.monotonic() - started) * 1000.0)
+                self._cond.notify()
+
+        try:
+            yield
+        except BaseException as exc:
+            running = getattr(exc, 'running', None)
+            if running is not None:
+                # The renderer is still busy on this job: keep the slot until it finishes.
+                running.add_done_callback(_release)
+            else:
+                _release()
+            raise
+        _release()
+
+    def saturated(self) -> bool:
+        with self._cond:
+            return self.active >= self.concurrency and self.waiting >= self.max_waiting
+
+    def render_reportlab(self, lang: str, meta: dict, lesson: dict, vocabulary: list, grammar) -> bytes:
+        if self.processes <= 0:
+            return _build_lesson_pdf_bytes_reportlab(lang, meta, lesson, vocabulary, grammar)
+        from concurrent.futures.process import BrokenProcessPool
+
+        config = {
+            name: _config_path(name) for name in ('PDF_FONT_PATH', 'PDF_FONT_BOLD_PATH', 'LOGO_DIR')
+        }
+        try:
+            return self._pool().submit(
+                _reportlab_pdf_in_worker, config, lang, meta, lesson, vocabulary, grammar,
+            ).result()
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory): start a fresh pool for the next render.
+            with self._cond:
+                self._executor = None
+            raise
+
+    def _pool(self):
+        with self._cond:
+            if self._executor is None or self._executor_pid != os.getpid():
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+
+                self._executor = ProcessPoolExecutor(
+                    max_workers=max(1, self.processes), mp_context=multiprocessing.get_context('spawn'),
+                )
+                self._executor_pid = os.getpid()
+            return self._executor
+
+    def metrics(self) -> dict:
+        with self._cond:
+            waits = sorted(self.wait_ms)
+            renders = sorted(self.render_ms)
+
+        def _pct(samples, q):
+            return round(samples[min(len(samples) - 1, int(q * len(samples)))], 3) if samples else None
+
+        return {
+            'concurrency': self.concurrency,
+            'max_waiting': self.max_waiting,
+            'processes': self.processes,
+            'active': self.active,
+            'waiting': self.waiting,
+            'admitted': self.admitted,
+            'rejected': self.rejected,
+            'timeouts': self.timeouts,
+            'wait_ms': {'p50': _pct(waits, 0.5), 'p99': _pct(waits, 0.99)},
+            'render_ms': {'p50': _pct(renders, 0.5), 'p99': _pct(renders, 0.99)},
+        }
+
+
+_PDF_RENDER_CONCURRENCY = max(1, int(_env_float('PDF_RENDER_CONCURRENCY', 2)))
+pdf_render_queue = PdfRenderQueue(
+    concurrency=_PDF_RENDER_CONCURRENCY,
+    max_waiting=max(0, int(_env_float('PDF_RENDER_QUEUE_MAX', 8))),
+    wait_sec=max(1.0, _env_float('PDF_RENDER_QUEUE_WAIT_SEC', 20)),
+    processes=max(0, int(_env_float('PDF_RENDER_PROCESSES', _PDF_RENDER_CONCURRENCY))),
+)
+# PDF renders single-flight on their own locks, apart from TTS generation.
+pdf_single_flight = SingleFlight()
+
+
+def _is_missing_chromium(exc: Exception) -> bool:
+    lower = (str(exc) or type(exc).__name__).lower()
+    return ('playwright' in lower) or ('chromium' in lower) or ('browser is not installed' in lower)
+
+
+def lesson_pdf_html(lang: str, lesson: dict, vocabulary: list, grammar: Optional[dict]) -> tuple:
+    """(html, header_html, footer_html) for a course lesson, rendered once per content version.
+
+    Also keyed by the footer year and the template and logo files. Fonts are linked,
+    not inlined, so the cached HTML stays small (see `_lesson_pdf_asset_files`).
+    """
+    meta = LANG_META[lang]
+    extra_key = '|'.join([
+        str(_app_now().year),
+        _file_digest(os.path.join(_config_path('TEMPLATE_DIR'), 'lesson_pdf.html')),
+        _file_digest(_logo_file_path()),
+    ])
+
+    def _build():
+        html = _render_lesson_pdf_html(lang, meta, lesson, vocabulary, grammar)
+        return (html,) + _lesson_pdf_header_footer(lang, meta, lesson)
+
+    return _content_derived(f"lesson_pdf_html/{lang}/{lesson.get('id')}", _build, extra_key=extra_key)
+
+
+def _render_lesson_pdf_bytes(engine: str, lang: str, lesson: dict, vocabulary: list, grammar: Optional[dict]) -> bytes:
+    meta = LANG_META[lang]
+    if engine == 'reportlab':
+        return pdf_render_queue.render_reportlab(lang, meta, lesson, vocabulary, grammar)
+    html, header_html, footer_html = lesson_pdf_html(lang, lesson, vocabulary, grammar)
+    return _build_lesson_pdf_bytes_chromium(html, header_html, footer_html, assets=_lesson_pdf_asset_files())
+
+
+def build_lesson_pdf(lang: str, lesson: dict, engine: str = 'chromium', strict: bool = False) -> dict:
+    """Cached PDF for a lesson, rendering it on a miss. Needs an app context.
+
+    Chromium falls back to ReportLab when Playwright/Chromium is not available unless
+    `strict` (an engine the user asked for explicitly). Concurrent misses for the same
+    PDF render it once, and renders go through `pdf_render_queue` (raises
+    `RenderQueueFull` when it is saturated). Returns {'path', 'key', 'engine', 'cached'}.
+    """
+    vocabulary = get_lesson_vocab(lang, lesson)
+    grammar = lesson.get('grammar')
+    engines = ['reportlab'] if engine == 'reportlab' else (['chromium'] if strict else ['chromium', 'reportlab'])
+    cache = get_lesson_pdf_cache()
+    for n, name in enumerate(engines):
+        key = lesson_pdf_cache_key(name, lang, lesson, vocabulary, grammar)
+        path = cache.get(key)
+        if path:
+            return {'path': path, 'key': key, 'engine': name, 'cached': True}
+        try:
+            with pdf_single_flight.hold(key, cache.cache_dir, timeout=120) as acquired:
+                if not acquired:
+                    raise TimeoutError('This PDF is being generated by another request; try again shortly.')
+                path = cache.get(key)
+                cached = bool(path)
+                if not path:
+                    with pdf_render_queue.slot(cache.cache_dir):
+                        data = _render_lesson_pdf_bytes(name, lang, lesson, vocabulary, grammar)
+                    path = cache.put(key, data)
+            return {'path': path, 'key': key, 'engine': name, 'cached': cached}
+        except Exception as exc:
+            if n + 1 < len(engines) and _is_missing_chromium(exc):
+                continue
+            raise
+
+
+def lesson_pdf_download_name(lang: str, lesson: dict) -> str:
+    safe_lang = re.sub(r'[^a-z0-9]+', '-', (lang or '').lower()).strip('-') or 'lesson'
+    try:
+        safe_id = int(lesson.get('id'))
+    except (TypeError, ValueError):
+        safe_id = 0
+    title_en = (lesson.get('title_en') or '').strip()
+    title_slug = re.sub(r'[^a-z0-9]+', '-', _strip_accents(title_en.lower())).strip('-')[:60]
+    return f"{safe_lang}-lesson-{safe_id}{('-' + title_slug) if title_slug else ''}.pdf"
+
+
+LESSON_PACK_LEVELS = ('A1', 'A2', 'B1', 'B2', 'all')
+_LESSON_PACK_FORMATS = ('zip', 'pdf')
+
+
+def lesson_pack_lessons(lang: str, level: str) -> list:
+    """Lessons of one CEFR level ('all' for the whole language), in course order."""
+    lessons = _sorted_lessons(get_lessons().get(lang, []))
+    level = (level or '').strip().upper()
+    if level == 'ALL':
+        return lessons
+    return [lesson for lesson in lessons if _lesson_cefr(lesson) == level]
+
+
+def _in_current_context(fn):
+    """Run `fn` in a worker thread with the caller's request (or app) context."""
+    if has_request_context():
+        return copy_current_request_context(fn)
+    app = current_app._get_current_object()
+
+    def _run(*args, **kwargs):
+        with app.app_context():
+            return fn(*args, **kwargs)
+
+    return _run
+
+
+def iter_lesson_pdfs(lang: str, lessons: list, engine: str = 'chromium', strict: bool = False, workers: int = 2):
+    """Yield (lesson, pdf_or_exception) in lesson order, rendering cache misses in the
+    background with at most `workers` at a time, so early lessons can be sent while later
+    ones are still rendering. `pdf` is `build_lesson_pdf`'s dict."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    executor = ThreadPoolExecutor(max_workers=max(1, int(workers)), thread_name_prefix='pdf-pack')
+    try:
+        futures = [
+            executor.submit(_in_current_context(build_lesson_pdf), lang, lesson, engine, strict)
+            for lesson in lessons
+        ]
+        for lesson, future in zip(lessons, futures):
+            try:
+                yield lesson, future.result()
+            except Exception as exc:
+                yield lesson, exc
+    finally:
+        # Client went away: drop the renders that have not started yet.
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+class _ZipStreamBuffer(io.RawIOBase):
+    """Write-only sink for `zipfile` that hands out what has been written so far."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_lesson_pack_zip(lang: str, lessons: list, engine: str = 'chromium', strict: bool = False,
+                           workers: int = 2, chunk_size: int = 256 * 1024):
+    """Generator of ZIP bytes with one PDF per lesson (`<level>/<nn>-<name>.pdf`).
+
+    PDFs are copied from the cache in `chunk_size` pieces and the archive is produced on
+    the fly (data descriptors, no seeking), so memory stays at about one chunk. Lessons
+    that fail to render are listed in `errors.txt` at the end.
+    """
+    sink = _ZipStreamBuffer()
+    errors = []
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_STORED) as zf:
+        for n, (lesson, pdf) in enumerate(iter_lesson_pdfs(lang, lessons, engine, strict, workers), 1):
+            if isinstance(pdf, Exception):
+                errors.append(f"Lesson {lesson.get('id')}: {pdf}")
+                continue
+            name = f"{_lesson_cefr(lesson) or 'other'}/{n:02d}-{lesson_pdf_download_name(lang, lesson)}"
+            with open(pdf['path'], 'rb') as src, zf.open(zipfile.ZipInfo(name, time.localtime()[:6]), 'w') as dest:
+                for chunk in iter(lambda: src.read(chunk_size), b''):
+                    dest.write(chunk)
+                    yield sink.drain()
+            yield sink.drain()
+        if errors:
+            zf.writestr('errors.txt', '\n'.join(errors) + '\n')
+    yield sink.drain()
+
+
+def build_lesson_pack_pdf(lang: str, level: str, lessons: list, engine: str = 'chromium', strict: bool = False,
+                          workers: int = 2) -> dict:
+    """One PDF with every lesson of the pack and a bookmark per lesson (the viewer's table
+    of contents), written next to the lesson PDFs and reused while they are unchanged.
+
+    Returns {'path', 'key', 'missing'}; lessons that failed to render are left out and
+    listed in `missing`.
+    """
+    rendered, missing = [], []
+    for lesson, pdf in iter_lesson_pdfs(lang, lessons, engine, strict, workers):
+        if isinstance(pdf, RenderQueueFull):
+            # Busy, not broken: let the client retry rather than get (and cache) a partial pack.
+            raise pdf
+        if isinstance(pdf, Exception):
+            missing.append({'lesson_id': lesson.get('id'), 'error': str(pdf)})
+        else:
+            rendered.append((lesson, pdf))
+    if not rendered:
+        raise RuntimeError(missing[0]['error'] if missing else 'No lessons in this pack.')
+
+    cache = get_lesson_pdf_cache()
+    key = hashlib.sha256(
+        f"pack|{lang}|{level}|{','.join(pdf['key'] for _, pdf in rendered)}".encode('utf-8')
+    ).hexdigest()
+    path = cache.get(key)
+    if not path:
+        with pdf_single_flight.hold(key, cache.cache_dir, timeout=300) as acquired:
+            if not acquired:
+                raise TimeoutError('This pack is being built by another request; try again shortly.')
+            path = cache.get(key)
+            if not path:
+                with pdf_render_queue.slot(cache.cache_dir):
+                    path = cache.put_file(key, lambda tmp_path: _merge_lesson_pdfs(lang, rendered, tmp_path))
+    return {'path': path, 'key': key, 'missing': missing}
+
+
+def _merge_lesson_pdfs(lang: str, rendered: list, out_path: str) -> None:
+    try:
+        from pypdf import PdfWriter
+    except ImportError as exc:
+        raise RuntimeError("Missing dependency: pypdf. Run: pip install -r requirements.txt") from exc
+
+    meta = LANG_META.get(lang) or {}
+    writer = PdfWriter()
+    levels = {}
+    for lesson, pdf in rendered:
+        start = len(writer.pages)
+        writer.append(pdf['path'], import_outline=False)
+        level = _lesson_cefr(lesson) or 'Other'
+        if level not in levels:
+            levels[level] = writer.add_outline_item(f"{meta.get('name') or lang} {level}", start)
+        title = (lesson.get('title_en') or '').strip() or f"Lesson {lesson.get('id')}"
+        writer.add_outline_item(f"{lesson.get('id')}. {title}", start, parent=levels[level])
+    writer.page_mode = '/UseOutlines'
+    with open(out_path, 'wb') as f:
+        writer.write(f)
+
+
 
 __all__ = [name for name in globals() if not name.startswith('__')]
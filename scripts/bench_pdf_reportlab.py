@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+scripts/bench_pdf_reportlab.py
+==============================
+Benchmark: ReportLab lesson PDF rendering for every lesson.
+
+Renders each lesson twice in this process:
+  - cold: the shared style sheet and page template/logo are rebuilt for every lesson
+          and words are shaped without the shaped-text cache (what each render paid
+          before those caches existed)
+  - warm: the caches are kept across lessons, as in a long-lived render worker
+
+Per-lesson times are reported for both passes. No PDF cache and no render queue
+involved: `_build_lesson_pdf_bytes_reportlab()` is timed directly.
+
+Usage
+-----
+    python scripts/bench_pdf_reportlab.py
+    python scripts/bench_pdf_reportlab.py --lang french --per-lesson
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from backend import create_app  # noqa: E402
+from backend.services import (  # noqa: E402
+    LANG_META,
+    _build_lesson_pdf_bytes_reportlab,
+    _sorted_lessons,
+    get_lesson_vocab,
+    get_lessons,
+    reset_reportlab_caches,
+    shaped_text_cache,
+)
+
+
+def _render_all(items, reset):
+    max_entries = shaped_text_cache.max_entries
+    if reset:
+        shaped_text_cache.max_entries = 0
+    times = []
+    for lang, lesson in items:
+        if reset:
+            reset_reportlab_caches()
+        args = (lang, LANG_META[lang], lesson, get_lesson_vocab(lang, lesson), lesson.get('grammar'))
+        start = time.perf_counter()
+        _build_lesson_pdf_bytes_reportlab(*args)
+        times.append((time.perf_counter() - start) * 1000.0)
+    shaped_text_cache.max_entries = max_entries
+    return times
+
+
+def _summary(times):
+    ordered = sorted(times)
+    pct = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]  # noqa: E731
+    return f"{sum(times) / len(times):8.1f} ms/lesson  p50 {pct(0.5):7.1f}  p95 {pct(0.95):7.1f}  total {sum(times) / 1000:6.2f} s"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark ReportLab lesson PDF rendering.")
+    parser.add_argument('--lang', choices=sorted(LANG_META), action='append',
+                        help="Language to render (repeatable; default: all).")
+    parser.add_argument('--per-lesson', action='store_true', help="Print the time of every lesson.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({
+            'TESTING': True,
+            'SECRET_KEY': 'bench',
+            'QUESTION_POOL_WARMUP': False,
+            'DB_PATH': os.path.join(tmp, 'progress.db'),
+            'TTS_CACHE_DIR': os.path.join(tmp, 'tts_cache'),
+        })
+        with app.test_request_context():
+            items = [
+                (lang, lesson)
+                for lang in (args.lang or sorted(LANG_META))
+                for lesson in _sorted_lessons(get_lessons().get(lang, []))
+            ]
+            if not items:
+                print("No lessons found.")
+                return 1
+            # Font registration and content JSON are loaded once either way.
+            _render_all(items[:1], reset=True)
+            cold = _render_all(items, reset=True)
+            reset_reportlab_caches()
+            warm = _render_all(items, reset=False)
+
+    print(f"Lessons : {len(items)}")
+    print(f"Cold    : {_summary(cold)}")
+    print(f"Warm    : {_summary(warm)}")
+    print(f"Speedup : {sum(cold) / sum(warm):.2f}x")
+    shaping = shaped_text_cache.metrics()
+    print(f"Shaping : {shaping['hits']} hits / {shaping['misses']} misses ({shaping['entries']} entries)")
+    if args.per_lesson:
+        print("\nlang     lesson   cold ms   warm ms")
+        for (lang, lesson), c, w in zip(items, cold, warm):
+            print(f"{lang:<8} {str(lesson.get('id')):>6} {c:9.1f} {w:9.1f}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
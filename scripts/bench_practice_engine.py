@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+scripts/bench_practice_engine.py
+================================
+Micro-benchmark: Daily Practice question generation.
+
+Compares the previous inline `/practice/<lang>` implementation (rebuild the unlocked
+pool from every lesson, copy ~4,000 entries per question for distractors) against
+`PracticeEngine.build_questions()`.
+
+No database or HTTP involved: both sides get the same due-word list and CEFR rank.
+
+Usage
+-----
+    python scripts/bench_practice_engine.py
+    python scripts/bench_practice_engine.py --lang spanish --sessions 300 --questions 25
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+
+sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from backend import create_app  # noqa: E402
+from backend.services import (  # noqa: E402
+    _cefr_rank,
+    _lesson_cefr,
+    _sorted_lessons,
+    get_lesson_vocab,
+    get_lessons,
+    get_practice_engine,
+    get_vocab,
+)
+
+
+def legacy_build(lang, total_q, due_words, current_rank):
+    """The pre-PracticeEngine route body (question dicts trimmed to what costs time)."""
+    vocab_by_cat = get_vocab().get(lang, {})
+    vocab_all = [w for words in vocab_by_cat.values() for w in words if w.get('word') and w.get('english')]
+    lesson_list_sorted = _sorted_lessons(get_lessons().get(lang, []))
+
+    unlocked = []
+    unlocked_words = set()
+    for lesson in lesson_list_sorted:
+        if _cefr_rank(_lesson_cefr(lesson)) > current_rank:
+            continue
+        for w in get_lesson_vocab(lang, lesson):
+            ww = (w.get('word') or '').strip()
+            if not ww or ww in unlocked_words:
+                continue
+            unlocked_words.add(ww)
+            unlocked.append(w)
+
+    vocab_lookup = {w['word']: w for w in vocab_all}
+    selected = []
+    for word in due_words:
+        entry = vocab_lookup.get(word)
+        if entry and (not unlocked_words or entry['word'] in unlocked_words):
+            selected.append(entry)
+
+    if len(selected) < total_q:
+        base_pool = unlocked or vocab_all
+        pool = [w for w in base_pool if w.get('word') and w['word'] not in {e['word'] for e in selected}]
+        random.shuffle(pool)
+        selected.extend(pool[: max(0, total_q - len(selected))])
+
+    all_for_wrong = (unlocked[:] if len(unlocked) >= 40 else vocab_all[:])
+    random.shuffle(all_for_wrong)
+
+    questions = []
+    for entry in selected[:total_q]:
+        word = entry['word']
+        example = (entry.get('example') or '').strip()
+        if example:
+            re.sub(r'[\\.,;:!?]', '', example).split()
+        others = [w for w in all_for_wrong if w.get('word') != word]
+        wrong = random.sample(others, min(3, len(others)))
+        q = {'word': word, 'choices': [entry.get('english', '')] + [w.get('english', '') for w in wrong]}
+        random.shuffle(q['choices'])
+        questions.append(q)
+    random.shuffle(questions)
+    return questions
+
+
+def _time(fn, sessions):
+    start = time.perf_counter()
+    for _ in range(sessions):
+        fn()
+    return time.perf_counter() - start
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark Daily Practice question generation.")
+    parser.add_argument('--lang', choices=['french', 'spanish'], default='french')
+    parser.add_argument('--sessions', type=int, default=200, help="Sessions per implementation (default: 200).")
+    parser.add_argument('--questions', type=int, default=25, help="Questions per session (default: 25).")
+    parser.add_argument('--rank', type=int, default=2, help="Learner CEFR rank (1=A1 .. 4=B2, default: 2).")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({
+            'TESTING': True,
+            'SECRET_KEY': 'bench',
+            'DB_PATH': os.path.join(tmp, 'progress.db'),
+            'TTS_CACHE_DIR': os.path.join(tmp, 'tts_cache'),
+        })
+        with app.app_context():
+            engine = get_practice_engine(args.lang)
+            due = [w['word'] for w in random.sample(engine.vocab_all, min(5, len(engine.vocab_all)))]
+            total_q = max(1, args.questions)
+            n = max(1, args.sessions)
+
+            # Warm caches (content JSON + engine) so both sides measure steady state.
+            legacy_build(args.lang, total_q, due, args.rank)
+            engine.build_questions(total_q, due, args.rank)
+
+            legacy_s = _time(lambda: legacy_build(args.lang, total_q, due, args.rank), n)
+            engine_s = _time(lambda: get_practice_engine(args.lang).build_questions(total_q, due, args.rank), n)
+
+    per_q = lambda s: s / (n * total_q) * 1e6  # noqa: E731
+    print(f"Language        : {args.lang} ({len(engine.vocab_all)} words)")
+    print(f"Sessions x Qs   : {n} x {total_q}")
+    print(f"Legacy route    : {legacy_s * 1000 / n:8.2f} ms/session  {per_q(legacy_s):8.1f} µs/question")
+    print(f"PracticeEngine  : {engine_s * 1000 / n:8.2f} ms/session  {per_q(engine_s):8.1f} µs/question")
+    if engine_s:
+        print(f"Speedup         : {legacy_s / engine_s:.1f}x")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+scripts/build_distractors.py
+============================
+Build the distractor neighbour table stored with the course content.
+
+Quiz and practice questions take their wrong answers from each vocab entry's nearest
+neighbours (similar category, part of speech, length, spelling, gloss and CEFR level).
+Computing them takes about a second per language, so it is done here, once per content
+change, instead of in every web worker on its first request.
+
+Output:
+  - data/distractors.json   (read by the practice engine; entries whose content digest no
+                              longer matches are recomputed in-process with a warning)
+
+Re-run after editing data/vocabulary.json or data/lessons.json (`--check` exits 1 while
+the stored table is stale).
+
+Usage
+-----
+    python scripts/build_distractors.py
+    python scripts/build_distractors.py --lang french --check
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from backend.services import (  # noqa: E402
+    LANG_META,
+    PracticeEngine,
+    build_path_config,
+    get_lessons,
+    get_vocab,
+)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Build the stored distractor neighbour table.")
+    parser.add_argument('--lang', choices=sorted(LANG_META), action='append',
+                        help="Language to rebuild (repeatable; default: all). Others are kept as stored.")
+    parser.add_argument('--out', default=build_path_config()['DISTRACTORS_PATH'], help="Output JSON.")
+    parser.add_argument('--check', action='store_true', help="Only report whether the stored table is up to date.")
+    args = parser.parse_args()
+
+    stored = {}
+    if os.path.exists(args.out):
+        with open(args.out, encoding='utf-8') as f:
+            stored = (json.load(f) or {}).get('languages') or {}
+
+    languages = dict(stored)
+    stale = 0
+    for lang in (args.lang or sorted(LANG_META)):
+        started = time.perf_counter()
+        engine = PracticeEngine(lang, get_vocab().get(lang, {}) or {}, get_lessons().get(lang, []) or [],
+                                distractor_snapshot=stored.get(lang))
+        index = engine.distractors
+        state = 'up to date' if index.precomputed else 'stale'
+        stale += int(not index.precomputed)
+        print(f"[{lang}] {len(index)} entries, k={index.k}: {state} ({(time.perf_counter() - started) * 1000:.0f} ms)")
+        languages[lang] = index.snapshot()
+
+    if args.check:
+        return 1 if stale else 0
+
+    # No timestamp: the file only changes when the content does.
+    payload = {'languages': languages}
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    tmp = f"{args.out}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, separators=(',', ':'))
+    os.replace(tmp, args.out)
+    print(f"Wrote: {args.out}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+scripts/calibrate_placement.py
+==============================
+Calibrate placement item difficulties from historical answers.
+
+Reads graded placement answers (table `placement_responses`, written by the web and
+mobile placement sessions) and fits a Rasch (1PL) model per language: one ability per
+test session, one difficulty per item. Each item is shrunk towards the difficulty it was
+served with (its CEFR prior when none was logged), so rarely-seen items stay close to it.
+
+Items are keyed by a digest of their content, so a calibration stays attached to the same
+question after lessons are edited or reordered. Answers whose item key is malformed are
+skipped.
+
+Output:
+  - data/placement_calibration.json   (read by the adaptive placement engine)
+
+Only items with at least --min-responses answers are written; the rest keep their prior.
+
+Usage
+-----
+    python scripts/calibrate_placement.py
+    python scripts/calibrate_placement.py --db data/progress.db --min-responses 30 --dry-run
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+from datetime import datetime, timezone
+
+sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(BASE_DIR, 'data')
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from backend.services import placement_prior_difficulty  # noqa: E402
+
+
+def _load_responses(db_path: str):
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute(
+            '''
+            SELECT language, session_id, item_key, correct, difficulty
+            FROM placement_responses
+            WHERE session_id IS NOT NULL AND item_key IS NOT NULL
+            '''
+        ).fetchall()
+    except sqlite3.OperationalError as exc:
+        print(f"ERROR: {exc} (has the app created the placement tables yet?)")
+        rows = []
+    finally:
+        conn.close()
+
+    by_lang = {}
+    skipped = 0
+    for lang, session_id, item_key, correct, difficulty in rows:
+        if placement_prior_difficulty(item_key) is None:
+            skipped += 1
+            continue
+        by_lang.setdefault(lang, []).append((session_id, item_key, int(correct), difficulty))
+    if skipped:
+        print(f"Skipped {skipped} answers with unknown item keys.")
+    return by_lang
+
+
+def calibrate(responses, iterations: int = 50, prior_sd: float = 1.0):
+    """Joint MAP estimate of session abilities and item difficulties.
+
+    `responses` is a list of (session_id, item_key, correct, served_difficulty); a
+    served difficulty of None falls back to the item's CEFR prior. Returns {item_key: (difficulty, n_responses)}.
+    """
+    import numpy as np
+
+    sessions = {}
+    items = {}
+    s_idx, i_idx, x, served = [], [], [], []
+    for session_id, item_key, correct, difficulty in responses:
+        s_idx.append(sessions.setdefault(session_id, len(sessions)))
+        i_idx.append(items.setdefault(item_key, len(items)))
+        x.append(float(correct))
+        if difficulty is None:
+            difficulty = placement_prior_difficulty(item_key)
+        served.append(float(difficulty) if difficulty is not None else 0.0)
+
+    s_idx = np.asarray(s_idx, dtype=np.int64)
+    i_idx = np.asarray(i_idx, dtype=np.int64)
+    x = np.asarray(x)
+    n_items = len(items)
+
+    # Prior mean per item: the mean difficulty it was served with.
+    counts = np.bincount(i_idx, minlength=n_items).astype(float)
+    prior_b = np.bincount(i_idx, weights=np.asarray(served), minlength=n_items) / np.maximum(counts, 1)
+
+    theta = np.zeros(len(sessions))
+    b = prior_b.copy()
+    prior_prec = 1.0 / (prior_sd ** 2)
+    for _ in range(max(1, iterations)):
+        p = 1.0 / (1.0 + np.exp(b[i_idx] - theta[s_idx]))
+        info = p * (1.0 - p)
+
+        # Newton step for abilities (N(0, 1) prior).
+        grad = np.bincount(s_idx, weights=x - p, minlength=len(theta)) - theta
+        hess = np.bincount(s_idx, weights=info, minlength=len(theta)) + 1.0
+        theta += np.clip(grad / hess, -1.0, 1.0)
+
+        p = 1.0 / (1.0 + np.exp(b[i_idx] - theta[s_idx]))
+        info = p * (1.0 - p)
+
+        # Newton step for difficulties (shrunk towards the served difficulty).
+        grad = np.bincount(i_idx, weights=p - x, minlength=n_items) - prior_prec * (b - prior_b)
+        hess = np.bincount(i_idx, weights=info, minlength=n_items) + prior_prec
+        b += np.clip(grad / hess, -1.0, 1.0)
+
+    # Keep the scale anchored to the served difficulties (the model is shift-invariant).
+    b += float(np.average(prior_b - b, weights=counts))
+
+    keys = [None] * n_items
+    for key, idx in items.items():
+        keys[idx] = key
+    return {keys[i]: (float(b[i]), int(counts[i])) for i in range(n_items)}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Calibrate placement item difficulties from logged answers.")
+    parser.add_argument('--db', default=os.path.join(DATA_DIR, 'progress.db'), help="SQLite DB path.")
+    parser.add_argument('--out', default=os.path.join(DATA_DIR, 'placement_calibration.json'), help="Output JSON.")
+    parser.add_argument('--min-responses', type=int, default=20, help="Min answers per item to publish (default: 20).")
+    parser.add_argument('--iterations', type=int, default=50, help="Fitting iterations (default: 50).")
+    parser.add_argument('--dry-run', action='store_true', help="Print a summary, do not write the output file.")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"ERROR: DB not found: {args.db}")
+        return 2
+
+    by_lang = _load_responses(args.db)
+    payload = {
+        'generated_at': datetime.now(timezone.utc).replace(microsecond=0).isoformat().replace('+00:00', 'Z'),
+        'min_responses': args.min_responses,
+        'languages': {},
+    }
+    for lang, responses in sorted(by_lang.items()):
+        fitted = calibrate(responses, iterations=args.iterations)
+        published = {
+            key: {'b': round(b, 3), 'n': n}
+            for key, (b, n) in sorted(fitted.items())
+            if n >= args.min_responses
+        }
+        payload['languages'][lang] = published
+        sessions = len({r[0] for r in responses})
+        print(f"[{lang}] {len(responses)} answers, {sessions} sessions, {len(fitted)} items, {len(published)} published")
+
+    if args.dry_run:
+        print("Dry run: nothing written.")
+        return 0
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    tmp = f"{args.out}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, args.out)
+    print(f"Wrote: {args.out}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -6,12 +6,19 @@ Safe cleanup helpers for small free hosting tiers (e.g., PythonAnywhere).
 
 What it cleans
 --------------
-1) gTTS MP3 cache under `data/tts_cache/` (or `TTS_CACHE_DIR`)
-   - Deletes stale temp files (leftovers from crashes)
-   - Deletes files older than `--tts-ttl-days`
-   - Enforces `--tts-max-mb` and `--tts-max-files` caps (LRU-ish by atime/mtime)
-
-2) Local debug artifacts under the project folder
+1) gTTS MP3 cache under `data/tts_cache/` (or `TTS_CACHE_DIR`), stored as `ab/cd/<hash>.mp3`
+   - Moves a cache still in the old flat layout into place first
+   - Deletes files not served for `--tts-ttl-days`
+   - Enforces `--tts-max-mb` and `--tts-max-files` caps (least recently served first)
+   - Works from the cache manifest (`.manifest.sqlite3`, kept up to date by /api/tts),
+     so only evicted files are touched. `--rebuild-manifest` re-indexes the directory
+     (one full scan, also deletes stale temp files left by crashes).
+   - `--dry-run` reports from a throwaway copy of the manifest and changes nothing
+
+2) Study sessions (quiz/practice/placement) that were opened but never submitted
+   - Deletes rows older than `--study-session-ttl-hours` from `study_sessions`
+
+3) Local debug artifacts under the project folder
    - `tmp_*.png`, `tmp_*.pdf`
    - `__pycache__/` and `*.pyc`
 
@@ -29,12 +36,18 @@ Suggested PythonAnywhere Scheduled Task (daily)
 import argparse
 import os
 import shutil
+import sqlite3
 import sys
-import time
 from pathlib import Path
 
 sys.stdout.reconfigure(encoding="utf-8", errors="replace")
 
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from backend.services import TTSCacheStore, purge_study_sessions  # noqa: E402
+
 
 def _human(n: int) -> str:
     n = int(n or 0)
@@ -82,90 +95,45 @@ def cleanup_tts_cache(
     max_files: int,
     min_age_sec: int,
     dry_run: bool,
+    rebuild: bool = False,
 ) -> dict:
-    now = time.time()
-    ttl_sec = max(0, int(ttl_days)) * 86400
-    max_bytes = max(0, int(max_mb)) * 1024 * 1024
-    max_files = max(0, int(max_files))
-    min_age_sec = max(0, int(min_age_sec))
-
-    removed = 0
-    removed_bytes = 0
-    scanned = 0
-
     if not cache_dir.exists() or not cache_dir.is_dir():
-        return {"ok": True, "scanned": 0, "removed": 0, "removed_bytes": 0, "path": str(cache_dir)}
-
-    mp3_entries: list[tuple[float, int, Path]] = []  # (last_used, size, path)
-
-    for p in cache_dir.iterdir():
-        if not p.is_file():
-            continue
-        scanned += 1
-        name = p.name.lower()
-        try:
-            st = p.stat()
-        except OSError:
-            continue
-        mtime = float(st.st_mtime or 0.0)
-        atime = float(getattr(st, "st_atime", 0.0) or 0.0)
-        last_used = max(atime, mtime)
-        age_m = now - mtime
-        age_u = now - last_used
-
-        if name.endswith(".tmp.mp3") or name.endswith(".tmp"):
-            if age_m >= max(3600, min_age_sec):
-                ok, freed = _safe_unlink(p, dry_run)
-                if ok:
-                    removed += 1
-                    removed_bytes += freed
-            continue
-
-        if not name.endswith(".mp3"):
-            continue
-
-        if min_age_sec and age_u < min_age_sec:
-            continue
-
-        if ttl_sec and age_u > ttl_sec:
-            ok, freed = _safe_unlink(p, dry_run)
-            if ok:
-                removed += 1
-                removed_bytes += freed
-            continue
-
-        mp3_entries.append((last_used, int(st.st_size or 0), p))
-
-    # Enforce caps (delete oldest first)
-    mp3_entries.sort(key=lambda x: x[0])
-    total_bytes = sum(s for _, s, __ in mp3_entries)
-    total_files = len(mp3_entries)
-
-    def over_caps(files: int, bytes_: int) -> bool:
-        if max_files and files > max_files:
-            return True
-        if max_bytes and bytes_ > max_bytes:
-            return True
-        return False
-
-    i = 0
-    while i < len(mp3_entries) and over_caps(total_files, total_bytes):
-        _, size, p = mp3_entries[i]
-        ok, freed = _safe_unlink(p, dry_run)
-        if ok:
-            removed += 1
-            removed_bytes += freed
-            total_files -= 1
-            total_bytes -= int(size or 0)
-        i += 1
-
-    return {
-        "ok": True,
-        "path": str(cache_dir),
-        "scanned": scanned,
-        "removed": removed,
-        "removed_bytes": removed_bytes,
-    }
+        return {"ok": True, "removed": 0, "removed_bytes": 0, "path": str(cache_dir)}
+
+    store = TTSCacheStore(str(cache_dir))
+    caps = dict(
+        ttl_sec=max(0, int(ttl_days)) * 86400,
+        max_files=max(0, int(max_files)),
+        max_bytes=max(0, int(max_mb)) * 1024 * 1024,
+        min_age_sec=max(0, int(min_age_sec)),
+    )
+    if dry_run:
+        # Work on a throwaway copy: no migration, no manifest writes, temp files kept.
+        with store.scratch_manifest() as manifest:
+            if rebuild:
+                manifest.rebuild()
+            result = manifest.evict(**caps, dry_run=True)
+    else:
+        store.migrate()
+        if rebuild:
+            store.manifest.rebuild()
+        result = store.evict(**caps)
+    return {**result, "path": str(cache_dir)}
+
+
+def cleanup_study_sessions(db_path: Path, ttl_hours: int, dry_run: bool) -> dict:
+    if ttl_hours <= 0 or not db_path.is_file():
+        return {"ok": True, "removed": 0, "path": str(db_path)}
+
+    conn = sqlite3.connect(str(db_path))
+    try:
+        removed = purge_study_sessions(ttl_hours * 3600, conn=conn, dry_run=dry_run)
+    except sqlite3.OperationalError:
+        # Tables not created yet (the app never started against this DB).
+        removed = 0
+    finally:
+        conn.close()
+    return {"ok": True, "removed": removed, "path": str(db_path)}
 
 
 def cleanup_project_debug_files(project_root: Path, dry_run: bool) -> dict:
@@ -219,7 +187,11 @@ def main() -> int:
     parser.add_argument("--tts-ttl-days", type=int, default=45, help="Delete cached MP3s not used for N days (0 disables).")
     parser.add_argument("--tts-max-mb", type=int, default=80, help="Keep cache under N MB (0 disables).")
     parser.add_argument("--tts-max-files", type=int, default=5000, help="Keep at most N MP3 files (0 disables).")
-    parser.add_argument("--tts-min-age-sec", type=int, default=120, help="Never delete files newer than N seconds.")
+    parser.add_argument("--tts-min-age-sec", type=int, default=120, help="Never delete files served in the last N seconds.")
+    parser.add_argument("--db", default="", help="SQLite DB (default: $DB_PATH or data/progress.db).")
+    parser.add_argument("--study-session-ttl-hours", type=int, default=48,
+                        help="Delete unsubmitted quiz/practice/placement sessions older than N hours (0 disables).")
+    parser.add_argument("--rebuild-manifest", action="store_true", help="Re-index the TTS cache directory first (full scan).")
     args = parser.parse_args()
 
     base_dir = Path(__file__).resolve().parents[1]
@@ -227,6 +199,8 @@ def main() -> int:
 
     default_cache = os.environ.get("TTS_CACHE_DIR") or str(project_root / "data" / "tts_cache")
     cache_dir = Path(args.tts_cache_dir).expanduser().resolve() if args.tts_cache_dir else Path(default_cache).expanduser().resolve()
+    default_db = os.environ.get("DB_PATH") or str(project_root / "data" / "progress.db")
+    db_path = Path(args.db or default_db).expanduser().resolve()
 
     print("== Cleanup ==")
     print(f"Dry run        : {bool(args.dry_run)}")
@@ -235,9 +209,9 @@ def main() -> int:
     print(f"TTS TTL days   : {args.tts_ttl_days}")
     print(f"TTS max MB     : {args.tts_max_mb}")
     print(f"TTS max files  : {args.tts_max_files}")
+    print(f"Study sessions : {db_path} (TTL {args.study_session_ttl_hours} h)")
     print()
 
-    tts_before = _dir_size(cache_dir) if cache_dir.exists() else 0
     tts = cleanup_tts_cache(
         cache_dir=cache_dir,
         ttl_days=args.tts_ttl_days,
@@ -245,15 +219,18 @@ def main() -> int:
         max_files=args.tts_max_files,
         min_age_sec=args.tts_min_age_sec,
         dry_run=args.dry_run,
+        rebuild=args.rebuild_manifest,
     )
-    tts_after = _dir_size(cache_dir) if cache_dir.exists() else 0
+
+    studies = cleanup_study_sessions(db_path, args.study_session_ttl_hours, dry_run=args.dry_run)
 
     dbg = cleanup_project_debug_files(project_root=project_root, dry_run=args.dry_run)
 
     print("== Results ==")
     print(f"TTS cache: removed {tts['removed']} file(s), freed {_human(tts['removed_bytes'])}")
-    if tts_before or tts_after:
-        print(f"TTS cache: size {_human(tts_before)} -> {_human(tts_after)}")
+    if "files" in tts:
+        print(f"TTS cache: {tts['files']} file(s), {_human(tts['bytes'])} remaining")
+    print(f"Sessions: removed {studies['removed']} unsubmitted study session(s)")
     print(f"Project:  removed {dbg['removed']} item(s), freed {_human(dbg['removed_bytes'])}")
 
     return 0
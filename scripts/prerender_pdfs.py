@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+scripts/prerender_pdfs.py
+=========================
+Render every lesson PDF into the PDF cache at deploy time, so downloads are served as
+static files instead of being rendered on the first click.
+
+PDFs are stored under the same content-addressed keys the download route uses
+(lesson, vocabulary, grammar, engine, fonts, logo, template and footer year), so a
+lesson is rendered again only when one of those changed. Already cached PDFs are
+skipped. Keep `PDF_CACHE_MAX_MB` large enough for every lesson in both languages.
+
+Usage
+-----
+    python scripts/prerender_pdfs.py --dry-run
+    python scripts/prerender_pdfs.py
+    python scripts/prerender_pdfs.py --lang french --engine reportlab
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from backend import create_app  # noqa: E402
+from backend.services import (  # noqa: E402
+    LANG_META,
+    _sorted_lessons,
+    build_lesson_pdf,
+    get_lesson_pdf_cache,
+    get_lesson_vocab,
+    get_lessons,
+    lesson_pdf_cache_key,
+)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Pre-render lesson PDFs into the PDF cache.")
+    parser.add_argument('--lang', choices=sorted(LANG_META), action='append',
+                        help="Language to render (repeatable; default: all).")
+    parser.add_argument('--engine', choices=['chromium', 'reportlab'], default='',
+                        help="PDF engine (default: $PDF_ENGINE or chromium, falling back to reportlab).")
+    parser.add_argument('--cache-dir', default='', help="PDF cache dir (default: $PDF_CACHE_DIR or data/pdf_cache).")
+    parser.add_argument('--dry-run', action='store_true', help="Count missing PDFs, render nothing.")
+    args = parser.parse_args()
+
+    config = {'SECRET_KEY': 'prerender', 'QUESTION_POOL_WARMUP': False}
+    if args.cache_dir:
+        config['PDF_CACHE_DIR'] = args.cache_dir
+    app = create_app(config)
+    engine = (args.engine or os.environ.get('PDF_ENGINE') or 'chromium').strip().lower()
+
+    failed = 0
+    # Templates use the request-bound context processors, so render inside a request.
+    with app.test_request_context():
+        cache = get_lesson_pdf_cache()
+        lessons = [
+            (lang, lesson)
+            for lang in (args.lang or list(LANG_META))
+            for lesson in _sorted_lessons(get_lessons().get(lang, []))
+        ]
+        print("== Lesson PDF pre-render ==")
+        print(f"Cache dir : {cache.cache_dir}")
+        print(f"Engine    : {engine}")
+        if args.dry_run:
+            missing = sum(
+                1 for lang, lesson in lessons
+                if not os.path.exists(cache.path_for(lesson_pdf_cache_key(
+                    engine, lang, lesson, get_lesson_vocab(lang, lesson), lesson.get('grammar'))))
+            )
+            print(f"Lessons   : {len(lessons)} ({missing} missing)")
+            return 0
+
+        counts = {'rendered': 0, 'cached': 0}
+        started = time.monotonic()
+        for lang, lesson in lessons:
+            t0 = time.monotonic()
+            try:
+                pdf = build_lesson_pdf(lang, lesson, engine=engine, strict=bool(args.engine))
+            except Exception as exc:
+                failed += 1
+                print(f"  FAILED {lang} lesson {lesson.get('id')}: {exc}")
+                continue
+            counts['cached' if pdf['cached'] else 'rendered'] += 1
+            if not pdf['cached']:
+                print(f"  {lang} lesson {lesson.get('id')}: {pdf['engine']} "
+                      f"{os.path.getsize(pdf['path'])} bytes in {(time.monotonic() - t0) * 1000:.0f} ms", flush=True)
+
+    print("== Results ==")
+    print(f"Rendered  : {counts['rendered']} in {time.monotonic() - started:.1f}s")
+    print(f"Cached    : {counts['cached']}")
+    print(f"Failed    : {failed}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+scripts/prewarm_tts.py
+======================
+Pre-generate server TTS audio for lesson vocabulary, so the first learner to open a
+lesson does not wait for live gTTS calls.
+
+For every lesson word it warms the three clips the app asks `/api/tts` for:
+  - the bare word (quiz / practice listen buttons)
+  - the word with its article (lesson page)
+  - the example sentence
+
+Clips land in the normal TTS cache under the exact cache keys `/api/tts` uses for the
+chosen provider and voice, so they are served (and evicted) like any other clip.
+Already cached clips are skipped: re-run the script after an interruption and it carries
+on where it stopped.
+
+The cache caps (`TTS_CACHE_MAX_MB` / `TTS_CACHE_MAX_FILES`, default 80 MB / 5000 files)
+must hold the warmed set: cleanup evicts the least recently served clips first, which
+would be the warmed ones. Every lesson of every language is ~11k clips, so the script
+refuses to run when the cache would end up over either cap (`--ignore-caps` overrides).
+
+Usage
+-----
+    python scripts/prewarm_tts.py --dry-run
+    python scripts/prewarm_tts.py --lang french --workers 4 --rate 2
+    python scripts/prewarm_tts.py --provider fake --cache-dir /tmp/tts_cache   # offline smoke test
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from backend.services import (  # noqa: E402
+    LANG_META,
+    TTS_CACHE_DIR,
+    TTS_PROVIDERS,
+    get_tts_store,
+    prewarm_tts_cache,
+    tts_prewarm_capacity,
+    tts_prewarm_items,
+)
+
+
+def _env_cap(name: str, default: int) -> int:
+    try:
+        return max(0, int(os.environ.get(name) or default))
+    except (TypeError, ValueError):
+        return default
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Pre-generate TTS audio for lesson vocabulary.")
+    parser.add_argument('--lang', choices=sorted(LANG_META), action='append',
+                        help="Language to warm (repeatable; default: all).")
+    parser.add_argument('--kinds', default='word,article,example',
+                        help="Comma-separated clip kinds: word, article, example (default: all).")
+    parser.add_argument('--cache-dir', default='', help="TTS cache dir (default: $TTS_CACHE_DIR or data/tts_cache).")
+    parser.add_argument('--provider', choices=sorted(TTS_PROVIDERS), default='gtts', help="TTS provider (default: gtts).")
+    parser.add_argument('--timeout', type=float, default=15.0, help="Seconds per provider call (default: 15).")
+    parser.add_argument('--workers', type=int, default=4, help="Concurrent generations (default: 4).")
+    parser.add_argument('--rate', type=float, default=2.0, help="Max provider calls per second, 0 = unlimited (default: 2).")
+    parser.add_argument('--retries', type=int, default=2, help="Retries per clip after a failure (default: 2).")
+    parser.add_argument('--limit', type=int, default=0, help="Only consider the first N clips (0 = all).")
+    parser.add_argument('--failures', default='', help="Write failed clips to this JSON file.")
+    parser.add_argument('--max-files', type=int, default=_env_cap('TTS_CACHE_MAX_FILES', 5000),
+                        help="Cache file cap the server enforces (default: $TTS_CACHE_MAX_FILES or 5000).")
+    parser.add_argument('--max-mb', type=int, default=_env_cap('TTS_CACHE_MAX_MB', 80),
+                        help="Cache size cap the server enforces (default: $TTS_CACHE_MAX_MB or 80).")
+    parser.add_argument('--ignore-caps', action='store_true',
+                        help="Warm even if the cache caps cannot hold the clips (cleanup will evict them).")
+    parser.add_argument('--dry-run', action='store_true', help="Count missing clips, generate nothing.")
+    args = parser.parse_args()
+
+    kinds = tuple(k.strip() for k in args.kinds.split(',') if k.strip())
+    unknown = set(kinds) - {'word', 'article', 'example'}
+    if unknown:
+        print(f"ERROR: unknown kind(s): {', '.join(sorted(unknown))}")
+        return 2
+
+    provider = TTS_PROVIDERS[args.provider](timeout=args.timeout, retries=0)
+    if not provider.available():
+        print(f"ERROR: TTS provider '{args.provider}' is not installed on this machine.")
+        return 2
+
+    store = get_tts_store(args.cache_dir or TTS_CACHE_DIR)
+    items = tts_prewarm_items(args.lang, kinds=kinds, provider=provider)
+    if args.limit > 0:
+        items = items[:args.limit]
+    max_bytes = args.max_mb * 1024 * 1024
+    capacity = tts_prewarm_capacity(store, items, args.max_files, max_bytes)
+    missing = capacity['missing']
+
+    print("== TTS pre-warm ==")
+    print(f"Cache dir : {store.cache_dir}")
+    print(f"Provider  : {args.provider}")
+    print(f"Clips     : {len(items)} ({missing} missing)")
+    print(f"Cache     : {capacity['files']} file(s), ~{capacity['bytes'] / 1048576:.0f} MB after warming "
+          f"(caps: {args.max_files or 'none'} files, {args.max_mb or 'none'} MB)")
+    if not capacity['fits']:
+        label = 'WARNING' if (args.ignore_caps or args.dry_run) else 'ERROR'
+        print(
+            f"{label}: the TTS cache caps are too small for these clips. The hourly cleanup evicts the "
+            "least recently served clips first, i.e. the ones warmed here.\n"
+            f"       Set TTS_CACHE_MAX_FILES >= {capacity['files']} and "
+            f"TTS_CACHE_MAX_MB >= {capacity['bytes'] // 1048576 + 1} on the server (and pass the same "
+            "values via --max-files/--max-mb), warm less (--lang/--kinds/--limit), or pass --ignore-caps."
+        )
+        if not (args.ignore_caps or args.dry_run):
+            return 2
+    if args.dry_run or not missing:
+        return 0
+
+    started = time.monotonic()
+    last_print = [0.0]
+
+    def _progress(stats):
+        now = time.monotonic()
+        if stats['done'] < stats['total'] and now - last_print[0] < 2.0:
+            return
+        last_print[0] = now
+        elapsed = max(0.001, now - started)
+        print(
+            f"  {stats['done']}/{stats['total']}  generated={stats['generated']} cached={stats['cached']} "
+            f"failed={stats['failed']}  {stats['generated'] / elapsed:.1f} clips/s",
+            flush=True,
+        )
+
+    stop = threading.Event()
+    result = {}
+    runner = threading.Thread(
+        target=lambda: result.update(prewarm_tts_cache(
+            store, items, provider.synthesize,
+            workers=args.workers, rate=args.rate, retries=args.retries,
+            progress=_progress, stop=stop,
+        )),
+        daemon=True,
+    )
+    runner.start()
+    try:
+        while runner.is_alive():
+            runner.join(0.5)
+    except KeyboardInterrupt:
+        print("Interrupted: finishing clips in flight (re-run to resume)...")
+        stop.set()
+        runner.join()
+
+    store.manifest.flush()
+    print("== Results ==")
+    print(f"Generated : {result.get('generated', 0)} clip(s), {result.get('bytes', 0)} bytes")
+    print(f"Cached    : {result.get('cached', 0)}")
+    print(f"Failed    : {result.get('failed', 0)}")
+    if result.get('remaining'):
+        print(f"Remaining : {result['remaining']} (not attempted)")
+    if args.failures and result.get('failures'):
+        with open(args.failures, 'w', encoding='utf-8') as f:
+            json.dump(result['failures'], f, ensure_ascii=False, indent=1)
+        print(f"Wrote: {args.failures}")
+    return 1 if result.get('failed') else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -114,18 +114,61 @@ function _hasBrowserVoiceFor(langTag) {
   return _ttsVoices.some(v => _normalizeLangTag(v.lang).startsWith(wantPrefix));
 }
 
+// Lesson audio prefetched from the audio bundle endpoint: "<lang>|<text>" -> Blob.
+const _bundledClips = new Map();
+let _audioBundlePromise = null;
+
+function _bundledClipKey(text, langTag) {
+  const lang = _normalizeLangTag(langTag || '').split('-')[0];
+  return `${lang}|${String(text || '').split(/\s+/).filter(Boolean).join(' ')}`;
+}
+
+function prefetchAudioBundle(url) {
+  // One request for the whole lesson (concatenated MP3 + offset index); clips the server
+  // has not cached yet keep going through /api/tts.
+  if (!url || _audioBundlePromise) return _audioBundlePromise;
+  _audioBundlePromise = (async () => {
+    try {
+      const index = await (await fetch(`${url}?format=index`)).json();
+      if (!index.ok || !index.clips || !index.clips.length) return;
+      const res = await fetch(`${url}?format=mp3`);
+      if (!res.ok || !String(res.headers.get('ETag') || '').includes(index.bundle_id)) return;
+      const buf = await res.arrayBuffer();
+      index.clips.forEach(clip => {
+        const bytes = buf.slice(clip.offset, clip.offset + clip.length);
+        _bundledClips.set(`${clip.lang}|${clip.text}`, new Blob([bytes], {type: 'audio/mpeg'}));
+      });
+    } catch (e) {
+      console.warn('Audio bundle prefetch failed:', e);
+    }
+  })();
+  return _audioBundlePromise;
+}
+
 async function _speakTextServer(text, langTag) {
-  const url = `/api/tts?lang=${encodeURIComponent(langTag || '')}&text=${encodeURIComponent(text || '')}`;
-  const res = await fetch(url, {cache: 'force-cache'});
-  if (!res.ok) {
-    let detail = '';
-    try { detail = (await res.text()) || ''; } catch { /* noop */ }
-    const msg = detail ? `TTS HTTP ${res.status}: ${detail}` : `TTS HTTP ${res.status}`;
-    throw new Error(msg);
+  let blob = _bundledClips.get(_bundledClipKey(text, langTag));
+  if (!blob) {
+    const url = `/api/tts?lang=${encodeURIComponent(langTag || '')}&text=${encodeURIComponent(text || '')}`;
+    const res = await fetch(url, {cache: 'force-cache'});
+    if (res.status === 202) {
+      // Cache miss queued on the server: the caller decides whether to wait or use the browser voice.
+      let info = {};
+      try { info = await res.json(); } catch { /* noop */ }
+      const err = new Error('TTS audio is being generated');
+      err.name = 'TtsPending';
+      err.statusUrl = info.status_url || res.headers.get('Location') || '';
+      err.retryAfter = Number(res.headers.get('Retry-After') || info.retry_after || 1);
+      throw err;
+    }
+    if (!res.ok) {
+      let detail = '';
+      try { detail = (await res.text()) || ''; } catch { /* noop */ }
+      const msg = detail ? `TTS HTTP ${res.status}: ${detail}` : `TTS HTTP ${res.status}`;
+      throw new Error(msg);
+    }
+    blob = await res.blob();
   }
 
-  const blob = await res.blob();
-
   if (_ttsAudioObjectUrl) {
     try { URL.revokeObjectURL(_ttsAudioObjectUrl); } catch { /* noop */ }
     _ttsAudioObjectUrl = null;
@@ -138,6 +181,25 @@ async function _speakTextServer(text, langTag) {
   await _ttsAudio.play();
 }
 
+async function _waitForServerTts(pending, maxWaitMs = 15000) {
+  // Poll the queued clip's status URL; true once the server has cached it.
+  // `unknown` is retried too: with several server workers the poll can reach a worker
+  // that did not queue the job and cannot see it until the clip is cached.
+  const deadline = Date.now() + maxWaitMs;
+  while (pending.statusUrl && Date.now() < deadline) {
+    await new Promise(resolve => setTimeout(resolve, Math.max(1, pending.retryAfter || 1) * 1000));
+    try {
+      const res = await fetch(pending.statusUrl, {cache: 'no-store'});
+      const info = await res.json();
+      if (info.status === 'done') return true;
+      if (!['queued', 'running', 'unknown'].includes(info.status)) return false;
+    } catch {
+      return false;
+    }
+  }
+  return false;
+}
+
 function _showServerTtsError(langName, details) {
   if (_ttsServerWarnedLangs.has(langName)) return;
   _ttsServerWarnedLangs.add(langName);
@@ -189,6 +251,7 @@ async function speakText(text, langTag, retryOnce = true) {
       return {ok: true, error: null};
     } catch (e) {
       const name = (e && e.name) ? String(e.name) : '';
+      if (name === 'TtsPending') return {ok: false, error: e, pending: e};
       if (name === 'NotAllowedError') {
         _showAutoplayWarning();
         return {ok: false, error: e};
@@ -210,7 +273,8 @@ async function speakText(text, langTag, retryOnce = true) {
       _speakTextBrowser(text, langTag, retryOnce);
       return;
     }
-    const res = await tryServer();
+    let res = await tryServer();
+    if (res.pending && await _waitForServerTts(res.pending)) res = await tryServer();
     if (res.ok) return;
     _showServerTtsError(langName, res.error ? String(res.error.message || res.error) : '');
     _showTtsWarning(langName);
@@ -219,8 +283,14 @@ async function speakText(text, langTag, retryOnce = true) {
 
   // Server mode (gtts): prefer server; only fall back to browser if the browser has a matching voice.
   if (now >= _serverTtsBackoffUntil) {
-    const res = await tryServer();
+    let res = await tryServer();
     if (res.ok) return;
+    // A queued clip: the browser voice covers the gap (the server clip is ready next time);
+    // without one, wait for the server to finish it.
+    if (res.pending && !hasVoice && await _waitForServerTts(res.pending)) {
+      res = await tryServer();
+      if (res.ok) return;
+    }
 
     if (hasVoice) {
       _speakTextBrowser(text, langTag, retryOnce);
@@ -714,6 +784,24 @@ function restartCards() {
   document.getElementById('completionBox').style.display = 'none';
 }
 
+/* ===============================================
+   STUDY SESSIONS (graded on the server in one request)
+   =============================================== */
+function studyQuestionId(idx) {
+  return `q_${String(idx + 1).padStart(3, '0')}`;
+}
+
+function submitStudySession(answers) {
+  if (typeof SESSION_ID === 'undefined' || !SESSION_ID) return Promise.resolve(null);
+  return fetch(`/api/study_sessions/${encodeURIComponent(SESSION_ID)}/submit`, {
+    method: 'POST',
+    headers: {'Content-Type': 'application/json'},
+    body: JSON.stringify({answers}),
+  })
+    .then(r => (r.ok ? r.json() : null))
+    .catch(() => null);
+}
+
 /* ===============================================
    QUIZ MODULE
    =============================================== */
@@ -721,6 +809,7 @@ let quizIdx = 0;
 let correctTotal = 0;
 let wrongTotal = 0;
 let currentQuizQuestion = null;
+let quizAnswers = [];
 let quizTtsText = null;
 let quizTtsLang = null;
 let quizSpeakLang = null;
@@ -801,6 +890,7 @@ function initQuiz() {
   quizIdx = 0;
   correctTotal = 0;
   wrongTotal = 0;
+  quizAnswers = [];
   showQuestion(0);
 }
 
@@ -846,8 +936,8 @@ function selectAnswer(chosen, correct, btn) {
   // Disable all buttons
   document.querySelectorAll('.choice-btn').forEach(b => { b.disabled = true; });
 
-  const q = currentQuizQuestion || {};
   const isCorrect = chosen === correct;
+  quizAnswers.push({question_id: studyQuestionId(quizIdx), answer: chosen});
   const fb = document.getElementById('feedbackBox');
   fb.style.display = 'block';
 
@@ -871,16 +961,6 @@ function selectAnswer(chosen, correct, btn) {
 
   document.getElementById('scoreDisplay').textContent = `Score: ${correctTotal}`;
 
-  // Track word progress for vocab questions
-  if (q.kind === 'vocab' && q.word && typeof LANG !== 'undefined') {
-    const xp = isCorrect ? 8 : 1;
-    fetch('/api/word_progress', {
-      method: 'POST',
-      headers: {'Content-Type': 'application/json'},
-      body: JSON.stringify({language: LANG, word: q.word, correct: isCorrect ? 1 : 0, source: 'quiz', xp})
-    });
-  }
-
   // Show next button
   const nextBtn = document.getElementById('nextQBtn');
   if (nextBtn) {
@@ -924,23 +1004,13 @@ function showResults() {
   document.getElementById('wrongCount').textContent = wrongTotal;
   document.getElementById('totalCount').textContent = total;
 
-  // Save progress
-  if (typeof LANG !== 'undefined' && typeof LESSON_ID !== 'undefined') {
-    fetch('/api/complete', {
-      method: 'POST',
-      headers: {'Content-Type': 'application/json'},
-      body: JSON.stringify({language: LANG, lesson_id: LESSON_ID, score: pct})
-    });
-  }
+  // Save progress: word reviews + lesson completion in one request
+  submitStudySession(quizAnswers);
 }
 
 function restartQuiz() {
-  quizIdx = 0;
-  correctTotal = 0;
-  wrongTotal = 0;
-  showQuestion(0);
-  document.getElementById('resultsCard').style.display = 'none';
-  document.getElementById('quizCard').style.display = '';
+  // A submitted session is final; reload for a fresh question set.
+  window.location.reload();
 }
 
 /* ===============================================
@@ -957,6 +1027,8 @@ let practiceTtsLang = null;
 let practiceAnswered = false;
 let practiceOrderAnswer = [];
 let practicePlacementLog = [];
+let practiceAnswers = [];
+let practiceSubmitted = false;
 
 function practiceListen() {
   speakText(practiceTtsText, practiceTtsLang);
@@ -1093,10 +1165,10 @@ function practiceShowFeedback(isCorrect, correctAnswer) {
   nextBtn.textContent = last ? 'See Results 🏁' : 'Next →';
 }
 
-function practiceRecord(isCorrect) {
+function practiceRecord(isCorrect, answer) {
   const q = currentPracticeQuestion || {};
   const placementMode = (typeof PLACEMENT_MODE !== 'undefined') && !!PLACEMENT_MODE;
-  const lang = (typeof PRACTICE_LANG !== 'undefined') ? PRACTICE_LANG : null;
+  practiceAnswers.push({question_id: studyQuestionId(practiceIdx), answer});
   const xpCorrect = Number.isFinite(q.xp_correct) ? q.xp_correct : 10;
   const xpWrong = Number.isFinite(q.xp_wrong) ? q.xp_wrong : 2;
   const xpDelta = isCorrect ? xpCorrect : xpWrong;
@@ -1119,14 +1191,6 @@ function practiceRecord(isCorrect) {
   if (xpEl) xpEl.textContent = `XP: ${practiceXp}`;
   const heartsEl = document.getElementById('practiceHearts');
   if (heartsEl) heartsEl.textContent = '♥'.repeat(Math.max(0, practiceHearts));
-
-  if (lang && q.word) {
-    fetch('/api/word_progress', {
-      method: 'POST',
-      headers: {'Content-Type': 'application/json'},
-      body: JSON.stringify({language: lang, word: q.word, correct: isCorrect ? 1 : 0, source: 'practice', xp: xpDelta})
-    });
-  }
 }
 
 function practiceSelect(choice, btn) {
@@ -1143,7 +1207,7 @@ function practiceSelect(choice, btn) {
     if (b.textContent === q.answer) b.classList.add('revealed');
   });
 
-  practiceRecord(isCorrect);
+  practiceRecord(isCorrect, choice);
   practiceShowFeedback(isCorrect, q.answer);
 }
 
@@ -1157,7 +1221,7 @@ function practiceSubmitType() {
   const expected = answerVariants(q.answer);
   const isCorrect = expected.includes(got);
 
-  practiceRecord(isCorrect);
+  practiceRecord(isCorrect, input.value);
   practiceShowFeedback(isCorrect, q.answer);
 }
 
@@ -1206,7 +1270,7 @@ function practiceSubmitOrder() {
   // Disable bank
   document.querySelectorAll('#practiceOrderBank button').forEach(b => { b.disabled = true; });
 
-  practiceRecord(isCorrect);
+  practiceRecord(isCorrect, practiceOrderAnswer.map(x => x.tok));
   practiceShowFeedback(isCorrect, q.answer || q.sentence || '');
 }
 
@@ -1224,6 +1288,58 @@ function practiceNext() {
   }
 }
 
+function renderPlacementResult(recommended, pct, stats) {
+  const levels = ['A1', 'A2', 'B1', 'B2'];
+  const correct = levels.reduce((n, l) => n + ((stats[l] && stats[l].correct) || 0), 0);
+  const total = levels.reduce((n, l) => n + ((stats[l] && stats[l].total) || 0), 0);
+
+  const levelBn = {
+    A1: 'A1 — প্রাথমিক (শুরু থেকে শুরু করুন)',
+    A2: 'A2 — প্রি-ইন্টারমিডিয়েট (A1 জানা থাকলে এখান থেকে শুরু করুন)',
+    B1: 'B1 — ইন্টারমিডিয়েট (কথোপকথন ও ব্যাকরণ শক্ত করুন)',
+    B2: 'B2 — আপার ইন্টারমিডিয়েট (উন্নত ব্যাকরণ ও সাবলীলতা)',
+  };
+
+  document.getElementById('practiceResultEmoji').textContent = '🎯';
+  document.getElementById('practiceResultTitle').textContent = `Recommended starting level: ${recommended}`;
+  document.getElementById('practiceResultBn').textContent = 'স্কোর দেখে আপনার শেখা শুরু করার লেভেল নির্বাচন করা হয়েছে।';
+  document.getElementById('practiceResultScore').innerHTML =
+    `<span class="${pct >= 70 ? 'text-success' : pct >= 50 ? 'text-warning' : 'text-danger'}">${pct}%</span>` +
+    `<div class="small text-muted mt-2">${correct}/${total} correct</div>`;
+
+  const badgeEl = document.getElementById('placementLevelBadge');
+  if (badgeEl) badgeEl.textContent = recommended;
+  const bnEl = document.getElementById('placementLevelBn');
+  if (bnEl) bnEl.textContent = levelBn[recommended] || '';
+
+  const breakdownEl = document.getElementById('placementBreakdown');
+  if (breakdownEl) {
+    breakdownEl.innerHTML = levels
+      .map(l => `• <strong>${l}</strong>: ${stats[l].correct}/${stats[l].total} (${stats[l].pct}%)`)
+      .join('<br>');
+  }
+
+  const wrap = document.getElementById('placementRecoWrap');
+  if (wrap) wrap.style.display = '';
+
+  const startBtn = document.getElementById('placementStartBtn');
+  if (startBtn && typeof PLACEMENT_START_URLS !== 'undefined' && PLACEMENT_START_URLS) {
+    startBtn.href = PLACEMENT_START_URLS[recommended] || startBtn.href;
+  }
+
+  const lang = (typeof PRACTICE_LANG !== 'undefined') ? PRACTICE_LANG : '';
+  try {
+    if (lang) {
+      localStorage.setItem(`placement_${lang}`, JSON.stringify({
+        level: recommended,
+        overall_pct: pct,
+        breakdown: Object.fromEntries(levels.map(l => [l, {pct: stats[l].pct, correct: stats[l].correct, total: stats[l].total}])),
+        at: new Date().toISOString(),
+      }));
+    }
+  } catch (e) { /* ignore */ }
+}
+
 function showPracticeResults() {
   document.getElementById('practiceCard').style.display = 'none';
   const res = document.getElementById('practiceResults');
@@ -1255,55 +1371,24 @@ function showPracticeResults() {
       if (stats[l].total === 0 || stats[l].pct < threshold) { recommended = l; break; }
     }
 
-    const levelBn = {
-      A1: 'A1 — প্রাথমিক (শুরু থেকে শুরু করুন)',
-      A2: 'A2 — প্রি-ইন্টারমিডিয়েট (A1 জানা থাকলে এখান থেকে শুরু করুন)',
-      B1: 'B1 — ইন্টারমিডিয়েট (কথোপকথন ও ব্যাকরণ শক্ত করুন)',
-      B2: 'B2 — আপার ইন্টারমিডিয়েট (উন্নত ব্যাকরণ ও সাবলীলতা)',
-    };
-
-    document.getElementById('practiceResultEmoji').textContent = '🎯';
-    document.getElementById('practiceResultTitle').textContent = `Recommended starting level: ${recommended}`;
-    document.getElementById('practiceResultBn').textContent = 'স্কোর দেখে আপনার শেখা শুরু করার লেভেল নির্বাচন করা হয়েছে।';
-    document.getElementById('practiceResultScore').innerHTML =
-      `<span class="${pct >= 70 ? 'text-success' : pct >= 50 ? 'text-warning' : 'text-danger'}">${pct}%</span>` +
-      `<div class="small text-muted mt-2">${practiceCorrect}/${total} correct</div>`;
-
-    const badgeEl = document.getElementById('placementLevelBadge');
-    if (badgeEl) badgeEl.textContent = recommended;
-    const bnEl = document.getElementById('placementLevelBn');
-    if (bnEl) bnEl.textContent = levelBn[recommended] || '';
-
-    const breakdownEl = document.getElementById('placementBreakdown');
-    if (breakdownEl) {
-      breakdownEl.innerHTML = levels
-        .map(l => `• <strong>${l}</strong>: ${stats[l].correct}/${stats[l].total} (${stats[l].pct}%)`)
-        .join('<br>');
-    }
-
-    const wrap = document.getElementById('placementRecoWrap');
-    if (wrap) wrap.style.display = '';
-
-    const startBtn = document.getElementById('placementStartBtn');
-    if (startBtn && typeof PLACEMENT_START_URLS !== 'undefined' && PLACEMENT_START_URLS) {
-      startBtn.href = PLACEMENT_START_URLS[recommended] || startBtn.href;
+    renderPlacementResult(recommended, pct, stats);
+    // The server grades the same answers (and logs them for calibration); prefer its result.
+    if (!practiceSubmitted) {
+      practiceSubmitted = true;
+      submitStudySession(practiceAnswers).then(result => {
+        if (result && result.recommended_level) {
+          renderPlacementResult(result.recommended_level, result.overall_pct, result.breakdown);
+        }
+      });
     }
-
-    const lang = (typeof PRACTICE_LANG !== 'undefined') ? PRACTICE_LANG : '';
-    try {
-      if (lang) {
-        localStorage.setItem(`placement_${lang}`, JSON.stringify({
-          level: recommended,
-          overall_pct: pct,
-          breakdown: Object.fromEntries(levels.map(l => [l, {pct: stats[l].pct, correct: stats[l].correct, total: stats[l].total}])),
-          at: new Date().toISOString(),
-        }));
-      }
-    } catch (e) { /* ignore */ }
-
     return;
   }
 
+  if (!practiceSubmitted) {
+    practiceSubmitted = true;
+    submitStudySession(practiceAnswers);
+  }
+
   let emoji = '🎉';
   let title = 'Great job!';
   let titleBn = 'দারুণ! প্রতিদিন একটু করে প্র্যাকটিস করুন।';
@@ -1337,6 +1422,8 @@ function initPractice() {
   practiceWrong = 0;
   currentPracticeQuestion = null;
   practicePlacementLog = [];
+  practiceAnswers = [];
+  practiceSubmitted = false;
   renderPractice(0);
 
   document.addEventListener('keydown', (e) => {
@@ -2436,8 +2523,13 @@ document.addEventListener('DOMContentLoaded', () => {
   initShortcutsHelp();
 
   // Lesson page vocab TTS buttons (data-tts / data-lang attributes)
+  const audioBundle = document.querySelector('.lesson-page [data-audio-bundle]');
   document.querySelectorAll('.lesson-page .btn-listen[data-tts]').forEach(btn => {
-    btn.addEventListener('click', () => speakText(btn.dataset.tts, btn.dataset.lang || ''));
+    btn.addEventListener('click', () => {
+      speakText(btn.dataset.tts, btn.dataset.lang || '');
+      // First listen: fetch the rest of the lesson's audio in one request.
+      if (audioBundle) prefetchAudioBundle(audioBundle.dataset.audioBundle);
+    });
   });
 
   // Global ? key → open shortcuts modal
@@ -1,9 +1,18 @@
+import random
 import tempfile
 import unittest
 from pathlib import Path
+from unittest import mock
 
-from backend import create_app
-from backend.services import get_lessons
+from backend import create_app, services
+from backend.routes import mobile_api
+from backend.services import (
+    _build_placement_questions,
+    adaptive_question,
+    get_db,
+    get_lessons,
+    get_study_session,
+)
 
 
 class MobileApiTest(unittest.TestCase):
@@ -149,6 +158,50 @@ class MobileApiTest(unittest.TestCase):
         self.assertEqual(lesson_progress['attempts'], 0)
         self.assertIsNotNone(lesson_progress['last_seen'])
 
+    def test_content_endpoints_revalidate_with_etags(self):
+        headers = {'Authorization': f'Bearer {self._create_mobile_session()["access_token"]}'}
+        lesson_id = int(get_lessons()['french'][0]['id'])
+        urls = [
+            '/api/v1/languages',
+            '/api/v1/languages/french/lessons',
+            '/api/v1/languages/french/vocabulary?category=greetings&limit=5',
+        ]
+        etags = {}
+        for url in urls:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+            self.assertEqual(response.headers['Cache-Control'], 'no-cache')
+            etags[url] = response.headers['ETag']
+            self.assertFalse(etags[url].startswith('W/'))
+
+            # The 304 is answered before any content is loaded for the payload.
+            with mock.patch.object(mobile_api, 'get_vocab', side_effect=AssertionError('payload built')), \
+                    mock.patch.object(mobile_api, 'load_progress', side_effect=AssertionError('payload built')):
+                cached = self.client.get(url, headers={'If-None-Match': etags[url]})
+            self.assertEqual(cached.status_code, 304, url)
+            self.assertEqual(cached.data, b'')
+            self.assertEqual(cached.headers['ETag'], etags[url])
+
+        other_page = self.client.get('/api/v1/languages/french/vocabulary?category=greetings&limit=5&offset=5')
+        self.assertNotEqual(other_page.headers['ETag'], etags[urls[2]])
+        with mock.patch.object(services, 'get_content_version', return_value='reloaded'):
+            reloaded = self.client.get(urls[0], headers={'If-None-Match': etags[urls[0]]})
+        self.assertEqual(reloaded.status_code, 200)
+
+        lessons_url = urls[1]
+        mine = self.client.get(lessons_url, headers=headers)
+        self.assertNotEqual(mine.headers['ETag'], etags[lessons_url])
+        self.assertEqual(mine.headers['Cache-Control'], 'private, no-cache')
+        self.assertIn('Authorization', mine.headers['Vary'])
+        revalidate = {**headers, 'If-None-Match': mine.headers['ETag']}
+        self.assertEqual(self.client.get(lessons_url, headers=revalidate).status_code, 304)
+
+        self.client.post(f'/api/v1/languages/french/lessons/{lesson_id}/touch', headers=headers)
+        changed = self.client.get(lessons_url, headers=revalidate)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed.headers['ETag'], mine.headers['ETag'])
+        self.assertIsNotNone(changed.get_json()['lessons'][0]['progress']['last_seen'])
+
     def test_auth_session_validates_email(self):
         response = self.client.post(
             '/api/v1/auth/session',
@@ -177,6 +230,111 @@ class MobileApiTest(unittest.TestCase):
         self.assertEqual(progress.status_code, 401)
         self.assertEqual(progress.get_json()['error']['code'], 'unauthorized')
 
+    def test_placement_session_is_scored_server_side(self):
+        token = self._create_mobile_session()['access_token']
+        headers = {'Authorization': f'Bearer {token}'}
+
+        created = self.client.post(
+            '/api/v1/languages/french/placement/sessions',
+            json={'questions_per_level': 6},
+            headers=headers,
+        )
+        self.assertEqual(created.status_code, 201)
+        payload = created.get_json()
+        self.assertEqual(payload['question_count'], 24)
+        first = payload['questions'][0]
+        self.assertEqual(first['question_id'], 'q_001')
+        self.assertEqual(first['cefr'], 'A1')
+        self.assertNotIn('answer', first)
+
+        with self.app.app_context():
+            study = get_study_session(payload['session_id'])
+            questions = _build_placement_questions('french', 6, rng=random.Random(study['seed']))
+        self.assertEqual([q['prompt_en'] for q in questions], [q['prompt']['en'] for q in payload['questions']])
+
+        answers = [
+            {'question_id': f'q_{i + 1:03d}', 'answer': q['answer'] if q['cefr'] in {'A1', 'A2'} else 'nope'}
+            for i, q in enumerate(questions)
+        ]
+        submit_url = f"/api/v1/languages/french/placement/sessions/{payload['session_id']}/submit"
+        submitted = self.client.post(submit_url, json={'answers': answers}, headers=headers)
+        self.assertEqual(submitted.status_code, 200)
+        result = submitted.get_json()
+        self.assertEqual(result['breakdown']['A1'], {'correct': 6, 'total': 6, 'pct': 100})
+        self.assertEqual(result['recommended_level'], 'B1')
+        self.assertEqual(result['overall_pct'], 50)
+        self.assertIsNotNone(result['recommended_lesson_id'])
+
+        again = self.client.post(submit_url, json={'answers': []}, headers=headers)
+        self.assertEqual(again.get_json(), result)
+
+        other = self._create_mobile_session(email='other.user@example.com')['access_token']
+        foreign = self.client.post(submit_url, json={'answers': []}, headers={'Authorization': f'Bearer {other}'})
+        self.assertEqual(foreign.status_code, 404)
+
+        bad = self.client.post(
+            '/api/v1/languages/french/placement/sessions',
+            json={'questions_per_level': 'many'},
+            headers=headers,
+        )
+        self.assertEqual(bad.status_code, 400)
+
+    def test_adaptive_placement_session(self):
+        token = self._create_mobile_session()['access_token']
+        headers = {'Authorization': f'Bearer {token}'}
+
+        created = self.client.post(
+            '/api/v1/languages/spanish/placement/sessions', json={'adaptive': True}, headers=headers,
+        )
+        self.assertEqual(created.status_code, 201)
+        payload = created.get_json()
+        session_id = payload['session_id']
+        self.assertTrue(payload['adaptive'])
+        self.assertEqual(payload['question']['question_id'], 'q_001')
+        answer_url = f'/api/v1/languages/spanish/placement/sessions/{session_id}/answers'
+
+        stale = self.client.post(answer_url, json={'question_id': 'q_002', 'answer': 'x'}, headers=headers)
+        self.assertEqual(stale.status_code, 400)
+
+        step = 0
+        while True:
+            with self.app.app_context():
+                study = get_study_session(session_id)
+                question = adaptive_question('spanish', study['seed'], study['state'], step)
+            response = self.client.post(
+                answer_url,
+                json={'question_id': f'q_{step + 1:03d}', 'answer': question['answer']},
+                headers=headers,
+            )
+            self.assertEqual(response.status_code, 200)
+            body = response.get_json()
+            self.assertTrue(body['correct'])
+            step += 1
+            if body['finished']:
+                break
+            self.assertEqual(body['question']['question_id'], f'q_{step + 1:03d}')
+
+        result = body['result']
+        self.assertLessEqual(step, 16)
+        self.assertEqual(result['question_count'], step)
+        self.assertEqual(result['recommended_level'], 'B2')
+        self.assertGreater(result['ability']['theta'], 1.0)
+
+        done = self.client.post(answer_url, json={'question_id': f'q_{step + 1:03d}', 'answer': 'x'}, headers=headers)
+        self.assertEqual(done.status_code, 409)
+        submitted = self.client.post(
+            f'/api/v1/languages/spanish/placement/sessions/{session_id}/submit', json={}, headers=headers,
+        )
+        self.assertEqual(submitted.get_json(), result)
+
+        with self.app.app_context():
+            conn = get_db()
+            logged = conn.execute(
+                'SELECT COUNT(*) AS n FROM placement_responses WHERE session_id=?', (session_id,)
+            ).fetchone()['n']
+            conn.close()
+        self.assertEqual(logged, step)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,546 @@
+import io
+import os
+import tempfile
+import threading
+import time
+import unittest
+import zipfile
+from datetime import datetime
+from pathlib import Path
+from unittest import mock
+
+from backend import create_app, services
+from backend.services import (
+    ChromiumPdfPool,
+    LessonPdfCache,
+    PdfRenderQueue,
+    RenderQueueFull,
+    ShapedTextCache,
+    build_lesson_pdf,
+    get_lesson_vocab,
+    get_lessons,
+    lesson_pack_lessons,
+    lesson_pdf_cache_key,
+)
+
+try:
+    import pypdf
+except ImportError:
+    pypdf = None
+
+try:
+    from reportlab import rl_config
+except ImportError:
+    rl_config = None
+
+
+class FakeBrowser:
+    active = 0
+    peak = 0
+    count_lock = threading.Lock()
+
+    def __init__(self, delay=0.0, fail_on=None):
+        self.delay = delay
+        self.fail_on = fail_on
+        self.closed = False
+        self.alive = True
+        self.renders = 0
+
+    def healthy(self):
+        return self.alive
+
+    def render(self, html, header_html, footer_html, assets=None):
+        self.assets = assets
+        self.html = html
+        with FakeBrowser.count_lock:
+            FakeBrowser.active += 1
+            FakeBrowser.peak = max(FakeBrowser.peak, FakeBrowser.active)
+        try:
+            time.sleep(self.delay)
+            self.renders += 1
+            if html == self.fail_on:
+                raise RuntimeError('page crashed')
+            return f'%PDF {html}'.encode('utf-8')
+        finally:
+            with FakeBrowser.count_lock:
+                FakeBrowser.active -= 1
+
+    def close(self):
+        self.closed = True
+
+
+class ChromiumPdfPoolTest(unittest.TestCase):
+    def setUp(self):
+        FakeBrowser.active = FakeBrowser.peak = 0
+        self.launched = []
+
+    def _pool(self, **kwargs):
+        options = {'delay': kwargs.pop('delay', 0.0), 'fail_on': kwargs.pop('fail_on', None)}
+
+        def _launch():
+            browser = FakeBrowser(**options)
+            self.launched.append(browser)
+            return browser
+
+        return ChromiumPdfPool(launcher=_launch, **kwargs)
+
+    def test_concurrent_requests_queue_for_one_browser(self):
+        pool = self._pool(size=1, delay=0.02)
+        results = {}
+
+        def _render(n):
+            results[n] = pool.render(f'lesson {n}', '', '')
+
+        threads = [threading.Thread(target=_render, args=(n,)) for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(10)
+
+        self.assertEqual(results, {n: f'%PDF lesson {n}'.encode('utf-8') for n in range(8)})
+        self.assertEqual(len(self.launched), 1)
+        self.assertEqual(FakeBrowser.peak, 1)
+        metrics = pool.metrics()
+        self.assertEqual((metrics['launches'], metrics['renders'], metrics['browsers']), (1, 8, 1))
+        self.assertIsNotNone(metrics['render_ms']['p50'])
+
+    def test_browsers_are_recycled_after_n_renders(self):
+        pool = self._pool(recycle_after=3)
+        for n in range(7):
+            pool.render(f'lesson {n}', '', '')
+        self.assertEqual([b.renders for b in self.launched], [3, 3, 1])
+        self.assertTrue(self.launched[0].closed and self.launched[1].closed)
+        self.assertEqual(pool.metrics()['recycles'], 2)
+
+    def test_unhealthy_or_failed_browsers_are_replaced(self):
+        pool = self._pool(fail_on='broken')
+        pool.render('one', '', '')
+        self.launched[0].alive = False
+        pool.render('two', '', '')
+        self.assertEqual(len(self.launched), 2)
+        self.assertTrue(self.launched[0].closed)
+
+        with self.assertRaises(RuntimeError):
+            pool.render('broken', '', '')
+        self.assertTrue(self.launched[1].closed)
+        self.assertEqual(pool.render('three', '', ''), b'%PDF three')
+        self.assertEqual(len(self.launched), 3)
+        self.assertEqual(pool.metrics()['failures'], 1)
+
+    def test_idle_browser_is_closed_and_slow_renders_time_out(self):
+        pool = self._pool(idle_sec=0.05, delay=0.3)
+        with self.assertRaises(TimeoutError):
+            pool.render('slow', '', '', timeout=0.05)
+        deadline = time.time() + 5
+        while pool.metrics()['browsers'] and time.time() < deadline:
+            time.sleep(0.02)
+        self.assertEqual(pool.metrics()['browsers'], 0)
+        self.assertTrue(self.launched[0].closed)
+
+    def test_timed_out_render_keeps_its_slot_until_the_browser_is_done(self):
+        pool = self._pool(delay=0.3)
+        queue = PdfRenderQueue(concurrency=1, max_waiting=0, processes=4)
+        self.assertEqual(queue.processes, 1)
+        with self.assertRaises(TimeoutError) as ctx:
+            with queue.slot():
+                pool.render('slow', '', '', timeout=0.05)
+        self.assertIsNotNone(ctx.exception.running)
+        self.assertEqual(queue.metrics()['active'], 1)
+        with self.assertRaises(RenderQueueFull):
+            with queue.slot():
+                pass
+
+        deadline = time.time() + 5
+        while queue.metrics()['active'] and time.time() < deadline:
+            time.sleep(0.02)
+        self.assertEqual(queue.metrics()['active'], 0)
+        self.assertEqual(FakeBrowser.peak, 1)
+
+    def test_lesson_html_links_fonts_and_is_rendered_once_per_content_version(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        app = create_app({'TESTING': True, 'DB_PATH': os.path.join(temp_dir.name, 'progress.db'), 'SECRET_KEY': 'x'})
+        pool = self._pool()
+        lesson = get_lessons()['french'][0]
+        args = ('chromium', 'french', lesson, get_lesson_vocab('french', lesson), lesson.get('grammar'))
+        render_html = mock.Mock(wraps=services._render_lesson_pdf_html)
+        with app.test_request_context(), mock.patch.object(services, 'chromium_pdf_pool', pool), \
+                mock.patch.object(services, '_render_lesson_pdf_html', render_html):
+            services._render_lesson_pdf_bytes(*args)
+            services._render_lesson_pdf_bytes(*args)
+            with mock.patch.object(services, 'get_content_version', return_value='reloaded'):
+                services._render_lesson_pdf_bytes(*args)
+            font_path = app.config['PDF_HTML_BN_FONT_REG_PATH']
+        self.assertEqual(render_html.call_count, 2)
+
+        browser = self.launched[0]
+        self.assertNotIn('data:font', browser.html)
+        self.assertIn(f'{services._PDF_ASSET_ORIGIN}/fonts/bn-regular.ttf', browser.html)
+        self.assertLess(len(browser.html), 200_000)
+        self.assertEqual(browser.assets['/fonts/bn-regular.ttf'], (font_path, 'font/ttf'))
+
+    def test_launch_errors_reach_the_caller(self):
+        def _missing():
+            raise RuntimeError('Missing dependency: playwright. Run: pip install -r requirements.txt')
+
+        pool = ChromiumPdfPool(launcher=_missing)
+        with self.assertRaisesRegex(RuntimeError, 'playwright'):
+            pool.render('<p>x</p>', '', '')
+        self.assertEqual(pool.metrics()['launches'], 0)
+
+
+class LessonPdfCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        temp_path = Path(self.temp_dir.name)
+        self.app = create_app(
+            {
+                'TESTING': True,
+                'DB_PATH': str(temp_path / 'progress.db'),
+                'TTS_CACHE_DIR': str(temp_path / 'tts_cache'),
+                'PDF_CACHE_DIR': str(temp_path / 'pdf_cache'),
+                'SECRET_KEY': 'test-secret',
+            }
+        )
+        self.rendered = []
+
+        def _render(engine, lang, lesson, vocabulary, grammar):
+            self.rendered.append((engine, lang, lesson['id']))
+            return f'%PDF {engine} {lang} {lesson["id"]}'.encode('utf-8')
+
+        patch = mock.patch.object(services, '_render_lesson_pdf_bytes', side_effect=_render)
+        patch.start()
+        self.addCleanup(patch.stop)
+        self.lesson = next(l for l in get_lessons()['french'] if get_lesson_vocab('french', l))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_key_covers_every_input(self):
+        vocab = get_lesson_vocab('french', self.lesson)
+        grammar = self.lesson.get('grammar')
+        with self.app.app_context():
+            key = lesson_pdf_cache_key('chromium', 'french', self.lesson, vocab, grammar)
+            self.assertEqual(key, lesson_pdf_cache_key('chromium', 'french', dict(self.lesson), list(vocab), grammar))
+            self.assertNotEqual(key, lesson_pdf_cache_key('reportlab', 'french', self.lesson, vocab, grammar))
+            self.assertNotEqual(key, lesson_pdf_cache_key('chromium', 'french', self.lesson, vocab[1:], grammar))
+            with mock.patch.object(services, '_app_now', return_value=datetime(2099, 1, 1)):
+                self.assertNotEqual(key, lesson_pdf_cache_key('chromium', 'french', self.lesson, vocab, grammar))
+
+            font = Path(self.temp_dir.name) / 'font.ttf'
+            font.write_bytes(b'font v1')
+            self.app.config['PDF_HTML_BN_FONT_REG_PATH'] = str(font)
+            before = lesson_pdf_cache_key('chromium', 'french', self.lesson, vocab, grammar)
+            font.write_bytes(b'font v2!')
+            self.assertNotEqual(before, lesson_pdf_cache_key('chromium', 'french', self.lesson, vocab, grammar))
+
+    def test_render_once_then_serve_from_disk(self):
+        with self.app.app_context():
+            first = build_lesson_pdf('french', self.lesson)
+            again = build_lesson_pdf('french', self.lesson)
+        self.assertEqual((first['cached'], again['cached']), (False, True))
+        self.assertEqual(first['path'], again['path'])
+        self.assertEqual(self.rendered, [('chromium', 'french', self.lesson['id'])])
+
+        client = self.app.test_client()
+        client.post('/login', data={'name': 'Pdf User', 'email': 'pdf@example.com'})
+        url = f"/lesson/french/{self.lesson['id']}/download.pdf"
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, f"%PDF chromium french {self.lesson['id']}".encode('utf-8'))
+        self.assertEqual(response.headers['ETag'], f'"{first["key"]}"')
+        self.assertIn('attachment', response.headers['Content-Disposition'])
+        response.close()
+        self.assertEqual(client.get(url, headers={'If-None-Match': response.headers['ETag']}).status_code, 304)
+        self.assertEqual(len(self.rendered), 1)
+
+    def test_missing_chromium_falls_back_unless_requested(self):
+        def _render(engine, lang, lesson, vocabulary, grammar):
+            if engine == 'chromium':
+                raise RuntimeError('Missing dependency: playwright. Run: pip install -r requirements.txt')
+            return b'%PDF reportlab'
+
+        with self.app.app_context(), mock.patch.object(services, '_render_lesson_pdf_bytes', side_effect=_render):
+            self.assertEqual(build_lesson_pdf('french', self.lesson)['engine'], 'reportlab')
+            with self.assertRaisesRegex(RuntimeError, 'playwright'):
+                build_lesson_pdf('french', self.lesson, strict=True)
+
+    def test_eviction_keeps_the_cache_under_its_cap(self):
+        cache = LessonPdfCache(os.path.join(self.temp_dir.name, 'capped'), max_bytes=250)
+        for n in range(5):
+            cache.put(f'{n:02d}' + 'a' * 62, b'x' * 100)
+            os.utime(cache.path_for(f'{n:02d}' + 'a' * 62), (1000 + n, 1000 + n))
+        remaining = sorted(os.path.basename(path)[:2] for _, __, path in cache.files())
+        self.assertEqual(remaining, ['03', '04'])
+        self.assertIsNone(cache.get('00' + 'a' * 62))
+
+
+class LessonPackTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        temp_path = Path(self.temp_dir.name)
+        self.app = create_app(
+            {
+                'TESTING': True,
+                'DB_PATH': str(temp_path / 'progress.db'),
+                'TTS_CACHE_DIR': str(temp_path / 'tts_cache'),
+                'PDF_CACHE_DIR': str(temp_path / 'pdf_cache'),
+                'SECRET_KEY': 'test-secret',
+            }
+        )
+        self.client = self.app.test_client()
+        self.client.post('/login', data={'name': 'Pack User', 'email': 'pack@example.com'})
+        self.rendered = []
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+        self.fail_id = None
+
+        def _render(engine, lang, lesson, vocabulary, grammar):
+            with self.lock:
+                self.active += 1
+                self.peak = max(self.peak, self.active)
+            try:
+                time.sleep(0.01)
+                if lesson['id'] == self.fail_id:
+                    raise RuntimeError('render failed')
+                self.rendered.append(lesson['id'])
+                return self._pdf_bytes(lesson)
+            finally:
+                with self.lock:
+                    self.active -= 1
+
+        patch = mock.patch.object(services, '_render_lesson_pdf_bytes', side_effect=_render)
+        patch.start()
+        self.addCleanup(patch.stop)
+        self.lessons = lesson_pack_lessons('french', 'A1')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _pdf_bytes(self, lesson):
+        if pypdf is None:
+            return f"%PDF lesson {lesson['id']}".encode('utf-8')
+        writer = pypdf.PdfWriter()
+        writer.add_blank_page(width=200, height=200)
+        buf = io.BytesIO()
+        writer.write(buf)
+        return buf.getvalue()
+
+    def test_zip_pack_is_streamed_with_bounded_rendering(self):
+        self.fail_id = self.lessons[1]['id']
+        with mock.patch.dict(os.environ, {'PDF_PACK_WORKERS': '2'}):
+            response = self.client.get('/lesson/french/pack/a1.zip')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_streamed)
+        self.assertIn('french-a1-lessons.zip', response.headers['Content-Disposition'])
+        with zipfile.ZipFile(io.BytesIO(response.data)) as zf:
+            names = zf.namelist()
+            self.assertEqual(len(names), len(self.lessons))  # one failed lesson + errors.txt
+            self.assertTrue(names[0].startswith('A1/01-french-lesson-'))
+            self.assertIn('render failed', zf.read('errors.txt').decode('utf-8'))
+            self.assertEqual(zf.read(names[0]), self._pdf_bytes(self.lessons[0]))
+        self.assertLessEqual(self.peak, 2)
+        self.assertEqual(len(self.rendered), len(self.lessons) - 1)
+
+        self.fail_id = None
+        again = self.client.get('/lesson/french/pack/A1.zip')
+        again.get_data()
+        self.assertEqual(len(self.rendered), len(self.lessons))
+
+    def test_unknown_packs(self):
+        self.assertEqual(self.client.get('/lesson/french/pack/C2.zip').status_code, 404)
+        self.assertEqual(self.client.get('/lesson/french/pack/A1.tar').status_code, 404)
+        self.assertEqual(self.client.get('/lesson/german/pack/A1.pdf').status_code, 404)
+        self.assertEqual(len(lesson_pack_lessons('french', 'all')), len(get_lessons()['french']))
+
+    @unittest.skipUnless(pypdf, 'pypdf is not installed')
+    def test_merged_pdf_pack_has_a_bookmark_per_lesson(self):
+        response = self.client.get('/lesson/french/pack/A1.pdf')
+        self.assertEqual(response.status_code, 200)
+        reader = pypdf.PdfReader(io.BytesIO(response.data))
+        self.assertEqual(len(reader.pages), len(self.lessons))
+        self.assertEqual(len(reader.outline[1]), len(self.lessons))
+        etag = response.headers['ETag']
+        response.close()
+        self.assertEqual(self.client.get('/lesson/french/pack/A1.pdf', headers={'If-None-Match': etag}).status_code, 304)
+
+
+class PdfRenderQueueTest(unittest.TestCase):
+    def _hold(self, queue, release, started, lock_dir=None):
+        def _run():
+            try:
+                with queue.slot(lock_dir):
+                    started.release()
+                    release.wait(5)
+            except RenderQueueFull:
+                started.release()
+
+        thread = threading.Thread(target=_run)
+        thread.start()
+        return thread
+
+    def test_cap_and_bounded_wait_queue(self):
+        queue = PdfRenderQueue(concurrency=2, max_waiting=1, wait_sec=5, processes=0)
+        release = threading.Event()
+        started = threading.Semaphore(0)
+        threads = [self._hold(queue, release, started) for _ in range(2)]
+        for _ in threads:
+            started.acquire()
+        threads.append(self._hold(queue, release, started))
+        deadline = time.time() + 5
+        while queue.metrics()['waiting'] < 1 and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertTrue(queue.saturated())
+
+        with self.assertRaises(RenderQueueFull) as ctx:
+            with queue.slot():
+                pass
+        self.assertGreaterEqual(ctx.exception.retry_after, 1)
+
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        metrics = queue.metrics()
+        self.assertEqual((metrics['admitted'], metrics['rejected'], metrics['active']), (3, 1, 0))
+        self.assertIsNotNone(metrics['wait_ms']['p99'])
+
+    def test_waiting_times_out(self):
+        queue = PdfRenderQueue(concurrency=1, max_waiting=2, wait_sec=0.05, processes=0)
+        release = threading.Event()
+        started = threading.Semaphore(0)
+        holder = self._hold(queue, release, started)
+        started.acquire()
+        with self.assertRaises(RenderQueueFull):
+            with queue.slot():
+                pass
+        release.set()
+        holder.join(5)
+        self.assertEqual(queue.metrics()['timeouts'], 1)
+
+    @unittest.skipIf(services._fcntl is None, "needs fcntl")
+    def test_slots_are_shared_by_queues_on_the_same_lock_dir(self):
+        # Two queues stand in for two web worker processes sharing PDF_CACHE_DIR.
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        first = PdfRenderQueue(concurrency=1, max_waiting=2, wait_sec=5, processes=0)
+        second = PdfRenderQueue(concurrency=1, max_waiting=2, wait_sec=0.2, processes=0)
+        release = threading.Event()
+        started = threading.Semaphore(0)
+        holder = self._hold(first, release, started, lock_dir=temp_dir.name)
+        started.acquire()
+        with self.assertRaises(RenderQueueFull):
+            with second.slot(temp_dir.name):
+                pass
+        self.assertEqual((second.metrics()['timeouts'], second.metrics()['active']), (1, 0))
+        release.set()
+        holder.join(5)
+        with second.slot(temp_dir.name):
+            self.assertEqual(second.metrics()['active'], 1)
+        self.assertEqual(second.metrics()['admitted'], 1)
+
+    def test_download_is_refused_with_retry_after_when_busy(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        app = create_app(
+            {
+                'TESTING': True,
+                'DB_PATH': os.path.join(temp_dir.name, 'progress.db'),
+                'PDF_CACHE_DIR': os.path.join(temp_dir.name, 'pdf_cache'),
+                'SECRET_KEY': 'test-secret',
+            }
+        )
+        client = app.test_client()
+        client.post('/login', data={'name': 'Busy User', 'email': 'busy@example.com'})
+        queue = PdfRenderQueue(concurrency=1, max_waiting=0, processes=0)
+        release = threading.Event()
+        started = threading.Semaphore(0)
+        holder = self._hold(queue, release, started)
+        started.acquire()
+        try:
+            with mock.patch.object(services, 'pdf_render_queue', queue), \
+                    mock.patch.object(services, '_render_lesson_pdf_bytes', return_value=b'%PDF'):
+                response = client.get('/lesson/french/1/download.pdf')
+        finally:
+            release.set()
+            holder.join(5)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers['Retry-After'], '2')
+
+    def test_reportlab_renders_in_a_worker_process(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        app = create_app({'TESTING': True, 'DB_PATH': os.path.join(temp_dir.name, 'progress.db'), 'SECRET_KEY': 'x'})
+        queue = PdfRenderQueue(processes=1)
+        lesson = get_lessons()['french'][1]
+        with app.app_context():
+            args = ('french', services.LANG_META['french'], lesson, get_lesson_vocab('french', lesson), lesson.get('grammar'))
+            try:
+                pdf = queue.render_reportlab(*args)
+            except RuntimeError as exc:
+                # Raised in the child process and handed back to the caller.
+                self.assertIn('reportlab', str(exc))
+            else:
+                self.assertTrue(pdf.startswith(b'%PDF'))
+        queue._executor.shutdown()
+
+
+class Frag:
+    def __init__(self, font='F', size=9, color='black'):
+        self.fontName = font
+        self.fontSize = size
+        self.textColor = color
+
+
+class ReportlabRenderCacheTest(unittest.TestCase):
+    def test_shaped_text_is_cached_per_text_font_and_size(self):
+        calls = []
+
+        def shape(w, features=None):
+            calls.append(w[1][1])
+            if w[1][1] == 'plain':
+                return w
+            return [len(w[1][1]) * 2.0, (w[1][0], w[1][1].upper())]
+
+        cache = ShapedTextCache(max_entries=2)
+        shape_word = cache.wrap(shape)
+        first = shape_word([1.0, (Frag(), 'ami')])
+        red = Frag(color='red')
+        again = shape_word([1.0, (red, 'ami')])
+        self.assertEqual(again, [6.0, (red, 'AMI')])
+        self.assertEqual(first[1][1], again[1][1])
+        plain = [1.0, (Frag(), 'plain')]
+        self.assertIs(shape_word(plain), plain)
+        self.assertIs(shape_word(plain), plain)
+        shape_word([1.0, (Frag(size=11), 'ami')])
+        self.assertEqual(calls, ['ami', 'plain', 'ami'])
+
+        # Oldest entry evicted; multi-run words and explicit features bypass the cache.
+        shape_word([1.0, (Frag(), 'ami')])
+        shape_word([2.0, (Frag(), 'a'), (Frag(), 'b')])
+        shape_word([1.0, (Frag(), 'plain')], {'kern': False})
+        self.assertEqual(calls[3:], ['ami', 'a', 'plain'])
+        self.assertEqual(cache.metrics(), {'entries': 2, 'max_entries': 2, 'hits': 2, 'misses': 4})
+
+    @unittest.skipUnless(rl_config, 'reportlab is not installed')
+    def test_cached_renders_match_a_cold_render(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        app = create_app({'TESTING': True, 'DB_PATH': os.path.join(temp_dir.name, 'progress.db'), 'SECRET_KEY': 'x'})
+        lesson = next(l for l in get_lessons()['spanish'] if l.get('grammar'))
+        self.addCleanup(setattr, rl_config, 'invariant', rl_config.invariant)
+        rl_config.invariant = 1
+        with app.app_context():
+            args = ('spanish', services.LANG_META['spanish'], lesson, get_lesson_vocab('spanish', lesson), lesson['grammar'])
+            services.reset_reportlab_caches()
+            cold = services._build_lesson_pdf_bytes_reportlab(*args)
+            sheet = services._reportlab_style_sheet(*services._ensure_pdf_font_registered())
+            hits = services.shaped_text_cache.metrics()['hits']
+            warm = services._build_lesson_pdf_bytes_reportlab(*args)
+            self.assertIs(services._reportlab_style_sheet(*services._ensure_pdf_font_registered()), sheet)
+        self.assertEqual(cold, warm)
+        self.assertGreater(services.shaped_text_cache.metrics()['hits'], hits)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,172 @@
+import importlib.util
+import math
+import random
+import tempfile
+import unittest
+from pathlib import Path
+
+from backend import create_app
+from backend.services import (
+    PlacementBank,
+    _grade_answer,
+    _score_placement,
+    answer_adaptive_placement,
+    get_adaptive_placement_engine,
+    get_lessons,
+    get_placement_bank,
+    get_vocab,
+    placement_prior_difficulty,
+    start_adaptive_placement,
+)
+
+SCRIPTS_DIR = Path(__file__).resolve().parents[1] / 'scripts'
+
+
+def _load_script(name):
+    spec = importlib.util.spec_from_file_location(name, SCRIPTS_DIR / f'{name}.py')
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class _AppContextTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        temp_path = Path(self.temp_dir.name)
+        self.app = create_app(
+            {
+                'TESTING': True,
+                'DB_PATH': str(temp_path / 'progress.db'),
+                'TTS_CACHE_DIR': str(temp_path / 'tts_cache'),
+                'SECRET_KEY': 'test-secret',
+            }
+        )
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+
+    def tearDown(self):
+        self.ctx.pop()
+        self.temp_dir.cleanup()
+
+
+class PlacementBankTest(_AppContextTest):
+    def test_bank_is_built_once_per_content_version(self):
+        bank = get_placement_bank('french')
+        self.assertIs(bank, get_placement_bank('french'))
+        for level in ('A1', 'A2', 'B1', 'B2'):
+            self.assertTrue(bank.levels[level]['vocab'])
+            self.assertEqual(len(bank.levels[level]['distractors']), len(bank.levels[level]['vocab']))
+
+    def test_same_seed_rebuilds_the_same_test(self):
+        bank = get_placement_bank('spanish')
+        first = bank.build_questions(10, rng=random.Random(42))
+        self.assertEqual(first, bank.build_questions(10, rng=random.Random(42)))
+        self.assertEqual(len(first), 40)
+        self.assertEqual([q['cefr'] for q in first[::10]], ['A1', 'A2', 'B1', 'B2'])
+
+        for q in first:
+            if q['kind'] == 'mcq':
+                self.assertEqual(q['choices'].count(q['answer']), 1)
+                self.assertLessEqual(len(q['choices']), 4)
+            rebuilt = bank.question_for_key(q['item_key'], random.Random(1))
+            self.assertEqual(rebuilt['answer'], q['answer'])
+
+    def test_item_keys_follow_content_not_position(self):
+        lessons = get_lessons()['french']
+        vocab = get_vocab()['french']
+        bank = PlacementBank('french', vocab, lessons)
+        shuffled = [dict(l) for l in lessons]
+        for lesson in shuffled:
+            gr = dict(lesson.get('grammar') or {})
+            gr['quiz_questions'] = list(reversed(gr.get('quiz_questions') or []))
+            lesson['grammar'] = gr
+        reordered = PlacementBank('french', vocab, shuffled)
+
+        key = bank.levels['A1']['grammar'][0]['key']
+        self.assertNotEqual(reordered.levels['A1']['grammar'][0]['key'], key)
+        before = bank.question_for_key(key, random.Random(1))
+        after = reordered.question_for_key(key, random.Random(1))
+        self.assertEqual(after['prompt_en'], before['prompt_en'])
+        self.assertEqual(after['answer'], before['answer'])
+        self.assertIsNone(bank.question_for_key('g:A1:0', random.Random(1)))
+
+    def test_grading_matches_the_browser_rules(self):
+        self.assertTrue(_grade_answer({'kind': 'type', 'answer': 'argentino/a'}, ' Argentina '))
+        self.assertTrue(_grade_answer({'kind': 'type', 'answer': 'cœur'}, 'coeur'))
+        self.assertTrue(_grade_answer({'kind': 'order', 'answer': 'Je suis là'}, ['je', 'suis', 'la']))
+        self.assertFalse(_grade_answer({'kind': 'mcq', 'answer': 'Bonsoir'}, 'bonsoir'))
+        self.assertFalse(_grade_answer({'kind': 'mcq', 'answer': 'Bonsoir'}, None))
+
+    def test_recommends_first_level_below_threshold(self):
+        questions = [{'kind': 'mcq', 'answer': 'x', 'cefr': lvl} for lvl in ('A1', 'A2', 'B1', 'B2') for _ in range(2)]
+        answers = {0: 'x', 1: 'x', 2: 'x', 3: 'no'}
+        result = _score_placement(questions, answers)
+        self.assertEqual(result['recommended_level'], 'A2')
+        self.assertEqual(result['breakdown']['A2'], {'correct': 1, 'total': 2, 'pct': 50})
+        self.assertEqual(result['overall_pct'], 38)
+
+
+class AdaptivePlacementTest(_AppContextTest):
+    def _run(self, theta, seed):
+        engine = get_adaptive_placement_engine('french')
+        bank = get_placement_bank('french')
+        rng = random.Random(seed)
+        state = start_adaptive_placement('french', seed)
+        while True:
+            key = state['items'][len(state['responses'])]
+            p = 1.0 / (1.0 + math.exp(engine.difficulty_of(key) - theta))
+            answer = bank.question_for_key(key, rng)['answer'] if rng.random() < p else '__wrong__'
+            state, _, finished, estimate, _ = answer_adaptive_placement('french', seed, state, answer)
+            if finished:
+                return state, estimate
+
+    def test_finishes_in_about_a_third_of_the_fixed_test(self):
+        lengths = []
+        for seed in range(20):
+            state, _ = self._run(0.0, seed)
+            lengths.append(len(state['responses']))
+            families = {':'.join(k.split(':')[:3]) for k in state['items']}
+            self.assertEqual(len(families), len(state['items']))
+        self.assertLessEqual(max(lengths), 16)
+        self.assertLessEqual(sum(lengths) / len(lengths), 15)
+
+    def test_estimate_tracks_ability(self):
+        engine = get_adaptive_placement_engine('french')
+        low = [self._run(-2.5, s)[1] for s in range(8)]
+        high = [self._run(2.5, s)[1] for s in range(8)]
+        self.assertLess(sum(low) / 8, -1.0)
+        self.assertGreater(sum(high) / 8, 1.0)
+        self.assertEqual(engine.level_for(-2.5), 'A1')
+        self.assertEqual(engine.level_for(2.5), 'B2')
+
+
+class CalibrationScriptTest(unittest.TestCase):
+    def test_recovers_an_item_that_is_harder_than_its_prior(self):
+        calibrate = _load_script('calibrate_placement').calibrate
+        rng = random.Random(4)
+        true_b = {'easy': -1.0, 'mid': 0.0, 'hard': 1.0, 'mislabelled': 1.5}
+        served = {'easy': -1.0, 'mid': 0.0, 'hard': 1.0, 'mislabelled': -0.5}
+        responses = []
+        for session in range(400):
+            theta = rng.gauss(0, 1)
+            for key, b in true_b.items():
+                correct = rng.random() < 1.0 / (1.0 + math.exp(b - theta))
+                responses.append((f's{session}', key, int(correct), served[key]))
+
+        fitted = calibrate(responses)
+        self.assertEqual(fitted['mid'][1], 400)
+        self.assertGreater(fitted['mislabelled'][0], 0.5)
+        self.assertLess(fitted['easy'][0], fitted['mid'][0])
+        self.assertLess(fitted['mid'][0], fitted['hard'][0])
+
+    def test_unlogged_difficulty_falls_back_to_the_level_prior(self):
+        calibrate = _load_script('calibrate_placement').calibrate
+        key = 'v:B2:0123456789:type_english_to_word'
+        responses = [(f's{i}', key, i % 2, None) for i in range(10)]
+        fitted = calibrate(responses)
+        self.assertAlmostEqual(fitted[key][0], placement_prior_difficulty(key), places=3)
+        self.assertIsNone(placement_prior_difficulty('v:B2:12:type_english_to_word'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+import random
+import tempfile
+import unittest
+from pathlib import Path
+
+from backend import create_app
+from backend.services import DistractorIndex, PracticeEngine, _sample_distinct, get_practice_engine
+
+
+def _entry(word, english, **extra):
+    return {'word': word, 'english': english, 'bengali': f'{english}-bn', **extra}
+
+
+class PracticeEngineTest(unittest.TestCase):
+    def setUp(self):
+        vocab_by_cat = {
+            'greetings': [_entry(f'salut{i}', f'hi{i}') for i in range(12)],
+            'travel': [_entry(f'gare{i}', f'station{i}') for i in range(12)],
+        }
+        lessons = [
+            {'id': 1, 'cefr_level': 'A1', 'vocabulary_categories': ['greetings']},
+            {'id': 2, 'cefr_level': 'A2', 'vocabulary_categories': ['travel']},
+        ]
+        self.engine = PracticeEngine('french', vocab_by_cat, lessons)
+
+    def test_unlocked_pools_are_cumulative_by_rank(self):
+        a1_entries, a1_words = self.engine.unlocked_pool(1)
+        a2_entries, a2_words = self.engine.unlocked_pool(2)
+
+        self.assertEqual(len(a1_entries), 12)
+        self.assertTrue(all(w.startswith('salut') for w in a1_words))
+        self.assertEqual(len(a2_entries), 24)
+        self.assertEqual(self.engine.unlocked_pool(0), ([], frozenset()))
+
+    def test_session_respects_unlocked_words_and_due_words_first(self):
+        rng = random.Random(7)
+        questions = self.engine.build_questions(8, due_words=['gare3', 'salut5'], current_rank=1, rng=rng)
+
+        self.assertEqual(len(questions), 8)
+        words = {q['word'] for q in questions}
+        self.assertIn('salut5', words)
+        self.assertNotIn('gare3', words)
+        self.assertTrue(all(w.startswith('salut') for w in words))
+        self.assertEqual(len(words), 8)
+
+    def test_distractors_never_include_the_answer(self):
+        rng = random.Random(3)
+        for _ in range(20):
+            for q in self.engine.build_questions(10, current_rank=2, rng=rng):
+                if q['kind'] != 'mcq':
+                    continue
+                self.assertEqual(q['choices'].count(q['answer']), 1)
+                self.assertEqual(len(q['choices']), 4)
+
+    def test_sample_distinct_handles_tiny_pools(self):
+        pool = [_entry('a', 'x'), _entry('b', 'y')]
+        picked = _sample_distinct(pool, 3, random.Random(1), skip_word='a')
+        self.assertEqual([p['word'] for p in picked], ['b'])
+
+
+class DistractorIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.entries = [
+            _entry('rouge', 'red'),
+            _entry('rose', 'pink'),
+            _entry('vert', 'green'),
+            _entry('écarlate', 'Red'),
+            _entry('manger', 'to eat'),
+            _entry('boire', 'to drink'),
+            _entry('lundi', 'Monday'),
+        ]
+        categories = ['colors'] * 4 + ['verbs'] * 2 + ['time']
+        self.index = DistractorIndex(self.entries, ranks=[1, 1, 2, 3, 1, 1, 1], categories=categories, k=4)
+
+    def _neighbour_words(self, word, **kwargs):
+        return [self.entries[i]['word'] for i in self.index.neighbours_of(word, **kwargs)]
+
+    def test_neighbours_prefer_similar_entries_and_skip_same_gloss(self):
+        self.assertEqual(self.index.neighbours.shape, (7, 4))
+        self.assertEqual(set(self._neighbour_words('rouge')[:2]), {'rose', 'vert'})
+        self.assertNotIn('écarlate', self._neighbour_words('rouge'))
+        self.assertEqual(self._neighbour_words('manger')[0], 'boire')
+
+    def test_rank_filter_and_pick(self):
+        self.assertNotIn('vert', self._neighbour_words('rose', max_rank=1))
+        picked = self.index.pick('manger', 3, random.Random(4))
+        self.assertEqual(len(picked), 3)
+        self.assertNotIn('manger', [p['word'] for p in picked])
+        self.assertEqual(self.index.pick('inconnu', 3, random.Random(4)), [])
+
+    def test_pick_keeps_shown_bengali_choices_unambiguous(self):
+        self.entries[1]['bengali'] = self.entries[0]['bengali']
+        for seed in range(10):
+            picked = self.index.pick('rouge', 3, random.Random(seed), distinct=('english', 'bengali'))
+            self.assertNotIn('rose', [p['word'] for p in picked])
+        picked = self.index.pick('rouge', 3, random.Random(0), within={'rose', 'lundi'})
+        self.assertTrue({p['word'] for p in picked} <= {'rose', 'lundi'})
+
+    def test_stored_snapshot_is_used_only_while_content_matches(self):
+        categories = ['colors'] * 4 + ['verbs'] * 2 + ['time']
+        snapshot = self.index.snapshot()
+        stored = DistractorIndex(self.entries, ranks=[1, 1, 2, 3, 1, 1, 1], categories=categories, k=4,
+                                 snapshot=snapshot)
+        self.assertTrue(stored.precomputed)
+        self.assertEqual(stored.neighbours.tolist(), self.index.neighbours.tolist())
+
+        edited = [dict(e) for e in self.entries]
+        edited[2]['english'] = 'olive'
+        stale = DistractorIndex(edited, ranks=[1, 1, 2, 3, 1, 1, 1], categories=categories, k=4, snapshot=snapshot)
+        self.assertFalse(stale.precomputed)
+        self.assertFalse(self.index.precomputed)
+
+    def test_engine_tops_up_from_fallback_pool(self):
+        engine = PracticeEngine('french', {'colors': self.entries[:3], 'verbs': self.entries[4:6]}, [])
+        self.assertEqual(len(engine.distractors), 5)
+        wrong = engine.pick_distractors('rouge', 3, random.Random(1), max_rank=0)
+        self.assertEqual(len(wrong), 3)
+        self.assertNotIn('rouge', [w['word'] for w in wrong])
+
+
+class PracticeEngineCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        temp_path = Path(self.temp_dir.name)
+        self.app = create_app(
+            {
+                'TESTING': True,
+                'DB_PATH': str(temp_path / 'progress.db'),
+                'TTS_CACHE_DIR': str(temp_path / 'tts_cache'),
+                'SECRET_KEY': 'test-secret',
+            }
+        )
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_engine_is_reused_for_the_same_content_version(self):
+        with self.app.app_context():
+            self.assertIs(get_practice_engine('french'), get_practice_engine('french'))
+
+    def test_practice_page_renders(self):
+        response = self.client.get('/practice/french?n=25')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'PRACTICE_QUESTIONS', response.data)
+
+
+if __name__ == '__main__':
+    unittest.main()
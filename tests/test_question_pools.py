@@ -0,0 +1,123 @@
+import json
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from backend import create_app, services
+from backend.services import QuestionPools, get_study_session, study_session_questions
+
+
+class QuestionPoolsTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        temp_path = Path(self.temp_dir.name)
+        self.resources_path = temp_path / 'resource_sentences.json'
+        self.resources_path.write_text(json.dumps({'french': [], 'spanish': []}), encoding='utf-8')
+        self.app = create_app(
+            {
+                'TESTING': True,
+                'DB_PATH': str(temp_path / 'progress.db'),
+                'TTS_CACHE_DIR': str(temp_path / 'tts_cache'),
+                'RESOURCE_SENTENCES_PATH': str(self.resources_path),
+                'SECRET_KEY': 'test-secret',
+                'METRICS_TOKEN': 'metrics-secret',
+            }
+        )
+        self.pools = QuestionPools()
+        self.pools.depth = 2
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_warm_fills_every_default_pool_with_rebuildable_sets(self):
+        with self.app.app_context():
+            self.pools.warm()
+            metrics = self.pools.metrics()
+            self.assertEqual(metrics['ready'], metrics['pools'] * 2)
+            self.assertIn('quiz/french/1', metrics['depths'])
+            self.assertIn('practice/spanish/99/12', metrics['depths'])
+
+            version, seed, questions = self.pools.take(('quiz', 'french', 1))
+            study = {'kind': 'quiz', 'language': 'french', 'seed': seed, 'params': {'lesson_id': 1}}
+            self.assertEqual(questions, study_session_questions(study))
+            self.assertEqual(self.pools.metrics()['depths']['quiz/french/1'], 1)
+
+            self.pools.refill()
+            self.assertEqual(self.pools.metrics()['depths']['quiz/french/1'], 2)
+
+    def test_misses_register_new_keys_and_content_changes_drop_pools(self):
+        with self.app.app_context():
+            self.pools.warm()
+            key = ('practice', 'french', 1, 7)
+            self.assertIsNone(self.pools.take(key))
+            self.pools.refill()
+            self.assertEqual(len(self.pools.take(key)[2]), 7)
+
+            self.resources_path.write_text(json.dumps({'french': [], 'spanish': []}, indent=1), encoding='utf-8')
+            self.assertIsNone(self.pools.take(('quiz', 'french', 1)))
+            self.assertEqual(self.pools.metrics()['misses'], 2)
+
+    def test_pages_and_sessions_use_pooled_questions(self):
+        with self.app.app_context():
+            self.pools.warm()
+            pooled = {seed for seed, _ in self.pools._pools[('quiz', 'french', 1)]}
+
+        client = self.app.test_client()
+        client.post('/login', data={'name': 'Pool User', 'email': 'pool@example.com'})
+        with mock.patch.object(services, 'question_pools', self.pools):
+            page = client.get('/quiz/french/1')
+        self.assertEqual(page.status_code, 200)
+        self.assertEqual(self.pools.metrics()['hits'], 1)
+        self.assertEqual(client.get('/api/metrics').status_code, 404)
+        metrics = client.get('/api/metrics?token=metrics-secret').get_json()
+        self.assertIn('refill_ms', metrics['question_pools'])
+
+        session_id = page.data.split(b"const SESSION_ID = '")[1].split(b"'")[0].decode()
+        with self.app.app_context():
+            study = get_study_session(session_id)
+            questions = study_session_questions(study)
+        self.assertIn(study['seed'], pooled)
+        answers = [{'question_id': f'q_{i + 1:03d}', 'answer': q['correct']} for i, q in enumerate(questions)]
+        result = client.post(f'/api/study_sessions/{session_id}/submit', json={'answers': answers}).get_json()
+        self.assertEqual(result['score_pct'], 100)
+
+    def test_due_words_are_merged_into_pooled_practice_sets(self):
+        client = self.app.test_client()
+        client.post('/login', data={'name': 'Due User', 'email': 'due@example.com'})
+        with self.app.app_context():
+            self.pools.warm()
+            engine = services.get_practice_engine('french')
+            due = [e['word'] for e in engine.unlocked_pool(99)[0][:3]]
+        with mock.patch.object(services, 'question_pools', self.pools), \
+                mock.patch.object(services, 'load_due_words', return_value=due), \
+                mock.patch.object(services, '_recommended_lesson', return_value=None):
+            page = client.get('/practice/french')
+        self.assertEqual(page.status_code, 200)
+        self.assertEqual(self.pools.metrics()['hits'], 1)
+
+        session_id = page.data.split(b"const SESSION_ID = '")[1].split(b"'")[0].decode()
+        with self.app.app_context():
+            study = get_study_session(session_id)
+            questions = study_session_questions(study)
+        self.assertEqual(study['params']['due_words'], due)
+        self.assertEqual(len(questions), 12)
+        self.assertTrue(set(due) <= {q['word'] for q in questions})
+        self.assertEqual([q['id'] for q in questions], list(range(1, 13)))
+        rendered = json.loads(page.data.split(b'const PRACTICE_QUESTIONS = ')[1].split(b';\n')[0])
+        self.assertEqual(rendered, questions)
+
+    def test_background_worker_warms_on_start(self):
+        self.pools.start(self.app, depth=1, poll_sec=60)
+        self.addCleanup(self.pools.stop)
+        deadline = time.time() + 30
+        while self.pools.metrics()['warmups'] < 1 and time.time() < deadline:
+            time.sleep(0.05)
+        metrics = self.pools.metrics()
+        self.assertTrue(metrics['running'])
+        self.assertEqual(metrics['ready'], metrics['pools'])
+
+
+if __name__ == '__main__':
+    unittest.main()
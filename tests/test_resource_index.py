@@ -0,0 +1,190 @@
+import json
+import random
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+from backend import create_app
+from backend.services import (
+    ResourceCorpus,
+    ResourceSentenceIndex,
+    _blank_first_token,
+    _build_resource_drill_questions,
+    _compute_resource_insights,
+    _content_derived,
+    _word_match_variants,
+    get_resource_index,
+    get_resource_stats,
+)
+
+
+SENTENCES = [
+    {'text': 'Le café est très chaud.', 'source': 'a.pdf', 'page': 1},
+    {'text': '   ', 'source': 'a.pdf', 'page': 1},
+    {'text': "Aujourd'hui, je bois un CAFE noir.", 'source': 'b.pdf', 'page': 2},
+    {'text': 'Él es argentino y ella es argentina.', 'source': 'c.pdf', 'page': 3},
+    {'text': 'Rien à voir.', 'source': 'c.pdf', 'page': 4},
+]
+
+
+class ResourceSentenceIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = ResourceSentenceIndex(SENTENCES)
+
+    def test_blank_matches_blank_first_token(self):
+        for sid, text in enumerate(self.index.texts):
+            for word in ('café', "aujourd'hui", 'argentino/a', 'es'):
+                self.assertEqual(
+                    self.index.blank(sid, _word_match_variants(word)),
+                    _blank_first_token(text, word),
+                    msg=f'{word!r} in {text!r}',
+                )
+
+    def test_pick_context_only_returns_sentences_containing_the_word(self):
+        rng = random.Random(5)
+        seen = set()
+        for _ in range(40):
+            ctx = self.index.pick_context('café', rng)
+            self.assertIn('____', ctx['blanked'])
+            seen.add(ctx['source'])
+        self.assertEqual(seen, {'a.pdf', 'b.pdf'})
+
+        ctx = self.index.pick_context('argentino/a', rng)
+        self.assertEqual(ctx['blanked'], 'Él es ____ y ella es argentina.')
+        self.assertIsNone(self.index.pick_context('bonjour', rng))
+
+    def test_blank_lines_are_not_indexed(self):
+        self.assertEqual(len(self.index), 4)
+
+
+class ResourceCorpusTest(unittest.TestCase):
+    def setUp(self):
+        vocab_by_cat = {
+            'food': [
+                {'word': 'café', 'english': 'coffee'},
+                {'word': 'noir', 'english': 'black'},
+                {'word': 'le', 'english': 'the'},
+                {'word': 'très chaud', 'english': 'very hot'},
+            ],
+        }
+        self.corpus = ResourceCorpus('french', vocab_by_cat, ResourceSentenceIndex(SENTENCES))
+
+    def test_sentences_map_to_drillable_words_only(self):
+        self.assertEqual(self.corpus.sentence_words(0), ['café'])
+        self.assertEqual(sorted(self.corpus.sentence_words(1)), ['café', 'noir'])
+        self.assertEqual(self.corpus.sentence_words(3), [])
+
+    def test_reverse_map_lists_every_sentence_for_a_word(self):
+        self.assertEqual(self.corpus.words, ['café', 'noir'])
+        self.assertEqual(self.corpus.word_sentences('café').tolist(), [0, 1])
+        self.assertEqual(self.corpus.word_sentences('noir').tolist(), [1])
+        self.assertEqual(len(self.corpus.word_sentences('le')), 0)
+        self.assertEqual(self.corpus.blank(1, 'café'), "Aujourd'hui, je bois un ____ noir.")
+
+    def test_language_without_vocabulary_matches_nothing(self):
+        corpus = ResourceCorpus('french', {}, ResourceSentenceIndex([{'text': 'Le chat noir.'}]))
+        self.assertEqual(corpus.token_category.tolist(), [-1, -1, -1])
+        self.assertEqual(corpus.words, [])
+        self.assertEqual(corpus.sentence_words(0), [])
+
+
+class ResourceIndexCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        temp_path = Path(self.temp_dir.name)
+        self.resources_path = temp_path / 'resource_sentences.json'
+        self.resources_path.write_text(json.dumps({'french': SENTENCES, 'spanish': []}), encoding='utf-8')
+        self.app = create_app(
+            {
+                'TESTING': True,
+                'DB_PATH': str(temp_path / 'progress.db'),
+                'TTS_CACHE_DIR': str(temp_path / 'tts_cache'),
+                'RESOURCE_SENTENCES_PATH': str(self.resources_path),
+                'SECRET_KEY': 'test-secret',
+            }
+        )
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_index_is_rebuilt_when_resources_change(self):
+        with self.app.app_context():
+            first = get_resource_index('french')
+            self.assertIs(first, get_resource_index('french'))
+            self.assertEqual(len(first), 4)
+
+            self.resources_path.write_text(
+                json.dumps({'french': SENTENCES[:1], 'spanish': []}, indent=1),
+                encoding='utf-8',
+            )
+            second = get_resource_index('french')
+            self.assertIsNot(first, second)
+            self.assertEqual(len(second), 1)
+
+    def test_slow_derived_build_only_blocks_its_own_name(self):
+        building = threading.Event()
+        release = threading.Event()
+
+        def _slow():
+            building.set()
+            release.wait(5)
+            return 'slow'
+
+        with self.app.app_context():
+            thread = threading.Thread(target=lambda: _content_derived(('test_slow', id(self)), _slow))
+            thread.start()
+            try:
+                self.assertTrue(building.wait(5))
+                self.assertEqual(len(get_resource_index('french')), 4)
+                self.assertTrue(thread.is_alive())
+            finally:
+                release.set()
+                thread.join(5)
+
+    def test_insights_reuse_corpus_stats_and_pick_focus_per_user(self):
+        with self.app.app_context():
+            stats = get_resource_stats('french')
+            self.assertIs(stats, get_resource_stats('french'))
+            self.assertEqual(stats['sentence_count'], 5)
+            self.assertEqual(stats['source_count'], 3)
+            self.assertGreater(stats['coverage_pct'], 0)
+
+            fresh = _compute_resource_insights('french', {})
+            first_focus = fresh['focus_lesson']['id']
+            self.assertEqual(first_focus, stats['focus_candidates'][0]['id'])
+
+            done = _compute_resource_insights('french', {first_focus: {'completed': 1}})
+            self.assertNotEqual(done['focus_lesson']['id'], first_focus)
+            self.assertEqual(done['top_categories'], fresh['top_categories'])
+            self.assertIsNone(_compute_resource_insights('spanish', {}))
+
+    def test_resource_drill_uses_corpus_sentences(self):
+        with self.app.app_context():
+            vocab_all = [{'word': f'mot{i}', 'english': f'word{i}'} for i in range(5)]
+            questions = _build_resource_drill_questions(
+                'french', 6, vocab_all, 'fr-FR', rng=random.Random(2),
+            )
+        self.assertEqual(len(questions), 6)
+        for q in questions:
+            self.assertEqual(q['mode'], 'resource_cloze')
+            self.assertIn('____', q['prompt_en'])
+            self.assertEqual(q['choices'].count(q['answer']), 1)
+
+    def test_resource_drill_keeps_the_most_overdue_words(self):
+        due = ['noir', 'café', 'bois', "aujourd'hui"]
+        with self.app.app_context():
+            for seed in range(8):
+                questions = _build_resource_drill_questions(
+                    'french', 2, [], 'fr-FR', rng=random.Random(seed), due_words=due,
+                )
+                self.assertEqual(sorted(q['answer'] for q in questions), ['café', 'noir'])
+
+    def test_resource_practice_page_renders(self):
+        response = self.app.test_client().get('/practice/french?mode=resources&n=5')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'resource_cloze', response.data)
+
+
+if __name__ == '__main__':
+    unittest.main()
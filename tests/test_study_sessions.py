@@ -0,0 +1,193 @@
+import re
+import tempfile
+import unittest
+from pathlib import Path
+
+from backend import create_app
+from backend.services import get_db, get_study_session, purge_study_sessions, study_session_questions
+
+
+def _expected(question):
+    return question['answer'] if 'answer' in question else question['correct']
+
+
+class StudySessionTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        temp_path = Path(self.temp_dir.name)
+        self.app = create_app(
+            {
+                'TESTING': True,
+                'DB_PATH': str(temp_path / 'progress.db'),
+                'TTS_CACHE_DIR': str(temp_path / 'tts_cache'),
+                'SECRET_KEY': 'test-secret',
+            }
+        )
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _login_via_web(self, email='web.user@example.com', name='Web User'):
+        response = self.client.post('/login', data={'name': name, 'email': email}, follow_redirects=False)
+        self.assertEqual(response.status_code, 302)
+
+    def _mobile_headers(self, email='mobile.user@example.com'):
+        response = self.client.post('/api/v1/auth/session', json={'email': email})
+        self.assertEqual(response.status_code, 200)
+        return {'Authorization': f"Bearer {response.get_json()['access_token']}"}
+
+    def _session_from_page(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        session_id = re.search(rb"const SESSION_ID = '([^']+)'", response.data).group(1).decode()
+        with self.app.app_context():
+            study = get_study_session(session_id)
+            questions = study_session_questions(study)
+        return study, questions
+
+    def _query(self, sql, params=()):
+        with self.app.app_context():
+            conn = get_db()
+            rows = [dict(r) for r in conn.execute(sql, params).fetchall()]
+            conn.close()
+        return rows
+
+    def test_web_quiz_is_graded_once_in_one_request(self):
+        self._login_via_web()
+        study, questions = self._session_from_page('/quiz/french/1')
+        self.assertEqual(study['kind'], 'quiz')
+        with self.app.app_context():
+            self.assertEqual(questions, study_session_questions(study))
+
+        answers = [
+            {'question_id': f'q_{i + 1:03d}', 'answer': _expected(q) if i else 'nope'}
+            for i, q in enumerate(questions)
+        ]
+        submit_url = f"/api/study_sessions/{study['id']}/submit"
+        response = self.client.post(submit_url, json={'answers': answers})
+        self.assertEqual(response.status_code, 200)
+        result = response.get_json()
+        self.assertEqual(result['correct_count'], len(questions) - 1)
+        self.assertEqual(result['score_pct'], round((len(questions) - 1) / len(questions) * 100))
+        self.assertEqual(result['completion']['attempts'], 1)
+        self.assertTrue(result['completion']['completed'])
+
+        vocab_words = {q['word'] for q in questions if q['kind'] == 'vocab'}
+        self.assertEqual({u['word'] for u in result['word_updates']}, vocab_words)
+        rows = self._query('SELECT word, box FROM user_word_progress')
+        self.assertEqual({r['word'] for r in rows}, vocab_words)
+
+        again = self.client.post(submit_url, json={'answers': []})
+        self.assertEqual(again.get_json(), result)
+        progress = self._query('SELECT attempts, best_score FROM user_lesson_progress WHERE lesson_id=1')
+        self.assertEqual(progress, [{'attempts': 1, 'best_score': result['score_pct']}])
+
+    def test_web_practice_applies_srs_and_activity(self):
+        study, questions = self._session_from_page('/practice/french?n=6')
+        self.assertEqual(len(questions), 6)
+        answers = [{'question_id': 'q_001', 'answer': _expected(questions[0])},
+                   {'question_id': 'q_002', 'answer': 'definitely wrong'}]
+        response = self.client.post(f"/api/study_sessions/{study['id']}/submit", json={'answers': answers})
+        result = response.get_json()
+        self.assertEqual((result['correct_count'], result['wrong_count']), (1, 1))
+
+        activity = self._query('SELECT xp, reviews, correct, wrong FROM daily_activity')
+        self.assertEqual(activity, [{'xp': result['xp_earned'], 'reviews': 2, 'correct': 1, 'wrong': 1}])
+        boxes = {r['word']: r['box'] for r in self._query('SELECT word, box FROM word_progress')}
+        self.assertEqual(boxes, {questions[0]['word']: 2, questions[1]['word']: 1})
+
+    def test_stale_or_foreign_sessions_are_rejected(self):
+        study, _ = self._session_from_page('/practice/french?n=5')
+        url = f"/api/study_sessions/{study['id']}/submit"
+        with self.app.app_context():
+            conn = get_db()
+            conn.execute("UPDATE study_sessions SET content_version='old' WHERE id=?", (study['id'],))
+            conn.commit()
+            conn.close()
+        self.assertEqual(self.client.post(url, json={'answers': []}).status_code, 409)
+
+        self._login_via_web()
+        self.assertEqual(self.client.post(url, json={'answers': []}).status_code, 404)
+
+    def test_anonymous_sessions_belong_to_their_browser(self):
+        study, _ = self._session_from_page('/practice/french?n=5')
+        url = f"/api/study_sessions/{study['id']}/submit"
+        other = self.app.test_client()
+        self.assertEqual(other.post(url, json={'answers': []}).status_code, 404)
+        self.assertEqual(self.client.post(url, json={'answers': []}).status_code, 200)
+
+    def test_unsubmitted_sessions_are_purged_after_their_ttl(self):
+        opened, _ = self._session_from_page('/practice/french?n=5')
+        submitted, _ = self._session_from_page('/practice/french?n=5')
+        self.client.post(f"/api/study_sessions/{submitted['id']}/submit", json={'answers': []})
+        with self.app.app_context():
+            conn = get_db()
+            conn.execute("UPDATE study_sessions SET created_at='2020-01-01T00:00:00Z'")
+            conn.commit()
+            conn.close()
+            self.assertEqual(purge_study_sessions(3600, dry_run=True), 1)
+            self.assertEqual(purge_study_sessions(3600), 1)
+            self.assertIsNone(get_study_session(opened['id']))
+            self.assertIsNotNone(get_study_session(submitted['id']))
+
+    def test_web_placement_is_scored_and_logged(self):
+        self._login_via_web()
+        study, questions = self._session_from_page('/placement/french?per=6')
+        answers = [{'question_id': f'q_{i + 1:03d}', 'answer': _expected(q)} for i, q in enumerate(questions)]
+        result = self.client.post(f"/api/study_sessions/{study['id']}/submit", json={'answers': answers}).get_json()
+        self.assertEqual(result['recommended_level'], 'B2')
+        logged = self._query('SELECT COUNT(*) AS n FROM placement_responses WHERE session_id=?', (study['id'],))
+        self.assertEqual(logged[0]['n'], len(questions))
+        self.assertEqual(self._query('SELECT COUNT(*) AS n FROM user_word_progress')[0]['n'], 0)
+
+    def test_mobile_quiz_session_contract(self):
+        headers = self._mobile_headers()
+        created = self.client.post('/api/v1/languages/french/lessons/1/quiz_sessions', headers=headers)
+        self.assertEqual(created.status_code, 201)
+        payload = created.get_json()
+        first = payload['questions'][0]
+        self.assertEqual(first['kind'], 'mcq')
+        self.assertIn(first['category'], {'vocab', 'grammar'})
+        self.assertNotIn('<strong>', first['prompt']['en'])
+        self.assertEqual(len(first['choices']), 4)
+
+        with self.app.app_context():
+            questions = study_session_questions(get_study_session(payload['session_id']))
+        answers = [{'question_id': q['question_id'], 'answer': _expected(questions[i])}
+                   for i, q in enumerate(payload['questions'])]
+        submitted = self.client.post(
+            f"/api/v1/languages/french/quiz_sessions/{payload['session_id']}/submit",
+            json={'answers': answers},
+            headers=headers,
+        )
+        self.assertEqual(submitted.status_code, 200)
+        result = submitted.get_json()
+        self.assertEqual(result['score_pct'], 100)
+        self.assertEqual(result['next_lesson_id'], 2)
+        self.assertTrue(result['completion']['last_seen'].endswith('Z'))
+        for update in result['word_updates']:
+            self.assertEqual(update['box'], 2)
+            self.assertTrue(update['next_due'].endswith('Z'))
+        self.assertEqual(result['activity_today']['reviews_today'], len(result['word_updates']))
+
+    def test_mobile_practice_session_validation(self):
+        headers = self._mobile_headers()
+        url = '/api/v1/languages/spanish/practice_sessions'
+        created = self.client.post(url, json={'question_count': 5}, headers=headers)
+        self.assertEqual(created.status_code, 201)
+        payload = created.get_json()
+        self.assertEqual(payload['question_count'], 5)
+        self.assertFalse(payload['resource_mode_available'])
+        self.assertEqual(self.client.post(url, json={'mode': 'resources'}, headers=headers).status_code, 400)
+        self.assertEqual(self.client.post(url, json={'mode': 'speed'}, headers=headers).status_code, 400)
+
+        submit_url = f"/api/v1/languages/spanish/practice_sessions/{payload['session_id']}/submit"
+        bad = self.client.post(submit_url, json={'answers': [{'question_id': 'q_099'}]}, headers=headers)
+        self.assertEqual(bad.status_code, 400)
+        result = self.client.post(submit_url, json={'answers': []}, headers=headers).get_json()
+        self.assertEqual((result['correct_count'], result['wrong_count'], result['xp_earned']), (0, 0, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,567 @@
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+import zipfile
+from pathlib import Path
+from unittest import mock
+
+from backend import create_app, services
+from backend.routes import api as api_routes
+from backend.services import (
+    EspeakProvider,
+    FakeTTSProvider,
+    GTTSProvider,
+    SingleFlight,
+    TTSCacheStore,
+    TTSError,
+    TTSGenerationQueue,
+    get_lesson_vocab,
+    get_lessons,
+    get_tts_store,
+    lesson_tts_clips,
+    prewarm_tts_cache,
+    tts_prewarm_capacity,
+    synthesize_tts,
+    tts_cache_key,
+    tts_provider_chain,
+    tts_prewarm_items,
+    tts_word_text,
+)
+
+
+class SingleFlightTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = self.temp_dir.name
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_concurrent_misses_generate_once(self):
+        flight = SingleFlight()
+        path = os.path.join(self.cache_dir, 'abc.mp3')
+        calls = []
+        served = []
+
+        def request():
+            if not os.path.exists(path):
+                with flight.hold('abc', self.cache_dir, timeout=5) as acquired:
+                    self.assertTrue(acquired)
+                    if not os.path.exists(path):
+                        calls.append(1)
+                        time.sleep(0.2)
+                        with open(path, 'wb') as f:
+                            f.write(b'mp3')
+            with open(path, 'rb') as f:
+                served.append(f.read())
+
+        threads = [threading.Thread(target=request) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(served, [b'mp3'] * 8)
+        metrics = flight.metrics()
+        self.assertEqual((metrics['leaders'], metrics['timeouts'], metrics['in_flight']), (1, 0, 0))
+        self.assertEqual(metrics['waited'], 7)
+
+    def test_other_keys_are_not_blocked_in_process(self):
+        flight = SingleFlight()
+        with flight.hold('one', self.cache_dir, timeout=1) as first:
+            with flight.hold('two', os.path.join(self.cache_dir, 'other'), timeout=1) as second:
+                self.assertTrue(first and second)
+
+    @unittest.skipIf(services._fcntl is None, 'flock is not available on this platform')
+    def test_waiters_in_other_workers_time_out(self):
+        # Two instances share nothing but the lock files, like two gunicorn workers.
+        worker_a, worker_b = SingleFlight(), SingleFlight()
+        with worker_a.hold('abc', self.cache_dir, timeout=1) as leader:
+            self.assertTrue(leader)
+            started = time.monotonic()
+            with worker_b.hold('abc', self.cache_dir, timeout=0.2) as follower:
+                self.assertFalse(follower)
+            self.assertLess(time.monotonic() - started, 1)
+        with worker_b.hold('abc', self.cache_dir, timeout=0.2) as follower:
+            self.assertTrue(follower)
+        self.assertEqual(worker_b.metrics()['timeouts'], 1)
+
+
+class TTSCacheStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = self.temp_dir.name
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _write(self, key, size, mtime=None, flat=False):
+        if flat:
+            path = os.path.join(self.cache_dir, f'{key}.mp3')
+        else:
+            path = TTSCacheStore(self.cache_dir).path_for(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(b'x' * size)
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+        return path
+
+    def test_flat_cache_is_migrated_and_indexed_once(self):
+        self._write('0a1b2c', 10, mtime=1000, flat=True)
+        self._write('ffee00', 20, flat=True)
+        stale_tmp = self._write('.ffee00.abc.tmp', 5, mtime=1000, flat=True)
+        store = TTSCacheStore(self.cache_dir)
+        self.assertEqual(store.migrate(), {'moved': 2})
+        self.assertEqual(store.path_for('0a1b2c'), os.path.join(self.cache_dir, '0a', '1b', '0a1b2c.mp3'))
+        self.assertTrue(store.exists('0a1b2c') and store.exists('ffee00'))
+        self.assertFalse(os.path.exists(os.path.join(self.cache_dir, 'ffee00.mp3')))
+        self.assertFalse(os.path.exists(stale_tmp))
+        self.assertEqual(store.totals(), {'files': 2, 'bytes': 30})
+
+        self._write('abcdef', 40, flat=True)
+        self.assertEqual(TTSCacheStore(self.cache_dir).migrate(), {'moved': 0})
+        self.assertEqual(store.totals(), {'files': 2, 'bytes': 30})
+        self.assertEqual(store.manifest.rebuild(), {'files': 3, 'bytes': 70})
+
+    def test_scratch_manifest_leaves_the_cache_alone(self):
+        self._write('0a1b2c', 10, mtime=1000)
+        stale_tmp = self._write('.0a1b2c.abc.tmp', 5, mtime=1000, flat=True)
+        store = TTSCacheStore(self.cache_dir)
+        with store.scratch_manifest() as manifest:
+            self.assertEqual(manifest.rebuild(), {'files': 1, 'bytes': 10})
+            self.assertEqual(manifest.evict(max_files=0, max_bytes=1, dry_run=True)['removed'], 1)
+        self.assertTrue(os.path.exists(stale_tmp))
+        self.assertTrue(store.exists('0a1b2c'))
+        self.assertFalse(os.path.exists(store.manifest.path))
+
+        store.manifest.record('0a1b2c', 10, now=2000)
+        with store.scratch_manifest() as manifest:
+            self.assertEqual(manifest.totals(), {'files': 1, 'bytes': 10})
+            manifest.record('ffee00', 20)
+        self.assertEqual(store.totals(), {'files': 1, 'bytes': 10})
+
+    def test_writer_publishes_and_records(self):
+        store = TTSCacheStore(self.cache_dir)
+        with store.writer('c0ffee') as tmp_path:
+            with open(tmp_path, 'wb') as f:
+                f.write(b'mp3!')
+        with self.assertRaises(RuntimeError):
+            with store.writer('bad000') as tmp_path:
+                raise RuntimeError('provider failed')
+        self.assertTrue(store.exists('c0ffee'))
+        self.assertFalse(store.exists('bad000'))
+        self.assertEqual(store.totals(), {'files': 1, 'bytes': 4})
+        self.assertEqual(os.listdir(os.path.dirname(store.path_for('c0ffee'))), ['c0ffee.mp3'])
+
+    def test_eviction_follows_last_served_order(self):
+        manifest = TTSCacheStore(self.cache_dir).manifest
+        for i, key in enumerate(['aa01', 'bb02', 'cc03', 'dd04']):
+            self._write(key, 100)
+            manifest.record(key, 100, now=1000 + i)
+        manifest.touch('aa01', now=2000)
+        self.assertEqual(manifest.totals(), {'files': 4, 'bytes': 400})
+
+        preview = manifest.evict(max_files=2, dry_run=True, now=3000)
+        self.assertEqual((preview['removed'], preview['files']), (2, 2))
+        self.assertTrue(manifest.store.exists('bb02'))
+
+        result = manifest.evict(max_files=2, keep={'bb02'}, now=3000)
+        self.assertEqual((result['removed'], result['removed_bytes']), (2, 200))
+        remaining = sorted(k for k in ['aa01', 'bb02', 'cc03', 'dd04'] if manifest.store.exists(k))
+        self.assertEqual(remaining, ['aa01', 'bb02'])
+        self.assertEqual(manifest.totals(), {'files': 2, 'bytes': 200})
+
+    def test_ttl_and_min_age(self):
+        manifest = TTSCacheStore(self.cache_dir).manifest
+        for key, ts in [('5ta1e', 100), ('2ecent', 5000)]:
+            self._write(key, 10)
+            manifest.record(key, 10, now=ts)
+        self.assertEqual(manifest.evict(ttl_sec=1000, now=5500)['removed'], 1)
+        self.assertEqual(manifest.evict(max_files=0, max_bytes=1, min_age_sec=600, now=5500)['removed'], 0)
+        self.assertEqual(manifest.evict(max_bytes=1, now=5500)['removed'], 1)
+        self.assertEqual(manifest.totals(), {'files': 0, 'bytes': 0})
+
+
+class TTSPrewarmTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        temp_path = Path(self.temp_dir.name)
+        self.app = create_app(
+            {
+                'TESTING': True,
+                'DB_PATH': str(temp_path / 'progress.db'),
+                'TTS_CACHE_DIR': str(temp_path / 'tts_cache'),
+                'TTS_PROVIDER': 'fake',
+                'SECRET_KEY': 'test-secret',
+            }
+        )
+        self.store = get_tts_store(self.app.config['TTS_CACHE_DIR'])
+        self.fake = FakeTTSProvider()
+        self.entry = next(
+            e for lesson in get_lessons()['french'] for e in get_lesson_vocab('french', lesson)
+            if e.get('article') and e.get('example')
+        )
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_items_use_the_api_cache_keys(self):
+        items = tts_prewarm_items(['french'])
+        keys = [key for key, _, __ in items]
+        self.assertEqual(len(keys), len(set(keys)))
+        texts = {text for _, __, text in items}
+        for text in (self.entry['word'], tts_word_text(self.entry), self.entry['example']):
+            self.assertIn(text, texts)
+            self.assertIn(tts_cache_key('fr', text), keys)
+        self.assertTrue(all(lang == 'fr' for _, lang, __ in items))
+
+    def test_prewarmed_clips_are_served_by_the_api(self):
+        items = tts_prewarm_items(['french'], provider=self.fake)[:40]
+        stats = prewarm_tts_cache(self.store, items, self.fake.synthesize, workers=4, rate=0)
+        self.assertEqual((stats['generated'], stats['failed'], stats['remaining']), (40, 0, 0))
+        self.assertEqual(self.store.totals()['files'], 40)
+
+        again = prewarm_tts_cache(self.store, items, self.fake.synthesize, workers=2, rate=0)
+        self.assertEqual((again['generated'], again['cached']), (0, 40))
+
+        _, __, text = items[1]
+        response = self.app.test_client().get('/api/tts', query_string={'lang': 'fr-FR', 'text': f'  {text} '})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data.endswith(f'fr|{text}'.encode('utf-8')))
+        response.close()
+
+    def test_prewarm_capacity_checks_the_cache_caps(self):
+        items = tts_prewarm_items(['french'], provider=self.fake)[:30]
+        prewarm_tts_cache(self.store, items[:10], self.fake.synthesize, rate=0)
+        capacity = tts_prewarm_capacity(self.store, items, max_files=25, max_bytes=0)
+        self.assertEqual((capacity['missing'], capacity['files'], capacity['fits']), (20, 30, False))
+        self.assertTrue(tts_prewarm_capacity(self.store, items, max_files=30, max_bytes=0)['fits'])
+        self.assertFalse(tts_prewarm_capacity(self.store, items, max_files=0, max_bytes=capacity['bytes'] - 1)['fits'])
+
+    def test_failures_are_retried_and_reported(self):
+        calls = []
+
+        def flaky(text, tts_lang, out_path):
+            calls.append(text)
+            if text == 'bad' or calls.count(text) == 1:
+                raise RuntimeError('quota')
+            self.fake.synthesize(text, tts_lang, out_path)
+
+        items = [(tts_cache_key('fr', t), 'fr', t) for t in ('good', 'bad')]
+        with mock.patch.object(services.time, 'sleep'):
+            stats = prewarm_tts_cache(self.store, items, flaky, workers=1, rate=0, retries=1)
+        self.assertEqual((stats['generated'], stats['failed']), (1, 1))
+        self.assertEqual(stats['failures'], [{'key': items[1][0], 'lang': 'fr', 'text': 'bad', 'error': 'quota'}])
+        self.assertEqual(calls, ['good', 'good', 'bad', 'bad'])
+
+    def test_rate_limit_spaces_provider_calls(self):
+        items = [(tts_cache_key('fr', t), 'fr', t) for t in ('un', 'deux', 'trois', 'quatre')]
+        started = time.monotonic()
+        stats = prewarm_tts_cache(self.store, items, self.fake.synthesize, workers=4, rate=20)
+        self.assertEqual(stats['generated'], 4)
+        self.assertGreaterEqual(time.monotonic() - started, 0.14)
+
+
+    def test_lesson_audio_bundle(self):
+        lesson = next(l for l in get_lessons()['french'] if len(lesson_tts_clips('french', l)) > 12)
+        clips = lesson_tts_clips('french', lesson, provider=self.fake)
+        warm = [(c['key'], c['lang'], c['text']) for c in clips[:10]]
+        prewarm_tts_cache(self.store, warm, self.fake.synthesize, rate=0)
+        client = self.app.test_client()
+        url = f"/api/v1/languages/french/lessons/{lesson['id']}/audio_bundle"
+
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/zip')
+        etag = response.headers['ETag']
+        with zipfile.ZipFile(io.BytesIO(response.data)) as zf:
+            index = json.loads(zf.read('index.json'))
+            self.assertEqual([c['key'] for c in index['clips']], [k for k, _, __ in warm])
+            self.assertEqual(len(index['missing']), len(clips) - 10)
+            first = index['clips'][0]
+            self.assertTrue(zf.read(first['file']).endswith(f"fr|{first['text']}".encode('utf-8')))
+        response.close()
+        self.assertEqual(client.get(url, headers={'If-None-Match': etag}).status_code, 304)
+
+        index = client.get(url, query_string={'format': 'index'}).get_json()
+        stream = client.get(url, query_string={'format': 'mp3'})
+        self.assertEqual(stream.headers['ETag'].strip('"'), index['bundle_id'])
+        last = index['clips'][-1]
+        clip = stream.data[last['offset']:last['offset'] + last['length']]
+        stream.close()
+        self.assertTrue(clip.endswith(f"fr|{last['text']}".encode('utf-8')))
+
+        # Warming more clips yields a new bundle and drops the old file.
+        prewarm_tts_cache(self.store, [(c['key'], c['lang'], c['text']) for c in clips[10:12]],
+                          self.fake.synthesize, rate=0)
+        refreshed = client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(refreshed.status_code, 200)
+        self.assertEqual(refreshed.headers['X-Audio-Bundle-Missing'], str(len(clips) - 12))
+        refreshed.close()
+        bundles = [n for n in os.listdir(os.path.join(self.store.cache_dir, 'bundles')) if n.endswith('.zip')]
+        self.assertEqual(len(bundles), 1)
+
+        self.assertEqual(client.get(url, query_string={'format': 'ogg'}).status_code, 400)
+        self.assertEqual(client.get('/api/v1/languages/french/lessons/9999/audio_bundle').status_code, 404)
+
+
+class TTSProviderTest(unittest.TestCase):
+    def setUp(self):
+        # Hedged requests and the cache cleanup keep running in background threads.
+        self.temp_dir = tempfile.TemporaryDirectory(ignore_cleanup_errors=True)
+        self.store = TTSCacheStore(os.path.join(self.temp_dir.name, 'tts_cache'))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _app(self, provider):
+        temp_path = Path(self.temp_dir.name)
+        return create_app(
+            {
+                'TESTING': True,
+                'DB_PATH': str(temp_path / 'progress.db'),
+                'TTS_CACHE_DIR': self.store.cache_dir,
+                'TTS_PROVIDER': provider,
+                'SECRET_KEY': 'test-secret',
+            }
+        )
+
+    def test_gtts_keeps_the_legacy_cache_key(self):
+        with mock.patch.dict(os.environ, {'GTTS_TLD': '', 'GTTS_TLD_FR': ''}):
+            self.assertEqual(GTTSProvider().cache_key('fr', 'bonjour'), tts_cache_key('fr', 'bonjour'))
+        self.assertNotEqual(FakeTTSProvider().cache_key('fr', 'bonjour'), tts_cache_key('fr', 'bonjour'))
+        self.assertNotEqual(
+            FakeTTSProvider(voice='a').cache_key('fr', 'bonjour'),
+            FakeTTSProvider(voice='b').cache_key('fr', 'bonjour'),
+        )
+
+    def test_chain_parsing(self):
+        self.assertEqual([p.name for p in tts_provider_chain('fake, espeak ,nope')][:1], ['fake'])
+        self.assertEqual(tts_provider_chain('browser'), [])
+        chain = tts_provider_chain('fake', timeout=3, retries=0)
+        self.assertEqual((chain[0].timeout, chain[0].retries), (3.0, 0))
+
+    def test_api_generates_with_the_configured_provider(self):
+        client = self._app('fake').test_client()
+        response = client.get('/api/tts', query_string={'lang': 'fr-FR', 'text': 'bonjour'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['X-TTS-Provider'], 'fake')
+        self.assertIn('immutable', response.headers['Cache-Control'])
+        self.assertTrue(response.data.endswith(b'fake|fr|bonjour'))
+        response.close()
+        self.assertTrue(self.store.exists(FakeTTSProvider().cache_key('fr', 'bonjour')))
+
+        disabled = self._app('browser').test_client().get('/api/tts', query_string={'lang': 'fr-FR', 'text': 'oui'})
+        self.assertEqual(disabled.status_code, 501)
+
+    def test_failing_provider_falls_over_at_once(self):
+        broken = FakeTTSProvider(fail=True, retries=1, backoff=0, voice='broken')
+        backup = FakeTTSProvider(voice='backup')
+        started = time.monotonic()
+        provider, key = synthesize_tts(self.store, [broken, backup], 'fr', 'salut', hedge_after=5, wait=5)
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertIs(provider, backup)
+        self.assertEqual(broken.calls, 2)
+        self.assertEqual(key, backup.cache_key('fr', 'salut'))
+
+        with self.assertRaises(TTSError):
+            synthesize_tts(self.store, [broken], 'fr', 'merci', wait=5)
+
+    def test_slow_provider_is_hedged_and_still_cached(self):
+        slow = FakeTTSProvider(delay=0.6, voice='slow')
+        fast = FakeTTSProvider(voice='fast')
+        provider, key = synthesize_tts(self.store, [slow, fast], 'fr', 'bonsoir', hedge_after=0.1, wait=5)
+        self.assertIs(provider, fast)
+        self.assertTrue(self.store.exists(key))
+
+        slow_key = slow.cache_key('fr', 'bonsoir')
+        deadline = time.time() + 5
+        while not self.store.exists(slow_key) and time.time() < deadline:
+            time.sleep(0.05)
+        self.assertTrue(self.store.exists(slow_key))
+        self.assertEqual(synthesize_tts(self.store, [slow, fast], 'fr', 'bonsoir'), (slow, slow_key))
+
+        with self.assertRaises(TimeoutError):
+            synthesize_tts(self.store, [FakeTTSProvider(delay=1, voice='stuck')], 'fr', 'adieu', wait=0.1)
+
+    def test_api_serves_fallback_audio_with_a_short_lifetime(self):
+        client = self._app('fake').test_client()
+        slow = FakeTTSProvider(delay=0.5)
+        fast = FakeTTSProvider(voice='fast')
+        with mock.patch.dict(os.environ, {'TTS_HEDGE_AFTER_MS': '50'}), \
+                mock.patch.object(api_routes, 'tts_provider_chain', return_value=[slow, fast]):
+            response = client.get('/api/tts', query_string={'lang': 'fr-FR', 'text': 'au revoir'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['Cache-Control'], 'public, max-age=3600')
+        self.assertTrue(response.data.endswith(b'fast|fr|au revoir'))
+        response.close()
+
+    @unittest.skipUnless(EspeakProvider().available(), 'espeak-ng and ffmpeg are not installed')
+    def test_espeak_renders_mp3(self):
+        provider, key = synthesize_tts(self.store, [EspeakProvider()], 'fr', 'bonjour')
+        with open(self.store.path_for(key), 'rb') as f:
+            self.assertGreater(len(f.read()), 100)
+
+
+class TTSServingTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory(ignore_cleanup_errors=True)
+        temp_path = Path(self.temp_dir.name)
+        self.app = create_app(
+            {
+                'TESTING': True,
+                'DB_PATH': str(temp_path / 'progress.db'),
+                'TTS_CACHE_DIR': str(temp_path / 'tts_cache'),
+                'TTS_PROVIDER': 'fake',
+                'SECRET_KEY': 'test-secret',
+            }
+        )
+        self.client = self.app.test_client()
+        self.store = get_tts_store(self.app.config['TTS_CACHE_DIR'])
+        self.query = {'lang': 'fr-FR', 'text': 'bonjour'}
+        self.key = FakeTTSProvider().cache_key('fr', 'bonjour')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_strong_etag_and_byte_ranges(self):
+        full = self.client.get('/api/tts', query_string=self.query)
+        self.assertEqual(full.headers['ETag'], f'"{self.key}"')
+        self.assertEqual(full.headers['Accept-Ranges'], 'bytes')
+        body = full.data
+        full.close()
+
+        part = self.client.get('/api/tts', query_string=self.query, headers={'Range': 'bytes=4-9'})
+        self.assertEqual(part.status_code, 206)
+        self.assertEqual(part.headers['Content-Range'], f'bytes 4-9/{len(body)}')
+        self.assertEqual(part.data, body[4:10])
+        part.close()
+
+        # Revalidation is answered from the key alone, without opening the file.
+        os.remove(self.store.path_for(self.key))
+        cached = self.client.get('/api/tts', query_string=self.query, headers={'If-None-Match': f'"{self.key}"'})
+        self.assertEqual(cached.status_code, 304)
+        self.assertIn('immutable', cached.headers['Cache-Control'])
+
+    def test_offload_to_the_front_proxy(self):
+        self.app.config['TTS_SENDFILE'] = 'nginx'
+        response = self.client.get('/api/tts', query_string=self.query)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, b'')
+        self.assertEqual(response.headers['X-Accel-Redirect'], f'/_tts_cache/{self.key[:2]}/{self.key[2:4]}/{self.key}.mp3')
+        self.assertEqual(response.headers['Content-Type'], 'audio/mpeg')
+        self.assertEqual(response.headers['ETag'], f'"{self.key}"')
+
+        self.app.config.update({'TTS_SENDFILE': 'x-sendfile'})
+        response = self.client.get('/api/tts', query_string=self.query)
+        self.assertEqual(response.headers['X-Sendfile'], self.store.path_for(self.key))
+        self.assertNotIn('X-Accel-Redirect', response.headers)
+
+        lesson = next(l for l in get_lessons()['french'] if lesson_tts_clips('french', l))
+        self.app.config.update({'TTS_SENDFILE': 'nginx', 'TTS_SENDFILE_PREFIX': '/internal/tts/'})
+        bundle = self.client.get(f"/api/v1/languages/french/lessons/{lesson['id']}/audio_bundle")
+        self.assertTrue(bundle.headers['X-Accel-Redirect'].startswith('/internal/tts/bundles/french-'))
+        self.assertIn(f"french-lesson-{lesson['id']}-audio.zip", bundle.headers['Content-Disposition'])
+        etag = bundle.headers['ETag']
+        again = self.client.get(f"/api/v1/languages/french/lessons/{lesson['id']}/audio_bundle",
+                                headers={'If-None-Match': etag})
+        self.assertEqual(again.status_code, 304)
+
+
+class TTSGenerationQueueTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory(ignore_cleanup_errors=True)
+        temp_path = Path(self.temp_dir.name)
+        self.app = create_app(
+            {
+                'TESTING': True,
+                'DB_PATH': str(temp_path / 'progress.db'),
+                'TTS_CACHE_DIR': str(temp_path / 'tts_cache'),
+                'TTS_PROVIDER': 'fake',
+                'SECRET_KEY': 'test-secret',
+            }
+        )
+        self.client = self.app.test_client()
+        self.queue = TTSGenerationQueue(workers=1, max_depth=2)
+        self.slow = FakeTTSProvider(delay=0.5, voice='slow')
+        patches = [
+            mock.patch.object(api_routes, 'tts_generation_queue', self.queue),
+            mock.patch.object(api_routes, 'tts_provider_chain', return_value=[self.slow]),
+            mock.patch.dict(os.environ, {'TTS_QUEUE_INLINE_WAIT_MS': '0'}),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _get(self, text):
+        return self.client.get('/api/tts', query_string={'lang': 'fr-FR', 'text': text})
+
+    def test_miss_is_queued_and_polled(self):
+        pending = self._get('bonjour')
+        self.assertEqual(pending.status_code, 202)
+        self.assertEqual(pending.headers['Retry-After'], '1')
+        self.assertEqual(pending.headers['Cache-Control'], 'no-store')
+        status_url = pending.get_json()['status_url']
+        self.assertEqual(pending.headers['Location'], status_url)
+        self.assertEqual(self._get('bonjour').status_code, 202)
+
+        job = self.queue.job(self.slow.cache_key('fr', 'bonjour'))
+        self.assertTrue(job['event'].wait(5))
+        self.assertEqual(self.client.get(status_url).get_json()['status'], 'done')
+        served = self._get('bonjour')
+        self.assertEqual(served.status_code, 200)
+        self.assertTrue(served.data.endswith(b'slow|fr|bonjour'))
+        served.close()
+
+        metrics = self.queue.metrics()
+        self.assertEqual((metrics['submitted'], metrics['joined'], metrics['completed']), (1, 1, 1))
+        self.assertGreaterEqual(metrics['generate_ms']['p50'], 250)
+        with mock.patch.dict(os.environ, {'METRICS_TOKEN': 'metrics-secret'}):
+            self.assertIn('tts_queue', self.client.get('/api/metrics?token=metrics-secret').get_json())
+        self.assertEqual(self.client.get('/api/tts/jobs/' + '0' * 64).status_code, 404)
+
+    def test_job_generating_in_another_worker_reads_as_running(self):
+        key = self.slow.cache_key('fr', 'salut')
+        url = f'/api/tts/jobs/{key}'
+        other_worker = SingleFlight()
+        with other_worker.hold(key, self.app.config['TTS_CACHE_DIR'], timeout=5) as acquired:
+            self.assertTrue(acquired)
+            running = self.client.get(url)
+            self.assertEqual((running.status_code, running.get_json()['status']), (200, 'running'))
+            self.assertEqual(running.headers['Retry-After'], '1')
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_full_queue_rejects(self):
+        self.assertEqual(self._get('un').status_code, 202)
+        deadline = time.time() + 5
+        while not self.queue.running and time.time() < deadline:
+            time.sleep(0.01)
+        # One job running, two waiting, the rest turned away.
+        statuses = [self._get(text).status_code for text in ('deux', 'trois', 'quatre', 'cinq')]
+        self.assertEqual(statuses, [202, 202, 503, 503])
+        self.assertEqual(self._get('quatre').headers['Retry-After'], '5')
+        self.assertEqual(self.queue.metrics()['rejected'], 3)
+
+    def test_short_inline_wait_serves_fast_engines_and_reports_failures(self):
+        with mock.patch.dict(os.environ, {'TTS_QUEUE_INLINE_WAIT_MS': '5000'}):
+            served = self._get('salut')
+            self.assertEqual(served.status_code, 200)
+            served.close()
+            with mock.patch.object(api_routes, 'tts_provider_chain',
+                                   return_value=[FakeTTSProvider(fail=True, retries=0)]):
+                failed = self._get('merci')
+        self.assertEqual(failed.status_code, 502)
+        self.assertEqual(self.queue.metrics()['failed'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()